@@ -417,7 +417,17 @@ class ToxicDetectionModel:
                 return 0, 0.9, self.label_mapping[0]  # Clean
 
 # Initialize model
-model = ToxicDetectionModel()
+# Với gunicorn preload (gunicorn.conf.py) model TensorFlow không được tạo trong master:
+# TensorFlow không an toàn khi fork, mỗi worker gọi init_model() sau khi fork
+model = None if os.getenv("SERVER_FORK_PRELOAD") == "1" else ToxicDetectionModel()
+
+
+def init_model():
+    """Tạo model trong worker nếu chưa có"""
+    global model
+    if model is None:
+        model = ToxicDetectionModel()
+    return model
 
 # API Key validation
 API_KEY = os.environ.get("API_KEY", "test-api-key")
@@ -437,6 +447,13 @@ def verify_api_key(request: Request):
 # Kết nối routes từ backend nếu có
 if USING_BACKEND:
     try:
+        # Đăng ký trước startup hook của các router (chúng truy vấn bảng comments):
+        # database cũ chưa có cột comments.vector_data thì thêm vào
+        @app.on_event("startup")
+        async def ensure_database_columns():
+            from backend.db.models import ensure_comment_columns
+            ensure_comment_columns()
+        
         # Thêm các routes từ backend
         app.include_router(admin.router, prefix="/admin", tags=["admin"])
         app.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -583,25 +600,26 @@ async def batch_detect_toxic_language(
                 detail="Items list cannot be empty"
             )
         
+        # Bỏ qua item rỗng
+        valid_items = [item for item in request.items if item.text.strip()]
+        
+        # Dự đoán cả batch bằng một lần forward pass
+        predictions = None
+        if USING_BACKEND:
+            try:
+                # Sử dụng function từ backend
+                from backend.services.ml_model import predict_texts
+                predictions = predict_texts([item.text for item in valid_items])
+            except Exception:
+                predictions = None
+        
         # Xử lý từng item
-        for item in request.items:
-            if not item.text.strip():
-                # Bỏ qua item rỗng
-                continue
-                
-            # Dự đoán
-            if USING_BACKEND:
-                try:
-                    # Sử dụng function từ backend
-                    from backend.services.ml_model import predict_text
-                    prediction_class, confidence, probabilities = predict_text(item.text)
-                    prediction_text = model.label_mapping[prediction_class]
-                except Exception:
-                    # Fallback to standalone model
-                    prediction_class, confidence, prediction_text = model.predict(item.text)
-                    probabilities = None
+        for index, item in enumerate(valid_items):
+            if predictions is not None:
+                prediction_class, confidence, probabilities = predictions[index]
+                prediction_text = model.label_mapping[prediction_class]
             else:
-                # Sử dụng model standalone
+                # Sử dụng model standalone (hoặc fallback khi backend lỗi)
                 prediction_class, confidence, prediction_text = model.predict(item.text)
                 probabilities = None
             
@@ -651,6 +669,39 @@ async def batch_detect_toxic_language(
             detail=f"Error processing batch request: {str(e)}"
         )
 
+@app.post("/batch/detect/stream")
+async def batch_detect_toxic_language_stream(
+    request: Request,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Phân tích hàng loạt văn bản dạng stream
+    
+    Body là NDJSON (mỗi dòng một {"text": ..., "id": ...}) hoặc một mảng JSON gửi dạng chunked.
+    Kết quả trả về dạng NDJSON theo từng micro-batch ngay khi phân loại xong, gồm cả kết quả
+    "bình thường" và không lưu vào database.
+    """
+    if not USING_BACKEND:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Streaming batch detection requires the backend"
+        )
+    from backend.api.streaming import ndjson_prediction_response
+    from backend.services.ml_model import predict_texts
+    
+    def format_result(item, text, result):
+        prediction_class, confidence, probabilities = result
+        return {
+            "text": text,
+            "prediction": prediction_class,
+            "confidence": confidence,
+            "prediction_text": model.label_mapping[prediction_class],
+            "probabilities": probabilities,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+    
+    return ndjson_prediction_response(request, predict_texts, format_result)
+
 @app.get("/health")
 async def health_check():
     """Endpoint kiểm tra trạng thái hoạt động"""
@@ -898,6 +949,21 @@ async def root():
                 </code></pre>
             </div>
             
+            <div class="endpoint">
+                <span class="method">POST</span> <span class="path">/batch/detect/stream</span>
+                <p class="description">Phân tích hàng loạt văn bản dạng stream (NDJSON vào, NDJSON ra)</p>
+                <h4>Request</h4>
+                <pre><code>
+{"text": "Văn bản thứ nhất", "id": 1}
+{"text": "Văn bản thứ hai", "id": 2}
+                </code></pre>
+                <h4>Response</h4>
+                <pre><code>
+{"index": 0, "id": 1, "text": "Văn bản thứ nhất", "prediction": 1, "confidence": 0.85, "prediction_text": "xúc phạm", ...}
+{"index": 1, "id": 2, "text": "Văn bản thứ hai", "prediction": 0, "confidence": 0.97, "prediction_text": "bình thường", ...}
+                </code></pre>
+            </div>
+            
             <div class="endpoint">
                 <span class="method">GET</span> <span class="path">/health</span>
                 <p class="description">Kiểm tra trạng thái hoạt động của API</p>
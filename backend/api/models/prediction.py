@@ -136,6 +136,7 @@ class PredictionResponse(BaseModel):
     prediction_text: str
     keywords: Optional[List[str]] = None
     timestamp: Optional[str] = None
+    stage: Optional[str] = Field(None, description="Stage của cascade đã trả lời (linear, lstm, phobert, ...) khi CASCADE_ENABLED")
     
     class Config:
         json_schema_extra = {
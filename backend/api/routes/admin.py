@@ -7,6 +7,8 @@ from backend.db.models import get_db, User, Role, Log, Comment
 from backend.api.models.prediction import UserResponse, LogResponse, CommentResponse, UserCreate, UserUpdate, DashboardData
 from backend.api.routes.auth import get_admin_user
 from backend.services.ml_model import get_model_stats
+from backend.services.vector_index import unindex_comment
+from backend.services.feature_store import remove_comment_features
 
 router = APIRouter()
 
@@ -446,6 +448,8 @@ def delete_comment(
     
     db.delete(comment)
     db.commit()
+    unindex_comment(comment_id)
+    remove_comment_features(comment_id)
     
     # Ghi log
     log = Log(
@@ -86,7 +86,14 @@ from backend.api.models.prediction import (
     ExtensionStatsResponse
 )
 from backend.services.ml_model import MLModel
-from backend.utils.vector_utils import extract_features
+from backend.services.batch_scheduler import MicroBatchScheduler
+from backend.services.cascade import CascadeClassifier
+from backend.api.streaming import ndjson_prediction_response
+from backend.services.vector_index import index_comment, unindex_comment
+from backend.services.feature_store import remove_comment_features, store_comment_features
+from backend.services.near_duplicates import get_duplicate_index
+from backend.services.persistence_worker import enqueue_comment, stop_persistence_worker
+from backend.utils.vector_utils import extract_features_sparse
 from backend.api.routes.auth import get_current_user, get_optional_current_user
 from backend.config.settings import settings
 import sqlalchemy as sa
@@ -94,8 +101,17 @@ import logging
 
 router = APIRouter()
 ml_model = MLModel()
+# Gom các request /detect đồng thời thành một lần forward pass
+inference_scheduler = MicroBatchScheduler(ml_model)
+cascade = CascadeClassifier(ml_model)
 logger = logging.getLogger(__name__)
 
+@router.on_event("shutdown")
+async def stop_inference_scheduler():
+    """Dừng worker micro-batching và ghi hết hàng đợi lưu dự đoán khi tắt ứng dụng"""
+    await inference_scheduler.stop()
+    stop_persistence_worker()
+
 @router.post("/detect", response_model=PredictionResponse)
 async def extension_detect(
     request: PredictionRequest,
@@ -109,8 +125,8 @@ async def extension_detect(
     # Lấy model type từ request nếu có, mặc định là None (sẽ dùng model mặc định)
     model_type = getattr(request, 'model_type', None)
     
-    # Thực hiện dự đoán với model type được chỉ định (nếu có)
-    prediction, confidence, probabilities = ml_model.predict(request.text, model_type=model_type)
+    # Thực hiện dự đoán với model type được chỉ định (nếu có), gom batch với các request đồng thời
+    prediction, confidence, probabilities = await inference_scheduler.predict(request.text, model_type=model_type)
     
     # Ánh xạ dự đoán sang text
     prediction_text = {0: "clean", 1: "offensive", 2: "hate", 3: "spam"}[prediction]
@@ -120,8 +136,8 @@ async def extension_detect(
     
     # Lưu dự đoán trong background nếu người dùng đã xác thực và save_to_db=True
     if save_to_db and current_user:
-        background_tasks.add_task(
-            store_extension_prediction, 
+        save_extension_prediction_later(
+            background_tasks, 
             db=db, 
             content=request.text, 
             platform=request.platform, 
@@ -173,14 +189,26 @@ async def extension_batch_detect(
     
     logger.info(f"Extension batch detect: Nhận {len(items)} items, save_to_db={save_to_db}, model_type={model_type}")
     
-    for item in items:
-        # Đảm bảo item có text
-        if not item.get('text'):
-            continue
-            
-        # Thực hiện dự đoán sử dụng mô hình đã được cập nhật và model_type được chỉ định (nếu có)
-        prediction, confidence, probabilities = ml_model.predict(item['text'], model_type=model_type)
-        
+    # Đảm bảo item có text
+    items_with_text = [item for item in items if item.get('text')]
+    
+    # Dự đoán toàn bộ batch bằng một lần tokenize/pad và forward pass (theo chunk)
+    batch_texts = [item['text'] for item in items_with_text]
+
+    def predict(texts: List[str]):
+        if settings.CASCADE_ENABLED and not model_type:
+            return cascade.predict_batch(texts)
+        return [(*result, None) for result in ml_model.predict_batch(texts, model_type=model_type)]
+
+    # Comment gần trùng với một cụm đã biết (spam hàng loạt) dùng lại kết quả của cụm thay vì chạy model
+    if settings.DUPLICATE_DETECTION_ENABLED and not model_type:
+        predictions, reused = get_duplicate_index().classify_batch(
+            batch_texts, [item.get('platform', 'unknown') for item in items_with_text], predict
+        )
+    else:
+        predictions, reused = predict(batch_texts), [False] * len(batch_texts)
+    
+    for item, (prediction, confidence, probabilities, stage), duplicate in zip(items_with_text, predictions, reused):
         # Ánh xạ dự đoán sang text
         prediction_text = {0: "bình thường", 1: "xúc phạm", 2: "thù ghét", 3: "spam"}[prediction]
         
@@ -191,10 +219,12 @@ async def extension_batch_detect(
         metadata = item.get('metadata')
         
         # Chỉ lưu kết quả vào database nếu save_to_db=True và điều kiện phù hợp
-        if save_to_db and (prediction != 0 or getattr(request, 'store_clean', False)):
+        if duplicate and settings.DUPLICATE_SKIP_STORE:
+            pass
+        elif save_to_db and (prediction != 0 or getattr(request, 'store_clean', False)):
             # Lưu dự đoán trong background
-            background_tasks.add_task(
-                store_extension_prediction, 
+            save_extension_prediction_later(
+                background_tasks, 
                 db=db, 
                 content=item['text'], 
                 platform=platform, 
@@ -212,7 +242,8 @@ async def extension_batch_detect(
             "prediction": prediction,
             "confidence": confidence,
             "probabilities": probabilities,
-            "prediction_text": prediction_text
+            "prediction_text": prediction_text,
+            "stage": stage
         })
     
     # Ghi log hoạt động chỉ khi save_to_db=True
@@ -241,6 +272,38 @@ async def extension_batch_detect(
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@router.post("/batch-detect/stream")
+async def extension_batch_detect_stream(
+    request: Request,
+    model_type: Optional[str] = None,
+    current_user: User = Depends(get_optional_current_user)
+):
+    """
+    API endpoint để extension phân tích số lượng lớn comments dạng stream
+
+    Body là NDJSON hoặc mảng JSON các item {"text": ..., "id": ...}; kết quả trả về dạng NDJSON
+    theo từng micro-batch, không lưu vào database.
+    """
+    use_cascade = settings.CASCADE_ENABLED and not model_type
+
+    def predict(texts: List[str]):
+        if use_cascade:
+            return cascade.predict_batch(texts)
+        return [(*result, None) for result in ml_model.predict_batch(texts, model_type=model_type)]
+
+    def format_result(item, text, result):
+        prediction, confidence, probabilities, stage = result
+        return {
+            "text": text,
+            "prediction": prediction,
+            "confidence": confidence,
+            "probabilities": probabilities,
+            "prediction_text": {0: "bình thường", 1: "xúc phạm", 2: "thù ghét", 3: "spam"}[prediction],
+            "stage": stage
+        }
+
+    return ndjson_prediction_response(request, predict, format_result)
+
 @router.get("/stats", response_model=ExtensionStatsResponse)
 async def extension_stats(
     request: Request,
@@ -347,6 +410,8 @@ async def delete_extension_comment(
     # Xóa comment
     db.delete(comment)
     db.commit()
+    unindex_comment(comment_id)
+    remove_comment_features(comment_id)
     
     # Ghi log
     log = Log(
@@ -426,25 +491,20 @@ async def update_extension_settings(
     
     return {"detail": "Cài đặt đã được cập nhật thành công"}
 
-def store_extension_prediction(
-    db: Session, 
-    content: str, 
-    platform: str, 
+def extension_comment_fields(
+    content: str,
+    platform: str,
     source_user_name: Optional[str] = None,
     source_url: Optional[str] = None,
-    prediction: int = 0, 
+    prediction: int = 0,
     confidence: float = 0.0,
     user_id: Optional[int] = None,
     metadata: Dict[str, Any] = None
-):
+) -> Dict[str, Any]:
     """
-    Hàm lưu kết quả dự đoán vào database
+    Giá trị các cột của Comment cho một dự đoán từ extension
     """
-    # Trích xuất vector features
-    vector = extract_features(content)
-    
-    # Tạo comment
-    comment = Comment(
+    return dict(
         content=content,
         platform=platform,
         source_user_name=source_user_name,
@@ -453,8 +513,37 @@ def store_extension_prediction(
         confidence=confidence,
         user_id=user_id,
         created_at=datetime.utcnow(),
-        metadata=metadata
+        meta_data=metadata
     )
+
+def save_extension_prediction_later(background_tasks: BackgroundTasks, db: Session, **kwargs):
+    """
+    Lưu dự đoán qua hàng đợi ghi theo lô; nếu hàng đợi tắt hoặc đầy thì lưu riêng trong background
+    """
+    if not enqueue_comment(extension_comment_fields(**kwargs), kwargs["content"]):
+        background_tasks.add_task(store_extension_prediction, db=db, **kwargs)
+
+def store_extension_prediction(
+    db: Session, 
+    content: str, 
+    platform: str, 
+    source_user_name: Optional[str] = None,
+    source_url: Optional[str] = None,
+    prediction: int = 0, 
+    confidence: float = 0.0,
+    user_id: Optional[int] = None,
+    metadata: Dict[str, Any] = None
+):
+    """
+    Hàm lưu kết quả dự đoán vào database
+    """
+    # Trích xuất vector features (dạng thưa)
+    vector = extract_features_sparse(content)
+    
+    # Tạo comment
+    comment = Comment(**extension_comment_fields(
+        content, platform, source_user_name, source_url, prediction, confidence, user_id, metadata
+    ))
     
     # Lưu vector
     if hasattr(comment, 'set_vector') and callable(getattr(comment, 'set_vector')):
@@ -464,6 +553,10 @@ def store_extension_prediction(
     db.add(comment)
     db.commit()
     
+    # Cập nhật chỉ mục tìm kiếm tương tự và kho đặc trưng dùng chung
+    index_comment(comment, vector)
+    store_comment_features(comment, vector)
+    
     return comment.id
 
 @router.post("/stats/reset")
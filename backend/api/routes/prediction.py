@@ -111,11 +111,12 @@
 #     db.add(comment)
 #     db.commit()
 # api/routes/prediction.py
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, File, UploadFile, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from io import StringIO
+import os
 import csv
 import pandas as pd
 import json
@@ -130,12 +131,41 @@ from backend.api.models.prediction import (
     TextAnalysisResponse
 )
 from backend.services.ml_model import MLModel
+from backend.services.cascade import CascadeClassifier
+from backend.services.vector_index import index_comment, save_vector_index, search_similar_comments, warm_vector_index
+from backend.services.feature_store import store_comment_features
+from backend.services.persistence_worker import enqueue_comment, stop_persistence_worker
 from backend.api.routes.auth import get_current_user
-from backend.utils.vector_utils import extract_features
+from backend.api.streaming import ndjson_prediction_response
+from backend.config.settings import settings
+from backend.utils.vector_utils import extract_features_sparse, load_hashing_idf, load_svd_reducer, load_vectorizer
 from backend.utils.text_processing import preprocess_text, extract_keywords
 
 router = APIRouter()
 ml_model = MLModel()
+# Cascade: stage tuyến tính rẻ trả lời văn bản chắc chắn, chỉ văn bản khó mới chạy LSTM/PhoBERT
+cascade = CascadeClassifier(ml_model)
+
+@router.on_event("startup")
+async def load_vector_index():
+    # Tải vectorizer đã huấn luyện (trước chỉ mục, vì chỉ mục dùng đặc trưng của nó);
+    # chế độ băm chỉ cần mảng IDF, không tải vocabulary
+    if settings.FEATURE_MODE == "hashing":
+        if os.path.exists(settings.HASHING_IDF_PATH):
+            load_hashing_idf()
+    elif os.path.exists(settings.VECTORIZER_PATH):
+        # Bộ giảm chiều chỉ khớp với vectorizer được huấn luyện cùng lần
+        if load_vectorizer(settings.VECTORIZER_PATH) and os.path.exists(settings.VECTORIZER_SVD_PATH):
+            load_svd_reducer(settings.VECTORIZER_SVD_PATH)
+    # Tải chỉ mục comment tương tự từ file và bổ sung các comment còn thiếu ngay khi khởi động,
+    # để request đầu tiên không phải đọc cả bảng comments
+    warm_vector_index()
+
+@router.on_event("shutdown")
+async def persist_vector_index():
+    # Ghi hết các dự đoán còn trong hàng đợi trước khi lưu chỉ mục
+    stop_persistence_worker()
+    save_vector_index()
 
 @router.post("/single", response_model=PredictionResponse)
 async def predict_single(
@@ -151,7 +181,11 @@ async def predict_single(
     processed_text = preprocess_text(request.text)
     
     # Thực hiện dự đoán
-    prediction, confidence, probabilities = ml_model.predict(processed_text)
+    stage = None
+    if settings.CASCADE_ENABLED:
+        prediction, confidence, probabilities, stage = cascade.predict(processed_text)
+    else:
+        prediction, confidence, probabilities = ml_model.predict(processed_text)
     
     # Ánh xạ dự đoán sang text
     prediction_text = {0: "clean", 1: "offensive", 2: "hate", 3: "spam"}[prediction]
@@ -159,8 +193,8 @@ async def predict_single(
     # Lưu dự đoán trong background
     comment_id = None
     if request.save_result:
-        background_tasks.add_task(
-            store_prediction, 
+        save_prediction_later(
+            background_tasks, 
             db=db, 
             content=request.text, 
             processed_content=processed_text,
@@ -185,7 +219,8 @@ async def predict_single(
         "probabilities": probabilities,
         "prediction_text": prediction_text,
         "keywords": keywords,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow().isoformat(),
+        "stage": stage
     }
 
 @router.post("/batch", response_model=BatchPredictionResponse)
@@ -199,45 +234,52 @@ async def predict_batch(
     API endpoint để phân tích nhiều comments cùng lúc
     """
     results = []
+    comments = request.comments or request.items or []
     
-    for comment in request.comments:
-        # Tiền xử lý văn bản
-        processed_text = preprocess_text(comment.text)
-        
-        # Thực hiện dự đoán
-        prediction, confidence, probabilities = ml_model.predict(processed_text)
+    # Tiền xử lý văn bản
+    processed_texts = [preprocess_text(comment.get('text', '')) for comment in comments]
+    
+    # Thực hiện dự đoán cho toàn bộ batch trong một lần forward pass
+    # (cascade chỉ dùng khi không chỉ định model cụ thể)
+    if settings.CASCADE_ENABLED and not request.model_type:
+        predictions = cascade.predict_batch(processed_texts)
+    else:
+        predictions = [(*result, None) for result in ml_model.predict_batch(processed_texts, model_type=request.model_type)]
+    
+    for comment, processed_text, (prediction, confidence, probabilities, stage) in zip(comments, processed_texts, predictions):
         prediction_text = {0: "clean", 1: "offensive", 2: "hate", 3: "spam"}[prediction]
         
         # Lưu dự đoán nếu cần
-        if request.save_results:
-            background_tasks.add_task(
-                store_prediction, 
+        if request.save_to_db:
+            save_prediction_later(
+                background_tasks, 
                 db=db, 
-                content=comment.text, 
+                content=comment.get('text', ''), 
                 processed_content=processed_text,
-                platform=comment.platform, 
-                source_user_name=comment.source_user_name,
-                source_url=comment.source_url,
+                platform=comment.get('platform', 'unknown'), 
+                source_user_name=comment.get('source_user_name'),
+                source_url=comment.get('source_url'),
                 prediction=prediction, 
                 confidence=confidence,
                 probabilities=probabilities,
                 user_id=current_user.id,
-                metadata=comment.metadata
+                metadata=comment.get('metadata')
             )
         
         results.append({
-            "text": comment.text,
+            "text": comment.get('text', ''),
             "processed_text": processed_text,
             "prediction": prediction,
             "confidence": confidence,
             "probabilities": probabilities,
-            "prediction_text": prediction_text
+            "prediction_text": prediction_text,
+            "stage": stage
         })
     
     # Ghi log
     log = Log(
         user_id=current_user.id,
-        action=f"Batch prediction: {len(request.comments)} items",
+        action=f"Batch prediction: {len(comments)} items",
         timestamp=datetime.utcnow()
     )
     db.add(log)
@@ -249,6 +291,59 @@ async def predict_batch(
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@router.post("/batch/stream")
+async def predict_batch_stream(
+    request: Request,
+    model_type: Optional[str] = Query(None, description="Model sử dụng (mặc định: model chính hoặc cascade)"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    API endpoint phân tích số lượng lớn comments dạng stream
+
+    Body là NDJSON (mỗi dòng một {"text": ..., "id": ...}) hoặc một mảng JSON gửi dạng chunked.
+    Kết quả trả về dạng NDJSON theo từng micro-batch ngay khi phân loại xong, không lưu vào database.
+    """
+    use_cascade = settings.CASCADE_ENABLED and not model_type
+
+    def predict(texts: List[str]):
+        processed_texts = [preprocess_text(text) for text in texts]
+        if use_cascade:
+            predictions = cascade.predict_batch(processed_texts)
+        else:
+            predictions = [(*result, None) for result in ml_model.predict_batch(processed_texts, model_type=model_type)]
+        return list(zip(processed_texts, predictions))
+
+    def format_result(item, text, result):
+        processed_text, (prediction, confidence, probabilities, stage) = result
+        return {
+            "text": text,
+            "processed_text": processed_text,
+            "prediction": prediction,
+            "confidence": confidence,
+            "probabilities": probabilities,
+            "prediction_text": {0: "clean", 1: "offensive", 2: "hate", 3: "spam"}[prediction],
+            "stage": stage
+        }
+
+    return ndjson_prediction_response(request, predict, format_result)
+
+@router.get("/cascade/stats")
+async def get_cascade_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Thống kê cascade: tỷ lệ văn bản mỗi stage trả lời, độ trễ trung bình và tỷ lệ khớp với model chính
+    """
+    return {
+        "enabled": settings.CASCADE_ENABLED,
+        "thresholds": {
+            "linear": settings.CASCADE_LINEAR_THRESHOLD,
+            "model": settings.CASCADE_MODEL_THRESHOLD
+        },
+        "escalation_model": settings.CASCADE_ESCALATION_MODEL or None,
+        **cascade.stats()
+    }
+
 @router.post("/upload-csv", response_model=BatchPredictionResponse)
 async def upload_csv_file(
     file: UploadFile = File(...),
@@ -289,16 +384,20 @@ async def upload_csv_file(
     
     results = []
     
-    # Xử lý từng hàng trong CSV
+    # Lọc các hàng có nội dung text
+    rows = []
     for index, row in df.iterrows():
-        # Lấy nội dung text
         text = str(row[text_column])
         if not text or text.lower() == 'nan':
             continue
-            
-        # Tiền xử lý text
-        processed_text = preprocess_text(text)
-        
+        rows.append((text, row))
+    
+    # Tiền xử lý và dự đoán toàn bộ file trong một lần forward pass (theo chunk)
+    processed_texts = [preprocess_text(text) for text, _ in rows]
+    predictions = ml_model.predict_batch(processed_texts)
+    
+    # Xử lý từng hàng trong CSV
+    for (text, row), processed_text, (prediction, confidence, probabilities) in zip(rows, processed_texts, predictions):
         # Lấy source_user_name nếu có
         source_user_name = None
         if has_user_column:
@@ -315,8 +414,6 @@ async def upload_csv_file(
                     source_url = str(row[col])
                     break
         
-        # Thực hiện dự đoán
-        prediction, confidence, probabilities = ml_model.predict(processed_text)
         prediction_text = {0: "clean", 1: "offensive", 2: "hate", 3: "spam"}[prediction]
         
         # Lưu vào database nếu cần
@@ -334,8 +431,8 @@ async def upload_csv_file(
                         continue
                     metadata[col] = value
             
-            background_tasks.add_task(
-                store_prediction, 
+            save_prediction_later(
+                background_tasks, 
                 db=db, 
                 content=text, 
                 processed_content=processed_text,
@@ -417,35 +514,22 @@ async def get_similar_comments(
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Lỗi khi tạo vector: {str(e)}")
     
-    # Tìm các comment tương tự
+    # Tìm các comment tương tự qua chỉ mục ANN (ứng viên được xếp hạng lại bằng vector gốc)
     similar_comments = []
-    
-    # Lưu ý: Triển khai cụ thể phụ thuộc vào cách bạn lưu vector trong database
-    # Ví dụ sử dụng cosine similarity
-    
-    # Giả sử bạn có hàm tính toán similarity trong database hoặc trong code
-    # Đây là ví dụ giả định, cần thay thế bằng triển khai thực tế
-    for comment in db.query(Comment).filter(Comment.id != comment_id).all():
-        comment_vector = comment.get_vector()
-        if comment_vector:
-            # Tính cosine similarity
-            similarity = cosine_similarity(source_vector, comment_vector)
-            if similarity >= threshold:
-                prediction_text = {0: "clean", 1: "offensive", 2: "hate", 3: "spam"}[comment.prediction]
-                similar_comments.append({
-                    "id": comment.id,
-                    "content": comment.content,
-                    "prediction": comment.prediction,
-                    "prediction_text": prediction_text,
-                    "confidence": comment.confidence,
-                    "similarity": similarity,
-                    "platform": comment.platform,
-                    "created_at": comment.created_at.isoformat()
-                })
-    
-    # Sắp xếp theo độ tương tự giảm dần và lấy theo limit
-    similar_comments.sort(key=lambda x: x["similarity"], reverse=True)
-    similar_comments = similar_comments[:limit]
+    for comment, similarity in search_similar_comments(
+        db, source_vector, limit=limit, threshold=threshold, exclude_ids={comment_id}
+    ):
+        prediction_text = {0: "clean", 1: "offensive", 2: "hate", 3: "spam"}[comment.prediction]
+        similar_comments.append({
+            "id": comment.id,
+            "content": comment.content,
+            "prediction": comment.prediction,
+            "prediction_text": prediction_text,
+            "confidence": comment.confidence,
+            "similarity": similarity,
+            "platform": comment.platform,
+            "created_at": comment.created_at.isoformat()
+        })
     
     return {
         "source_comment": {
@@ -509,27 +593,22 @@ async def analyze_text(
         "char_count": len(processed_text)
     }
 
-def store_prediction(
-    db: Session, 
-    content: str, 
+def prediction_comment_fields(
+    content: str,
     processed_content: str,
-    platform: str, 
+    platform: str,
     source_user_name: Optional[str] = None,
     source_url: Optional[str] = None,
-    prediction: int = 0, 
+    prediction: int = 0,
     confidence: float = 0.0,
     probabilities: Optional[Dict[str, float]] = None,
     user_id: Optional[int] = None,
     metadata: Optional[Dict[str, Any]] = None
-):
+) -> Dict[str, Any]:
     """
-    Hàm lưu kết quả dự đoán vào database
+    Giá trị các cột của Comment cho một dự đoán
     """
-    # Trích xuất vector đặc trưng
-    vector = extract_features(processed_content)
-    
-    # Tạo comment
-    comment = Comment(
+    return dict(
         content=content,
         processed_content=processed_content,
         platform=platform,
@@ -540,8 +619,40 @@ def store_prediction(
         probabilities=json.dumps(probabilities) if probabilities else None,
         user_id=user_id,
         created_at=datetime.utcnow(),
-        metadata=json.dumps(metadata) if metadata else None
+        meta_data=metadata
     )
+
+def save_prediction_later(background_tasks: BackgroundTasks, db: Session, **kwargs):
+    """
+    Lưu dự đoán qua hàng đợi ghi theo lô; nếu hàng đợi tắt hoặc đầy thì lưu riêng trong background
+    """
+    if not enqueue_comment(prediction_comment_fields(**kwargs), kwargs["processed_content"]):
+        background_tasks.add_task(store_prediction, db=db, **kwargs)
+
+def store_prediction(
+    db: Session, 
+    content: str, 
+    processed_content: str,
+    platform: str, 
+    source_user_name: Optional[str] = None,
+    source_url: Optional[str] = None,
+    prediction: int = 0, 
+    confidence: float = 0.0,
+    probabilities: Optional[Dict[str, float]] = None,
+    user_id: Optional[int] = None,
+    metadata: Optional[Dict[str, Any]] = None
+):
+    """
+    Hàm lưu kết quả dự đoán vào database
+    """
+    # Trích xuất vector đặc trưng (dạng thưa, không chuyển sang mảng 10000 chiều)
+    vector = extract_features_sparse(processed_content)
+    
+    # Tạo comment
+    comment = Comment(**prediction_comment_fields(
+        content, processed_content, platform, source_user_name, source_url,
+        prediction, confidence, probabilities, user_id, metadata
+    ))
     
     # Lưu vector
     if hasattr(comment, 'set_vector') and callable(getattr(comment, 'set_vector')):
@@ -551,6 +662,10 @@ def store_prediction(
     db.add(comment)
     db.commit()
     
+    # Cập nhật chỉ mục tìm kiếm tương tự và kho đặc trưng dùng chung
+    index_comment(comment, vector)
+    store_comment_features(comment, vector)
+    
     return comment.id
 
 def cosine_similarity(vec1, vec2):
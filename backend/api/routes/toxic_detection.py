@@ -76,13 +76,28 @@ from datetime import datetime, timedelta
 from backend.db.models import get_db, Comment, User, Log
 from backend.api.models.prediction import CommentResponse, StatisticsResponse, TrendResponse
 from backend.api.routes.auth import get_current_user
-from backend.utils.vector_utils import compute_similarity, extract_features
+from backend.utils.vector_utils import extract_features, extract_features_batch
+from backend.services.feature_store import get_feature_store
+from backend.services.comment_clusters import get_cluster_service, start_cluster_service, stop_cluster_service
+from backend.services.near_duplicates import get_duplicate_index
+from backend.services.comment_statistics import cached_statistics
+from backend.services.vector_index import search_similar_comments
+from backend.config.settings import settings
 from backend.utils.text_processing import preprocess_text
 import numpy as np
 import sqlalchemy as sa
 
 router = APIRouter()
 
+@router.on_event("startup")
+async def start_comment_clusters():
+    # Tải trạng thái phân cụm đã lưu và chạy cập nhật nền
+    start_cluster_service()
+
+@router.on_event("shutdown")
+async def stop_comment_clusters():
+    stop_cluster_service()
+
 @router.get("/similar", response_model=List[CommentResponse])
 def find_similar_comments(
     text: str,
@@ -100,34 +115,14 @@ def find_similar_comments(
     processed_text = preprocess_text(text)
     query_vector = extract_features(processed_text)
     
-    # Xây dựng query cơ sở
-    query = db.query(Comment)
-    
-    # Áp dụng bộ lọc nếu có
-    if platform:
-        query = query.filter(Comment.platform == platform)
-    
-    if prediction is not None:
-        query = query.filter(Comment.prediction == prediction)
-    
-    # Lấy tất cả comments từ database phù hợp với bộ lọc
-    comments = query.all()
-    
-    # Tính toán độ tương tự
-    similar_comments = []
-    for comment in comments:
-        comment_vector = comment.get_vector()
-        if comment_vector is not None:
-            similarity = compute_similarity(query_vector, comment_vector)
-            if similarity >= threshold:
-                similar_comments.append((comment, similarity))
-    
-    # Sắp xếp theo độ tương tự (giảm dần)
-    similar_comments.sort(key=lambda x: x[1], reverse=True)
+    # Ứng viên từ chỉ mục ANN (lọc theo platform/prediction), xếp hạng lại bằng vector gốc
+    similar_comments = search_similar_comments(
+        db, query_vector, limit=limit, threshold=threshold, platform=platform, prediction=prediction
+    )
     
     # Chuyển đổi thành CommentResponse
     result = []
-    for comment, similarity in similar_comments[:limit]:
+    for comment, similarity in similar_comments:
         prediction_text = {0: "clean", 1: "offensive", 2: "hate", 3: "spam"}[comment.prediction]
         result.append({
             "id": comment.id,
@@ -166,87 +161,28 @@ def get_statistics(
 ):
     """
     Lấy thống kê về các comments đã phát hiện
-    """
-    # Xây dựng query cơ sở
-    query = db.query(Comment)
-    
-    # Áp dụng các bộ lọc
-    if platform:
-        query = query.filter(Comment.platform == platform)
     
-    if start_date:
-        query = query.filter(Comment.created_at >= start_date)
-    
-    if end_date:
-        query = query.filter(Comment.created_at <= end_date)
-    
-    if user_id and (current_user.role.name == "admin" or current_user.id == user_id):
-        query = query.filter(Comment.user_id == user_id)
-    elif not current_user.role.name == "admin":
+    Một lượt quét gộp theo platform (đếm theo nhãn bằng SUM(CASE ...)) và một
+    truy vấn top người dùng, trên biểu thức lọc; kết quả được cache
+    STATISTICS_CACHE_TTL giây theo bộ lọc.
+    """
+    is_admin = current_user.role.name == "admin"
+    if user_id and (is_admin or current_user.id == user_id):
+        scope_user_id = user_id
+    elif not is_admin:
         # Nếu không phải admin, chỉ xem được comments của mình
-        query = query.filter(Comment.user_id == current_user.id)
-    
-    # Thống kê tổng quan
-    total = query.count()
-    clean = query.filter(Comment.prediction == 0).count()
-    offensive = query.filter(Comment.prediction == 1).count()
-    hate = query.filter(Comment.prediction == 2).count()
-    spam = query.filter(Comment.prediction == 3).count()
-    
-    # Thống kê theo platform
-    platforms = db.query(
-        Comment.platform, 
-        sa.func.count(Comment.id).label('count')
-    ).filter(
-        Comment.id.in_([c.id for c in query])
-    ).group_by(Comment.platform).all()
-    
-    platform_stats = {platform: count for platform, count in platforms}
-    
-    # Thống kê về tin cậy
-    confidence_query = db.query(
-        sa.func.avg(Comment.confidence).label('avg'),
-        sa.func.min(Comment.confidence).label('min'),
-        sa.func.max(Comment.confidence).label('max')
-    ).filter(
-        Comment.id.in_([c.id for c in query])
-    ).first()
-    
-    confidence_stats = {
-        "average": confidence_query.avg if confidence_query.avg else 0,
-        "min": confidence_query.min if confidence_query.min else 0,
-        "max": confidence_query.max if confidence_query.max else 0
-    }
+        scope_user_id = current_user.id
+    else:
+        scope_user_id = None
     
-    # Thống kê người dùng tiêu cực nhất (chỉ admin mới thấy)
-    toxic_users = []
-    if current_user.role.name == "admin":
-        toxic_user_query = db.query(
-            Comment.source_user_name,
-            sa.func.count(Comment.id).label('count')
-        ).filter(
-            Comment.id.in_([c.id for c in query]),
-            Comment.prediction.in_([1, 2, 3]),  # offensive, hate, spam
-            Comment.source_user_name != None
-        ).group_by(Comment.source_user_name).order_by(sa.desc('count')).limit(10).all()
-        
-        toxic_users = [{"username": username, "count": count} for username, count in toxic_user_query]
+    # Thống kê người dùng tiêu cực nhất chỉ admin mới thấy
+    stats = cached_statistics(
+        db, platform=platform, start_date=start_date, end_date=end_date,
+        user_id=scope_user_id, include_toxic_users=is_admin
+    )
     
     return {
-        "total": total,
-        "clean": clean,
-        "offensive": offensive,
-        "hate": hate,
-        "spam": spam,
-        "percentages": {
-            "clean": (clean / total * 100) if total > 0 else 0,
-            "offensive": (offensive / total * 100) if total > 0 else 0,
-            "hate": (hate / total * 100) if total > 0 else 0,
-            "spam": (spam / total * 100) if total > 0 else 0,
-        },
-        "platforms": platform_stats,
-        "confidence": confidence_stats,
-        "toxic_users": toxic_users,
+        **stats,
         "filters": {
             "platform": platform,
             "start_date": start_date.isoformat() if start_date else None,
@@ -471,6 +407,27 @@ def get_comment_clusters(
     if current_user.role.name != "admin":
         raise HTTPException(status_code=403, detail="Chỉ admin mới có quyền truy cập chức năng này")
     
+    # Nhãn được phân cụm tăng dần: trả lời ngay từ các cụm hiện có, không fit lại
+    if settings.CLUSTER_SERVICE_ENABLED and settings.FEATURE_STORE_ENABLED:
+        incremental = get_cluster_service().clusters(prediction, limit)
+        if incremental:
+            member_ids = [comment_id for cluster in incremental for comment_id in cluster["members"]]
+            comments_by_id = {
+                comment.id: comment for comment in db.query(Comment).filter(Comment.id.in_(member_ids)).all()
+            }
+            clusters, cluster_info = [], []
+            for cluster in incremental:
+                members = [_cluster_member(comments_by_id[i]) for i in cluster["members"] if i in comments_by_id]
+                if members:
+                    clusters.append(members)
+                    cluster_info.append({"cluster": cluster["cluster"], "size": cluster["size"], "drift": cluster["drift"]})
+            return {
+                "clusters": clusters,
+                "total_comments": sum(len(members) for members in clusters),
+                "cluster_info": cluster_info,
+                "updated_at": get_cluster_service().updated_at,
+            }
+    
     # Lấy các comments có cùng nhãn dự đoán
     comments = db.query(Comment).filter(
         Comment.prediction == prediction
@@ -479,21 +436,30 @@ def get_comment_clusters(
     if len(comments) < 5:
         return {"clusters": [], "message": "Không đủ dữ liệu để phân cụm"}
     
-    # Trích xuất vectors
-    comment_vectors = []
-    for comment in comments:
-        vector = comment.get_vector()
-        if vector is not None:
-            comment_vectors.append((comment, vector))
+    # Đọc vectors từ kho đặc trưng dùng chung (ánh xạ bộ nhớ, không giải mã từng dòng)
+    comment_vectors, vectors = [], None
+    if settings.FEATURE_STORE_ENABLED:
+        found_ids, stored = get_feature_store().get([comment.id for comment in comments])
+        if len(found_ids) >= 5:
+            comments_by_id = {comment.id: comment for comment in comments}
+            comment_vectors = [(comments_by_id[comment_id], None) for comment_id in found_ids]
+            vectors = stored
     
-    # Nếu không có vectors, thử trích xuất lại
+    # Kho chưa có đủ: giải mã vector lưu trong bảng comments
     if len(comment_vectors) < 5:
         comment_vectors = []
         for comment in comments:
-            # Sử dụng processed_content nếu có, nếu không thì dùng content
-            text = comment.processed_content if comment.processed_content else comment.content
-            vector = extract_features(text)
-            comment_vectors.append((comment, vector))
+            vector = comment.get_vector()
+            if vector is not None:
+                comment_vectors.append((comment, vector))
+        vectors = np.array([vec for _, vec in comment_vectors]) if comment_vectors else None
+    
+    # Nếu không có vectors, trích xuất lại cho cả danh sách bằng một lần transform (ma trận thưa)
+    if len(comment_vectors) < 5:
+        # Sử dụng processed_content nếu có, nếu không thì dùng content
+        texts = [comment.processed_content if comment.processed_content else comment.content for comment in comments]
+        vectors = extract_features_batch(texts)
+        comment_vectors = [(comment, None) for comment in comments]
     
     # Sử dụng KMeans để phân cụm
     try:
@@ -503,8 +469,7 @@ def get_comment_clusters(
         # Xác định số cụm dựa trên số lượng dữ liệu
         n_clusters = min(5, len(comment_vectors) // 2)
         
-        # Chuẩn hóa vectors
-        vectors = np.array([vec for _, vec in comment_vectors])
+        # Chuẩn hóa vectors (KMeans nhận được cả ma trận thưa)
         vectors = normalize(vectors)
         
         # Phân cụm
@@ -514,19 +479,7 @@ def get_comment_clusters(
         # Tổ chức dữ liệu theo cụm
         clusters = [[] for _ in range(n_clusters)]
         for i, (comment, _) in enumerate(comment_vectors):
-            cluster_id = int(labels[i])
-            prediction_text = {0: "clean", 1: "offensive", 2: "hate", 3: "spam"}[comment.prediction]
-            
-            clusters[cluster_id].append({
-                "id": comment.id,
-                "content": comment.content,
-                "prediction": comment.prediction,
-                "prediction_text": prediction_text,
-                "confidence": comment.confidence,
-                "platform": comment.platform,
-                "source_user_name": comment.source_user_name,
-                "created_at": comment.created_at.isoformat()
-            })
+            clusters[int(labels[i])].append(_cluster_member(comment))
         
         # Loại bỏ các cụm rỗng
         clusters = [cluster for cluster in clusters if cluster]
@@ -539,6 +492,58 @@ def get_comment_clusters(
     except ImportError:
         raise HTTPException(status_code=500, detail="Không có thư viện scikit-learn để phân cụm")
 
+@router.get("/comment-clusters/drift")
+def get_comment_cluster_drift(
+    prediction: int = Query(..., ge=0, le=3),
+    last: int = Query(24, ge=1, le=1000),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Lịch sử độ trôi tâm cụm và kích thước cụm theo thời gian (phát hiện chiến dịch)
+    """
+    if current_user.role.name != "admin":
+        raise HTTPException(status_code=403, detail="Chỉ admin mới có quyền truy cập chức năng này")
+    
+    service = get_cluster_service()
+    return {"prediction": prediction, "drift": service.drift(prediction, last), "stats": service.stats()}
+
+@router.get("/duplicate-clusters")
+def get_duplicate_clusters(
+    platform: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200),
+    min_size: int = Query(2, ge=1),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Các cụm comment gần trùng lặp lớn nhất theo từng platform (spam hàng loạt)
+
+    Chỉ phản ánh các comment đã qua worker hiện tại (chỉ mục nằm trong bộ nhớ), nên kết quả
+    khác nhau giữa các worker: "scope" và stats (worker_pid, started_at, texts) cho biết
+    câu trả lời đến từ worker nào và dựa trên bao nhiêu comment.
+    """
+    if current_user.role.name != "admin":
+        raise HTTPException(status_code=403, detail="Chỉ admin mới có quyền truy cập chức năng này")
+    
+    index = get_duplicate_index()
+    if platform:
+        clusters = {platform: index.largest_clusters(platform, limit, min_size)}
+    else:
+        clusters = index.clusters_by_platform(limit, min_size)
+    return {"scope": "worker", "clusters": clusters, "stats": index.stats()}
+
+def _cluster_member(comment):
+    """Thông tin một comment trong kết quả phân cụm"""
+    return {
+        "id": comment.id,
+        "content": comment.content,
+        "prediction": comment.prediction,
+        "prediction_text": {0: "clean", 1: "offensive", 2: "hate", 3: "spam"}[comment.prediction],
+        "confidence": comment.confidence,
+        "platform": comment.platform,
+        "source_user_name": comment.source_user_name,
+        "created_at": comment.created_at.isoformat()
+    }
+
 # Added new function save_prediction (stub implementation) to support batch detection
 
 def save_prediction(**prediction):
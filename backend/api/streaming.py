@@ -0,0 +1,341 @@
+"""
+Streaming Batch Detection
+
+Request and response plumbing for the NDJSON batch endpoints. The request
+body is either newline-delimited JSON or one JSON array, and is parsed
+incrementally as chunks arrive. Items are classified in micro-batches: a batch
+is flushed when it reaches the batch size or when its oldest item has waited
+the configured number of milliseconds. Results are written back as one JSON
+object per line.
+
+Memory stays bounded on both sides: at most one micro-batch of items (plus
+one partially received item) is buffered, and the next batch is not read
+until the previous results have been handed to the server, which applies
+transport backpressure. A client disconnect stops both reading and
+inference.
+
+Item format: {"text": "...", "id": ...} or a plain JSON string. Output lines
+carry the item's position ("index") and its "id" when given; items that
+cannot be classified get an {"index", "error"} line instead, and a malformed
+stream ends with a final {"error"} line.
+"""
+
+import json
+import codecs
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from backend.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# (item, error): error is set for items that could not be decoded
+ParsedItem = Tuple[Any, Optional[str]]
+
+_WHITESPACE = " \t\r\n"
+_CLOSED_VALUE_ENDS = '}]"'
+
+
+class StreamParseError(ValueError):
+    """The request body cannot be parsed any further"""
+
+
+class JSONItemParser:
+    """
+    Incremental parser for an NDJSON or JSON-array request body
+
+    The format is detected from the first non-whitespace byte: "[" starts a
+    JSON array, anything else is read as NDJSON. In NDJSON a malformed line
+    only fails that item; in an array it ends the stream.
+    """
+
+    def __init__(self, max_item_bytes: int):
+        """
+        Args:
+            max_item_bytes: Largest single item that may be buffered while incomplete
+        """
+        self.max_item_bytes = max_item_bytes
+        self.mode: Optional[str] = None
+        self._pending = bytearray()
+        # Array mode state
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._text = ""
+        self._expect_value = True
+        self._array_closed = False
+        self._values = 0
+        self._error: Optional[StreamParseError] = None
+
+    def feed(self, chunk: bytes) -> List[ParsedItem]:
+        """Parse a body chunk; returns the items completed by it"""
+        if self._error is not None:
+            raise self._error
+        if self.mode is None:
+            self._pending += chunk
+            stripped = self._pending.lstrip()
+            if not stripped:
+                return []
+            self.mode = "array" if stripped[:1] == b"[" else "ndjson"
+            chunk, self._pending = bytes(self._pending), bytearray()
+            if self.mode == "array":
+                chunk = chunk.lstrip()[1:]
+        if self.mode == "array":
+            return self._feed_array(self._decoder.decode(chunk))
+        return self._feed_ndjson(chunk)
+
+    def close(self) -> List[ParsedItem]:
+        """Parse what is left at the end of the body"""
+        if self._error is not None:
+            raise self._error
+        if self.mode == "array":
+            items = self._feed_array(self._decoder.decode(b"", final=True), final=True)
+            if not self._array_closed:
+                raise StreamParseError("Unterminated JSON array")
+            return items
+        if self.mode == "ndjson" and self._pending:
+            line, self._pending = bytes(self._pending), bytearray()
+            return self._parse_lines([line])
+        return []
+
+    def _feed_ndjson(self, chunk: bytes) -> List[ParsedItem]:
+        self._pending += chunk
+        end = self._pending.rfind(b"\n")
+        if end < 0:
+            if len(self._pending) > self.max_item_bytes:
+                raise StreamParseError(f"Line exceeds {self.max_item_bytes} bytes")
+            return []
+        lines = bytes(self._pending[:end]).split(b"\n")
+        del self._pending[:end + 1]
+        return self._parse_lines(lines)
+
+    def _parse_lines(self, lines: List[bytes]) -> List[ParsedItem]:
+        items = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if len(line) > self.max_item_bytes:
+                items.append((None, f"Line exceeds {self.max_item_bytes} bytes"))
+                continue
+            try:
+                items.append((json.loads(line), None))
+            except ValueError as e:
+                items.append((None, f"Invalid JSON: {e}"))
+        return items
+
+    def _feed_array(self, text: str, final: bool = False) -> List[ParsedItem]:
+        items: List[ParsedItem] = []
+        try:
+            self._scan_array(self._text + text, items, final)
+        except StreamParseError as e:
+            if not items:
+                raise
+            # Return the items decoded before the error; the next call raises
+            self._error = e
+        return items
+
+    def _scan_array(self, buffer: str, items: List[ParsedItem], final: bool):
+        pos = 0
+        while not self._array_closed:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos >= len(buffer):
+                break
+            char = buffer[pos]
+            if char == "]" and (not self._expect_value or not self._values):
+                self._array_closed = True
+                pos += 1
+            elif not self._expect_value:
+                if char != ",":
+                    raise StreamParseError(f"Expected ',' or ']' in JSON array, got {char!r}")
+                self._expect_value = True
+                pos += 1
+            else:
+                try:
+                    value, end = self._json.raw_decode(buffer, pos)
+                except ValueError as e:
+                    if final:
+                        raise StreamParseError(f"Invalid JSON: {e}")
+                    if len(buffer) - pos > self.max_item_bytes:
+                        raise StreamParseError(f"Item exceeds {self.max_item_bytes} bytes")
+                    break
+                # A number or literal at the end of the buffer may continue in the next chunk
+                if end == len(buffer) and not final and buffer[end - 1] not in _CLOSED_VALUE_ENDS:
+                    break
+                items.append((value, None))
+                self._values += 1
+                self._expect_value = False
+                pos = end
+        self._text = buffer[pos:]
+
+
+def item_text(item: Any) -> Optional[str]:
+    """Text of a stream item, or None if it has none"""
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict) and isinstance(item.get("text"), str):
+        return item["text"]
+    return None
+
+
+async def iter_body_items(chunks: AsyncIterator[bytes], max_item_bytes: int) -> AsyncIterator[ParsedItem]:
+    """Items of a streamed request body, in order, as they become complete"""
+    parser = JSONItemParser(max_item_bytes)
+    async for chunk in chunks:
+        if chunk:
+            for parsed in parser.feed(chunk):
+                yield parsed
+    for parsed in parser.close():
+        yield parsed
+
+
+def _line(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, ensure_ascii=False) + "\n"
+
+
+async def stream_predictions(
+    chunks: AsyncIterator[bytes],
+    predict_batch: Callable[[List[str]], Sequence[tuple]],
+    format_result: Callable[[Any, str, tuple], Dict[str, Any]],
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    batch_size: Optional[int] = None,
+    max_wait_ms: Optional[float] = None,
+    max_item_bytes: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """
+    Classify a streamed request body and yield NDJSON result lines
+
+    Args:
+        chunks: Request body chunks (Request.stream())
+        predict_batch: Blocking batch classifier, run in the threadpool
+        format_result: (item, text, prediction) -> output object
+        is_disconnected: Disconnect check, consulted once the body is fully read
+            (before that the body reader itself sees the disconnect)
+        batch_size: Items per forward pass
+        max_wait_ms: Longest an item waits for its batch to fill
+        max_item_bytes: Largest single item accepted
+
+    Yields:
+        bytes: One or more NDJSON lines per micro-batch
+    """
+    batch_size = max(1, int(batch_size or settings.STREAM_BATCH_SIZE))
+    max_wait = max(0.0, float(settings.STREAM_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms)) / 1000.0
+    max_item_bytes = int(max_item_bytes or settings.STREAM_MAX_ITEM_BYTES)
+
+    loop = asyncio.get_running_loop()
+    items = iter_body_items(chunks, max_item_bytes)
+    next_item: Optional[asyncio.Future] = None
+    body_done = False
+    batch: List[Tuple[int, Any, str]] = []
+    deadline = 0.0
+    index = 0
+    count = 0
+
+    async def flush() -> str:
+        texts = [text for _, _, text in batch]
+        predictions = await run_in_threadpool(predict_batch, texts)
+        lines = []
+        for (position, item, text), prediction in zip(batch, predictions):
+            payload = {"index": position}
+            if isinstance(item, dict) and "id" in item:
+                payload["id"] = item["id"]
+            payload.update(format_result(item, text, prediction))
+            lines.append(_line(payload))
+        batch.clear()
+        return "".join(lines)
+
+    try:
+        while True:
+            lines = []
+            if not body_done:
+                if next_item is None:
+                    next_item = asyncio.ensure_future(items.__anext__())
+                timeout = max(0.0, deadline - loop.time()) if batch else None
+                done, _ = await asyncio.wait({next_item}, timeout=timeout)
+                if done:
+                    future, next_item = next_item, None
+                    try:
+                        item, error = future.result()
+                    except StopAsyncIteration:
+                        body_done = True
+                    else:
+                        text = item_text(item) if error is None else None
+                        if error is None and text is None:
+                            error = "Item has no text"
+                        if error is not None:
+                            lines.append(_line({"index": index, "error": error}))
+                        else:
+                            if not batch:
+                                deadline = loop.time() + max_wait
+                            batch.append((index, item, text))
+                        index += 1
+
+            full = len(batch) >= batch_size or (batch and (body_done or loop.time() >= deadline))
+            if full:
+                if body_done and is_disconnected is not None and await is_disconnected():
+                    logger.info(f"Stream client disconnected after {count} results")
+                    return
+                count += len(batch)
+                lines.append(await flush())
+            if lines:
+                yield "".join(lines).encode("utf-8")
+            if body_done and not batch:
+                break
+    except ClientDisconnect:
+        logger.info(f"Stream client disconnected while sending, after {count} results")
+    except StreamParseError as e:
+        if batch:
+            yield (await flush()).encode("utf-8")
+        yield _line({"index": index, "error": str(e)}).encode("utf-8")
+    finally:
+        if next_item is not None:
+            next_item.cancel()
+            try:
+                await next_item
+            except BaseException:
+                pass
+        await items.aclose()
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for bodies that read the request body while streaming
+
+    StreamingResponse listens for the client disconnect by calling receive()
+    concurrently, which would consume request body messages meant for the
+    body iterator; disconnects are handled by stream_predictions instead.
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def ndjson_prediction_response(
+    request: Request,
+    predict_batch: Callable[[List[str]], Sequence[tuple]],
+    format_result: Callable[[Any, str, tuple], Dict[str, Any]],
+    batch_size: Optional[int] = None
+) -> NDJSONStreamingResponse:
+    """NDJSON response classifying the request body as it streams in"""
+    return NDJSONStreamingResponse(
+        stream_predictions(
+            request.stream(),
+            predict_batch,
+            format_result,
+            is_disconnected=request.is_disconnected,
+            batch_size=batch_size
+        ),
+        headers={"X-Accel-Buffering": "no"}
+    )
@@ -152,6 +152,105 @@ class Settings(BaseSettings):
     MODEL_PHOBERT_VOCAB: Optional[str] = os.getenv("MODEL_PHOBERT_VOCAB", None)
     MODEL_PHOBERT_CONFIG: Optional[str] = os.getenv("MODEL_PHOBERT_CONFIG", None)
     
+    # HuggingFace tokenizer cho các model BERT (chỉ đọc file local, không tải qua mạng)
+    HF_TOKENIZER_LOCAL_FILES_ONLY: bool = os.getenv("HF_TOKENIZER_LOCAL_FILES_ONLY", "True").lower() == "true"
+    HF_TOKENIZER_CACHE_DIR: Optional[str] = os.getenv("HF_TOKENIZER_CACHE_DIR", None)
+    
+    # Model registry: các model được giữ trong bộ nhớ, loại bỏ theo LRU khi vượt ngân sách
+    MODEL_REGISTRY_MEMORY_BUDGET_MB: float = float(os.getenv("MODEL_REGISTRY_MEMORY_BUDGET_MB", "2048"))
+
+    # Inference micro-batching (gom các request đơn lẻ thành một lần forward pass)
+    INFERENCE_BATCHING_ENABLED: bool = os.getenv("INFERENCE_BATCHING_ENABLED", "True").lower() == "true"
+    INFERENCE_MAX_BATCH_SIZE: int = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "32"))
+    INFERENCE_MAX_WAIT_MS: float = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+    INFERENCE_BATCH_CHUNK_SIZE: int = int(os.getenv("INFERENCE_BATCH_CHUNK_SIZE", "256"))  # Số văn bản tối đa mỗi forward pass của predict_batch
+    INFERENCE_LENGTH_BUCKETS: str = os.getenv("INFERENCE_LENGTH_BUCKETS", "")  # VD: "16,32,64,100" - pad theo nhóm độ dài cho LSTM/CNN/GRU, rỗng = tắt
+
+    # Endpoint batch dạng stream (NDJSON): kích thước micro-batch, thời gian chờ tối đa và kích thước tối đa một item
+    STREAM_BATCH_SIZE: int = int(os.getenv("STREAM_BATCH_SIZE", "64"))
+    STREAM_MAX_WAIT_MS: float = float(os.getenv("STREAM_MAX_WAIT_MS", "50"))
+    STREAM_MAX_ITEM_BYTES: int = int(os.getenv("STREAM_MAX_ITEM_BYTES", "1048576"))
+
+    # Prediction cache (khóa theo văn bản đã chuẩn hóa + model type + phiên bản model)
+    PREDICTION_CACHE_ENABLED: bool = os.getenv("PREDICTION_CACHE_ENABLED", "True").lower() == "true"
+    PREDICTION_CACHE_MAX_ENTRIES: int = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "50000"))
+    PREDICTION_CACHE_TTL: int = int(os.getenv("PREDICTION_CACHE_TTL", "86400"))  # Giây
+
+    # Cache kết quả /toxic/statistics trong từng worker, khóa theo bộ lọc
+    STATISTICS_CACHE_TTL: float = float(os.getenv("STATISTICS_CACHE_TTL", "30"))  # Giây, 0 = tắt
+    STATISTICS_CACHE_MAX_ENTRIES: int = int(os.getenv("STATISTICS_CACHE_MAX_ENTRIES", "256"))
+
+    # Inference backend: "keras" hoặc "onnx" (dùng file .onnx cạnh file .h5 nếu đã export)
+    INFERENCE_BACKEND: str = os.getenv("INFERENCE_BACKEND", "keras").lower()
+    ONNX_INTRA_OP_THREADS: int = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0 = mặc định của ONNX Runtime
+    ONNX_INTER_OP_THREADS: int = int(os.getenv("ONNX_INTER_OP_THREADS", "0"))
+    ONNX_GRAPH_OPTIMIZATION_LEVEL: str = os.getenv("ONNX_GRAPH_OPTIMIZATION_LEVEL", "all").lower()  # disabled, basic, extended, all
+
+    # Lượng tử hóa int8 cho CPU: "none" hoặc "int8" (dùng file .int8.onnx/.int8.tflite nếu có, PyTorch lượng tử hóa khi tải)
+    MODEL_QUANTIZATION: str = os.getenv("MODEL_QUANTIZATION", "none").lower()
+
+    # Cascade: model tuyến tính rẻ trả lời văn bản chắc chắn, phần còn lại chuyển lên LSTM rồi PhoBERT
+    CASCADE_ENABLED: bool = os.getenv("CASCADE_ENABLED", "False").lower() == "true"
+    CASCADE_LINEAR_MODEL_PATH: str = os.getenv("CASCADE_LINEAR_MODEL_PATH", "model/cascade_linear.joblib")
+    CASCADE_LINEAR_THRESHOLD: float = float(os.getenv("CASCADE_LINEAR_THRESHOLD", "0.9"))  # Độ tin cậy tối thiểu để stage tuyến tính trả lời
+    CASCADE_MODEL_THRESHOLD: float = float(os.getenv("CASCADE_MODEL_THRESHOLD", "0.8"))  # Dưới ngưỡng này model chính chuyển lên CASCADE_ESCALATION_MODEL
+    CASCADE_ESCALATION_MODEL: str = os.getenv("CASCADE_ESCALATION_MODEL", "phobert")  # Rỗng = không có stage cuối
+    CASCADE_SHADOW_SAMPLE_RATE: float = float(os.getenv("CASCADE_SHADOW_SAMPLE_RATE", "0.0"))  # Tỷ lệ câu trả lời sớm được kiểm tra lại bằng model chính
+
+    # Chỉ mục ANN (IVF-flat) cho tìm kiếm comment tương tự
+    VECTOR_INDEX_ENABLED: bool = os.getenv("VECTOR_INDEX_ENABLED", "True").lower() == "true"
+    VECTOR_INDEX_PATH: str = os.getenv("VECTOR_INDEX_PATH", "data/vector_index.npz")
+    VECTOR_INDEX_DIM: int = int(os.getenv("VECTOR_INDEX_DIM", "256"))  # Vector rộng hơn được chiếu ngẫu nhiên xuống số chiều này
+    VECTOR_INDEX_NLIST: int = int(os.getenv("VECTOR_INDEX_NLIST", "0"))  # Số danh sách đảo ngược, 0 = sqrt(số vector)
+    VECTOR_INDEX_NPROBE: int = int(os.getenv("VECTOR_INDEX_NPROBE", "8"))  # Số danh sách quét mỗi truy vấn
+    VECTOR_INDEX_TRAIN_SIZE: int = int(os.getenv("VECTOR_INDEX_TRAIN_SIZE", "4096"))  # Dưới ngưỡng này quét toàn bộ (chính xác)
+    VECTOR_INDEX_OVERSAMPLE: int = int(os.getenv("VECTOR_INDEX_OVERSAMPLE", "4"))  # Số ứng viên = limit * hệ số, xếp hạng lại bằng vector gốc
+    VECTOR_INDEX_SAVE_EVERY: int = int(os.getenv("VECTOR_INDEX_SAVE_EVERY", "1000"))  # Lưu file sau số thay đổi này, 0 = chỉ lưu khi tắt
+    VECTOR_INDEX_SYNC_WINDOW: int = int(os.getenv("VECTOR_INDEX_SYNC_WINDOW", "1000"))  # Số id dưới watermark được đọc lại mỗi lần sync (giao dịch commit muộn)
+    SIMILARITY_BLOCK_ROWS: int = int(os.getenv("SIMILARITY_BLOCK_ROWS", "4096"))  # Số hàng ứng viên nhân mỗi khối khi chọn top-k (giữ khối trong cache)
+
+    # Kho đặc trưng trên đĩa (ma trận float16 ánh xạ bộ nhớ) dùng chung giữa các worker cho phân cụm, tìm kiếm, xuất dữ liệu
+    FEATURE_STORE_ENABLED: bool = os.getenv("FEATURE_STORE_ENABLED", "True").lower() == "true"
+    FEATURE_STORE_PATH: str = os.getenv("FEATURE_STORE_PATH", "data/feature_store")
+    FEATURE_STORE_DIM: int = int(os.getenv("FEATURE_STORE_DIM", "256"))  # Vector rộng hơn được chiếu ngẫu nhiên xuống số chiều này
+
+    # Phân cụm tăng dần (MiniBatchKMeans.partial_fit) cho /comment-clusters, đọc vector từ kho đặc trưng
+    CLUSTER_SERVICE_ENABLED: bool = os.getenv("CLUSTER_SERVICE_ENABLED", "True").lower() == "true"
+    CLUSTER_MODEL_PATH: str = os.getenv("CLUSTER_MODEL_PATH", "data/comment_clusters.joblib")
+    CLUSTER_LABELS: List[int] = [int(x) for x in os.getenv("CLUSTER_LABELS", "1,2,3").split(",") if x.strip()]  # Nhãn được phân cụm tăng dần
+    CLUSTER_COUNT: int = int(os.getenv("CLUSTER_COUNT", "8"))  # Số cụm mỗi nhãn
+    CLUSTER_BATCH_SIZE: int = int(os.getenv("CLUSTER_BATCH_SIZE", "256"))
+    CLUSTER_UPDATE_INTERVAL: float = float(os.getenv("CLUSTER_UPDATE_INTERVAL", "30"))  # Giây giữa hai lần cập nhật nền
+    CLUSTER_DRIFT_INTERVAL: float = float(os.getenv("CLUSTER_DRIFT_INTERVAL", "3600"))  # Giây giữa hai lần ghi độ trôi tâm cụm
+    CLUSTER_DRIFT_HISTORY: int = int(os.getenv("CLUSTER_DRIFT_HISTORY", "168"))  # Số lần ghi độ trôi được giữ lại
+    CLUSTER_MEMBERS_KEPT: int = int(os.getenv("CLUSTER_MEMBERS_KEPT", "200"))  # Số comment gần nhất giữ lại mỗi cụm
+
+    # Phát hiện comment gần trùng lặp (MinHash/LSH) khi bị spam hàng loạt, chỉ nằm trong bộ nhớ của từng worker.
+    # Tắt mặc định: khi bật, bản sao sửa một từ cũng nhận lại nhãn của cụm thay vì chạy model
+    DUPLICATE_DETECTION_ENABLED: bool = os.getenv("DUPLICATE_DETECTION_ENABLED", "False").lower() == "true"
+    DUPLICATE_THRESHOLD: float = float(os.getenv("DUPLICATE_THRESHOLD", "0.8"))  # Độ tương đồng Jaccard ước lượng tối thiểu
+    DUPLICATE_MIN_CLUSTER_SIZE: int = int(os.getenv("DUPLICATE_MIN_CLUSTER_SIZE", "3"))  # Số bản đã chạy model cùng nhãn trước khi dùng lại kết quả
+    DUPLICATE_MAX_CLUSTERS: int = int(os.getenv("DUPLICATE_MAX_CLUSTERS", "50000"))  # Cụm ít dùng nhất bị loại khi vượt quá
+    DUPLICATE_SKIP_STORE: bool = os.getenv("DUPLICATE_SKIP_STORE", "False").lower() == "true"  # Không lưu các bản trùng đã dùng lại kết quả
+
+    # Vectorizer TF-IDF dùng chung (huấn luyện: python -m backend.services.vectorizer_training)
+    VECTORIZER_PATH: str = os.getenv("VECTORIZER_PATH", "model/tfidf_vectorizer.joblib")  # Được tải khi khởi động nếu tồn tại
+    VECTORIZER_SVD_PATH: str = os.getenv("VECTORIZER_SVD_PATH", "model/tfidf_svd.joblib")
+    VECTORIZER_TRAIN_CHUNK_SIZE: int = int(os.getenv("VECTORIZER_TRAIN_CHUNK_SIZE", "5000"))  # Số comment đọc mỗi lần khi huấn luyện
+    VECTORIZER_TRAIN_MAX_TERMS: int = int(os.getenv("VECTORIZER_TRAIN_MAX_TERMS", "2000000"))  # Vượt quá thì bỏ các từ hiếm nhất
+    FEATURE_MODE: str = os.getenv("FEATURE_MODE", "tfidf").lower()  # "tfidf" (vocabulary đã huấn luyện) hoặc "hashing" (không cần huấn luyện)
+    HASHING_N_FEATURES: int = int(os.getenv("HASHING_N_FEATURES", str(2 ** 16)))  # Số bucket băm; đổi giá trị cần tính lại IDF và các vector đã lưu
+    HASHING_IDF_PATH: str = os.getenv("HASHING_IDF_PATH", "model/hashing_idf.npy")  # Thiếu file thì chỉ dùng tần suất từ
+
+    # Hàng đợi lưu dự đoán theo lô (một lần trích xuất đặc trưng và một lần insert cho mỗi lô)
+    PERSIST_WORKER_ENABLED: bool = os.getenv("PERSIST_WORKER_ENABLED", "True").lower() == "true"
+    PERSIST_QUEUE_SIZE: int = int(os.getenv("PERSIST_QUEUE_SIZE", "10000"))  # Hàng đợi đầy thì lưu từng dòng như cũ
+    PERSIST_BATCH_SIZE: int = int(os.getenv("PERSIST_BATCH_SIZE", "256"))  # Số comment tối đa mỗi lần ghi
+    PERSIST_FLUSH_INTERVAL: float = float(os.getenv("PERSIST_FLUSH_INTERVAL", "0.5"))  # Giây chờ tối đa trước khi ghi lô chưa đầy
+
+    # Trọng số ONNX dùng chung giữa các worker gunicorn (file .weights ánh xạ bộ nhớ, chỉ đọc)
+    MODEL_SHARED_WEIGHTS: bool = os.getenv("MODEL_SHARED_WEIGHTS", "False").lower() == "true"
+
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: Optional[int] = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
     
@@ -243,6 +342,7 @@ class Settings(BaseSettings):
     # Vietnamese language specific settings
     VIETNAMESE_STOPWORDS_FILE: Optional[str] = os.getenv("VIETNAMESE_STOPWORDS_FILE", "data/vietnamese_stopwords.txt")
     VIETNAMESE_OFFENSIVE_WORDLIST_FILE: Optional[str] = os.getenv("VIETNAMESE_OFFENSIVE_WORDLIST_FILE", "data/vietnamese_offensive_words.txt")
+    VIETNAMESE_HATE_SPEECH_FILE: Optional[str] = os.getenv("VIETNAMESE_HATE_SPEECH_FILE", "data/vietnamese_hate_speech.txt")
     
     @field_validator('SECRET_KEY')
     @classmethod
@@ -0,0 +1,180 @@
+"""
+Compact Vector Storage Migration
+
+Adds the comments.vector_data binary column and converts the JSON text in
+comments.vector_representation to the compact format of
+backend/utils/vector_codec.py, in batches ordered by id so it can run against
+a live database and be resumed after an interruption. Converted rows have
+vector_representation cleared; rows whose JSON cannot be parsed are left
+untouched and counted as failed.
+
+The application adds the (empty) vector_data column at startup if it is
+missing, since every ORM query on Comment selects it; run this migration to
+convert the existing JSON vectors.
+
+Space freed by the old column is only returned to the OS after VACUUM
+(SQLite) or VACUUM FULL comments (PostgreSQL).
+
+Usage:
+    python -m backend.db.migrations.compact_vector_storage
+    python -m backend.db.migrations.compact_vector_storage --batch-size 500
+    python -m backend.db.migrations.compact_vector_storage --rollback
+"""
+
+import sys
+import json
+import logging
+import argparse
+from sqlalchemy import create_engine, text, inspect, bindparam, LargeBinary
+from backend.config.settings import settings
+from backend.utils.vector_codec import VectorCodecError, decode_vector, encode_vector
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TABLE = "comments"
+COLUMN = "vector_data"
+
+
+def check_column_exists(engine, table_name: str, column_name: str) -> bool:
+    """Check if a column already exists"""
+    inspector = inspect(engine)
+    return any(col['name'] == column_name for col in inspector.get_columns(table_name))
+
+
+def add_vector_column(engine):
+    """Add comments.vector_data if the table predates it"""
+    if check_column_exists(engine, TABLE, COLUMN):
+        logger.info(f"⏭️  Skipping column {COLUMN} - already exists")
+        return
+
+    column_type = LargeBinary().compile(dialect=engine.dialect)
+    with engine.connect() as conn:
+        conn.execute(text(f"ALTER TABLE {TABLE} ADD COLUMN {COLUMN} {column_type}"))
+        conn.commit()
+    logger.info(f"✅ Added column {TABLE}.{COLUMN} ({column_type})")
+
+
+def convert_vectors(engine, batch_size: int = 1000) -> dict:
+    """Convert JSON vectors to the binary format, one committed batch at a time"""
+    select_batch = text(
+        f"SELECT id, vector_representation FROM {TABLE} "
+        f"WHERE id > :last_id AND vector_representation IS NOT NULL "
+        f"ORDER BY id LIMIT :batch_size"
+    )
+    update_row = text(
+        f"UPDATE {TABLE} SET {COLUMN} = :data, vector_representation = NULL WHERE id = :id"
+    ).bindparams(bindparam("data", type_=LargeBinary))
+
+    summary = {"converted": 0, "failed": 0, "json_bytes": 0, "binary_bytes": 0}
+    last_id = 0
+    with engine.connect() as conn:
+        while True:
+            rows = conn.execute(select_batch, {"last_id": last_id, "batch_size": batch_size}).fetchall()
+            if not rows:
+                break
+
+            updates = []
+            for row_id, value in rows:
+                try:
+                    data = encode_vector(json.loads(value))
+                except (ValueError, TypeError) as e:
+                    logger.warning(f"⚠️  Comment {row_id}: cannot parse vector ({e})")
+                    summary["failed"] += 1
+                    continue
+                updates.append({"id": row_id, "data": data})
+                summary["json_bytes"] += len(value)
+                summary["binary_bytes"] += len(data)
+
+            if updates:
+                conn.execute(update_row, updates)
+            conn.commit()
+
+            summary["converted"] += len(updates)
+            last_id = rows[-1][0]
+            logger.info(f"📦 Converted up to id {last_id} ({summary['converted']} rows)")
+    return summary
+
+
+def restore_json_vectors(engine, batch_size: int = 1000) -> int:
+    """Write binary vectors back as JSON text (for rollback); vector_data is set to NULL, the column is kept"""
+    select_batch = text(
+        f"SELECT id, {COLUMN} FROM {TABLE} "
+        f"WHERE id > :last_id AND {COLUMN} IS NOT NULL "
+        f"ORDER BY id LIMIT :batch_size"
+    )
+    update_row = text(
+        f"UPDATE {TABLE} SET vector_representation = :value, {COLUMN} = NULL WHERE id = :id"
+    )
+
+    restored, last_id = 0, 0
+    with engine.connect() as conn:
+        while True:
+            rows = conn.execute(select_batch, {"last_id": last_id, "batch_size": batch_size}).fetchall()
+            if not rows:
+                break
+
+            updates = []
+            for row_id, data in rows:
+                try:
+                    updates.append({"id": row_id, "value": json.dumps(decode_vector(data).tolist())})
+                except VectorCodecError as e:
+                    logger.warning(f"⚠️  Comment {row_id}: cannot decode vector ({e})")
+
+            if updates:
+                conn.execute(update_row, updates)
+            conn.commit()
+
+            restored += len(updates)
+            last_id = rows[-1][0]
+            logger.info(f"📦 Restored up to id {last_id} ({restored} rows)")
+    return restored
+
+
+def main(argv=None):
+    """Main migration function"""
+    parser = argparse.ArgumentParser(description="Convert comment vectors to the compact binary format")
+    parser.add_argument("--rollback", action="store_true", help="Convert binary vectors back to JSON")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    logger.info("="*60)
+    logger.info("🚀 Starting Compact Vector Storage Migration")
+    logger.info("="*60)
+    logger.info(f"Database URL: {settings.DATABASE_URL}")
+    logger.info("")
+
+    try:
+        engine = create_engine(settings.DATABASE_URL)
+
+        if args.rollback:
+            logger.info("🔄 Restoring JSON vectors...")
+            if not check_column_exists(engine, TABLE, COLUMN):
+                logger.info(f"⏭️  Column {COLUMN} does not exist - nothing to restore")
+            else:
+                restored = restore_json_vectors(engine, args.batch_size)
+                logger.info(f"\n✅ Restored {restored} vectors")
+        else:
+            add_vector_column(engine)
+            logger.info("➕ Converting vectors...")
+            summary = convert_vectors(engine, args.batch_size)
+
+            ratio = summary["json_bytes"] / summary["binary_bytes"] if summary["binary_bytes"] else 0.0
+            logger.info("\n" + "="*60)
+            logger.info(f"📊 Vector Conversion Summary:")
+            logger.info(f"   ✅ Converted: {summary['converted']}")
+            logger.info(f"   ❌ Failed: {summary['failed']}")
+            logger.info(f"   📝 JSON bytes: {summary['json_bytes']}")
+            logger.info(f"   📦 Binary bytes: {summary['binary_bytes']} ({ratio:.0f}x smaller)")
+            logger.info("="*60)
+            logger.info("💡 Run VACUUM (SQLite) or VACUUM FULL comments (PostgreSQL) to reclaim the space")
+
+        logger.info("\n✅ Migration completed successfully!")
+
+    except Exception as e:
+        logger.error(f"\n❌ Migration failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
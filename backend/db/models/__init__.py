@@ -33,11 +33,46 @@ def init_db():
     """Khởi tạo database schema"""
     try:
         Base.metadata.create_all(bind=engine)
+        ensure_comment_columns()
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {str(e)}")
         raise
 
+# Cột được thêm sau khi bảng đã có dữ liệu: create_all không thêm cột vào bảng cũ
+def ensure_comment_columns() -> bool:
+    """
+    Thêm cột comments.vector_data nếu database được tạo trước khi có cột này
+    
+    Model Comment luôn đọc cột này, nên nếu thiếu thì mọi truy vấn ORM trên
+    Comment đều lỗi. Chỉ thêm cột rỗng; chuyển vector JSON cũ sang định dạng
+    nhị phân vẫn do migration compact_vector_storage thực hiện.
+    
+    Returns:
+        bool: True nếu cột vừa được thêm
+    """
+    from sqlalchemy import inspect, text, LargeBinary
+    
+    inspector = inspect(engine)
+    if not inspector.has_table("comments"):
+        return False
+    if any(col["name"] == "vector_data" for col in inspector.get_columns("comments")):
+        return False
+    
+    column_type = LargeBinary().compile(dialect=engine.dialect)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE comments ADD COLUMN vector_data {column_type}"))
+    except Exception as e:
+        # Worker khác có thể vừa thêm cột
+        if any(col["name"] == "vector_data" for col in inspect(engine).get_columns("comments")):
+            return False
+        logger.error(f"Không thể thêm cột comments.vector_data: {str(e)}")
+        raise
+    logger.warning("Đã thêm cột comments.vector_data; chạy "
+                   "python -m backend.db.migrations.compact_vector_storage để chuyển các vector JSON cũ")
+    return True
+
 # Generator function để lấy database session
 def get_db():
     """
@@ -42,11 +42,12 @@
 #             return np.array(json.loads(self.vector_representation))
 #         return None
 # db/models/comment.py
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, JSON, Index, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, JSON, Index, Boolean, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from backend.db.models.base import Base, TimestampMixin
 from backend.config.settings import settings
+from backend.utils.vector_codec import decode_stored_vector, encode_vector
 import numpy as np
 import json
 from datetime import datetime
@@ -70,7 +71,8 @@ class Comment(Base, TimestampMixin):
     probabilities = Column(Text, nullable=True)  # Xác suất cho từng nhãn dưới dạng JSON
     
     # Lưu trữ vector đặc trưng cho tìm kiếm tương tự
-    vector_representation = Column(Text)  # Stored as JSON string
+    vector_representation = Column(Text)  # Định dạng JSON cũ, chỉ còn ở các dòng chưa chuyển đổi
+    vector_data = Column(LargeBinary, nullable=True)  # Vector nhị phân (xem backend/utils/vector_codec.py)
     
     # Trường hỗ trợ (phục vụ xử lý)
     is_reviewed = Column(Boolean, default=False, index=True)  # Đánh dấu đã xem xét chưa
@@ -97,24 +99,17 @@ class Comment(Base, TimestampMixin):
     )
     
     def set_vector(self, vector):
-        """Chuyển đổi numpy array thành chuỗi JSON để lưu trữ"""
+        """Lưu vector dưới dạng nhị phân (sparse hoặc float16, có header phiên bản)"""
+        self.vector_representation = None
         if vector is None:
-            self.vector_representation = None
+            self.vector_data = None
             return
-            
-        if isinstance(vector, np.ndarray):
-            self.vector_representation = json.dumps(vector.tolist())
-        else:
-            self.vector_representation = json.dumps(vector)
+
+        self.vector_data = encode_vector(vector)
     
     def get_vector(self):
-        """Lấy vector dưới dạng numpy array"""
-        if self.vector_representation:
-            try:
-                return np.array(json.loads(self.vector_representation))
-            except (json.JSONDecodeError, ValueError):
-                return None
-        return None
+        """Lấy vector dưới dạng numpy array (float32); dòng cũ chưa migration vẫn đọc từ JSON"""
+        return decode_stored_vector(self.vector_data, self.vector_representation)
     
     def set_probabilities(self, probs_dict):
         """Lưu trữ xác suất cho các nhãn"""
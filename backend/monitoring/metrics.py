@@ -129,6 +129,82 @@ class MetricsCollector:
             ['model_type']
         )
         
+        # Inference batching metrics
+        self.inference_queue_depth = Gauge(
+            f'{prefix}_inference_queue_depth',
+            'Number of texts waiting in the inference batching queue'
+        )
+        
+        self.inference_batch_size = Histogram(
+            f'{prefix}_inference_batch_size',
+            'Number of texts per coalesced forward pass',
+            ['model_type'],
+            buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+        )
+        
+        self.inference_batch_wait_seconds = Histogram(
+            f'{prefix}_inference_batch_wait_seconds',
+            'Time a text spent queued before its batch was dispatched',
+            ['model_type'],
+            buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5)
+        )
+        
+        # Cascade classifier metrics
+        self.cascade_stage_texts_total = Counter(
+            f'{prefix}_cascade_stage_texts_total',
+            'Texts that reached a cascade stage, by outcome',
+            ['stage', 'outcome']
+        )
+        
+        self.cascade_stage_duration_seconds = Histogram(
+            f'{prefix}_cascade_stage_duration_seconds',
+            'Duration of one cascade stage call in seconds',
+            ['stage'],
+            buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+        )
+        
+        self.cascade_shadow_checks_total = Counter(
+            f'{prefix}_cascade_shadow_checks_total',
+            'Early-stage answers re-checked against the full model',
+            ['stage', 'agreement']
+        )
+        
+        # Near-duplicate detection metrics
+        self.near_duplicate_checks_total = Counter(
+            f'{prefix}_near_duplicate_checks_total',
+            'Texts checked against the near-duplicate index, by outcome',
+            ['outcome']
+        )
+        
+        self.near_duplicate_clusters = Gauge(
+            f'{prefix}_near_duplicate_clusters',
+            'Near-duplicate clusters held in memory'
+        )
+        
+        # Batched persistence metrics
+        self.persistence_queue_depth = Gauge(
+            f'{prefix}_persistence_queue_depth',
+            'Predictions waiting in the persistence queue'
+        )
+        
+        self.persistence_items_total = Counter(
+            f'{prefix}_persistence_items_total',
+            'Predictions handled by the persistence worker, by outcome',
+            ['outcome']
+        )
+        
+        self.persistence_flush_size = Histogram(
+            f'{prefix}_persistence_flush_size',
+            'Comments inserted per persistence flush',
+            buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+        )
+        
+        self.persistence_flush_duration_seconds = Histogram(
+            f'{prefix}_persistence_flush_duration_seconds',
+            'Time to vectorize and insert one persistence flush',
+            buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+        )
+        
         # Database metrics
         self.db_queries_total = Counter(
             f'{prefix}_db_queries_total',
@@ -313,6 +389,99 @@ class MetricsCollector:
             exception_type=exception_type
         ).inc()
     
+    def set_inference_queue_depth(self, depth: int):
+        """Set number of texts waiting for a batched forward pass"""
+        if not self.enabled:
+            return
+        
+        self.inference_queue_depth.set(depth)
+    
+    def track_inference_batch(
+        self,
+        model_type: str,
+        batch_size: int,
+        wait_times: list
+    ):
+        """Track one coalesced forward pass and the queue wait of its items"""
+        if not self.enabled:
+            return
+        
+        self.inference_batch_size.labels(
+            model_type=model_type
+        ).observe(batch_size)
+        
+        histogram = self.inference_batch_wait_seconds.labels(
+            model_type=model_type
+        )
+        for wait in wait_times:
+            histogram.observe(wait)
+    
+    def track_cascade_stage(
+        self,
+        stage: str,
+        texts: int,
+        answered: int,
+        duration: float
+    ):
+        """Track one cascade stage call: texts seen, texts answered, latency"""
+        if not self.enabled:
+            return
+        
+        self.cascade_stage_texts_total.labels(
+            stage=stage,
+            outcome="answered"
+        ).inc(answered)
+        self.cascade_stage_texts_total.labels(
+            stage=stage,
+            outcome="escalated"
+        ).inc(texts - answered)
+        
+        self.cascade_stage_duration_seconds.labels(
+            stage=stage
+        ).observe(duration)
+    
+    def track_cascade_shadow(self, stage: str, agreed: int, checked: int):
+        """Track early-stage answers compared with the full model"""
+        if not self.enabled:
+            return
+        
+        self.cascade_shadow_checks_total.labels(
+            stage=stage,
+            agreement="agree"
+        ).inc(agreed)
+        self.cascade_shadow_checks_total.labels(
+            stage=stage,
+            agreement="disagree"
+        ).inc(checked - agreed)
+    
+    def track_near_duplicates(self, reused: int, matched: int, new: int, clusters: int):
+        """Track one near-duplicate batch check"""
+        if not self.enabled:
+            return
+        
+        for outcome, count in (("reused", reused), ("matched", matched), ("new", new)):
+            if count:
+                self.near_duplicate_checks_total.labels(outcome=outcome).inc(count)
+        self.near_duplicate_clusters.set(clusters)
+    
+    def track_persistence(self, outcome: str, count: int = 1, depth: Optional[int] = None):
+        """Track predictions queued, written, failed or rejected by the persistence worker"""
+        if not self.enabled:
+            return
+        
+        if count:
+            self.persistence_items_total.labels(outcome=outcome).inc(count)
+        if depth is not None:
+            self.persistence_queue_depth.set(depth)
+    
+    def track_persistence_flush(self, size: int, duration: float):
+        """Track one batched insert"""
+        if not self.enabled:
+            return
+        
+        self.persistence_flush_size.observe(size)
+        self.persistence_flush_duration_seconds.observe(duration)
+    
     def set_model_loaded(self, model_type: str, loaded: bool):
         """Set model loaded status"""
         if not self.enabled:
@@ -0,0 +1,203 @@
+"""
+Micro-batching Inference Scheduler
+
+Coalesces concurrent single-text prediction requests into one forward pass.
+Requests are queued on the event loop; a worker task collects them until
+either the maximum batch size is reached or the oldest request has waited
+the configured number of milliseconds, runs one batched prediction in a
+dedicated thread and resolves each caller's future with its own result.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.config.settings import settings
+from backend.monitoring.metrics import get_metrics_collector
+from backend.services.model_registry import normalize_model_type
+
+logger = logging.getLogger(__name__)
+
+PredictionResult = Tuple[int, float, Dict[str, float]]
+
+
+class MicroBatchScheduler:
+    """
+    Request-coalescing scheduler in front of an MLModel instance
+    """
+
+    def __init__(
+        self,
+        model,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        enabled: Optional[bool] = None
+    ):
+        """
+        Initialize scheduler
+
+        Args:
+            model: MLModel instance used for inference
+            max_batch_size: Maximum number of texts per forward pass
+            max_wait_ms: Maximum time the first queued text waits for company
+            enabled: Whether batching is enabled (falls back to direct predict)
+        """
+        self.model = model
+        self.max_batch_size = max(1, int(
+            max_batch_size if max_batch_size is not None else settings.INFERENCE_MAX_BATCH_SIZE
+        ))
+        self.max_wait = max(0.0, float(
+            max_wait_ms if max_wait_ms is not None else settings.INFERENCE_MAX_WAIT_MS
+        )) / 1000.0
+        self.enabled = settings.INFERENCE_BATCHING_ENABLED if enabled is None else enabled
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # One inference thread: forward passes are serialized, never interleaved
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self._metrics = get_metrics_collector()
+
+    def _ensure_worker(self):
+        """Create queue and worker task bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker is not None and not self._worker.done():
+            return
+
+        # Event loop changed (e.g. new test client) or worker died: start fresh
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._worker = loop.create_task(self._run())
+
+    async def predict(self, text: str, model_type: Optional[str] = None) -> PredictionResult:
+        """
+        Predict one text, sharing a forward pass with concurrent callers
+
+        Args:
+            text: Text to classify
+            model_type: Optional model override
+
+        Returns:
+            (predicted_class, confidence, probabilities)
+        """
+        if not self.enabled:
+            return self.model.predict(text, model_type=model_type)
+
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((text, model_type, future, time.perf_counter()))
+        self._metrics.set_inference_queue_depth(self._queue.qsize())
+        return await future
+
+    async def _run(self):
+        """Worker loop: collect a batch, dispatch it, repeat"""
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+
+        batch: List[Tuple[str, Optional[str], asyncio.Future, float]] = []
+        try:
+            while True:
+                batch = [await queue.get()]
+                deadline = loop.time() + self.max_wait
+
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        # Deadline passed: take whatever is already queued
+                        while len(batch) < self.max_batch_size and not queue.empty():
+                            batch.append(queue.get_nowait())
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                self._metrics.set_inference_queue_depth(queue.qsize())
+
+                try:
+                    await self._dispatch(batch)
+                except Exception as e:
+                    logger.error(f"Inference batch failed: {e}")
+                    for _, _, future, _ in batch:
+                        if not future.done():
+                            future.set_exception(e)
+        except asyncio.CancelledError:
+            # stop() cancelled us mid-batch: these requests are no longer queued, fail them here
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("Inference scheduler stopped"))
+            raise
+
+    async def _dispatch(self, batch: List[Tuple[str, Optional[str], asyncio.Future, float]]):
+        """Run one forward pass per model type present in the batch"""
+        loop = asyncio.get_running_loop()
+        dispatched_at = time.perf_counter()
+
+        groups: Dict[Optional[str], List[Tuple[str, Optional[str], asyncio.Future, float]]] = {}
+        for item in batch:
+            # Callers that gave up (client disconnect) don't need a slot
+            if item[2].cancelled():
+                continue
+            model_type = normalize_model_type(item[1])
+            if model_type == getattr(self.model, "model_type", None):
+                model_type = None
+            groups.setdefault(model_type, []).append(item)
+
+        for model_type, items in groups.items():
+            texts = [item[0] for item in items]
+            self._metrics.track_inference_batch(
+                model_type=model_type or getattr(self.model, "model_type", "default"),
+                batch_size=len(texts),
+                wait_times=[dispatched_at - item[3] for item in items]
+            )
+
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self._infer, texts, model_type
+                )
+            except Exception as e:
+                logger.error(f"Batched prediction failed for model {model_type}: {e}")
+                for item in items:
+                    if not item[2].done():
+                        item[2].set_exception(e)
+                continue
+
+            for item, result in zip(items, results):
+                if not item[2].done():
+                    item[2].set_result(result)
+
+    def _infer(self, texts: List[str], model_type: Optional[str]) -> List[PredictionResult]:
+        """Blocking inference for one group (runs in the inference thread)"""
+        return self.model.predict_batch(texts, model_type=model_type)
+
+    async def stop(self):
+        """Cancel the worker task and fail any requests still queued"""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, _, future, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Inference scheduler stopped"))
+
+        self._worker = None
+        self._queue = None
+        self._loop = None
+        self._metrics.set_inference_queue_depth(0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return scheduler configuration and current queue depth"""
+        return {
+            "enabled": self.enabled,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "running": self._worker is not None and not self._worker.done(),
+        }
@@ -0,0 +1,402 @@
+"""
+Cascade Classifier
+
+Most traffic is clearly clean, so running the LSTM (or PhoBERT) on every
+text wastes compute. The cascade answers each text at the cheapest stage that
+is confident enough:
+
+1. linear     - logistic regression over the TF-IDF features of
+                backend/utils/vector_utils plus lexicon and spam signals;
+                answers when its top probability >= CASCADE_LINEAR_THRESHOLD
+2. <default>  - the MLModel's own model (e.g. lstm); answers when its
+                confidence >= CASCADE_MODEL_THRESHOLD or no further stage exists
+3. <escalation> - CASCADE_ESCALATION_MODEL (e.g. phobert) for what is left
+
+Every result carries the stage that answered. Per-stage counters and latency
+histograms go to Prometheus; a sampled shadow check
+(CASCADE_SHADOW_SAMPLE_RATE) re-runs early answers through the default model
+to measure agreement.
+
+Train and evaluate the linear stage:
+    python -m backend.services.cascade train --csv labelled.csv
+    python -m backend.services.cascade evaluate --csv labelled.csv
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.config.settings import settings
+from backend.monitoring.metrics import get_metrics_collector
+from backend.services.model_registry import get_model_registry, normalize_model_type
+
+logger = logging.getLogger(__name__)
+
+STAGE_LINEAR = "linear"
+STAGE_EMPTY = "empty"
+
+# Cheap per-text signals appended to the TF-IDF features
+SIGNAL_FEATURES = (
+    "offensive_hits", "hate_hits", "has_url", "url_count", "has_suspicious_url",
+    "spam_keyword_count", "has_excessive_punctuation", "has_all_caps_words",
+    "has_phone_number", "has_price", "has_suspicious_patterns", "emoji_count",
+    "capitalization_ratio",
+)
+_COUNT_FEATURES = {"offensive_hits", "hate_hits", "url_count", "spam_keyword_count", "emoji_count"}
+
+CascadeResult = Tuple[int, float, Dict[str, float], str]
+
+
+def signal_features(texts: Sequence[str]) -> np.ndarray:
+    """Lexicon hits and spam features as a (len(texts), len(SIGNAL_FEATURES)) matrix"""
+    from backend.utils.lexicon import get_lexicon_matcher
+    from backend.utils.text_processing import preprocess_for_spam_detection_batch
+
+    lexicon_hits = get_lexicon_matcher().match_batch(list(texts))
+    spam = preprocess_for_spam_detection_batch(list(texts))
+
+    matrix = np.zeros((len(texts), len(SIGNAL_FEATURES)), dtype=np.float64)
+    for row, (hits, (_, features)) in enumerate(zip(lexicon_hits, spam)):
+        values = dict(features)
+        values["offensive_hits"] = len(hits.get("offensive", []))
+        values["hate_hits"] = len(hits.get("hate", []))
+        for col, name in enumerate(SIGNAL_FEATURES):
+            value = float(values.get(name, 0))
+            matrix[row, col] = np.log1p(value) if name in _COUNT_FEATURES else value
+    return matrix
+
+
+def stage_features(texts: Sequence[str], vectorizer=None):
+    """Sparse TF-IDF + signal feature matrix of the linear stage"""
+    from scipy import sparse
+    from backend.utils.vector_utils import preprocess_text
+
+    signals = sparse.csr_matrix(signal_features(texts))
+    if vectorizer is None:
+        return signals
+    tfidf = vectorizer.transform([preprocess_text(text) for text in texts])
+    return sparse.hstack([tfidf, signals], format="csr")
+
+
+class LinearStage:
+    """
+    First cascade stage: linear classifier over TF-IDF and signal features
+
+    The artifact pins the fitted vectorizer it was trained with, so retraining
+    the shared vectorizer does not silently change this stage's input.
+    """
+
+    def __init__(self, artifact: Dict[str, Any]):
+        self.classifier = artifact["classifier"]
+        self.vectorizer = artifact.get("vectorizer")
+        self.labels: List[str] = list(artifact["labels"])
+        self.classes = [int(c) for c in self.classifier.classes_]
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LinearStage"]:
+        """Load a trained stage, or None if the file does not exist or is invalid"""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            import joblib
+            stage = cls(joblib.load(path))
+            logger.info(f"Loaded cascade linear stage from {path}")
+            return stage
+        except Exception as e:
+            logger.error(f"Could not load cascade linear stage {path}: {e}")
+            return None
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """Probabilities over all labels (classes unseen in training get 0)"""
+        probs = np.zeros((len(texts), len(self.labels)), dtype=np.float64)
+        if len(texts):
+            probs[:, self.classes] = self.classifier.predict_proba(stage_features(texts, self.vectorizer))
+        return probs
+
+
+def train_linear_stage(
+    texts: Sequence[str],
+    targets: Sequence[int],
+    labels: Sequence[str],
+    vectorizer=None,
+    C: float = 4.0
+) -> Dict[str, Any]:
+    """
+    Fit the linear stage
+
+    Args:
+        texts: Training texts (preprocessed like the route inputs)
+        targets: Class index per text
+        labels: Label names, index = class
+        vectorizer: Fitted TfidfVectorizer; None = signal features only
+        C: Inverse regularisation strength
+
+    Returns:
+        Artifact for joblib.dump / LinearStage
+    """
+    from sklearn.linear_model import LogisticRegression
+
+    classifier = LogisticRegression(C=C, max_iter=2000, class_weight="balanced")
+    classifier.fit(stage_features(texts, vectorizer), np.asarray(targets))
+    return {"classifier": classifier, "vectorizer": vectorizer, "labels": list(labels)}
+
+
+class CascadeClassifier:
+    """
+    Routes texts through the cascade stages of one MLModel
+    """
+
+    def __init__(self, ml_model, linear_stage: Optional[LinearStage] = None):
+        """
+        Args:
+            ml_model: MLModel answering the model stages
+            linear_stage: First stage; loaded from CASCADE_LINEAR_MODEL_PATH on first use if None
+        """
+        self.ml_model = ml_model
+        self._linear_stage = linear_stage
+        self._linear_loaded = linear_stage is not None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._shadow = {"checked": 0, "agreed": 0}
+        self._texts_total = 0
+
+    @property
+    def linear_stage(self) -> Optional[LinearStage]:
+        if not self._linear_loaded:
+            with self._lock:
+                if not self._linear_loaded:
+                    self._linear_stage = LinearStage.load(settings.CASCADE_LINEAR_MODEL_PATH)
+                    if self._linear_stage is None:
+                        logger.warning("Cascade linear stage not available, texts start at the model stage")
+                    self._linear_loaded = True
+        return self._linear_stage
+
+    def _escalation_model(self) -> Optional[str]:
+        """Model type of the last stage, if it exists and differs from the default model"""
+        model_type = normalize_model_type(settings.CASCADE_ESCALATION_MODEL)
+        if not model_type or model_type == normalize_model_type(self.ml_model.model_type):
+            return None
+        if get_model_registry().resolve_path(model_type) is None:
+            return None
+        return model_type
+
+    def _record(self, stage: str, texts: int, answered: int, duration: float):
+        with self._lock:
+            stats = self._stats.setdefault(stage, {"texts": 0, "answered": 0, "seconds": 0.0, "calls": 0})
+            stats["texts"] += texts
+            stats["answered"] += answered
+            stats["seconds"] += duration
+            stats["calls"] += 1
+        get_metrics_collector().track_cascade_stage(stage, texts, answered, duration)
+
+    def _shadow_check(self, texts: List[str], predicted: List[int]):
+        """Compare a sample of early answers with the default model"""
+        rate = settings.CASCADE_SHADOW_SAMPLE_RATE
+        if rate <= 0 or not texts:
+            return
+        sample = [i for i in range(len(texts)) if random.random() < rate]
+        if not sample:
+            return
+        full = self.ml_model.predict_batch([texts[i] for i in sample])
+        agreed = sum(int(full[k][0] == predicted[i]) for k, i in enumerate(sample))
+        with self._lock:
+            self._shadow["checked"] += len(sample)
+            self._shadow["agreed"] += agreed
+        get_metrics_collector().track_cascade_shadow(STAGE_LINEAR, agreed, len(sample))
+
+    def predict_batch(self, texts: List[str]) -> List[CascadeResult]:
+        """
+        Classify texts, each at the first confident stage
+
+        Returns:
+            List of (predicted_class, confidence, probabilities, stage) in input order
+        """
+        labels = self.ml_model.labels
+        texts = list(texts)
+        results: List[Optional[CascadeResult]] = [None] * len(texts)
+        with self._lock:
+            self._texts_total += len(texts)
+
+        pending = []
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                probabilities = {label: 0.0 for label in labels}
+                probabilities[labels[0]] = 1.0
+                results[i] = (0, 1.0, probabilities, STAGE_EMPTY)
+            else:
+                pending.append(i)
+
+        # Stage 1: linear model
+        linear = self.linear_stage if pending else None
+        if linear is not None:
+            start = time.perf_counter()
+            probs = linear.predict_proba([texts[i] for i in pending])
+            duration = time.perf_counter() - start
+
+            predicted = probs.argmax(axis=1)
+            confidence = probs[np.arange(len(pending)), predicted]
+            confident = confidence >= settings.CASCADE_LINEAR_THRESHOLD
+
+            answered = []
+            for row, i in enumerate(pending):
+                if confident[row]:
+                    probabilities = {label: float(probs[row, j]) for j, label in enumerate(linear.labels)}
+                    results[i] = (int(predicted[row]), float(confidence[row]), probabilities, STAGE_LINEAR)
+                    answered.append(i)
+            self._record(STAGE_LINEAR, len(pending), len(answered), duration)
+            self._shadow_check([texts[i] for i in answered], [results[i][0] for i in answered])
+            pending = [i for row, i in enumerate(pending) if not confident[row]]
+
+        # Stage 2: default model, escalating low-confidence texts if a last stage exists
+        escalation = self._escalation_model() if pending else None
+        for model_type in (None, escalation):
+            if not pending:
+                break
+            is_last = model_type is not None or escalation is None
+            stage = model_type or normalize_model_type(self.ml_model.model_type) or "model"
+
+            start = time.perf_counter()
+            outputs = self.ml_model.predict_batch([texts[i] for i in pending], model_type=model_type)
+            duration = time.perf_counter() - start
+
+            remaining = []
+            for i, (predicted_class, confidence, probabilities) in zip(pending, outputs):
+                if is_last or confidence >= settings.CASCADE_MODEL_THRESHOLD:
+                    results[i] = (predicted_class, confidence, probabilities, stage)
+                else:
+                    remaining.append(i)
+            self._record(stage, len(pending), len(pending) - len(remaining), duration)
+            pending = remaining
+
+        return results
+
+    def predict(self, text: str) -> CascadeResult:
+        """Classify one text (a batch of one)"""
+        return self.predict_batch([text])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-stage counts, share of all texts answered and mean latency"""
+        with self._lock:
+            stages = {stage: dict(values) for stage, values in self._stats.items()}
+            shadow = dict(self._shadow)
+            total = self._texts_total
+        for values in stages.values():
+            values["answered_share"] = values["answered"] / total if total else 0.0
+            values["mean_ms"] = values["seconds"] / values["calls"] * 1000.0 if values["calls"] else 0.0
+        shadow["agreement_rate"] = shadow["agreed"] / shadow["checked"] if shadow["checked"] else None
+        return {"texts": total, "stages": stages, "shadow": shadow}
+
+
+def load_labelled_csv(path: str, labels: Sequence[str], limit: Optional[int] = None) -> Tuple[List[str], List[int]]:
+    """
+    Read `text`, `label` columns, preprocessed like the prediction routes
+
+    `label` may be a class index or a label name.
+    """
+    import pandas as pd
+    from backend.utils.text_processing import preprocess_text
+
+    frame = pd.read_csv(path, nrows=limit)
+    texts = [preprocess_text(str(text)) for text in frame["text"]]
+    targets = [int(label) if str(label).isdigit() else list(labels).index(str(label)) for label in frame["label"]]
+    return texts, targets
+
+
+def evaluate(cascade: CascadeClassifier, texts: List[str], targets: Optional[List[int]] = None) -> Dict[str, Any]:
+    """
+    Compare the cascade with running the default model on every text
+
+    Returns:
+        Share answered per stage, agreement with the full model, accuracy and time
+    """
+    start = time.perf_counter()
+    full = cascade.ml_model.predict_batch(texts)
+    full_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cascaded = cascade.predict_batch(texts)
+    cascade_seconds = time.perf_counter() - start
+
+    full_classes = np.array([r[0] for r in full])
+    cascade_classes = np.array([r[0] for r in cascaded])
+    stages = np.array([r[3] for r in cascaded])
+
+    report: Dict[str, Any] = {
+        "texts": len(texts),
+        "full_model_seconds": full_seconds,
+        "cascade_seconds": cascade_seconds,
+        "speedup": full_seconds / cascade_seconds if cascade_seconds else None,
+        "agreement_with_full_model": float(np.mean(full_classes == cascade_classes)) if len(texts) else None,
+        "stages": {},
+    }
+    for stage in dict.fromkeys(stages.tolist()):
+        mask = stages == stage
+        report["stages"][stage] = {
+            "share": float(mask.mean()),
+            "agreement_with_full_model": float(np.mean(full_classes[mask] == cascade_classes[mask])),
+        }
+    if targets is not None:
+        targets_array = np.asarray(targets)
+        report["accuracy_full_model"] = float(np.mean(full_classes == targets_array))
+        report["accuracy_cascade"] = float(np.mean(cascade_classes == targets_array))
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Train or evaluate the cascade linear stage"""
+    import json
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Cascade classifier linear stage")
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("--csv", required=True, help="CSV with `text` and `label` columns")
+    parser.add_argument("--output", default=settings.CASCADE_LINEAR_MODEL_PATH, help="Linear stage artifact")
+    parser.add_argument("--vectorizer", default=None, help="Fitted TF-IDF vectorizer (default: fit on --csv)")
+    parser.add_argument("--no-tfidf", action="store_true", help="Use lexicon/spam signals only")
+    parser.add_argument("--C", type=float, default=4.0)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    labels = list(settings.MODEL_LABELS)
+    texts, targets = load_labelled_csv(args.csv, labels, args.limit)
+
+    if args.command == "train":
+        vectorizer = None
+        if not args.no_tfidf:
+            from backend.utils import vector_utils
+            if args.vectorizer:
+                if not vector_utils.load_vectorizer(args.vectorizer):
+                    return 1
+                vectorizer = vector_utils._get_vectorizer()
+            else:
+                vectorizer = vector_utils.train_vectorizer_on_corpus(texts)
+        artifact = train_linear_stage(texts, targets, labels, vectorizer=vectorizer, C=args.C)
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        joblib.dump(artifact, args.output)
+        print(f"Wrote {args.output} ({len(texts)} texts, tfidf={'yes' if vectorizer is not None else 'no'})")
+        return 0
+
+    # Evaluation runs every text through the models: the prediction cache would hide model cost
+    from backend.services.ml_model import MLModel
+    from backend.services.prediction_cache import reset_prediction_cache
+    settings.PREDICTION_CACHE_ENABLED = False
+    reset_prediction_cache()
+
+    stage = LinearStage.load(args.output)
+    if stage is None:
+        print(f"No linear stage at {args.output}; run `train` first")
+        return 1
+    report = evaluate(CascadeClassifier(MLModel(), stage), texts, targets)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
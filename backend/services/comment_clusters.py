@@ -0,0 +1,463 @@
+"""
+Incremental Comment Clustering
+
+Keeps one MiniBatchKMeans model per prediction label (CLUSTER_LABELS,
+offensive / hate / spam by default) that is updated with partial_fit as new
+comments are stored, so /comment-clusters answers from the current
+assignments instead of refitting KMeans on every request.
+
+Vectors come from the shared feature store (unit-norm rows, see
+feature_store.py), which also serves as the log of new comments: update()
+reads the rows appended since the last update (a row offset into the
+current store generation, carried over compaction), looks up their labels
+in the comments table, assigns each batch after fitting it, and records the
+most recent members of every cluster. Reading by row rather than by comment
+id matters because workers append after their own commit, so ids reach the
+store out of order. When the store is cleared (rebuild) the models start
+over from its new rows. Comments keep the cluster
+they were assigned on arrival; centroids keep moving, which is what the
+drift history measures: every CLUSTER_DRIFT_INTERVAL seconds each cluster's
+centroid shift (cosine distance to the previous snapshot) and size are
+recorded, so a campaign shows up as a cluster that grows or moves fast.
+
+Only one process updates the models: every worker runs a background
+thread, but only the one holding an exclusive lock on
+CLUSTER_MODEL_PATH + ".lock" (fcntl) runs update() every
+CLUSTER_UPDATE_INTERVAL seconds and saves the state (atomic replace). The
+other workers reload the saved file when it changes, so all of them answer
+from the same models, at most one interval behind. When the leader exits
+its lock is released and the next worker to try takes over from the saved
+state. The CLI update refuses to run while a worker holds the lock.
+
+    python -m backend.services.comment_clusters update
+    python -m backend.services.comment_clusters stats
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+import joblib
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+
+from backend.config.settings import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process leader election, every process updates
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STATE_FORMAT_VERSION = 2
+
+
+class LabelClusters:
+    """Incremental k-means over the comments of one prediction label"""
+
+    def __init__(self, label: int, n_clusters: int, members_kept: int, history: int, seed: int = 0):
+        self.label = label
+        self.n_clusters = n_clusters
+        self.model = MiniBatchKMeans(n_clusters=n_clusters, n_init=3, random_state=seed)
+        self.counts = np.zeros(n_clusters, dtype=np.int64)
+        self.members = [deque(maxlen=members_kept) for _ in range(n_clusters)]
+        self.drift = deque(maxlen=history)
+        self.points = 0
+        self._pending_ids: List[int] = []
+        self._pending_vectors: List[np.ndarray] = []
+        self._reference: Optional[np.ndarray] = None
+        self._reference_time = time.time()
+        self._reference_counts = np.zeros(n_clusters, dtype=np.int64)
+
+    @property
+    def fitted(self) -> bool:
+        return hasattr(self.model, "cluster_centers_")
+
+    def update(self, ids: Sequence[int], vectors: np.ndarray) -> Dict[int, int]:
+        """
+        Fit a batch and assign it
+
+        Batches are held back until the first fit has n_clusters points.
+
+        Returns:
+            {comment_id: cluster} for the comments assigned by this call
+        """
+        if len(ids):
+            self._pending_ids.extend(int(i) for i in ids)
+            self._pending_vectors.append(np.asarray(vectors, dtype=np.float32))
+        if len(self._pending_ids) < (1 if self.fitted else self.n_clusters):
+            return {}
+
+        ids, vectors = self._pending_ids, np.vstack(self._pending_vectors)
+        self._pending_ids, self._pending_vectors = [], []
+        self.model.partial_fit(vectors)
+        labels = self.model.predict(vectors)
+        if self._reference is None:
+            self._reference = self.model.cluster_centers_.copy()
+
+        for comment_id, cluster in zip(ids, labels.tolist()):
+            self.counts[cluster] += 1
+            self.members[cluster].append(comment_id)
+        self.points += len(ids)
+        return dict(zip(ids, labels.tolist()))
+
+    def record_drift(self, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Append centroid shift and growth since the previous snapshot to the history"""
+        if not self.fitted or self._reference is None:
+            return None
+        now = time.time() if now is None else now
+        current = self.model.cluster_centers_
+        norms = np.linalg.norm(current, axis=1) * np.linalg.norm(self._reference, axis=1)
+        cosine = np.divide((current * self._reference).sum(axis=1), norms, out=np.ones(len(norms)), where=norms > 0)
+        shift = np.clip(1.0 - cosine, 0.0, 2.0)
+        entry = {
+            "timestamp": now,
+            "seconds": round(now - self._reference_time, 1),
+            "shift": [round(float(s), 6) for s in shift],
+            "mean_shift": round(float(shift.mean()), 6),
+            "max_shift": round(float(shift.max()), 6),
+            "new_points": [int(n) for n in self.counts - self._reference_counts],
+            "sizes": [int(n) for n in self.counts],
+        }
+        self.drift.append(entry)
+        self._reference = current.copy()
+        self._reference_time = now
+        self._reference_counts = self.counts.copy()
+        return entry
+
+    def clusters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Clusters by size (largest first) with their most recent members, at most `limit` ids in total"""
+        total = int(self.counts.sum())
+        result = []
+        for cluster in np.argsort(-self.counts, kind="stable").tolist():
+            if not self.counts[cluster]:
+                continue
+            share = max(1, limit * int(self.counts[cluster]) // total)
+            result.append({
+                "cluster": cluster,
+                "size": int(self.counts[cluster]),
+                "members": list(self.members[cluster])[::-1][:share],
+                "drift": self.drift[-1]["shift"][cluster] if self.drift else None,
+            })
+        return result
+
+
+class CommentClusterService:
+    """Per-label incremental clusters fed from the feature store"""
+
+    def __init__(self, labels: Optional[Sequence[int]] = None, n_clusters: Optional[int] = None,
+                 members_kept: Optional[int] = None, history: Optional[int] = None):
+        self.labels = list(settings.CLUSTER_LABELS if labels is None else labels)
+        self.n_clusters = int(n_clusters or settings.CLUSTER_COUNT)
+        self.members_kept = int(members_kept or settings.CLUSTER_MEMBERS_KEPT)
+        self.history = int(history or settings.CLUSTER_DRIFT_HISTORY)
+        self.models = self._new_models()
+        # Rows of feature store generation `generation` already read
+        self.generation: Optional[int] = None
+        self.watermark = 0
+        self.updated_at: Optional[float] = None
+        self._last_drift = time.time()
+        self._lock = threading.RLock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._leader_file = None
+        self._loaded_mtime: Optional[float] = None
+        self.changes_since_save = 0
+
+    def _new_models(self) -> Dict[int, LabelClusters]:
+        return {
+            label: LabelClusters(label, self.n_clusters, self.members_kept, self.history) for label in self.labels
+        }
+
+    def update(self, db, store=None, batch_size: Optional[int] = None, now: Optional[float] = None) -> int:
+        """
+        Cluster the comments appended to the store since the last update
+
+        Returns:
+            int: Number of comments read from the store
+        """
+        from backend.db.models import Comment
+        from backend.services.feature_store import get_feature_store
+
+        store = store or get_feature_store()
+        batch_size = int(batch_size or settings.CLUSTER_BATCH_SIZE)
+        with self._lock:
+            generation, offset = self.generation, self.watermark
+        carried = store.carry_offset(generation, offset) if generation is not None else None
+        if carried is None:
+            if generation is not None:
+                logger.warning(f"Feature store generation {generation} was cleared, re-clustering from the start")
+            with self._lock:
+                self.models = self._new_models()
+            carried = (store.generation, 0)
+        generation, offset = carried
+        new_ids, rows, end = store.appended_since(generation, offset)
+        with self._lock:
+            self.generation, self.watermark = generation, offset
+
+        for start in range(0, len(new_ids), batch_size):
+            chunk = new_ids[start:start + batch_size].tolist()
+            labels = dict(db.query(Comment.id, Comment.prediction).filter(Comment.id.in_(chunk)).all())
+            batches = {
+                label: store.get([comment_id for comment_id in chunk if labels.get(comment_id) == label])
+                for label in self.models
+            }
+            # The lock is held only while fitting, so cluster requests are never stuck behind the database
+            with self._lock:
+                for label, (found, vectors) in batches.items():
+                    self.models[label].update(found, vectors)
+                self.watermark = int(rows[start + len(chunk) - 1]) + 1
+
+        with self._lock:
+            self.watermark = max(self.watermark, end)
+            now = time.time() if now is None else now
+            if now - self._last_drift >= settings.CLUSTER_DRIFT_INTERVAL:
+                for model in self.models.values():
+                    model.record_drift(now)
+                self._last_drift = now
+            if len(new_ids):
+                self.updated_at = now
+                self.changes_since_save += len(new_ids)
+        return len(new_ids)
+
+    def clusters(self, label: int, limit: int = 100) -> Optional[List[Dict[str, Any]]]:
+        """Current clusters of a label, or None if the label is not clustered incrementally"""
+        with self._lock:
+            model = self.models.get(label)
+            if model is None or not model.fitted:
+                return None
+            return model.clusters(limit)
+
+    def drift(self, label: int, last: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            model = self.models.get(label)
+            if model is None:
+                return []
+            history = list(model.drift)
+            return history[-last:] if last else history
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "labels": {
+                    str(label): {"fitted": model.fitted, "points": model.points,
+                                 "sizes": [int(n) for n in model.counts],
+                                 "drift_snapshots": len(model.drift)}
+                    for label, model in self.models.items()
+                },
+                "generation": self.generation,
+                "watermark": self.watermark,
+                "leader": self._leader_file is not None,
+                "updated_at": self.updated_at,
+            }
+
+    # Persistence
+
+    def save(self, path: Optional[str] = None):
+        """Write the state atomically (temp file + rename)"""
+        path = path or settings.CLUSTER_MODEL_PATH
+        with self._lock:
+            state = {
+                "format": STATE_FORMAT_VERSION,
+                "n_clusters": self.n_clusters,
+                "models": self.models,
+                "generation": self.generation,
+                "watermark": self.watermark,
+                "updated_at": self.updated_at,
+                "last_drift": self._last_drift,
+            }
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            joblib.dump(state, tmp_path)
+            self.changes_since_save = 0
+        os.replace(tmp_path, path)
+        logger.info(f"Saved comment clusters (store generation {self.generation}, row {self.watermark}) to {path}")
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> Optional["CommentClusterService"]:
+        """Load a saved state, or None if it is missing, unreadable or configured differently"""
+        path = path or settings.CLUSTER_MODEL_PATH
+        if not os.path.exists(path):
+            return None
+        try:
+            state = joblib.load(path)
+        except Exception as e:
+            logger.error(f"Could not load comment clusters from {path}: {e}")
+            return None
+        if state.get("format") != STATE_FORMAT_VERSION or state.get("n_clusters") != settings.CLUSTER_COUNT:
+            logger.warning(f"Ignoring comment clusters at {path}: saved with different settings")
+            return None
+        service = cls()
+        service.models.update({label: model for label, model in state["models"].items() if label in service.models})
+        service._loaded_mtime = os.path.getmtime(path)
+        service.generation = state["generation"]
+        service.watermark = state["watermark"]
+        service.updated_at = state["updated_at"]
+        service._last_drift = state["last_drift"]
+        return service
+
+    def reload(self, path: Optional[str] = None) -> bool:
+        """Replace the state with the saved file if it changed since it was last read"""
+        path = path or settings.CLUSTER_MODEL_PATH
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return False
+        if mtime == self._loaded_mtime:
+            return False
+        loaded = CommentClusterService.load(path)
+        if loaded is None:
+            return False
+        with self._lock:
+            self.models = loaded.models
+            self.generation = loaded.generation
+            self.watermark = loaded.watermark
+            self.updated_at = loaded.updated_at
+            self._last_drift = loaded._last_drift
+            self._loaded_mtime = loaded._loaded_mtime
+            self.changes_since_save = 0
+        return True
+
+    # Leader election
+
+    def acquire_leadership(self, path: Optional[str] = None) -> bool:
+        """Take the updater lock without blocking; True if this process holds it"""
+        if self._leader_file is not None or fcntl is None:
+            return True
+        path = path or settings.CLUSTER_MODEL_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        lock_file = open(f"{path}.lock", "a+b")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._leader_file = lock_file
+        logger.info(f"Process {os.getpid()} is the comment cluster updater")
+        return True
+
+    def release_leadership(self):
+        if self._leader_file is not None:
+            fcntl.flock(self._leader_file.fileno(), fcntl.LOCK_UN)
+            self._leader_file.close()
+            self._leader_file = None
+
+    # Background updates
+
+    def start(self, interval: Optional[float] = None):
+        """Run update() every CLUSTER_UPDATE_INTERVAL seconds in a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        interval = settings.CLUSTER_UPDATE_INTERVAL if interval is None else interval
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="comment-clusters", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, interval: float):
+        from backend.db.models.base import SessionLocal
+
+        while not self._stop.wait(interval):
+            was_leader = self._leader_file is not None
+            try:
+                if not self.acquire_leadership():
+                    self.reload()
+                    continue
+                if not was_leader:
+                    # Continue from the last state saved by the previous leader
+                    self.reload()
+            except Exception as e:
+                logger.error(f"Comment cluster reload failed: {e}")
+                continue
+            db = SessionLocal()
+            try:
+                if self.update(db):
+                    self.save()
+            except Exception as e:
+                logger.error(f"Comment cluster update failed: {e}")
+            finally:
+                db.close()
+
+
+# Singleton instance
+_cluster_service: Optional[CommentClusterService] = None
+_cluster_service_lock = threading.Lock()
+
+
+def get_cluster_service() -> CommentClusterService:
+    """Get the process-wide service, loading CLUSTER_MODEL_PATH on first use"""
+    global _cluster_service
+    if _cluster_service is None:
+        with _cluster_service_lock:
+            if _cluster_service is None:
+                _cluster_service = CommentClusterService.load() or CommentClusterService()
+    return _cluster_service
+
+
+def start_cluster_service():
+    if settings.CLUSTER_SERVICE_ENABLED and settings.FEATURE_STORE_ENABLED:
+        get_cluster_service().start()
+
+
+def stop_cluster_service():
+    """Stop the background thread, save unsaved updates, then hand over the updater lock"""
+    if _cluster_service is None:
+        return
+    _cluster_service.stop()
+    if _cluster_service.changes_since_save:
+        try:
+            _cluster_service.save()
+        except OSError as e:
+            logger.error(f"Could not save comment clusters: {e}")
+    _cluster_service.release_leadership()
+
+
+def reset_cluster_service():
+    """Drop the singleton (tests)"""
+    global _cluster_service
+    with _cluster_service_lock:
+        if _cluster_service is not None:
+            _cluster_service.stop()
+            _cluster_service.release_leadership()
+        _cluster_service = None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Incremental comment clusters")
+    parser.add_argument("command", choices=["update", "stats"])
+    parser.add_argument("--path", default=settings.CLUSTER_MODEL_PATH)
+    args = parser.parse_args(argv)
+
+    service = CommentClusterService.load(args.path) or CommentClusterService()
+    if args.command == "update":
+        from backend.db.models.base import SessionLocal
+        if not service.acquire_leadership(args.path):
+            print(f"A running worker holds {args.path}.lock and updates the clusters", file=sys.stderr)
+            return 1
+        db = SessionLocal()
+        try:
+            read = service.update(db)
+            service.save(args.path)
+        finally:
+            db.close()
+            service.release_leadership()
+        print(json.dumps({"read": read, **service.stats()}, indent=2))
+    else:
+        print(json.dumps(service.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
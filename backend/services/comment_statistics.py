@@ -0,0 +1,196 @@
+"""
+Comment Statistics
+
+Aggregates for /api/toxic/statistics computed in the database from the
+filter expression:
+- one GROUP BY platform scan returns the per-platform count, the per-label
+  counts (SUM(CASE ...)) and the confidence sum / count / min / max; the
+  totals are folded from the platform rows;
+- one grouped query over the same filter (plus toxic labels) returns the
+  top source users, only when they are requested (admins).
+
+Results are cached in process for STATISTICS_CACHE_TTL seconds, keyed by
+the effective filter tuple, so dashboards polling the same view do not
+rescan the table on every refresh.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import sqlalchemy as sa
+
+from backend.config.settings import settings
+
+LABELS = {0: "clean", 1: "offensive", 2: "hate", 3: "spam"}
+TOXIC_LABELS = (1, 2, 3)
+TOP_USERS = 10
+
+
+def comment_conditions(
+    platform: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    user_id: Optional[int] = None
+) -> List[Any]:
+    """SQL conditions on Comment for the given filters (None = not filtered)"""
+    from backend.db.models import Comment
+
+    conditions = []
+    if platform:
+        conditions.append(Comment.platform == platform)
+    if start_date:
+        conditions.append(Comment.created_at >= start_date)
+    if end_date:
+        conditions.append(Comment.created_at <= end_date)
+    if user_id is not None:
+        conditions.append(Comment.user_id == user_id)
+    return conditions
+
+
+def compute_statistics(
+    db,
+    platform: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    include_toxic_users: bool = False
+) -> Dict[str, Any]:
+    """
+    Label counts, percentages, platform counts, confidence and top toxic users
+
+    Returns:
+        The StatisticsResponse fields except "filters"
+    """
+    from backend.db.models import Comment
+
+    conditions = comment_conditions(platform, start_date, end_date, user_id)
+    label_columns = [
+        sa.func.sum(sa.case((Comment.prediction == label, 1), else_=0)).label(name)
+        for label, name in LABELS.items()
+    ]
+    rows = db.execute(
+        sa.select(
+            Comment.platform,
+            sa.func.count().label("count"),
+            *label_columns,
+            sa.func.sum(Comment.confidence).label("confidence_sum"),
+            sa.func.count(Comment.confidence).label("confidence_count"),
+            sa.func.min(Comment.confidence).label("confidence_min"),
+            sa.func.max(Comment.confidence).label("confidence_max"),
+        ).where(*conditions).group_by(Comment.platform)
+    ).all()
+
+    total = sum(row.count for row in rows)
+    counts = {name: sum(getattr(row, name) or 0 for row in rows) for name in LABELS.values()}
+    confidence_count = sum(row.confidence_count for row in rows)
+    minimums = [row.confidence_min for row in rows if row.confidence_min is not None]
+    maximums = [row.confidence_max for row in rows if row.confidence_max is not None]
+
+    toxic_users = []
+    if include_toxic_users:
+        top = db.execute(
+            sa.select(Comment.source_user_name, sa.func.count().label("count"))
+            .where(*conditions, Comment.prediction.in_(TOXIC_LABELS), Comment.source_user_name.is_not(None))
+            .group_by(Comment.source_user_name)
+            .order_by(sa.desc("count"))
+            .limit(TOP_USERS)
+        ).all()
+        toxic_users = [{"username": username, "count": count} for username, count in top]
+
+    return {
+        "total": total,
+        **counts,
+        "percentages": {name: (count / total * 100) if total > 0 else 0 for name, count in counts.items()},
+        "platforms": {row.platform: row.count for row in rows},
+        "confidence": {
+            "average": (sum(row.confidence_sum or 0 for row in rows) / confidence_count) if confidence_count else 0,
+            "min": min(minimums) if minimums else 0,
+            "max": max(maximums) if maximums else 0,
+        },
+        "toxic_users": toxic_users,
+    }
+
+
+class StatisticsCache:
+    """In-process TTL cache of statistics results keyed by the filter tuple"""
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl = float(settings.STATISTICS_CACHE_TTL if ttl is None else ttl)
+        self.max_entries = max(1, int(settings.STATISTICS_CACHE_MAX_ENTRIES if max_entries is None else max_entries))
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Dict[str, Any], now: Optional[float] = None):
+        if self.ttl <= 0:
+            return
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+def cached_statistics(
+    db,
+    platform: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    include_toxic_users: bool = False
+) -> Dict[str, Any]:
+    """compute_statistics through the shared TTL cache"""
+    cache = get_statistics_cache()
+    key = (platform or None, start_date, end_date, user_id, include_toxic_users)
+    result = cache.get(key)
+    if result is None:
+        result = compute_statistics(db, platform, start_date, end_date, user_id, include_toxic_users)
+        cache.set(key, result)
+    return result
+
+
+_cache: Optional[StatisticsCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_statistics_cache() -> StatisticsCache:
+    """Process-wide statistics cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = StatisticsCache()
+    return _cache
+
+
+def reset_statistics_cache():
+    """Drop the process-wide cache (tests, settings changes)"""
+    global _cache
+    with _cache_lock:
+        _cache = None
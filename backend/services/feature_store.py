@@ -0,0 +1,675 @@
+"""
+Comment Feature Store
+
+An append-only on-disk matrix of comment feature vectors that clustering,
+similarity and export jobs read through a read-only memory map, so every
+gunicorn worker shares the same page-cached rows instead of decoding the
+vector column of each comment per request.
+
+Vectors wider than FEATURE_STORE_DIM are reduced with a fixed-seed Gaussian
+random projection (the same construction as the vector index), L2-normalized
+and stored as float16, so a row is 2 * FEATURE_STORE_DIM bytes and the inner
+product of two rows is their cosine similarity.
+
+Layout of FEATURE_STORE_PATH:
+    meta.json             format, generation, dim, source_dim, seed
+    features.<gen>.f16    row-major float16 matrix (rows x dim)
+    ids.<gen>.i64         comment id of each row
+    deleted.<gen>.i64     tombstones: (comment id, row count at deletion) pairs
+    origin.<gen>.i64      row of the previous generation each row was copied from (compact())
+
+Writers append under an exclusive file lock (fcntl; only threads are
+serialized on platforms without it). A comment stored twice keeps its last
+row; a tombstone hides the rows written before it. Readers derive the row
+count from the file sizes and re-map when it grows, so appends by other
+workers become visible without coordination. compact() rewrites the live
+rows into the next generation and switches meta.json atomically; readers
+holding the previous generation keep a valid mapping until they refresh.
+Rows keep their append order through compaction, so a consumer that reads
+the store in append order (appended_since) can carry its row offset into
+the new generation (carry_offset).
+
+Maintenance:
+    python -m backend.services.feature_store stats
+    python -m backend.services.feature_store check [--repair]
+    python -m backend.services.feature_store compact
+    python -m backend.services.feature_store rebuild
+    python -m backend.services.feature_store export --output comments_features
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from backend.config.settings import settings
+from backend.utils.vector_codec import decode_stored_vector
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT_VERSION = 1
+ROW_DTYPE = np.dtype("<f2")
+ID_DTYPE = np.dtype("<i8")
+
+
+def _vector_size(vector) -> int:
+    if vector is None:
+        return 0
+    if hasattr(vector, "tocsr"):
+        return int(vector.shape[1]) if vector.shape[0] == 1 else int(vector.shape[0] * vector.shape[1])
+    return int(np.size(vector))
+
+
+class FeatureStore:
+    """
+    Memory-mapped comment feature matrix shared by all workers
+
+    Instances are cheap views of FEATURE_STORE_PATH: several instances (or
+    processes) on the same directory see each other's writes.
+    """
+
+    def __init__(self, path: Optional[str] = None, dim: Optional[int] = None, seed: int = 0):
+        """
+        Args:
+            path: Store directory
+            dim: Row dimension for a new store (wider vectors are projected)
+            seed: Projection seed for a new store
+        """
+        self.path = path or settings.FEATURE_STORE_PATH
+        self.target_dim = int(dim or settings.FEATURE_STORE_DIM)
+        self.seed = seed
+
+        self._lock = threading.RLock()
+        self._meta: Optional[Dict[str, Any]] = None
+        self._meta_stamp = None
+        self._projection: Optional[np.ndarray] = None
+        self._view_key = None
+        self._rows = np.zeros((0, 0), dtype=ROW_DTYPE)
+        self._ids = np.zeros(0, dtype=ID_DTYPE)
+        self._tombstones = np.zeros((0, 2), dtype=ID_DTYPE)
+        self._live_key = None
+        self._live: Tuple[np.ndarray, np.ndarray] = (np.zeros(0, dtype=ID_DTYPE), np.zeros(0, dtype=np.int64))
+
+    # Files
+
+    def _file(self, kind: str, generation: int) -> str:
+        suffix = "f16" if kind == "features" else "i64"
+        return os.path.join(self.path, f"{kind}.{generation}.{suffix}")
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "meta.json")
+
+    def _read_meta(self) -> Dict[str, Any]:
+        """Current meta.json, re-read only when the file changed"""
+        try:
+            stat = os.stat(self._meta_path)
+        except FileNotFoundError:
+            return {"format": STORE_FORMAT_VERSION, "generation": 0, "dim": None,
+                    "source_dim": None, "seed": self.seed}
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp != self._meta_stamp:
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("format") != STORE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported feature store format: {meta.get('format')}")
+            self._meta, self._meta_stamp = meta, stamp
+        return self._meta
+
+    def _write_meta(self, meta: Dict[str, Any]):
+        tmp_path = f"{self._meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path)
+
+    @contextmanager
+    def _writing(self):
+        """Exclusive access across threads and (with fcntl) processes"""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(os.path.join(self.path, ".lock"), "a+b") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield self._read_meta()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _row_count(self, meta: Dict[str, Any]) -> int:
+        if not meta["dim"]:
+            return 0
+        generation = meta["generation"]
+        try:
+            features = os.path.getsize(self._file("features", generation))
+            ids = os.path.getsize(self._file("ids", generation))
+        except FileNotFoundError:
+            return 0
+        return min(features // (meta["dim"] * ROW_DTYPE.itemsize), ids // ID_DTYPE.itemsize)
+
+    def _repair_tail(self, meta: Dict[str, Any]):
+        """Truncate a row half-written by a crashed writer (called under the write lock)"""
+        rows = self._row_count(meta)
+        for kind, size in (("features", rows * meta["dim"] * ROW_DTYPE.itemsize), ("ids", rows * ID_DTYPE.itemsize)):
+            path = self._file(kind, meta["generation"])
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                logger.warning(f"Truncating torn tail of {path}")
+                os.truncate(path, size)
+
+    # Encoding
+
+    def _get_projection(self, meta: Dict[str, Any]) -> Optional[np.ndarray]:
+        source_dim, dim = meta["source_dim"], meta["dim"]
+        if source_dim is None or source_dim <= dim:
+            return None
+        if self._projection is None or self._projection.shape != (source_dim, dim):
+            rng = np.random.default_rng(meta["seed"])
+            self._projection = (rng.standard_normal((source_dim, dim)) / np.sqrt(dim)).astype(np.float32)
+        return self._projection
+
+    def _encode(self, vectors: Sequence[Any], meta: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """Project and normalize; returns (rows float32, positions of the encodable inputs)"""
+        projection = self._get_projection(meta)
+        rows, keep = [], []
+        for position, vector in enumerate(vectors):
+            if _vector_size(vector) != meta["source_dim"]:
+                continue
+            if hasattr(vector, "tocsr") and vector.shape[0] == 1:
+                row = vector.tocsr()
+                nonzero, values = row.indices, row.data.astype(np.float32)
+                dense = None
+            else:
+                dense = np.asarray(vector.toarray() if hasattr(vector, "toarray") else vector,
+                                   dtype=np.float32).ravel()
+                nonzero = np.flatnonzero(dense)
+                values = dense[nonzero]
+            if projection is not None:
+                # Project through the non-zero rows only (TF-IDF vectors are sparse)
+                encoded = values @ projection[nonzero]
+            elif dense is not None:
+                encoded = dense
+            else:
+                encoded = np.zeros(meta["source_dim"], dtype=np.float32)
+                encoded[nonzero] = values
+            norm = np.linalg.norm(encoded)
+            if norm == 0:
+                continue
+            rows.append(encoded / norm)
+            keep.append(position)
+        if not rows:
+            return np.zeros((0, meta["dim"] or 0), dtype=np.float32), np.zeros(0, dtype=np.int64)
+        return np.vstack(rows).astype(np.float32), np.asarray(keep, dtype=np.int64)
+
+    def encode_query(self, vector) -> Optional[np.ndarray]:
+        """A query vector in row space (float32, unit norm), or None"""
+        meta = self._read_meta()
+        if meta["dim"] is None:
+            return None
+        rows, keep = self._encode([vector], meta)
+        return rows[0] if len(keep) else None
+
+    # Writing
+
+    def append_many(self, items: Iterable[Tuple[int, Any]]) -> int:
+        """
+        Append (comment_id, vector) pairs; vectors may be dense or one-row sparse
+
+        Returns:
+            int: Number of rows written (zero and mismatched vectors are skipped)
+        """
+        items = [(int(comment_id), vector) for comment_id, vector in items if vector is not None]
+        if not items:
+            return 0
+        with self._writing() as meta:
+            if meta["source_dim"] is None:
+                source_dim = next((_vector_size(v) for _, v in items if _vector_size(v)), 0)
+                if not source_dim:
+                    return 0
+                meta = {**meta, "source_dim": source_dim, "dim": min(source_dim, self.target_dim), "seed": self.seed}
+                self._write_meta(meta)
+            rows, keep = self._encode([vector for _, vector in items], meta)
+            if not len(keep):
+                return 0
+            ids = np.asarray([items[i][0] for i in keep], dtype=ID_DTYPE)
+
+            self._repair_tail(meta)
+            generation = meta["generation"]
+            with open(self._file("features", generation), "ab") as f:
+                f.write(rows.astype(ROW_DTYPE).tobytes())
+            # The id is written last: readers never count a row whose id is missing
+            with open(self._file("ids", generation), "ab") as f:
+                f.write(ids.tobytes())
+        return len(keep)
+
+    def append(self, comment_id: int, vector) -> bool:
+        return self.append_many([(comment_id, vector)]) == 1
+
+    def delete_many(self, comment_ids: Iterable[int]) -> int:
+        """Hide the rows stored so far for these comments"""
+        comment_ids = [int(i) for i in comment_ids]
+        if not comment_ids:
+            return 0
+        with self._writing() as meta:
+            if meta["dim"] is None:
+                return 0
+            rows = self._row_count(meta)
+            pairs = np.asarray([(comment_id, rows) for comment_id in comment_ids], dtype=ID_DTYPE)
+            with open(self._file("deleted", meta["generation"]), "ab") as f:
+                f.write(pairs.tobytes())
+        return len(comment_ids)
+
+    def delete(self, comment_id: int) -> int:
+        return self.delete_many([comment_id])
+
+    # Reading
+
+    def _refresh(self):
+        """Re-map the files if another writer appended or compacted"""
+        meta = self._read_meta()
+        generation, rows = meta["generation"], self._row_count(meta)
+        deleted_path = self._file("deleted", generation)
+        deleted_size = os.path.getsize(deleted_path) if os.path.exists(deleted_path) else 0
+        key = (generation, rows, deleted_size)
+        if key == self._view_key:
+            return
+        dim = meta["dim"] or 0
+        if rows:
+            self._rows = np.memmap(self._file("features", generation), dtype=ROW_DTYPE, mode="r", shape=(rows, dim))
+            self._ids = np.memmap(self._file("ids", generation), dtype=ID_DTYPE, mode="r", shape=(rows,))
+        else:
+            self._rows = np.zeros((0, dim), dtype=ROW_DTYPE)
+            self._ids = np.zeros(0, dtype=ID_DTYPE)
+        pairs = deleted_size // (2 * ID_DTYPE.itemsize)
+        self._tombstones = (
+            np.fromfile(deleted_path, dtype=ID_DTYPE, count=pairs * 2).reshape(-1, 2)
+            if pairs else np.zeros((0, 2), dtype=ID_DTYPE)
+        )
+        self._view_key = key
+
+    def matrix(self) -> np.ndarray:
+        """All rows, including superseded and deleted ones (read-only memory map)"""
+        with self._lock:
+            self._refresh()
+            return self._rows
+
+    def live(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Live comments
+
+        Returns:
+            (comment ids sorted ascending, row of each in matrix())
+        """
+        with self._lock:
+            self._refresh()
+            if self._live_key == self._view_key:
+                return self._live
+            ids = np.asarray(self._ids)
+            # Last row of each comment id wins
+            reversed_ids = ids[::-1]
+            unique_ids, first_reversed = np.unique(reversed_ids, return_index=True)
+            rows = (len(ids) - 1 - first_reversed).astype(np.int64)
+            if len(self._tombstones):
+                dead_ids, inverse = np.unique(self._tombstones[:, 0], return_inverse=True)
+                marks = np.zeros(len(dead_ids), dtype=np.int64)
+                np.maximum.at(marks, inverse, self._tombstones[:, 1])
+                position = np.minimum(np.searchsorted(dead_ids, unique_ids), len(dead_ids) - 1)
+                deleted = (dead_ids[position] == unique_ids) & (marks[position] > rows)
+                unique_ids, rows = unique_ids[~deleted], rows[~deleted]
+            self._live = (unique_ids, rows)
+            self._live_key = self._view_key
+            return self._live
+
+    def __len__(self) -> int:
+        return len(self.live()[0])
+
+    def __contains__(self, comment_id: int) -> bool:
+        ids, _ = self.live()
+        position = np.searchsorted(ids, int(comment_id))
+        return bool(position < len(ids) and ids[position] == int(comment_id))
+
+    def get(self, comment_ids: Sequence[int]) -> Tuple[List[int], np.ndarray]:
+        """
+        Stored vectors of the given comments (float32 copies of their rows)
+
+        Returns:
+            (ids found, in request order; matrix with one row per found id)
+        """
+        ids, rows = self.live()
+        requested = np.asarray(list(comment_ids), dtype=ID_DTYPE)
+        if not len(ids) or not len(requested):
+            return [], np.zeros((0, self._rows.shape[1]), dtype=np.float32)
+        position = np.minimum(np.searchsorted(ids, requested), len(ids) - 1)
+        found = ids[position] == requested
+        return requested[found].tolist(), np.asarray(self.matrix()[rows[position[found]]], dtype=np.float32)
+
+    def iter_chunks(self, chunk_rows: int = 65536) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Live (ids, float32 rows) in file order, chunk_rows at a time"""
+        ids, rows = self.live()
+        order = np.argsort(rows, kind="stable")
+        matrix = self.matrix()
+        for start in range(0, len(order), chunk_rows):
+            selected = order[start:start + chunk_rows]
+            yield ids[selected], np.asarray(matrix[rows[selected]], dtype=np.float32)
+
+    @property
+    def generation(self) -> int:
+        with self._lock:
+            return self._read_meta()["generation"]
+
+    def appended_since(self, generation: int, offset: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Live comments whose row was appended at or after row `offset`
+
+        A comment stored again after `offset` is left out if it already had a
+        row before it, so a reader consuming the store in append order sees
+        each comment once.
+
+        Returns:
+            (comment ids in append order, row of each, row count read up to);
+            nothing new if `generation` is no longer the current one
+        """
+        empty = np.zeros(0, dtype=ID_DTYPE)
+        with self._lock:
+            self._refresh()
+            if self._view_key[0] != generation:
+                return empty, empty, offset
+            all_ids = self._ids
+            count = len(all_ids)
+            offset = min(int(offset), count)
+            ids = np.asarray(all_ids[offset:])
+            rows = np.arange(offset, count, dtype=np.int64)
+            live_ids, live_rows = self.live()
+            if not len(ids) or not len(live_ids):
+                return empty, empty, count
+            position = np.minimum(np.searchsorted(live_ids, ids), len(live_ids) - 1)
+            keep = (live_ids[position] == ids) & (live_rows[position] == rows)
+            if offset:
+                keep &= ~np.isin(ids, np.asarray(all_ids[:offset]))
+            return ids[keep], rows[keep], count
+
+    def carry_offset(self, generation: int, offset: int) -> Optional[Tuple[int, int]]:
+        """
+        Translate a row offset of `generation` into the current generation
+
+        Returns:
+            (current generation, offset in it), or None when the rows the offset
+            counted are gone (clear(), or more than one compaction since)
+        """
+        with self._lock:
+            meta = self._read_meta()
+            current = meta["generation"]
+            if generation == current:
+                return current, int(offset)
+            if meta.get("compacted_from") != generation:
+                return None
+            try:
+                origin = np.fromfile(self._file("origin", current), dtype=ID_DTYPE)
+            except FileNotFoundError:
+                return None
+            # Rows were copied in order: the ones from before `offset` form a prefix
+            return current, int(np.searchsorted(origin, offset))
+
+    def similar(self, vector, k: int = 10, exclude_ids: Optional[Set[int]] = None,
+                chunk_rows: int = 65536) -> List[Tuple[int, float]]:
+        """Exact top-k live comments by cosine similarity in row space"""
+        query = self.encode_query(vector)
+        if query is None or k <= 0:
+            return []
+        exclude = np.asarray(sorted(int(i) for i in exclude_ids or ()), dtype=ID_DTYPE)
+        best_ids, best_scores = np.zeros(0, dtype=ID_DTYPE), np.zeros(0, dtype=np.float32)
+        for ids, block in self.iter_chunks(chunk_rows):
+            scores = block @ query
+            if len(exclude):
+                keep = ~np.isin(ids, exclude)
+                ids, scores = ids[keep], scores[keep]
+            best_ids = np.concatenate([best_ids, ids])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                top = np.argpartition(-best_scores, k - 1)[:k]
+                best_ids, best_scores = best_ids[top], best_scores[top]
+        order = np.argsort(-best_scores, kind="stable")
+        return [(int(best_ids[i]), float(best_scores[i])) for i in order]
+
+    # Maintenance
+
+    def compact(self) -> Dict[str, int]:
+        """Rewrite the live rows into a new generation, dropping deleted and superseded rows"""
+        with self._writing() as meta:
+            if meta["dim"] is None:
+                return {"rows_before": 0, "rows_after": 0}
+            self._repair_tail(meta)
+            self._meta_stamp = None
+            self._view_key = None
+            self._live_key = None
+            before = self._row_count(meta)
+            old_generation, generation = meta["generation"], meta["generation"] + 1
+
+            written = 0
+            origin = np.sort(self.live()[1])
+            with open(self._file("origin", generation), "wb") as origin_file:
+                origin_file.write(origin.astype(ID_DTYPE).tobytes())
+            with open(self._file("features", generation), "wb") as features, \
+                    open(self._file("ids", generation), "wb") as ids_file:
+                for ids, block in self.iter_chunks():
+                    features.write(block.astype(ROW_DTYPE).tobytes())
+                    ids_file.write(ids.astype(ID_DTYPE).tobytes())
+                    written += len(ids)
+                features.flush()
+                os.fsync(features.fileno())
+                ids_file.flush()
+                os.fsync(ids_file.fileno())
+            self._write_meta({**meta, "generation": generation, "compacted_from": old_generation})
+
+            for kind in ("features", "ids", "deleted", "origin"):
+                try:
+                    os.remove(self._file(kind, old_generation))
+                except FileNotFoundError:
+                    pass
+        logger.info(f"Compacted feature store: {before} -> {written} rows (generation {generation})")
+        return {"rows_before": before, "rows_after": written}
+
+    def clear(self):
+        """Start an empty generation (rebuilds)"""
+        with self._writing() as meta:
+            old_generation = meta["generation"]
+            self._write_meta({**meta, "generation": old_generation + 1, "dim": None, "source_dim": None,
+                              "seed": self.seed, "compacted_from": None})
+            self._view_key = self._live_key = None
+            for kind in ("features", "ids", "deleted", "origin"):
+                try:
+                    os.remove(self._file(kind, old_generation))
+                except FileNotFoundError:
+                    pass
+
+    def check(self, db, repair: bool = False, batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Compare the live rows with the comments that have a stored vector
+
+        Args:
+            repair: Append missing comments and tombstone rows of deleted comments
+
+        Returns:
+            Counts of live rows, comments with vectors, missing and orphaned ids
+        """
+        from backend.db.models import Comment
+
+        db_ids = np.asarray(
+            [row.id for row in db.query(Comment.id).filter(
+                (Comment.vector_data.isnot(None)) | (Comment.vector_representation.isnot(None))
+            ).order_by(Comment.id)],
+            dtype=ID_DTYPE,
+        )
+        live_ids, _ = self.live()
+        missing = np.setdiff1d(db_ids, live_ids, assume_unique=True)
+        orphaned = np.setdiff1d(live_ids, db_ids, assume_unique=True)
+        report = {"live": int(len(live_ids)), "comments_with_vectors": int(len(db_ids)),
+                  "missing": int(len(missing)), "orphaned": int(len(orphaned)), "appended": 0}
+
+        if repair:
+            with self._writing() as meta:
+                if meta["dim"] is not None:
+                    self._repair_tail(meta)
+            self.delete_many(orphaned.tolist())
+            for start in range(0, len(missing), batch_size):
+                chunk = missing[start:start + batch_size].tolist()
+                rows = db.query(Comment.id, Comment.vector_data, Comment.vector_representation).filter(
+                    Comment.id.in_(chunk)
+                ).all()
+                report["appended"] += self.append_many(
+                    (row.id, decode_stored_vector(row.vector_data, row.vector_representation)) for row in rows
+                )
+        return report
+
+    def export(self, output: str) -> int:
+        """Write live ids and rows to <output>.ids.npy / <output>.vectors.npy (chunked)"""
+        ids, _ = self.live()
+        dim = self.matrix().shape[1]
+        np.save(f"{output}.ids.npy", np.sort(ids))
+        vectors = np.lib.format.open_memmap(f"{output}.vectors.npy", mode="w+", dtype=ROW_DTYPE,
+                                            shape=(len(ids), dim))
+        written = 0
+        # iter_chunks is in file order; the ids file is sorted, so place rows by id rank
+        sorted_ids = np.sort(ids)
+        for chunk_ids, block in self.iter_chunks():
+            vectors[np.searchsorted(sorted_ids, chunk_ids)] = block.astype(ROW_DTYPE)
+            written += len(chunk_ids)
+        vectors.flush()
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            meta = self._read_meta()
+            self._refresh()
+            live_ids, _ = self.live()
+            return {
+                "path": self.path,
+                "generation": meta["generation"],
+                "dim": meta["dim"],
+                "source_dim": meta["source_dim"],
+                "rows": int(self._rows.shape[0]),
+                "live": int(len(live_ids)),
+                "tombstones": int(len(self._tombstones)),
+                "size_mb": round(self._rows.nbytes / 1e6, 1),
+            }
+
+
+# Singleton instance
+_feature_store: Optional[FeatureStore] = None
+_feature_store_lock = threading.Lock()
+
+
+def get_feature_store() -> FeatureStore:
+    """Get the process-wide view of FEATURE_STORE_PATH"""
+    global _feature_store
+    if _feature_store is None:
+        with _feature_store_lock:
+            if _feature_store is None:
+                _feature_store = FeatureStore()
+    return _feature_store
+
+
+def reset_feature_store():
+    """Drop the singleton (tests, rebuilds)"""
+    global _feature_store
+    with _feature_store_lock:
+        _feature_store = None
+
+
+def store_comment_features(comment, vector=None):
+    """Append a stored comment's vector (errors are logged, never raised)"""
+    if not settings.FEATURE_STORE_ENABLED:
+        return
+    try:
+        get_feature_store().append(comment.id, comment.get_vector() if vector is None else vector)
+    except Exception as e:
+        logger.error(f"Could not store features of comment {getattr(comment, 'id', None)}: {e}")
+
+
+def store_comments_features(comments, vectors):
+    """Append the vectors of stored comments in one locked write"""
+    if not settings.FEATURE_STORE_ENABLED or not comments:
+        return
+    try:
+        get_feature_store().append_many((c.id, vector) for c, vector in zip(comments, vectors))
+    except Exception as e:
+        logger.error(f"Could not store features of {len(comments)} comments: {e}")
+
+
+def remove_comment_features(comment_id: int):
+    """Tombstone a deleted comment's row"""
+    if not settings.FEATURE_STORE_ENABLED:
+        return
+    try:
+        get_feature_store().delete(comment_id)
+    except Exception as e:
+        logger.error(f"Could not remove features of comment {comment_id}: {e}")
+
+
+def rebuild(db, store: Optional[FeatureStore] = None, batch_size: int = 1000) -> FeatureStore:
+    """Refill the store from the vector columns of the comments table"""
+    from backend.db.models import Comment
+
+    store = store or get_feature_store()
+    store.clear()
+    last_id = 0
+    while True:
+        rows = (
+            db.query(Comment.id, Comment.vector_data, Comment.vector_representation)
+            .filter(Comment.id > last_id)
+            .order_by(Comment.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        store.append_many((row.id, decode_stored_vector(row.vector_data, row.vector_representation)) for row in rows)
+        last_id = rows[-1].id
+        logger.info(f"Stored features up to id {last_id} ({len(store)} rows)")
+    return store
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Comment feature store")
+    parser.add_argument("command", choices=["stats", "check", "compact", "rebuild", "export"])
+    parser.add_argument("--path", default=settings.FEATURE_STORE_PATH)
+    parser.add_argument("--repair", action="store_true", help="check: fix missing and orphaned rows")
+    parser.add_argument("--output", default="comment_features", help="export: output prefix")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    store = FeatureStore(args.path)
+    start = time.perf_counter()
+    if args.command == "stats":
+        result = store.stats()
+    elif args.command == "compact":
+        result = store.compact()
+    elif args.command == "export":
+        result = {"exported": store.export(args.output), "output": args.output}
+    else:
+        from backend.db.models.base import SessionLocal
+        db = SessionLocal()
+        try:
+            if args.command == "check":
+                result = store.check(db, repair=args.repair, batch_size=args.batch_size)
+            else:
+                result = rebuild(db, store, batch_size=args.batch_size).stats()
+        finally:
+            db.close()
+    print(json.dumps({**result, "seconds": round(time.perf_counter() - start, 2)}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
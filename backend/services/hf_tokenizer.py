@@ -0,0 +1,190 @@
+"""
+HuggingFace Tokenizer Service
+
+Loads each BERT-family fast tokenizer once per process from local files and
+shares it across threads. Encoding is batch-first and pads dynamically to
+the longest item in the batch instead of always padding to max_length.
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from backend.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Pretrained tokenizer per model type
+PRETRAINED_TOKENIZERS: Dict[str, str] = {
+    "bert": "bert-base-multilingual-cased",
+    "bert1800": "bert-base-multilingual-cased",
+    "phobert": "vinai/phobert-base",
+    "bert4news": "NlpHUST/vibert4news-base-cased",
+}
+
+# Files that mark a directory as a saved tokenizer
+_TOKENIZER_FILES = ("tokenizer.json", "tokenizer_config.json", "vocab.txt", "bpe.codes")
+
+
+def is_transformer_model(model_type: Optional[str]) -> bool:
+    """Whether a model type needs a HuggingFace tokenizer"""
+    return model_type in PRETRAINED_TOKENIZERS
+
+
+class TokenizerService:
+    """
+    Process-wide cache of HuggingFace tokenizers
+    """
+
+    def __init__(self, local_files_only: Optional[bool] = None, cache_dir: Optional[str] = None):
+        """
+        Initialize tokenizer service
+
+        Args:
+            local_files_only: Never hit the network when loading tokenizers
+            cache_dir: HuggingFace cache directory (defaults to HF's own)
+        """
+        self.local_files_only = (
+            settings.HF_TOKENIZER_LOCAL_FILES_ONLY if local_files_only is None else local_files_only
+        )
+        self.cache_dir = cache_dir or settings.HF_TOKENIZER_CACHE_DIR
+
+        self._tokenizers: Dict[str, Any] = {}
+        self._encode_locks: Dict[str, threading.Lock] = {}
+        self._unavailable: set = set()
+        self._lock = threading.Lock()
+
+    def _sources(self, model_type: str) -> List[str]:
+        """Local tokenizer directories first, then the pretrained name"""
+        sources = []
+        for directory in (
+            os.path.join("model", model_type, "tokenizer"),
+            os.path.join("model", model_type),
+        ):
+            if os.path.isdir(directory) and any(
+                os.path.exists(os.path.join(directory, name)) for name in _TOKENIZER_FILES
+            ):
+                sources.append(directory)
+        sources.append(PRETRAINED_TOKENIZERS[model_type])
+        return sources
+
+    def get(self, model_type: str):
+        """
+        Return the shared tokenizer for a model type
+
+        Returns:
+            Tokenizer, or None if transformers or the tokenizer files are unavailable
+        """
+        tokenizer = self._tokenizers.get(model_type)
+        if tokenizer is not None or model_type in self._unavailable:
+            return tokenizer
+
+        if not is_transformer_model(model_type):
+            return None
+
+        with self._lock:
+            tokenizer = self._tokenizers.get(model_type)
+            if tokenizer is not None or model_type in self._unavailable:
+                return tokenizer
+
+            try:
+                from transformers import AutoTokenizer
+            except ImportError:
+                logger.warning("transformers not installed. HuggingFace tokenizers disabled.")
+                self._unavailable.add(model_type)
+                return None
+
+            for source in self._sources(model_type):
+                try:
+                    tokenizer = AutoTokenizer.from_pretrained(
+                        source,
+                        use_fast=True,
+                        local_files_only=self.local_files_only,
+                        cache_dir=self.cache_dir
+                    )
+                    break
+                except Exception as e:
+                    logger.debug(f"Tokenizer source {source} unavailable: {e}")
+                    tokenizer = None
+
+            if tokenizer is None:
+                logger.warning(
+                    f"No local tokenizer for '{model_type}' "
+                    f"(local_files_only={self.local_files_only})"
+                )
+                self._unavailable.add(model_type)
+                return None
+
+            # The lock must exist before the tokenizer is visible to the lock-free fast path
+            self._encode_locks[model_type] = threading.Lock()
+            self._tokenizers[model_type] = tokenizer
+            logger.info(f"Loaded tokenizer for '{model_type}' ({type(tokenizer).__name__})")
+            return tokenizer
+
+    def encode_batch(
+        self,
+        texts: List[str],
+        model_type: str,
+        max_length: int,
+        padding: Any = "longest",
+        return_tensors: Optional[str] = "tf"
+    ):
+        """
+        Tokenize a list of texts in one call
+
+        Args:
+            texts: Texts to encode
+            model_type: Model type selecting the tokenizer
+            max_length: Truncation length
+            padding: "longest" (dynamic, default) or "max_length"
+            return_tensors: Tensor type ("tf", "np", "pt" or None)
+
+        Returns:
+            BatchEncoding, or None if no tokenizer is available
+        """
+        tokenizer = self.get(model_type)
+        if tokenizer is None:
+            return None
+
+        # Fast tokenizers reconfigure truncation/padding on the shared Rust
+        # object for each call; serialize calls to avoid "Already borrowed"
+        with self._encode_locks[model_type]:
+            return tokenizer(
+                list(texts),
+                truncation=True,
+                padding=padding,
+                max_length=max_length,
+                return_tensors=return_tensors
+            )
+
+    def encode(self, text: str, model_type: str, max_length: int, **kwargs):
+        """Tokenize a single text (a batch of one)"""
+        return self.encode_batch([text], model_type, max_length, **kwargs)
+
+    def loaded_types(self) -> List[str]:
+        """Model types with a loaded tokenizer"""
+        return list(self._tokenizers)
+
+
+# Global tokenizer service
+_tokenizer_service: Optional[TokenizerService] = None
+_service_lock = threading.Lock()
+
+
+def get_tokenizer_service() -> TokenizerService:
+    """Get global tokenizer service"""
+    global _tokenizer_service
+
+    if _tokenizer_service is None:
+        with _service_lock:
+            if _tokenizer_service is None:
+                _tokenizer_service = TokenizerService()
+
+    return _tokenizer_service
+
+
+def reset_tokenizer_service():
+    """Reset tokenizer service (for testing)"""
+    global _tokenizer_service
+    _tokenizer_service = None
@@ -144,15 +144,23 @@ import re
 import os
 import json
 import pickle
+import uuid
 import logging
+import weakref
 from typing import Tuple, Dict, Any, List, Optional
 from backend.config.settings import settings
-from backend.utils.text_processing import preprocess_text, preprocess_for_spam_detection, extract_keywords
+from backend.utils.text_processing import preprocess_text, preprocess_for_spam_detection_batch, extract_keywords
 from .model_adapter import ModelAdapter
+from .model_registry import get_model_registry, normalize_model_type, model_version, tokenizer_path_for, serving_path
+from .prediction_cache import get_prediction_cache
+from .hf_tokenizer import get_tokenizer_service, is_transformer_model
 
 # Thiết lập logging
 logger = logging.getLogger("services.ml_model")
 
+# Mọi instance MLModel trong process, để worker gunicorn tải model sau khi fork
+_instances = weakref.WeakSet()
+
 class MLModel:
     """
     Lớp quản lý mô hình Machine Learning để phát hiện ngôn từ tiêu cực tiếng Việt
@@ -169,6 +177,10 @@ class MLModel:
         self.labels = settings.MODEL_LABELS
         self.loaded = False
         self.model_type = "lstm"  # Mặc định là LSTM
+        self.model_version = None  # Fingerprint của file model/tokenizer, dùng làm khóa cache
+        # Bản sao nhận độ dài chuỗi động (dùng chung layer/trọng số) cho chế độ length bucket
+        self._dynamic_length_models = weakref.WeakKeyDictionary()
+        _instances.add(self)
         
         # Tải cấu hình model nếu có
         self._load_config()
@@ -230,12 +242,16 @@ class MLModel:
                     model_path = self.model_path
                     logger.info(f"Sử dụng model mặc định tại {model_path}")
             
+            # INFERENCE_BACKEND=onnx: dùng file .onnx đã export cạnh file .h5 (nếu có)
+            load_path = serving_path(model_path)
+            
             # Sử dụng ModelAdapter để tải model bất kể định dạng nào
-            self.model = ModelAdapter.load_model(model_path, self.device)
-            logger.info(f"Đã tải model thành công: {model_path}")
+            self.model = ModelAdapter.load_model(load_path, self.device)
+            logger.info(f"Đã tải model thành công: {load_path}")
             
-            # Tải tokenizer phù hợp
+            # Tải tokenizer phù hợp (theo file model gốc)
             self._load_tokenizer(model_path)
+            self.model_version = model_version(load_path, tokenizer_path_for(model_path))
             
             self.loaded = True
             
@@ -284,6 +300,8 @@ class MLModel:
         self.model = tf.keras.Model(inputs=inputs, outputs=outputs)
         self.model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
         self.tokenizer = Tokenizer(num_words=self.max_words)
+        # Trọng số ngẫu nhiên: không chia sẻ kết quả cache với process khác
+        self.model_version = f"dummy-{uuid.uuid4().hex[:8]}"
         self.loaded = True
     
     def preprocess(self, text: str) -> np.ndarray:
@@ -296,35 +314,12 @@ class MLModel:
         processed_text = preprocess_text(text)
         
         # Kiểm tra loại model để có phương pháp tiền xử lý phù hợp
-        if self.model_type in ["bert", "phobert", "bert4news"]:
-            # Sử dụng Hugging Face tokenizer nếu có
-            try:
-                from transformers import AutoTokenizer
-                
-                # Map model_type to pretrained model name
-                model_name_map = {
-                    "bert": "bert-base-multilingual-cased",
-                    "phobert": "vinai/phobert-base",
-                    "bert4news": "NlpHUST/vibert4news-base-cased"
-                }
-                
-                model_name = model_name_map.get(self.model_type, "bert-base-multilingual-cased")
-                tokenizer = AutoTokenizer.from_pretrained(model_name)
-                
-                # Tokenize với BERT tokenizer
-                encoded = tokenizer(
-                    processed_text, 
-                    truncation=True,
-                    padding="max_length",
-                    max_length=self.max_length,
-                    return_tensors="tf"
-                )
-                
+        if is_transformer_model(self.model_type):
+            # Tokenizer Hugging Face dùng chung trong process (không tải lại mỗi request)
+            encoded = self._encode_transformer([processed_text], self.model_type, self.model)
+            if encoded is not None:
                 return encoded
-                
-            except ImportError:
-                    logger.warning("Thư viện transformers không khả dụng, sử dụng tiền xử lý thông thường")
-                # Fallback về phương pháp thông thường
+            # Fallback về phương pháp thông thường
         
         # Tiền xử lý thông thường với Keras Tokenizer
         sequences = self.tokenizer.texts_to_sequences([processed_text])
@@ -332,209 +327,298 @@ class MLModel:
         
         return padded
     
-    def predict(self, text: str, model_type: str = None) -> Tuple[int, float, Dict[str, float]]:
+    @staticmethod
+    def _static_input_length(model) -> Optional[int]:
+        """Độ dài chuỗi cố định mà model yêu cầu, None nếu model nhận độ dài động"""
+        try:
+            shape = model.input_shape
+            if isinstance(shape, list):
+                shape = shape[0]
+            return int(shape[1]) if shape[1] is not None else None
+        except Exception:
+            return None
+    
+    def _encode_transformer(self, processed_texts: List[str], model_type: str, model):
+        """Tokenize bằng tokenizer Hugging Face, pad động theo văn bản dài nhất trong batch"""
+        static_length = self._static_input_length(model)
+        return get_tokenizer_service().encode_batch(
+            processed_texts,
+            model_type,
+            max_length=static_length or self.max_length,
+            padding="max_length" if static_length else "longest"
+        )
+    
+    def _encode_batch(self, processed_texts: List[str], model_type: str, tokenizer, model=None):
+        """Tokenize và pad toàn bộ danh sách văn bản đã tiền xử lý trong một lần"""
+        if is_transformer_model(model_type):
+            encoded = self._encode_transformer(processed_texts, model_type, model)
+            if encoded is not None:
+                return encoded
+            logger.warning(f"Không có tokenizer Hugging Face cho {model_type}, sử dụng tiền xử lý thông thường")
+        
+        sequences = tokenizer.texts_to_sequences(processed_texts)
+        return pad_sequences(sequences, maxlen=self.max_length)
+    
+    def _length_buckets(self, model) -> List[int]:
         """
-        Dự đoán phân loại cho văn bản
+        Các độ dài bucket từ INFERENCE_LENGTH_BUCKETS, bucket cuối luôn là độ dài tối đa
+        
+        Returns:
+            List[int]: danh sách tăng dần, rỗng nếu chế độ bucket bị tắt
+        """
+        if not settings.INFERENCE_LENGTH_BUCKETS.strip():
+            return []
+        
+        max_length = self._static_input_length(model) or self.max_length
+        try:
+            buckets = {int(b) for b in settings.INFERENCE_LENGTH_BUCKETS.split(",") if b.strip()}
+        except ValueError:
+            logger.warning(f"INFERENCE_LENGTH_BUCKETS không hợp lệ: {settings.INFERENCE_LENGTH_BUCKETS}")
+            return []
+        return sorted(b for b in buckets if 0 < b < max_length) + [max_length]
+    
+    def _dynamic_length_model(self, model):
+        """
+        Bản sao của model Keras nhận đầu vào (batch, None), dùng chung các layer nên
+        không tốn thêm bộ nhớ trọng số. None nếu kiến trúc cần độ dài cố định
+        (ví dụ Flatten + Dense) hoặc model không phải Keras (ONNX/TFLite).
+        """
+        if not isinstance(model, tf.keras.Model):
+            return None
+        try:
+            dynamic = self._dynamic_length_models[model]
+            # True = chính model nhận độ dài động (không lưu model làm value, sẽ giữ key sống mãi)
+            return model if dynamic is True else dynamic
+        except KeyError:
+            pass
+        
+        dynamic = None
+        try:
+            model_input = model.inputs[0]
+            if model_input.shape[1] is None:
+                dynamic = model
+            else:
+                dynamic = tf.keras.models.clone_model(
+                    model,
+                    input_tensors=tf.keras.Input(shape=(None,), dtype=model_input.dtype),
+                    clone_function=lambda layer: layer
+                )
+                # Layer đã build (Dense sau Flatten) chỉ báo lỗi khi chạy thật với độ dài khác
+                dynamic.predict_on_batch(np.zeros((1, 2), dtype=model_input.dtype.as_numpy_dtype))
+        except Exception as e:
+            dynamic = None
+            logger.info(f"Model không hỗ trợ độ dài chuỗi động, bỏ qua length bucket: {str(e)}")
+        
+        self._dynamic_length_models[model] = True if dynamic is model else dynamic
+        return dynamic
+    
+    def _forward_bucketed(self, model, processed_texts: List[str], tokenizer, buckets: List[int], chunk_size: int) -> np.ndarray:
+        """
+        Forward pass theo nhóm độ dài: mỗi chuỗi chỉ được pad tới bucket nhỏ nhất
+        chứa được nó, mỗi bucket chạy thành batch riêng, kết quả ghép lại theo thứ tự gốc
+        """
+        dynamic = self._dynamic_length_model(model)
+        sequences = tokenizer.texts_to_sequences(processed_texts)
+        lengths = np.array([len(seq) for seq in sequences])
+        # Chuỗi dài hơn bucket cuối bị cắt như pad_sequences thông thường
+        bucket_ids = np.minimum(np.searchsorted(buckets, lengths), len(buckets) - 1)
+        
+        output = None
+        for bucket_id in np.unique(bucket_ids):
+            rows = np.flatnonzero(bucket_ids == bucket_id)
+            for start in range(0, len(rows), chunk_size):
+                chunk_rows = rows[start:start + chunk_size]
+                inputs = pad_sequences([sequences[r] for r in chunk_rows], maxlen=buckets[bucket_id])
+                prediction = self._forward(dynamic, inputs)
+                if output is None:
+                    output = np.empty((len(sequences), prediction.shape[1]), dtype=np.float64)
+                output[chunk_rows] = prediction
+        return output
+    
+    @staticmethod
+    def _forward(model, inputs) -> np.ndarray:
+        """Một lần forward pass, trả về ma trận xác suất (n_texts, n_labels)"""
+        if isinstance(model, tf.keras.Model):
+            # predict_on_batch chạy một step duy nhất, không có overhead của vòng lặp predict()
+            prediction = model.predict_on_batch(inputs)
+        else:
+            prediction = model.predict(inputs)
+        
+        if isinstance(prediction, list):
+            prediction = prediction[0]
+        prediction = np.asarray(prediction, dtype=np.float64)
+        if prediction.ndim == 1:
+            prediction = prediction.reshape(1, -1)
+        return prediction
+    
+    def _apply_spam_heuristics_batch(self, texts: List[str], probs: np.ndarray):
+        """
+        Áp dụng rule-based heuristics cho spam trên cả ma trận xác suất
+        
+        Returns:
+            (predicted_classes, confidences, probs) sau khi ghi đè các dòng bị coi là spam
+        """
+        spam_class = 3  # Index cho spam
+        n = probs.shape[0]
+        predicted = probs.argmax(axis=1)
+        confidence = probs[np.arange(n), predicted]
+        
+        # Chỉ những dòng model chưa chắc chắn mới cần tính đặc trưng spam
+        eligible = np.flatnonzero((predicted != spam_class) & (confidence < 0.8))
+        if eligible.size == 0:
+            return predicted, confidence, probs
+        
+        features = [f for _, f in preprocess_for_spam_detection_batch([texts[i] for i in eligible])]
+        has_url = np.array([f.get('has_url', False) for f in features], dtype=bool)
+        has_suspicious_url = np.array([f.get('has_suspicious_url', False) for f in features], dtype=bool)
+        url_count = np.array([f.get('url_count', 0) for f in features], dtype=np.float64)
+        keyword_count = np.array([f.get('spam_keyword_count', 0) for f in features], dtype=np.float64)
+        excessive_punct = np.array([f.get('has_excessive_punctuation', False) for f in features], dtype=bool)
+        all_caps = np.array([f.get('has_all_caps_words', False) for f in features], dtype=bool)
+        
+        # Cộng điểm theo đúng thứ tự của _apply_spam_heuristics để kết quả trùng khớp
+        spam_score = np.zeros(eligible.size)
+        spam_score += np.where(has_url, 0.2, 0.0)
+        spam_score += np.where(has_suspicious_url, 0.3, 0.0)
+        spam_score += np.where(url_count > 1, 0.1 * url_count, 0.0)
+        spam_score += np.where(keyword_count > 0, 0.15 * keyword_count, 0.0)
+        spam_score += np.where(excessive_punct, 0.1, 0.0)
+        spam_score += np.where(all_caps, 0.1, 0.0)
+        
+        # Ghi đè dự đoán nếu spam_score đủ cao
+        hit = spam_score > 0.5
+        rows = eligible[hit]
+        if rows.size:
+            probs = probs.copy()
+            predicted = predicted.copy()
+            confidence = confidence.copy()
+            predicted[rows] = spam_class
+            confidence[rows] = np.maximum(confidence[rows], spam_score[hit])
+            probs[rows] = 0.1
+            probs[rows, spam_class] = spam_score[hit]
+        
+        return predicted, confidence, probs
+    
+    def predict_batch(self, texts: List[str], model_type: str = None) -> List[Tuple[int, float, Dict[str, float]]]:
+        """
+        Dự đoán phân loại cho nhiều văn bản cùng lúc
+        
+        Toàn bộ danh sách được tiền xử lý, tokenize và pad trong một lần, sau đó
+        chạy forward pass theo từng chunk (INFERENCE_BATCH_CHUNK_SIZE) thay vì
+        gọi model.predict một lần cho mỗi văn bản.
         
         Args:
-            text: Văn bản cần phân loại
-            model_type: Loại mô hình cần sử dụng (lstm, cnn, bert, phobert, bert4news, grn)
+            texts: Danh sách văn bản cần phân loại
+            model_type: Loại mô hình cần sử dụng (lstm, cnn, gru, bert, phobert, bert4news)
             
         Returns:
-            Tuple[int, float, Dict[str, float]]: (predicted_class, confidence, probabilities)
+            List[Tuple[int, float, Dict[str, float]]]: kết quả theo đúng thứ tự đầu vào
         """
         # Đảm bảo model đã được tải
         if not self.loaded:
             self.load_model()
         
-        # Xử lý văn bản trống
-        if not text or not text.strip():
-            # Trả về nhãn "clean" với độ tin cậy cao
-            probabilities = {label: 0.0 for label in self.labels}
-            probabilities[self.labels[0]] = 1.0
-            return 0, 1.0, probabilities
+        texts = list(texts)
+        results: List[Optional[Tuple[int, float, Dict[str, float]]]] = [None] * len(texts)
+        
+        cache = get_prediction_cache()
+        
+        # Văn bản trống: trả về nhãn "clean" với độ tin cậy cao (kết quả hằng, không cần model/cache)
+        pending = []
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                probabilities = {label: 0.0 for label in self.labels}
+                probabilities[self.labels[0]] = 1.0
+                results[i] = (0, 1.0, probabilities)
+            else:
+                pending.append(i)
+        cache.record_empty_hit(len(texts) - len(pending))
+        
+        if not pending:
+            return results
         
-        # Kiểm tra và sử dụng model_type được chỉ định
-        current_model_type = self.model_type
+        # Chọn model: model mặc định hoặc model_type được chỉ định (lấy từ registry, không tải lại)
+        model, tokenizer, active_type, version = self.model, self.tokenizer, self.model_type, self.model_version
+        model_type = normalize_model_type(model_type)
         if model_type and model_type != self.model_type:
-            try:
-                # Lưu lại model_type hiện tại
-                self.model_type = model_type
-                
-                # Kiểm tra các model mới trong thư mục model
-                model_files = {
-                    "lstm": "model/best_model_LSTM.h5",
-                    "cnn": "model/cnn/model.safetensors",
-                    "grn": "model/grn/model.safetensors",
-                    "bert": "model/bert/model.safetensors",
-                    "phobert": "model/phobert/model.safetensors",
-                    "bert4news": "model/bert4news/model.safetensors"
-                }
-                
-                # Kiểm tra nếu model tồn tại
-                if model_type in model_files and os.path.exists(model_files[model_type]):
-                    # Tải model mới
-                    temp_model = ModelAdapter.load_model(model_files[model_type], self.device)
-                    
-                    # Tìm tokenizer phù hợp
-                    tokenizer_path = model_files[model_type].replace('.h5', '_tokenizer.pkl').replace('.safetensors', '_tokenizer.pkl')
-                    if not os.path.exists(tokenizer_path):
-                        # Thử tìm trong thư mục model/
-                        tokenizer_path = os.path.join("model", "tokenizer.pkl")
-                    
-                    temp_tokenizer = None
-                    if os.path.exists(tokenizer_path):
-                        with open(tokenizer_path, 'rb') as f:
-                            temp_tokenizer = pickle.load(f)
-                    
-                    # Sử dụng model và tokenizer tạm thời
-                    original_model = self.model
-                    original_tokenizer = self.tokenizer
-                    
-                    self.model = temp_model
-                    if temp_tokenizer:
-                        self.tokenizer = temp_tokenizer
-                    
-                    # Thực hiện dự đoán
-                    try:
-                        processed_input = self.preprocess(text)
-                        prediction = self.model.predict(processed_input)
-                        
-                        # Lấy kết quả
-                        if isinstance(prediction, list):
-                            probs = prediction[0]
-                        else:
-                            probs = prediction[0] if prediction.ndim > 1 else prediction
-                        
-                        # Lấy class có xác suất cao nhất
-                        predicted_class = np.argmax(probs)
-                        confidence = float(probs[predicted_class])
-                        
-                        # Chuẩn bị dictionary probabilities
-                        probabilities = {
-                            self.labels[i]: float(probs[i]) for i in range(len(self.labels))
-                        }
-                        
-                        # Áp dụng rule-based heuristics cho spam
-                        _, spam_features = preprocess_for_spam_detection(text)
-                        
-                        # Tích hợp phát hiện spam bổ sung
-                        spam_class = 3  # Index cho spam
-                        if predicted_class != spam_class and confidence < 0.8:
-                            spam_score = 0
-            
-                            if spam_features.get('has_url', False):
-                                spam_score += 0.2
-            
-                            if spam_features.get('has_suspicious_url', False):
-                                spam_score += 0.3
-            
-                            if spam_features.get('url_count', 0) > 1:
-                                spam_score += 0.1 * spam_features.get('url_count', 0)
-            
-                            if spam_features.get('spam_keyword_count', 0) > 0:
-                                spam_score += 0.15 * spam_features.get('spam_keyword_count', 0)
-            
-                            if spam_features.get('has_excessive_punctuation', False):
-                                spam_score += 0.1
-                
-                            if spam_features.get('has_all_caps_words', False):
-                                spam_score += 0.1
-            
-                            # Ghi đè dự đoán nếu spam_score đủ cao
-                            if spam_score > 0.5:
-                                predicted_class = spam_class
-                                confidence = max(confidence, spam_score)
-                                
-                            # Cập nhật probabilities
-                                probabilities = {label: 0.1 for label in self.labels}
-                                probabilities[self.labels[spam_class]] = spam_score
-                        
-                        # Khôi phục model và tokenizer gốc
-                        self.model = original_model
-                        self.tokenizer = original_tokenizer
-                        self.model_type = current_model_type
-        
-                        return int(predicted_class), confidence, probabilities
-    
-                    except Exception as e:
-                        logger.error(f"Lỗi khi dự đoán với model {model_type}: {str(e)}")
-                        # Khôi phục model và tokenizer gốc
-                        self.model = original_model
-                        self.tokenizer = original_tokenizer
-                        self.model_type = current_model_type
-                else:
-                    logger.warning(f"Không tìm thấy model {model_type}, sử dụng model mặc định")
-            except Exception as e:
-                logger.error(f"Lỗi khi tải model {model_type}: {str(e)}")
-                # Đảm bảo khôi phục model_type ban đầu
-                self.model_type = current_model_type
+            handle = get_model_registry().get(model_type)
+            if handle is not None:
+                model, active_type, version = handle.model, handle.model_type, handle.version
+                tokenizer = handle.tokenizer or self.tokenizer
+            else:
+                logger.warning(f"Không tìm thấy model {model_type}, sử dụng model mặc định")
+        
+        pending_texts = [texts[i] for i in pending]
+        chunk_size = max(1, settings.INFERENCE_BATCH_CHUNK_SIZE)
         
         try:
-            # Tiền xử lý text
-            processed_input = self.preprocess(text)
-            
-            # Dự đoán
-            prediction = self.model.predict(processed_input)
-            
-            # Lấy kết quả
-            if isinstance(prediction, list):
-                probs = prediction[0]
-            else:
-                probs = prediction[0] if prediction.ndim > 1 else prediction
-            
-            # Lấy class có xác suất cao nhất
-            predicted_class = np.argmax(probs)
-            confidence = float(probs[predicted_class])
+            # Length bucket chỉ áp dụng cho model Keras dùng Keras Tokenizer
+            buckets = [] if is_transformer_model(active_type) else self._length_buckets(model)
+            if len(buckets) > 1 and self._dynamic_length_model(model) is None:
+                buckets = []
+            if len(buckets) > 1:
+                # Ít padding hơn cho kết quả lệch rất nhỏ so với pad cố định: tách khóa cache
+                version = f"{version}:len{'-'.join(map(str, buckets))}"
             
-            # Chuẩn bị dictionary probabilities
-            probabilities = {
-                self.labels[i]: float(probs[i]) for i in range(len(self.labels))
-            }
+            processed = [preprocess_text(text) for text in pending_texts]
             
-            # Tích hợp phát hiện spam bổ sung
-            _, spam_features = preprocess_for_spam_detection(text)
+            # Tra cache theo văn bản đã chuẩn hóa; cache lưu xác suất thô của model
+            keys = [cache.make_key(text, active_type, version) for text in processed]
+            cached = cache.get_many(keys)
             
-            # Áp dụng rule-based heuristics cho spam
-            spam_class = 3  # Index cho spam
-            if predicted_class != spam_class and confidence < 0.8:
-                spam_score = 0
-                
-                if spam_features.get('has_url', False):
-                    spam_score += 0.2
-                
-                if spam_features.get('has_suspicious_url', False):
-                    spam_score += 0.3
-                
-                if spam_features.get('url_count', 0) > 1:
-                    spam_score += 0.1 * spam_features.get('url_count', 0)
-                
-                if spam_features.get('spam_keyword_count', 0) > 0:
-                    spam_score += 0.15 * spam_features.get('spam_keyword_count', 0)
-                
-                if spam_features.get('has_excessive_punctuation', False):
-                    spam_score += 0.1
-                
-                if spam_features.get('has_all_caps_words', False):
-                    spam_score += 0.1
-                
-                # Ghi đè dự đoán nếu spam_score đủ cao
-                if spam_score > 0.5:
-                    predicted_class = spam_class
-                    confidence = max(confidence, spam_score)
-                    
-                    # Cập nhật probabilities
-                    probabilities = {label: 0.1 for label in self.labels}
-                    probabilities[self.labels[spam_class]] = spam_score
+            # Văn bản trùng nhau trong cùng batch chỉ chạy model một lần
+            text_by_key = dict(zip(keys, processed))
+            miss_keys = [key for key in text_by_key if key not in cached]
+            if miss_keys:
+                miss_texts = [text_by_key[key] for key in miss_keys]
+                if len(buckets) > 1:
+                    miss_probs = self._forward_bucketed(model, miss_texts, tokenizer, buckets, chunk_size)
+                else:
+                    chunks = []
+                    for start in range(0, len(miss_texts), chunk_size):
+                        inputs = self._encode_batch(miss_texts[start:start + chunk_size], active_type, tokenizer, model)
+                        chunks.append(self._forward(model, inputs))
+                    miss_probs = np.vstack(chunks)
+                computed = dict(zip(miss_keys, miss_probs))
+                cache.set_many(computed)
+                cached.update(computed)
             
-            return int(predicted_class), confidence, probabilities
+            probs = np.asarray([cached[key] for key in keys], dtype=np.float64)
             
+            # Heuristics spam phụ thuộc văn bản gốc (URL, chữ hoa) nên luôn tính lại
+            predicted, confidence, probs = self._apply_spam_heuristics_batch(pending_texts, probs)
         except Exception as e:
-            logger.error(f"Lỗi khi dự đoán: {str(e)}")
+            logger.error(f"Lỗi khi dự đoán theo batch: {str(e)}")
             # Fallback về clean với độ tin cậy thấp
-            probabilities = {label: 0.2 for label in self.labels}
-            probabilities[self.labels[0]] = 0.4
-            return 0, 0.4, probabilities
+            for i in pending:
+                probabilities = {label: 0.2 for label in self.labels}
+                probabilities[self.labels[0]] = 0.4
+                results[i] = (0, 0.4, probabilities)
+            return results
+        
+        n_labels = len(self.labels)
+        for row, i in enumerate(pending):
+            results[i] = (
+                int(predicted[row]),
+                float(confidence[row]),
+                {self.labels[j]: float(probs[row, j]) for j in range(n_labels)}
+            )
+        
+        return results
+    
+    def predict(self, text: str, model_type: str = None) -> Tuple[int, float, Dict[str, float]]:
+        """
+        Dự đoán phân loại cho văn bản
+        
+        Args:
+            text: Văn bản cần phân loại
+            model_type: Loại mô hình cần sử dụng (lstm, cnn, gru, bert, phobert, bert4news)
+            
+        Returns:
+            Tuple[int, float, Dict[str, float]]: (predicted_class, confidence, probabilities)
+        """
+        # Một văn bản là một batch cỡ 1: dùng chung cache, registry và heuristics với predict_batch
+        return self.predict_batch([text], model_type=model_type)[0]
 
 # Singleton instance
 _model_instance = None
@@ -548,6 +632,20 @@ def get_model_instance() -> MLModel:
         _model_instance = MLModel()
     return _model_instance
 
+def warm_up_models() -> int:
+    """
+    Tải model cho mọi instance MLModel chưa tải (gọi trong worker sau khi fork)
+
+    Returns:
+        int: Số instance đã tải
+    """
+    loaded = 0
+    for instance in list(_instances):
+        if not instance.loaded:
+            instance.load_model()
+            loaded += 1
+    return loaded
+
 def predict_text(text: str) -> Tuple[int, float, Dict[str, float]]:
     """
     Hàm tiện ích để dự đoán text mà không cần tạo instance mới
@@ -555,6 +653,13 @@ def predict_text(text: str) -> Tuple[int, float, Dict[str, float]]:
     model = get_model_instance()
     return model.predict(text)
 
+def predict_texts(texts: List[str], model_type: str = None) -> List[Tuple[int, float, Dict[str, float]]]:
+    """
+    Hàm tiện ích để dự đoán nhiều text bằng một lần forward pass
+    """
+    model = get_model_instance()
+    return model.predict_batch(texts, model_type=model_type)
+
 def get_model_stats() -> Dict[str, Any]:
     """
     Lấy thống kê về model
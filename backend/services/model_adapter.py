@@ -173,6 +173,8 @@ class ModelAdapter:
             return ModelAdapter._load_from_pytorch(model_path, device)
         elif model_format == "onnx":
             return ModelAdapter._load_from_onnx(model_path, device)
+        elif model_format == "tflite":
+            return ModelAdapter._load_from_tflite(model_path, device)
         elif model_format == "tensorflow":
             return ModelAdapter._load_from_tensorflow(model_path, device)
         elif model_format == "keras":
@@ -197,6 +199,8 @@ class ModelAdapter:
             return "pytorch"
         elif model_path.endswith(".onnx"):
             return "onnx"
+        elif model_path.endswith(".tflite"):
+            return "tflite"
         elif model_path.endswith(".pb"):
             return "tensorflow"
         elif model_path.endswith(".h5") or model_path.endswith(".keras"):
@@ -262,6 +266,7 @@ class ModelAdapter:
                     
                     # Chuyển model sang eval mode
                     model.eval()
+                    model = ModelAdapter._maybe_quantize_pytorch(model, device)
                     
                     # Tạo wrapper để prediction API tương thích với Keras
                     model.predict = lambda x: ModelAdapter._pytorch_predict_wrapper(model, x)
@@ -343,6 +348,7 @@ class ModelAdapter:
             
             # Chuyển model sang eval mode
             model.eval()
+            model = ModelAdapter._maybe_quantize_pytorch(model, device)
             
             # Tạo wrapper để prediction API tương thích với Keras
             model.predict = lambda x: ModelAdapter._pytorch_predict_wrapper(model, x)
@@ -353,6 +359,142 @@ class ModelAdapter:
             logger.error(f"Lỗi khi tải model PyTorch: {str(e)}")
             raise RuntimeError(f"Không thể tải model PyTorch: {str(e)}")
     
+    @staticmethod
+    def quantize_pytorch(model) -> Any:
+        """
+        Lượng tử hóa động int8 cho model PyTorch (LSTM và Linear)
+        
+        Args:
+            model: Model PyTorch ở eval mode
+            
+        Returns:
+            Model: Model đã lượng tử hóa (chỉ chạy trên CPU)
+        """
+        import torch
+        import torch.nn as nn
+        
+        return torch.quantization.quantize_dynamic(model, {nn.LSTM, nn.GRU, nn.Linear}, dtype=torch.qint8)
+    
+    @staticmethod
+    def _maybe_quantize_pytorch(model, device: str) -> Any:
+        """Lượng tử hóa model PyTorch khi MODEL_QUANTIZATION=int8 và chạy trên CPU"""
+        if settings.MODEL_QUANTIZATION != "int8":
+            return model
+        if device.lower() != "cpu":
+            logger.warning("MODEL_QUANTIZATION=int8 chỉ hỗ trợ CPU, bỏ qua lượng tử hóa")
+            return model
+        
+        try:
+            model = ModelAdapter.quantize_pytorch(model)
+            logger.info("Đã lượng tử hóa model PyTorch sang int8")
+        except Exception as e:
+            logger.warning(f"Không thể lượng tử hóa model PyTorch: {str(e)}")
+        return model
+    
+    @staticmethod
+    def _load_from_tflite(model_path: str, device: str) -> Any:
+        """
+        Tải model từ định dạng TFLite (thường là bản int8 do công cụ lượng tử hóa tạo ra)
+        
+        Args:
+            model_path: Đường dẫn đến file model .tflite
+            device: Thiết bị để chạy model (TFLite chỉ chạy trên CPU)
+            
+        Returns:
+            Model: Model đã tải
+        """
+        try:
+            import threading
+            import tensorflow as tf
+            
+            # Dùng chung cấu hình số luồng với ONNX Runtime (0 = mặc định)
+            num_threads = settings.ONNX_INTRA_OP_THREADS or None
+            interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+            interpreter.allocate_tensors()
+            
+            # Tạo wrapper class cho prediction API
+            class TFLiteModel:
+                def __init__(self, interpreter):
+                    self.interpreter = interpreter
+                    self.input_detail = interpreter.get_input_details()[0]
+                    self.output_index = interpreter.get_output_details()[0]['index']
+                    self.input_dtype = self.input_detail['dtype']
+                    shape = self.input_detail['shape']
+                    signature = self.input_detail.get('shape_signature', shape)
+                    # Batch cố định (graph dùng kernel LSTM hợp nhất) hoặc động (-1)
+                    self.static_batch = int(shape[0]) if int(signature[0]) > 0 else None
+                    # Giống Keras: (None, max_length)
+                    self.input_shape = (None,) + tuple(int(dim) for dim in shape[1:])
+                    self._current_shape = tuple(shape)
+                    # Interpreter không thread-safe
+                    self._lock = threading.Lock()
+                
+                def _invoke(self, x):
+                    if tuple(x.shape) != self._current_shape:
+                        self.interpreter.resize_tensor_input(self.input_detail['index'], list(x.shape))
+                        self.interpreter.allocate_tensors()
+                        self._current_shape = tuple(x.shape)
+                    self.interpreter.set_tensor(self.input_detail['index'], x)
+                    self.interpreter.invoke()
+                    return self.interpreter.get_tensor(self.output_index).copy()
+                
+                def predict(self, x):
+                    x = np.asarray(x, dtype=self.input_dtype)
+                    with self._lock:
+                        if self.static_batch is None:
+                            return self._invoke(x)
+                        
+                        # Chia thành các chunk đúng kích thước batch của graph, pad chunk cuối
+                        outputs = []
+                        for start in range(0, len(x), self.static_batch):
+                            chunk = x[start:start + self.static_batch]
+                            rows = len(chunk)
+                            if rows < self.static_batch:
+                                padding = np.zeros((self.static_batch - rows,) + chunk.shape[1:], dtype=chunk.dtype)
+                                chunk = np.concatenate([chunk, padding])
+                            outputs.append(self._invoke(chunk)[:rows])
+                        return np.concatenate(outputs)
+            
+            return TFLiteModel(interpreter)
+            
+        except Exception as e:
+            logger.error(f"Lỗi khi tải model TFLite: {str(e)}")
+            raise RuntimeError(f"Không thể tải model TFLite: {str(e)}")
+    
+    @staticmethod
+    def _onnx_session_options(ort) -> Any:
+        """
+        Tạo SessionOptions theo cấu hình ONNX_* trong settings
+
+        Args:
+            ort: Module onnxruntime
+
+        Returns:
+            SessionOptions: Cấu hình session
+        """
+        sess_options = ort.SessionOptions()
+
+        # 0 nghĩa là để ONNX Runtime tự chọn theo số core
+        if settings.ONNX_INTRA_OP_THREADS > 0:
+            sess_options.intra_op_num_threads = settings.ONNX_INTRA_OP_THREADS
+        if settings.ONNX_INTER_OP_THREADS > 0:
+            sess_options.inter_op_num_threads = settings.ONNX_INTER_OP_THREADS
+            sess_options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+
+        optimization_levels = {
+            "disabled": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+        }
+        level = settings.ONNX_GRAPH_OPTIMIZATION_LEVEL
+        if level not in optimization_levels:
+            logger.warning(f"ONNX_GRAPH_OPTIMIZATION_LEVEL không hợp lệ: {level}, sử dụng 'all'")
+            level = "all"
+        sess_options.graph_optimization_level = optimization_levels[level]
+
+        return sess_options
+
     @staticmethod
     def _load_from_onnx(model_path: str, device: str) -> Any:
         """
@@ -369,29 +511,50 @@ class ModelAdapter:
             import onnxruntime as ort
             
             # Thiết lập ONNX Runtime session
-            sess_options = ort.SessionOptions()
+            sess_options = ModelAdapter._onnx_session_options(ort)
             providers = ['CPUExecutionProvider']
             if device.lower() == 'cuda' and 'CUDAExecutionProvider' in ort.get_available_providers():
                 providers.insert(0, 'CUDAExecutionProvider')
-            
-            session = ort.InferenceSession(model_path, sess_options=sess_options, providers=providers)
-            
+
+            shared_values = []
+            if settings.MODEL_SHARED_WEIGHTS:
+                # Trọng số đọc trực tiếp từ file ánh xạ bộ nhớ, các worker dùng chung trang nhớ
+                from backend.services.shared_weights import get_shared_weights
+                session, shared_values = get_shared_weights(model_path).create_session(sess_options, providers)
+            else:
+                session = ort.InferenceSession(model_path, sess_options=sess_options, providers=providers)
+
+            # Kiểu dữ liệu đầu vào mà graph yêu cầu (Keras export thường là float32)
+            onnx_dtypes = {
+                'tensor(float)': np.float32,
+                'tensor(double)': np.float64,
+                'tensor(int32)': np.int32,
+                'tensor(int64)': np.int64,
+            }
+
             # Tạo wrapper class cho prediction API
             class ONNXModel:
-                def __init__(self, session):
+                def __init__(self, session, shared_values):
                     self.session = session
-                    self.input_name = session.get_inputs()[0].name
-                
+                    # Giữ OrtValue trỏ vào bộ nhớ dùng chung sống cùng session
+                    self._shared_values = shared_values
+                    model_input = session.get_inputs()[0]
+                    self.input_name = model_input.name
+                    self.input_dtype = onnx_dtypes.get(model_input.type, np.float32)
+                    # Giống Keras: (None, max_length), None cho trục động
+                    self.input_shape = tuple(
+                        dim if isinstance(dim, int) else None for dim in model_input.shape
+                    )
+
                 def predict(self, x):
-                    # Đảm bảo x là numpy array
-                    if not isinstance(x, np.ndarray):
-                        x = np.array(x)
-                    
+                    # Đảm bảo x là numpy array đúng kiểu dữ liệu của graph
+                    x = np.asarray(x, dtype=self.input_dtype)
+
                     # Thực hiện inference
                     outputs = self.session.run(None, {self.input_name: x})
                     return outputs[0]
-            
-            return ONNXModel(session)
+
+            return ONNXModel(session, shared_values)
             
         except Exception as e:
             logger.error(f"Lỗi khi tải model ONNX: {str(e)}")
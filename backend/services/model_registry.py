@@ -0,0 +1,385 @@
+"""
+Resident Model Registry
+
+Keeps one loaded instance of each model type (lstm, cnn, gru, bert, ...) in
+memory so that a `model_type` override never reloads weights from disk.
+Models are loaded lazily on first use and evicted least-recently-used first
+once the estimated memory footprint exceeds the configured budget.
+
+Every loaded model is wrapped in an immutable `ModelHandle`; callers work
+with the handle they received and never mutate shared state, so concurrent
+requests for different models cannot race.
+"""
+
+import os
+import pickle
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Default file locations per model type (overridable with MODEL_<TYPE>_PATH)
+DEFAULT_MODEL_PATHS: Dict[str, List[str]] = {
+    "lstm": ["model/best_model_LSTM.h5"],
+    "cnn": ["model/cnn/text_cnn_model.h5", "model/cnn/model.safetensors"],
+    "gru": ["model/gru/gru_model.h5", "model/grn/model.safetensors"],
+    "bert": ["model/bert/model_bert.safetensors", "model/bert/model.safetensors"],
+    "bert1800": ["model/bert/bert1800/model_bert1800.safetensors"],
+    "phobert": ["model/phobert/model_phobert.safetensors", "model/phobert/model.safetensors"],
+    "bert4news": ["model/bert4news/model_bert4news.safetensors", "model/bert4news/model.safetensors"],
+}
+
+# Historical names still accepted from clients
+MODEL_TYPE_ALIASES: Dict[str, str] = {
+    "grn": "gru",
+}
+
+
+def normalize_model_type(model_type: Optional[str]) -> Optional[str]:
+    """Lower-case a model type and resolve aliases"""
+    if not model_type:
+        return None
+    model_type = model_type.strip().lower()
+    return MODEL_TYPE_ALIASES.get(model_type, model_type)
+
+
+class ModelHandle:
+    """
+    Immutable bundle of a loaded model and the tokenizer that goes with it
+    """
+
+    __slots__ = ("model_type", "path", "model", "tokenizer", "nbytes", "version")
+
+    def __init__(self, model_type: str, path: str, model: Any, tokenizer: Any, nbytes: int, version: str = ""):
+        object.__setattr__(self, "model_type", model_type)
+        object.__setattr__(self, "path", path)
+        object.__setattr__(self, "model", model)
+        object.__setattr__(self, "tokenizer", tokenizer)
+        object.__setattr__(self, "nbytes", nbytes)
+        object.__setattr__(self, "version", version)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ModelHandle is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("ModelHandle is immutable")
+
+    def __repr__(self):
+        return f"ModelHandle(model_type={self.model_type!r}, path={self.path!r}, nbytes={self.nbytes})"
+
+
+def estimate_model_nbytes(model: Any, path: Optional[str] = None) -> int:
+    """
+    Estimate resident size of a loaded model
+
+    Uses parameter sizes for Keras and PyTorch models, and falls back to the
+    size of the model file on disk.
+    """
+    try:
+        weights = getattr(model, "weights", None)
+        if weights:
+            return int(sum(int(w.shape.num_elements() or 0) * w.dtype.size for w in weights))
+    except Exception:
+        pass
+
+    try:
+        parameters = getattr(model, "parameters", None)
+        if callable(parameters):
+            return int(sum(p.numel() * p.element_size() for p in parameters()))
+    except Exception:
+        pass
+
+    if path and os.path.exists(path):
+        return os.path.getsize(path)
+    return 0
+
+
+def tokenizer_path_for(model_path: str) -> Optional[str]:
+    """Pickled Keras tokenizer stored next to a model, or the shared one"""
+    tokenizer_path = (
+        model_path.replace('.h5', '_tokenizer.pkl')
+        .replace('.safetensors', '_tokenizer.pkl')
+        .replace('.onnx', '_tokenizer.pkl')
+    )
+    if not os.path.exists(tokenizer_path):
+        tokenizer_path = os.path.join("model", "tokenizer.pkl")
+    return tokenizer_path if os.path.exists(tokenizer_path) else None
+
+
+def onnx_path_for(model_path: str) -> str:
+    """ONNX export location for a Keras model file (same name, .onnx extension)"""
+    return os.path.splitext(model_path)[0] + ".onnx"
+
+
+def quantized_paths_for(model_path: str) -> List[str]:
+    """int8 variants of a Keras model file written by the quantization tool"""
+    stem = os.path.splitext(model_path)[0]
+    return [stem + ".int8.onnx", stem + ".int8.tflite"]
+
+
+def serving_path(model_path: str, backend: Optional[str] = None, quantization: Optional[str] = None) -> str:
+    """
+    File to actually load for a model under the configured inference backend
+
+    With MODEL_QUANTIZATION=int8, a Keras `.h5` model is served from its int8
+    variant when one exists. With INFERENCE_BACKEND=onnx, it is served from
+    its exported `.onnx` sibling. Otherwise the original file is used.
+    """
+    backend = (backend or settings.INFERENCE_BACKEND).lower()
+    quantization = (quantization or settings.MODEL_QUANTIZATION).lower()
+    if not model_path.endswith((".h5", ".keras")):
+        return model_path
+
+    if quantization == "int8":
+        for quantized in quantized_paths_for(model_path):
+            if os.path.exists(quantized):
+                return quantized
+        logger.warning(f"MODEL_QUANTIZATION=int8 but no int8 variant of {model_path} found")
+
+    if backend == "onnx":
+        exported = onnx_path_for(model_path)
+        if os.path.exists(exported):
+            return exported
+        logger.warning(f"INFERENCE_BACKEND=onnx but {exported} not found, serving {model_path} with Keras")
+    return model_path
+
+
+def model_version(*paths: Optional[str]) -> str:
+    """
+    Short fingerprint of model artifacts (path, mtime and size of each file)
+
+    Replacing any of the files changes the fingerprint.
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        if not path:
+            digest.update(b"-|")
+            continue
+        try:
+            stat = os.stat(path)
+            digest.update(f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}|".encode("utf-8"))
+        except OSError:
+            digest.update(f"{path}:missing|".encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def _default_tokenizer_loader(model_path: str):
+    """Load the pickled Keras tokenizer stored next to a model, if any"""
+    tokenizer_path = tokenizer_path_for(model_path)
+    if tokenizer_path is None:
+        return None
+
+    try:
+        with open(tokenizer_path, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer {tokenizer_path}: {e}")
+        return None
+
+
+class ModelRegistry:
+    """
+    LRU registry of resident models bounded by a memory budget
+    """
+
+    def __init__(
+        self,
+        memory_budget_mb: Optional[float] = None,
+        device: Optional[str] = None,
+        loader: Optional[Callable[[str, str], Any]] = None,
+        tokenizer_loader: Optional[Callable[[str], Any]] = None,
+        model_paths: Optional[Dict[str, List[str]]] = None
+    ):
+        """
+        Initialize registry
+
+        Args:
+            memory_budget_mb: Maximum estimated size of resident models (MB)
+            device: Device passed to the model loader
+            loader: Callable (path, device) -> model, defaults to ModelAdapter.load_model
+            tokenizer_loader: Callable (model_path) -> tokenizer or None
+            model_paths: Candidate paths per model type (defaults to DEFAULT_MODEL_PATHS)
+        """
+        budget = memory_budget_mb if memory_budget_mb is not None else settings.MODEL_REGISTRY_MEMORY_BUDGET_MB
+        self.memory_budget = int(float(budget) * 1024 * 1024)
+        self.device = device or settings.MODEL_DEVICE
+
+        if loader is None:
+            from backend.services.model_adapter import ModelAdapter
+            loader = ModelAdapter.load_model
+        self._loader = loader
+        self._tokenizer_loader = tokenizer_loader or _default_tokenizer_loader
+        self._model_paths = model_paths if model_paths is not None else DEFAULT_MODEL_PATHS
+
+        self._handles: "OrderedDict[str, ModelHandle]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._failed: Dict[str, tuple] = {}
+        self._stats = {"hits": 0, "loads": 0, "evictions": 0, "failures": 0}
+
+    def resolve_path(self, model_type: str) -> Optional[str]:
+        """Return the model file for a type, honouring MODEL_<TYPE>_PATH"""
+        model_type = normalize_model_type(model_type)
+        if not model_type:
+            return None
+
+        configured = getattr(settings, f"MODEL_{model_type.upper()}_PATH", None)
+        candidates = ([configured] if configured else []) + list(self._model_paths.get(model_type, []))
+        for path in candidates:
+            if path and os.path.exists(path):
+                return path
+        return None
+
+    def _load_lock(self, model_type: str) -> threading.Lock:
+        with self._lock:
+            lock = self._load_locks.get(model_type)
+            if lock is None:
+                lock = self._load_locks[model_type] = threading.Lock()
+            return lock
+
+    def get(self, model_type: str) -> Optional[ModelHandle]:
+        """
+        Return the resident handle for a model type, loading it on first use
+
+        Returns:
+            ModelHandle, or None if the model file does not exist or failed to load
+        """
+        model_type = normalize_model_type(model_type)
+        if not model_type:
+            return None
+
+        with self._lock:
+            handle = self._handles.get(model_type)
+            if handle is not None:
+                self._handles.move_to_end(model_type)
+                self._stats["hits"] += 1
+                return handle
+
+        # Only callers of the same model type wait on each other
+        with self._load_lock(model_type):
+            with self._lock:
+                handle = self._handles.get(model_type)
+                if handle is not None:
+                    self._handles.move_to_end(model_type)
+                    self._stats["hits"] += 1
+                    return handle
+
+            path = self.resolve_path(model_type)
+            if path is None:
+                return None
+
+            # An ONNX export may be served in place of the Keras file; the
+            # tokenizer still belongs to the source model
+            load_path = serving_path(path)
+
+            # Don't retry a broken file until it changes on disk
+            fingerprint = self._fingerprint(load_path)
+            if self._failed.get(model_type) == fingerprint:
+                return None
+
+            try:
+                model = self._loader(load_path, self.device)
+                tokenizer = self._tokenizer_loader(path)
+            except Exception as e:
+                logger.error(f"Failed to load model '{model_type}' from {load_path}: {e}")
+                self._failed[model_type] = fingerprint
+                self._stats["failures"] += 1
+                return None
+
+            handle = ModelHandle(
+                model_type=model_type,
+                path=load_path,
+                model=model,
+                tokenizer=tokenizer,
+                nbytes=estimate_model_nbytes(model, load_path),
+                version=model_version(load_path, tokenizer_path_for(path))
+            )
+            self._failed.pop(model_type, None)
+
+            with self._lock:
+                self._handles[model_type] = handle
+                self._stats["loads"] += 1
+                self._evict_over_budget(keep=model_type)
+
+            logger.info(
+                f"Loaded model '{model_type}' from {load_path} "
+                f"(~{handle.nbytes / (1024 * 1024):.1f} MB, resident: {list(self._handles)})"
+            )
+            return handle
+
+    @staticmethod
+    def _fingerprint(path: str) -> tuple:
+        try:
+            stat = os.stat(path)
+            return (path, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return (path, None, None)
+
+    def _evict_over_budget(self, keep: str):
+        """Drop least-recently-used models until under budget (caller holds lock)"""
+        while self.memory_usage() > self.memory_budget and len(self._handles) > 1:
+            oldest = next(iter(self._handles))
+            if oldest == keep:
+                break
+            evicted = self._handles.pop(oldest)
+            self._stats["evictions"] += 1
+            logger.info(f"Evicted model '{evicted.model_type}' (~{evicted.nbytes / (1024 * 1024):.1f} MB)")
+
+    def memory_usage(self) -> int:
+        """Estimated bytes held by resident models"""
+        return sum(handle.nbytes for handle in self._handles.values())
+
+    def loaded_types(self) -> List[str]:
+        """Resident model types, least recently used first"""
+        with self._lock:
+            return list(self._handles)
+
+    def evict(self, model_type: str) -> bool:
+        """Drop a model from the registry; in-flight requests keep their handle"""
+        model_type = normalize_model_type(model_type)
+        with self._lock:
+            return self._handles.pop(model_type, None) is not None
+
+    def clear(self):
+        """Drop all resident models"""
+        with self._lock:
+            self._handles.clear()
+            self._failed.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Registry statistics"""
+        with self._lock:
+            return {
+                **self._stats,
+                "resident": list(self._handles),
+                "memory_usage_mb": round(self.memory_usage() / (1024 * 1024), 2),
+                "memory_budget_mb": round(self.memory_budget / (1024 * 1024), 2),
+            }
+
+
+# Global registry instance
+_model_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get global model registry"""
+    global _model_registry
+
+    if _model_registry is None:
+        with _registry_lock:
+            if _model_registry is None:
+                _model_registry = ModelRegistry()
+
+    return _model_registry
+
+
+def reset_model_registry():
+    """Reset model registry (for testing)"""
+    global _model_registry
+    _model_registry = None
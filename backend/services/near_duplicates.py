@@ -0,0 +1,347 @@
+"""
+Near-Duplicate Detection for Comment Raids
+
+Spam campaigns post the same text with small edits (emoji, punctuation,
+a changed word) thousands of times. This module keeps a MinHash/LSH index
+of recent texts so a near-duplicate is found in O(1) expected time at
+ingest instead of being classified and stored again.
+
+Texts are lowercased and reduced to words before 5-character shingles are
+taken; each text gets a 64-value MinHash signature, split into 16 bands of
+4 rows. Two texts with Jaccard similarity 0.8 share at least one band with
+probability > 0.999, while dissimilar texts rarely do; candidates found
+through a band are confirmed by the estimated Jaccard similarity against
+the cluster's first text (DUPLICATE_THRESHOLD).
+
+Each cluster keeps the model verdict of its first classified member. Once
+DUPLICATE_MIN_CLUSTER_SIZE members were classified with the same label,
+classify_batch() answers further duplicates from the cluster (stage
+"duplicate") without running the model; a cluster whose members got
+different labels is never reused. Clusters are evicted least recently hit
+first beyond DUPLICATE_MAX_CLUSTERS.
+
+The index is in memory and per worker: every worker learns the raid on
+its own after a few requests, and nothing has to be shared or persisted.
+Listings and stats therefore describe only the worker that answers; stats()
+includes its pid and start time so callers can tell the views apart.
+
+Verdict reuse is opt-in (DUPLICATE_DETECTION_ENABLED, off by default): a
+copy is matched against the cluster's first text only, so an edit that
+flips the meaning (an added "không") can still inherit the cluster label.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+BANDS = 16
+_PRIME = (1 << 31) - 1
+_BASE = np.uint64(1000003)
+_NON_WORD = re.compile(r"[\W_]+")
+
+Verdict = Tuple[int, float, Dict[str, float]]
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and keep only words separated by single spaces"""
+    return _NON_WORD.sub(" ", (text or "").lower()).strip()
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """Unique 31-bit hashes of the character `size`-grams of a normalized text"""
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if len(codes) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    if len(codes) < size:
+        codes = np.concatenate([codes, np.zeros(size - len(codes), dtype=np.uint64)])
+    count = len(codes) - size + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    # Polynomial hash of every window at once (uint64 arithmetic wraps)
+    for offset in range(size):
+        hashes = hashes * _BASE + codes[offset:offset + count]
+    return np.unique((hashes ^ (hashes >> np.uint64(31))) % np.uint64(_PRIME))
+
+
+class DuplicateCluster:
+    """Texts found to be near-duplicates of one first text"""
+
+    __slots__ = (
+        "id", "signature", "sample", "size", "platforms", "verdict",
+        "classified", "conflicting", "reused", "first_seen", "last_seen",
+    )
+
+    def __init__(self, cluster_id: int, signature: np.ndarray, sample: str, now: float):
+        self.id = cluster_id
+        self.signature = signature
+        self.sample = sample
+        self.size = 0
+        self.platforms: Counter = Counter()
+        self.verdict: Optional[Verdict] = None
+        self.classified = 0
+        self.conflicting = False
+        self.reused = 0
+        self.first_seen = now
+        self.last_seen = now
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "cluster_id": self.id,
+            "size": self.size,
+            "platforms": dict(self.platforms.most_common()),
+            "sample": self.sample,
+            "prediction": self.verdict[0] if self.verdict else None,
+            "conflicting": self.conflicting,
+            "classified": self.classified,
+            "reused": self.reused,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+        }
+
+
+class NearDuplicateIndex:
+    """MinHash LSH index of recent comment texts grouped into duplicate clusters"""
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        min_cluster_size: Optional[int] = None,
+        max_clusters: Optional[int] = None,
+        num_perm: int = NUM_PERM,
+        bands: int = BANDS,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = settings.DUPLICATE_THRESHOLD if threshold is None else threshold
+        self.min_cluster_size = settings.DUPLICATE_MIN_CLUSTER_SIZE if min_cluster_size is None else min_cluster_size
+        self.max_clusters = settings.DUPLICATE_MAX_CLUSTERS if max_clusters is None else max_clusters
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._clusters: "OrderedDict[int, DuplicateCluster]" = OrderedDict()
+        self._buckets: List[Dict[bytes, int]] = [{} for _ in range(bands)]
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self._clusters)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of a text, None if nothing is left after normalization"""
+        shingles = shingle_hashes(normalize_text(text))
+        if len(shingles) == 0:
+            return None
+        # a*x + b stays below 2**62 for 31-bit a, x and b
+        return ((self._a * shingles[None, :] + self._b) % np.uint64(_PRIME)).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _find(self, signature: np.ndarray, keys: List[bytes]) -> Optional[DuplicateCluster]:
+        best, best_score = None, self.threshold
+        seen = set()
+        for bucket, key in zip(self._buckets, keys):
+            cluster_id = bucket.get(key)
+            if cluster_id is None or cluster_id in seen:
+                continue
+            seen.add(cluster_id)
+            cluster = self._clusters[cluster_id]
+            score = float(np.mean(cluster.signature == signature))
+            if score >= best_score:
+                best, best_score = cluster, score
+        return best
+
+    def find(self, text: str) -> Optional[DuplicateCluster]:
+        """The cluster a text is a near-duplicate of, if any"""
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        with self._lock:
+            return self._find(signature, self._band_keys(signature))
+
+    def reusable(self, cluster: Optional[DuplicateCluster]) -> bool:
+        """Whether the cluster's verdict may stand in for the model"""
+        return (
+            cluster is not None and cluster.verdict is not None and not cluster.conflicting
+            and cluster.classified >= self.min_cluster_size
+        )
+
+    def add(
+        self,
+        text: str,
+        platform: str = "unknown",
+        verdict: Optional[Verdict] = None,
+        signature: Optional[np.ndarray] = None,
+        now: Optional[float] = None,
+    ) -> Optional[DuplicateCluster]:
+        """
+        Record one text, joining the cluster it duplicates or starting a new one
+
+        Args:
+            verdict: (prediction, confidence, probabilities) if the text was classified by the model
+
+        Returns:
+            The text's cluster, None for texts without content
+        """
+        signature = self.signature(text) if signature is None else signature
+        if signature is None:
+            return None
+        now = time.time() if now is None else now
+        keys = self._band_keys(signature)
+        with self._lock:
+            cluster = self._find(signature, keys)
+            if cluster is None:
+                cluster = DuplicateCluster(self._next_id, signature, text[:500], now)
+                self._next_id += 1
+                self._clusters[cluster.id] = cluster
+                for bucket, key in zip(self._buckets, keys):
+                    bucket.setdefault(key, cluster.id)
+                self._evict()
+            else:
+                self._clusters.move_to_end(cluster.id)
+            cluster.size += 1
+            cluster.platforms[platform or "unknown"] += 1
+            cluster.last_seen = now
+            if verdict is not None:
+                if cluster.verdict is None:
+                    cluster.verdict = verdict
+                elif verdict[0] != cluster.verdict[0]:
+                    cluster.conflicting = True
+                cluster.classified += 1
+            return cluster
+
+    def _evict(self):
+        while len(self._clusters) > self.max_clusters:
+            _, cluster = self._clusters.popitem(last=False)
+            for bucket, key in zip(self._buckets, self._band_keys(cluster.signature)):
+                if bucket.get(key) == cluster.id:
+                    del bucket[key]
+
+    def classify_batch(
+        self,
+        texts: Sequence[str],
+        platforms: Sequence[str],
+        predict: Callable[[List[str]], List[tuple]],
+    ) -> Tuple[List[tuple], List[bool]]:
+        """
+        Classify a batch, answering known duplicates from their cluster
+
+        Args:
+            texts: Comment texts
+            platforms: Platform of each text
+            predict: Batch predictor returning (prediction, confidence, probabilities, stage) per text
+
+        Returns:
+            (results in input order, whether each result was reused from a cluster)
+        """
+        signatures = [self.signature(text) for text in texts]
+        with self._lock:
+            matches = [
+                self._find(signature, self._band_keys(signature)) if signature is not None else None
+                for signature in signatures
+            ]
+
+        results: List[Optional[tuple]] = [None] * len(texts)
+        reused = [False] * len(texts)
+        pending = []
+        for i, cluster in enumerate(matches):
+            if self.reusable(cluster):
+                prediction, confidence, probabilities = cluster.verdict
+                results[i] = (prediction, confidence, dict(probabilities), "duplicate")
+                reused[i] = True
+            else:
+                pending.append(i)
+
+        if pending:
+            for i, result in zip(pending, predict([texts[i] for i in pending])):
+                results[i] = result
+        for i, signature in enumerate(signatures):
+            if signature is None:
+                continue
+            cluster = self.add(
+                texts[i], platforms[i], verdict=None if reused[i] else tuple(results[i][:3]), signature=signature
+            )
+            if reused[i]:
+                cluster.reused += 1
+
+        try:
+            from backend.monitoring.metrics import get_metrics_collector
+            matched = sum(1 for i in pending if matches[i] is not None)
+            get_metrics_collector().track_near_duplicates(
+                reused=sum(reused), matched=matched, new=len(pending) - matched, clusters=len(self)
+            )
+        except Exception as e:
+            logger.debug(f"Near-duplicate metrics unavailable: {e}")
+        return results, reused
+
+    def largest_clusters(
+        self, platform: Optional[str] = None, limit: int = 20, min_size: int = 2
+    ) -> List[Dict[str, Any]]:
+        """Largest clusters, counting only `platform`'s members when given"""
+        with self._lock:
+            snapshot = [c.to_dict() for c in self._clusters.values()]
+        if platform:
+            for cluster in snapshot:
+                cluster["size"] = cluster["platforms"].get(platform, 0)
+        snapshot = [c for c in snapshot if c["size"] >= min_size]
+        snapshot.sort(key=lambda c: (-c["size"], c["cluster_id"]))
+        return snapshot[:limit]
+
+    def clusters_by_platform(self, limit: int = 20, min_size: int = 2) -> Dict[str, List[Dict[str, Any]]]:
+        """largest_clusters() for every platform seen"""
+        with self._lock:
+            platforms = sorted({p for c in self._clusters.values() for p in c.platforms})
+        grouped = {p: self.largest_clusters(p, limit, min_size) for p in platforms}
+        return {p: clusters for p, clusters in grouped.items() if clusters}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            clusters = list(self._clusters.values())
+        return {
+            "worker_pid": os.getpid(),
+            "started_at": self.started_at,
+            "clusters": len(clusters),
+            "max_clusters": self.max_clusters,
+            "texts": sum(c.size for c in clusters),
+            "reused": sum(c.reused for c in clusters),
+            "reusable_clusters": sum(1 for c in clusters if self.reusable(c)),
+            "threshold": self.threshold,
+            "min_cluster_size": self.min_cluster_size,
+        }
+
+
+# Singleton instance
+_duplicate_index: Optional[NearDuplicateIndex] = None
+_duplicate_index_lock = threading.Lock()
+
+
+def get_duplicate_index() -> NearDuplicateIndex:
+    """Get the process-wide index"""
+    global _duplicate_index
+    if _duplicate_index is None:
+        with _duplicate_index_lock:
+            if _duplicate_index is None:
+                _duplicate_index = NearDuplicateIndex()
+    return _duplicate_index
+
+
+def reset_duplicate_index():
+    """Drop the singleton (tests)"""
+    global _duplicate_index
+    with _duplicate_index_lock:
+        _duplicate_index = None
@@ -0,0 +1,249 @@
+"""
+ONNX Export
+
+Converts the Keras sequence models (LSTM, CNN, GRU) to ONNX so they can be
+served by ONNX Runtime (`INFERENCE_BACKEND=onnx`). Each model is written next
+to its `.h5` file with a `.onnx` extension, with a dynamic batch axis, and is
+checked against the Keras outputs before it is kept.
+
+Usage:
+    python -m backend.services.onnx_export                 # lstm, cnn, gru
+    python -m backend.services.onnx_export --models lstm --opset 13
+    python -m backend.services.onnx_export --path model/custom.h5
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.services.model_registry import DEFAULT_MODEL_PATHS, onnx_path_for
+
+logger = logging.getLogger(__name__)
+
+# Keras models that can be exported (transformers are served by their own path)
+EXPORTABLE_MODEL_TYPES = ("lstm", "cnn", "gru")
+
+DEFAULT_OPSET = 13
+
+
+def keras_model_path(model_type: str) -> Optional[str]:
+    """Existing `.h5` file for a model type, honouring MODEL_<TYPE>_PATH"""
+    from backend.config.settings import settings
+
+    configured = getattr(settings, f"MODEL_{model_type.upper()}_PATH", None)
+    candidates = ([configured] if configured else []) + DEFAULT_MODEL_PATHS.get(model_type, [])
+    for path in candidates:
+        if path and path.endswith((".h5", ".keras")) and os.path.exists(path):
+            return path
+    return None
+
+
+def _input_spec(model):
+    """Input signature with a dynamic batch axis and the model's own sequence length"""
+    import tensorflow as tf
+
+    model_input = model.inputs[0]
+    shape = (None,) + tuple(model_input.shape[1:])
+    return (tf.TensorSpec(shape, model_input.dtype, name="input"),)
+
+
+def export_keras_model(model, output_path: str, opset: int = DEFAULT_OPSET) -> str:
+    """
+    Export an in-memory Keras model to ONNX
+
+    Args:
+        model: tf.keras.Model
+        output_path: Destination `.onnx` file
+        opset: ONNX opset version
+
+    Returns:
+        Path of the written file
+    """
+    try:
+        import tf2onnx
+    except ImportError:
+        raise RuntimeError("tf2onnx is not installed. Install it with: pip install tf2onnx")
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Write to a temporary name first so a running server never sees a partial file
+    tmp_path = output_path + ".tmp"
+    tf2onnx.convert.from_keras(
+        model,
+        input_signature=_input_spec(model),
+        opset=opset,
+        output_path=tmp_path
+    )
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def sample_inputs(model, batch_size: int, seed: int = 0) -> np.ndarray:
+    """Random token id sequences shaped like the model input"""
+    rng = np.random.default_rng(seed)
+    model_input = model.inputs[0]
+    length = model_input.shape[1] or 100
+
+    vocab_size = 1000
+    for layer in model.layers:
+        if hasattr(layer, "input_dim"):
+            vocab_size = int(layer.input_dim)
+            break
+
+    ids = rng.integers(0, vocab_size, size=(batch_size, int(length)))
+    # Mostly-padded rows, like short comments after pad_sequences
+    ids[: batch_size // 2, : int(length) // 2] = 0
+    return ids.astype(model_input.dtype.as_numpy_dtype)
+
+
+def check_parity(
+    model,
+    onnx_path: str,
+    batch_sizes: tuple = (1, 7, 32),
+    atol: float = 1e-4,
+    benchmark_batch_size: int = 64,
+    benchmark_rounds: int = 5
+) -> Dict[str, Any]:
+    """
+    Compare ONNX Runtime outputs with Keras outputs and time both
+
+    Args:
+        model: Source tf.keras.Model
+        onnx_path: Exported model
+        batch_sizes: Batch sizes to compare (exercises the dynamic batch axis)
+        atol: Maximum allowed absolute difference in probabilities
+        benchmark_batch_size: Batch size used for the throughput comparison
+        benchmark_rounds: Timed rounds per backend
+
+    Returns:
+        Report with max_abs_diff, argmax agreement, timings and `ok`
+    """
+    from backend.services.model_adapter import ModelAdapter
+
+    onnx_model = ModelAdapter.load_model(onnx_path, "cpu")
+
+    max_abs_diff = 0.0
+    agreement = []
+    for seed, batch_size in enumerate(batch_sizes):
+        inputs = sample_inputs(model, batch_size, seed=seed)
+        expected = np.asarray(model.predict_on_batch(inputs))
+        actual = np.asarray(onnx_model.predict(inputs))
+        max_abs_diff = max(max_abs_diff, float(np.max(np.abs(expected - actual))))
+        agreement.append(float(np.mean(expected.argmax(axis=1) == actual.argmax(axis=1))))
+
+    inputs = sample_inputs(model, benchmark_batch_size, seed=len(batch_sizes))
+    model.predict_on_batch(inputs)
+    onnx_model.predict(inputs)
+
+    start = time.perf_counter()
+    for _ in range(benchmark_rounds):
+        model.predict_on_batch(inputs)
+    keras_seconds = (time.perf_counter() - start) / benchmark_rounds
+
+    start = time.perf_counter()
+    for _ in range(benchmark_rounds):
+        onnx_model.predict(inputs)
+    onnx_seconds = (time.perf_counter() - start) / benchmark_rounds
+
+    return {
+        "max_abs_diff": max_abs_diff,
+        "argmax_agreement": min(agreement),
+        "keras_ms_per_batch": keras_seconds * 1000.0,
+        "onnx_ms_per_batch": onnx_seconds * 1000.0,
+        "speedup": keras_seconds / onnx_seconds if onnx_seconds > 0 else None,
+        "ok": max_abs_diff <= atol,
+    }
+
+
+def export_model_file(
+    model_path: str,
+    output_path: Optional[str] = None,
+    opset: int = DEFAULT_OPSET,
+    atol: float = 1e-4,
+    check: bool = True
+) -> Dict[str, Any]:
+    """
+    Load a Keras model file the way the server does, export it and verify parity
+
+    A model that fails the parity check is not kept on disk.
+
+    Returns:
+        Report for the model
+    """
+    from backend.services.model_adapter import ModelAdapter
+
+    output_path = output_path or onnx_path_for(model_path)
+    model = ModelAdapter.load_model(model_path, "cpu")
+
+    export_keras_model(model, output_path, opset=opset)
+    report: Dict[str, Any] = {"source": model_path, "output": output_path, "opset": opset}
+
+    if check:
+        report.update(check_parity(model, output_path, atol=atol))
+        if not report["ok"]:
+            os.remove(output_path)
+            logger.error(
+                f"Parity check failed for {model_path}: max_abs_diff={report['max_abs_diff']:.2e} "
+                f"(atol={atol}); {output_path} removed"
+            )
+
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Export Keras models to ONNX")
+    parser.add_argument("--models", nargs="+", default=list(EXPORTABLE_MODEL_TYPES),
+                        choices=EXPORTABLE_MODEL_TYPES, help="Model types to export")
+    parser.add_argument("--path", help="Export a single Keras file instead of the configured models")
+    parser.add_argument("--output", help="Output path when --path is given")
+    parser.add_argument("--opset", type=int, default=DEFAULT_OPSET)
+    parser.add_argument("--atol", type=float, default=1e-4, help="Parity tolerance")
+    parser.add_argument("--no-check", action="store_true", help="Skip the parity check")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    if args.path:
+        jobs = [(args.path, args.output)]
+    else:
+        jobs = []
+        for model_type in args.models:
+            path = keras_model_path(model_type)
+            if path is None:
+                logger.warning(f"No Keras model file for '{model_type}', skipping")
+                continue
+            jobs.append((path, None))
+
+    failed = False
+    for path, output in jobs:
+        try:
+            report = export_model_file(path, output, opset=args.opset, atol=args.atol, check=not args.no_check)
+        except Exception as e:
+            logger.error(f"Export failed for {path}: {e}")
+            failed = True
+            continue
+
+        if "ok" in report:
+            speedup = f"{report['speedup']:.1f}x" if report["speedup"] is not None else "n/a"
+            logger.info(
+                f"{path} -> {report['output']}: max_abs_diff={report['max_abs_diff']:.2e}, "
+                f"keras={report['keras_ms_per_batch']:.1f}ms, onnx={report['onnx_ms_per_batch']:.1f}ms "
+                f"per batch ({speedup})"
+            )
+            failed = failed or not report["ok"]
+        else:
+            logger.info(f"{path} -> {report['output']} (parity check skipped)")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
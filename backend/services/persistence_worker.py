@@ -0,0 +1,249 @@
+"""
+Batched Prediction Persistence
+
+Saving a prediction used to be one BackgroundTask per item: one vectorizer
+transform, one Comment and one commit each, so an N-item batch cost N
+transforms and N transactions. Routes now put the Comment columns on a
+bounded in-process queue; a worker thread drains it in groups of up to
+PERSIST_BATCH_SIZE (or whatever arrived within PERSIST_FLUSH_INTERVAL
+seconds of the first item), extracts features for the whole group in one
+extract_features_batch() call, inserts them with one ORM bulk insert in
+one transaction and then updates the vector index and the feature store
+once per group.
+
+submit() never blocks the event loop: when the worker is disabled or the
+queue is full it returns False and the caller falls back to the per-item
+BackgroundTask. stop() lets the worker drain everything queued before the
+shutdown hook returns.
+"""
+
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from backend.config.settings import settings
+from backend.monitoring.metrics import get_metrics_collector
+
+logger = logging.getLogger(__name__)
+
+# Put on the queue by stop(): everything queued before it is written first
+_STOP = object()
+
+QueuedComment = Tuple[Dict[str, Any], str]
+
+
+class PersistenceWorker:
+    """Bounded queue of predictions written to the comments table in groups"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable] = None,
+        max_queue: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+    ):
+        """
+        Args:
+            session_factory: Callable returning a new Session (SessionLocal by default)
+            max_queue: Queue bound; submit() fails fast beyond it
+            batch_size: Maximum comments per insert
+            flush_interval: Seconds the first queued comment waits for company
+        """
+        if session_factory is None:
+            from backend.db.models.base import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size if batch_size is not None else settings.PERSIST_BATCH_SIZE)
+        self.flush_interval = max(0.0, flush_interval if flush_interval is not None else settings.PERSIST_FLUSH_INTERVAL)
+        self._queue: "queue.Queue" = queue.Queue(
+            maxsize=max(1, max_queue if max_queue is not None else settings.PERSIST_QUEUE_SIZE)
+        )
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._accepting = True
+        self._metrics = get_metrics_collector()
+        self.counts = {"queued": 0, "written": 0, "failed": 0, "rejected": 0, "flushes": 0}
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._accepting = True
+            self._thread = threading.Thread(target=self._run, name="persistence-worker", daemon=True)
+            self._thread.start()
+
+    def submit(self, fields: Dict[str, Any], feature_text: str) -> bool:
+        """
+        Queue one comment
+
+        Args:
+            fields: Comment column values
+            feature_text: Text the feature vector is extracted from
+
+        Returns:
+            False if the comment was not queued (worker stopped or queue full)
+        """
+        if not self._accepting:
+            return False
+        self.start()
+        try:
+            self._queue.put_nowait((fields, feature_text or ""))
+        except queue.Full:
+            self.counts["rejected"] += 1
+            self._metrics.track_persistence("rejected", depth=self._queue.qsize())
+            return False
+        self.counts["queued"] += 1
+        self._metrics.track_persistence("queued", depth=self._queue.qsize())
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch, stop = [item], False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self.flush(batch)
+            if stop:
+                return
+
+    def flush(self, batch: List[QueuedComment]) -> int:
+        """
+        Vectorize and insert one group of queued comments
+
+        Returns:
+            int: Number of comments written (0 if the transaction failed)
+        """
+        from backend.db.models import Comment
+        from backend.services.feature_store import store_comments_features
+        from backend.services.vector_index import index_comments
+        from backend.utils.vector_codec import encode_vector
+        from backend.utils.vector_utils import extract_features_batch
+
+        if not batch:
+            return 0
+        start = time.time()
+        ids = None
+        db = self.session_factory()
+        try:
+            matrix = extract_features_batch([text for _, text in batch])
+            vectors = [matrix[row] for row in range(len(batch))]
+            rows = [{**fields, "vector_data": encode_vector(vector)} for (fields, _), vector in zip(batch, vectors)]
+            # INSERT ... RETURNING over the group; RETURNING order is not guaranteed to follow
+            # the parameters, so ask SQLAlchemy to match ids back to rows
+            ids = db.scalars(insert(Comment).returning(Comment.id, sort_by_parameter_order=True), rows).all()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            if len(batch) > 1:
+                # One bad row must not drop the whole group
+                logger.warning(f"Batched insert of {len(batch)} predictions failed, retrying one by one: {e}")
+            else:
+                logger.error(f"Could not persist prediction: {e}")
+                self.counts["failed"] += 1
+                self._metrics.track_persistence("failed", depth=self._queue.qsize())
+                return 0
+        finally:
+            db.close()
+        if ids is None:
+            return sum(self.flush([item]) for item in batch)
+
+        comments = []
+        for comment_id, (fields, _) in zip(ids, batch):
+            comment = Comment(**fields)
+            comment.id = comment_id
+            comments.append(comment)
+
+        index_comments(comments, vectors)
+        store_comments_features(comments, vectors)
+        self.counts["written"] += len(comments)
+        self.counts["flushes"] += 1
+        self._metrics.track_persistence("written", len(comments), depth=self._queue.qsize())
+        self._metrics.track_persistence_flush(len(comments), time.time() - start)
+        return len(comments)
+
+    def stop(self, timeout: float = 30.0):
+        """Stop accepting comments and wait until everything queued is written"""
+        with self._lock:
+            self._accepting = False
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                logger.error("Persistence worker did not drain before shutdown")
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.error(f"Persistence worker still running, {self._queue.qsize()} predictions queued")
+                return
+        # Worker never started or exited: write leftovers here
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        for i in range(0, len(leftovers), self.batch_size):
+            self.flush(leftovers[i:i + self.batch_size])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counts,
+            "backlog": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "running": self._thread is not None and self._thread.is_alive(),
+        }
+
+
+# Singleton instance
+_persistence_worker: Optional[PersistenceWorker] = None
+_persistence_worker_lock = threading.Lock()
+
+
+def get_persistence_worker() -> PersistenceWorker:
+    """Get the process-wide worker"""
+    global _persistence_worker
+    if _persistence_worker is None:
+        with _persistence_worker_lock:
+            if _persistence_worker is None:
+                _persistence_worker = PersistenceWorker()
+    return _persistence_worker
+
+
+def enqueue_comment(fields: Dict[str, Any], feature_text: str) -> bool:
+    """Queue a comment for batched insert; False means the caller must store it itself"""
+    if not settings.PERSIST_WORKER_ENABLED:
+        return False
+    return get_persistence_worker().submit(fields, feature_text)
+
+
+def stop_persistence_worker():
+    """Drain the queue (shutdown hook)"""
+    if _persistence_worker is not None:
+        _persistence_worker.stop()
+
+
+def reset_persistence_worker():
+    """Drop the singleton (tests)"""
+    global _persistence_worker
+    with _persistence_worker_lock:
+        if _persistence_worker is not None:
+            _persistence_worker.stop()
+        _persistence_worker = None
@@ -0,0 +1,215 @@
+"""
+Prediction Cache
+
+Content-addressed cache of model outputs. Entries are keyed by a hash of
+the normalized text (the `preprocess_text` output the model actually sees),
+the model type and a version fingerprint of the loaded model files, so
+replacing a model automatically stops old entries from being served.
+
+Two tiers:
+- an in-process LRU with TTL (always on)
+- the shared `RedisService` tier, used only when a real Redis is connected
+
+What is cached is the raw probability vector from the model. Rule-based
+post-processing (spam heuristics) depends on the original text (URLs, case)
+and is re-applied by the caller on every request.
+"""
+
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+from backend.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "pred"
+
+
+class PredictionCache:
+    """
+    Two-tier (process LRU + Redis) cache of model probability vectors
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[int] = None,
+        enabled: Optional[bool] = None,
+        redis_service=None,
+        metrics=None
+    ):
+        """
+        Initialize prediction cache
+
+        Args:
+            max_entries: Maximum entries in the in-process tier
+            ttl: Time to live in seconds for both tiers
+            enabled: Whether caching is enabled
+            redis_service: Shared tier (defaults to get_redis_service())
+            metrics: MetricsCollector (defaults to get_metrics_collector())
+        """
+        self.enabled = settings.PREDICTION_CACHE_ENABLED if enabled is None else enabled
+        self.max_entries = max(1, int(max_entries if max_entries is not None else settings.PREDICTION_CACHE_MAX_ENTRIES))
+        self.ttl = int(ttl if ttl is not None else settings.PREDICTION_CACHE_TTL)
+
+        if redis_service is None:
+            from backend.services.redis_service import get_redis_service
+            redis_service = get_redis_service()
+        self._redis = redis_service
+
+        if metrics is None:
+            from backend.monitoring.metrics import get_metrics_collector
+            metrics = get_metrics_collector()
+        self._metrics = metrics
+
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "shared_hits": 0, "misses": 0, "empty_hits": 0}
+
+    @property
+    def shared_tier_enabled(self) -> bool:
+        """Only a real Redis connection is used as the shared tier"""
+        return bool(self._redis is not None and self._redis.enabled and self._redis.redis_client)
+
+    @staticmethod
+    def make_key(normalized_text: str, model_type: str, version: str) -> str:
+        """Build the cache key for a normalized text"""
+        digest = hashlib.sha1(normalized_text.encode("utf-8")).hexdigest()
+        return f"{KEY_PREFIX}:{model_type}:{version}:{digest}"
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        """
+        Look up several keys
+
+        Returns:
+            Mapping of found keys to their cached probability vectors
+        """
+        if not self.enabled or not keys:
+            return {}
+
+        found: Dict[str, List[float]] = {}
+        missing: List[str] = []
+        now = time.time()
+
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    self._stats["local_hits"] += 1
+                    continue
+                entry = self._local.get(key)
+                if entry is not None and entry[0] > now:
+                    self._local.move_to_end(key)
+                    found[key] = entry[1]
+                    self._stats["local_hits"] += 1
+                else:
+                    if entry is not None:
+                        del self._local[key]
+                    missing.append(key)
+
+        if missing and self.shared_tier_enabled:
+            unique_missing = list(dict.fromkeys(missing))
+            try:
+                values = self._redis.mget(unique_missing)
+            except Exception as e:
+                logger.warning(f"Prediction cache shared tier unavailable: {e}")
+                values = [None] * len(unique_missing)
+
+            promoted = {}
+            for key, value in zip(unique_missing, values):
+                if value is None:
+                    continue
+                try:
+                    promoted[key] = json.loads(value)
+                except (TypeError, ValueError):
+                    continue
+
+            if promoted:
+                self._put_local(promoted)
+                found.update(promoted)
+                with self._lock:
+                    self._stats["shared_hits"] += sum(1 for key in missing if key in promoted)
+
+        misses = sum(1 for key in keys if key not in found)
+        with self._lock:
+            self._stats["misses"] += misses
+
+        for key in keys:
+            self._metrics.track_cache("prediction", key in found)
+
+        return found
+
+    def set_many(self, entries: Dict[str, Sequence[float]]):
+        """Store probability vectors in both tiers"""
+        if not self.enabled or not entries:
+            return
+
+        values = {key: [float(p) for p in probs] for key, probs in entries.items()}
+        self._put_local(values)
+
+        if self.shared_tier_enabled:
+            try:
+                self._redis.set_many(
+                    {key: json.dumps(probs) for key, probs in values.items()},
+                    ex=self.ttl
+                )
+            except Exception as e:
+                logger.warning(f"Prediction cache shared tier write failed: {e}")
+
+    def _put_local(self, entries: Dict[str, List[float]]):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            for key, probs in entries.items():
+                self._local[key] = (expires_at, probs)
+                self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def record_empty_hit(self, count: int = 1):
+        """Empty input is answered with a constant result without touching any tier"""
+        if not self.enabled or count <= 0:
+            return
+        with self._lock:
+            self._stats["empty_hits"] += count
+        for _ in range(count):
+            self._metrics.track_cache("prediction", True)
+
+    def clear(self):
+        """Drop the in-process tier and this cache's keys in the shared tier"""
+        with self._lock:
+            self._local.clear()
+        if self.shared_tier_enabled:
+            self._redis.clear_pattern(f"{KEY_PREFIX}:*")
+
+    def stats(self) -> Dict[str, int]:
+        """Cache statistics"""
+        with self._lock:
+            return {
+                **self._stats,
+                "local_entries": len(self._local),
+                "shared_tier": self.shared_tier_enabled,
+            }
+
+
+# Global prediction cache
+_prediction_cache: Optional[PredictionCache] = None
+
+
+def get_prediction_cache() -> PredictionCache:
+    """Get global prediction cache"""
+    global _prediction_cache
+
+    if _prediction_cache is None:
+        _prediction_cache = PredictionCache()
+
+    return _prediction_cache
+
+
+def reset_prediction_cache():
+    """Reset prediction cache (for testing)"""
+    global _prediction_cache
+    _prediction_cache = None
@@ -0,0 +1,347 @@
+"""
+Post-training int8 Quantization
+
+Produces dynamically quantized int8 variants of the served models and a
+report of the accuracy delta and latency against the float32 originals.
+
+- Keras models (LSTM, CNN, GRU): ONNX Runtime dynamic quantization of the
+  ONNX export (`<name>.int8.onnx`, default) or TFLite dynamic-range
+  quantization (`<name>.int8.tflite`)
+- PyTorch models: `torch.quantization.quantize_dynamic` over LSTM/GRU/Linear
+  layers. PyTorch has no portable int8 artifact, so `ModelAdapter` quantizes
+  at load time; the tool only reports the effect.
+
+Serve the int8 variants with MODEL_QUANTIZATION=int8.
+
+Usage:
+    python -m backend.services.quantization                   # lstm, cnn, gru -> .int8.onnx
+    python -m backend.services.quantization --format tflite
+    python -m backend.services.quantization --eval-csv data/labelled.csv --report model/quantization_report.json
+    python -m backend.services.quantization --path model/lstm.pt
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backend.services.model_registry import (
+    estimate_model_nbytes, onnx_path_for, quantized_paths_for, _default_tokenizer_loader
+)
+from backend.services.onnx_export import (
+    EXPORTABLE_MODEL_TYPES, check_parity, export_keras_model, keras_model_path, sample_inputs
+)
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_FORMATS = ("onnx", "tflite")
+
+DEFAULT_REPORT_PATH = os.path.join("model", "quantization_report.json")
+
+# Static batch size of TFLite graphs (see convert_tflite_int8)
+TFLITE_BATCH_SIZE = 32
+
+
+def int8_path_for(model_path: str, fmt: str) -> str:
+    """Destination of the int8 variant of a Keras model file"""
+    onnx_path, tflite_path = quantized_paths_for(model_path)
+    return onnx_path if fmt == "onnx" else tflite_path
+
+
+def quantize_onnx(onnx_path: str, output_path: str) -> str:
+    """
+    Dynamic int8 quantization of an ONNX graph (weights int8, activations
+    quantized on the fly)
+    """
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError:
+        raise RuntimeError("onnxruntime is not installed. Install it with: pip install onnxruntime")
+
+    tmp_path = output_path + ".tmp"
+    quantize_dynamic(onnx_path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def convert_tflite_int8(model, output_path: str, batch_size: int = TFLITE_BATCH_SIZE) -> str:
+    """
+    Dynamic-range int8 TFLite conversion of an in-memory Keras model
+
+    The graph is traced with a fixed batch size so recurrent layers lower to
+    the fused builtin LSTM/GRU kernels (a dynamic batch axis would need the
+    much slower Flex delegate); the loader splits larger batches into chunks.
+    """
+    import tensorflow as tf
+
+    model_input = model.inputs[0]
+    spec = tf.TensorSpec([batch_size] + list(model_input.shape[1:]), model_input.dtype)
+    concrete = tf.function(lambda x: model(x, training=False)).get_concrete_function(spec)
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete], model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    try:
+        flatbuffer = converter.convert()
+    except Exception as e:
+        logger.warning(f"Builtin-only TFLite conversion failed ({e}), retrying with select TF ops")
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS,
+            tf.lite.OpsSet.SELECT_TF_OPS,
+        ]
+        converter._experimental_lower_tensor_list_ops = False
+        flatbuffer = converter.convert()
+
+    with open(output_path + ".tmp", "wb") as f:
+        f.write(flatbuffer)
+    os.replace(output_path + ".tmp", output_path)
+    return output_path
+
+
+def _ms_per_batch(predict: Callable, inputs: np.ndarray, rounds: int) -> float:
+    predict(inputs)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        predict(inputs)
+    return (time.perf_counter() - start) / rounds * 1000.0
+
+
+def compare_predictions(
+    reference: Callable,
+    quantized: Callable,
+    inputs: np.ndarray,
+    labels: Optional[Sequence[int]] = None,
+    rounds: int = 5
+) -> Dict[str, Any]:
+    """
+    Accuracy delta and latency of a quantized model against its reference
+
+    Without labels, top-1 agreement with the reference stands in for accuracy.
+
+    Args:
+        reference: float32 predict callable
+        quantized: int8 predict callable
+        inputs: Encoded batch
+        labels: Optional true class indices for `inputs`
+        rounds: Timed rounds per model
+
+    Returns:
+        Report dictionary
+    """
+    expected = np.asarray(reference(inputs), dtype=np.float64)
+    actual = np.asarray(quantized(inputs), dtype=np.float64)
+    expected_classes = expected.argmax(axis=1)
+    actual_classes = actual.argmax(axis=1)
+
+    report: Dict[str, Any] = {
+        "samples": int(len(inputs)),
+        "top1_agreement": float(np.mean(expected_classes == actual_classes)),
+        "max_abs_diff": float(np.max(np.abs(expected - actual))),
+        "mean_abs_diff": float(np.mean(np.abs(expected - actual))),
+    }
+
+    if labels is not None:
+        labels = np.asarray(labels)
+        report["accuracy_fp32"] = float(np.mean(expected_classes == labels))
+        report["accuracy_int8"] = float(np.mean(actual_classes == labels))
+        report["accuracy_delta"] = report["accuracy_int8"] - report["accuracy_fp32"]
+    else:
+        report["accuracy_delta"] = report["top1_agreement"] - 1.0
+
+    report["fp32_ms_per_batch"] = _ms_per_batch(reference, inputs, rounds)
+    report["int8_ms_per_batch"] = _ms_per_batch(quantized, inputs, rounds)
+    report["speedup"] = (
+        report["fp32_ms_per_batch"] / report["int8_ms_per_batch"] if report["int8_ms_per_batch"] > 0 else None
+    )
+    return report
+
+
+def load_eval_csv(eval_csv: str, model_path: str, max_length: int, labels: List[str]):
+    """
+    Encode a labelled CSV (`text`, `label` columns) with the model's tokenizer
+
+    `label` may be a class index or a label name.
+    """
+    import pandas as pd
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+    from backend.utils.text_processing import preprocess_text
+
+    tokenizer = _default_tokenizer_loader(model_path)
+    if tokenizer is None:
+        raise RuntimeError(f"No tokenizer found for {model_path}; --eval-csv needs the trained tokenizer")
+
+    frame = pd.read_csv(eval_csv)
+    texts = [preprocess_text(str(text)) for text in frame["text"]]
+    encoded = pad_sequences(tokenizer.texts_to_sequences(texts), maxlen=max_length)
+    targets = [
+        int(label) if str(label).isdigit() else labels.index(str(label))
+        for label in frame["label"]
+    ]
+    return encoded, targets
+
+
+def quantize_keras_model_file(
+    model_path: str,
+    fmt: str = "onnx",
+    eval_csv: Optional[str] = None,
+    sample_size: int = 256
+) -> Dict[str, Any]:
+    """
+    Write the int8 variant of a Keras model file and report on it
+
+    Args:
+        model_path: Source `.h5` file
+        fmt: "onnx" or "tflite"
+        eval_csv: Optional labelled CSV for a real accuracy delta
+        sample_size: Random inputs used when no eval CSV is given
+
+    Returns:
+        Report for the model
+    """
+    from backend.config.settings import settings
+    from backend.services.model_adapter import ModelAdapter
+
+    if fmt not in QUANTIZATION_FORMATS:
+        raise ValueError(f"Unsupported quantization format: {fmt}")
+
+    model = ModelAdapter.load_model(model_path, "cpu")
+    output_path = int8_path_for(model_path, fmt)
+
+    if fmt == "onnx":
+        # Quantize the verified float32 export, producing it first if needed
+        fp32_path = onnx_path_for(model_path)
+        if not os.path.exists(fp32_path):
+            export_keras_model(model, fp32_path)
+            parity = check_parity(model, fp32_path)
+            if not parity["ok"]:
+                os.remove(fp32_path)
+                raise RuntimeError(f"ONNX export of {model_path} failed the parity check")
+        quantize_onnx(fp32_path, output_path)
+        # Compare against the exact graph that was quantized
+        reference = ModelAdapter.load_model(fp32_path, "cpu").predict
+        fp32_bytes = os.path.getsize(fp32_path)
+    else:
+        convert_tflite_int8(model, output_path)
+        reference = model.predict_on_batch
+        fp32_bytes = estimate_model_nbytes(model, model_path)
+
+    quantized = ModelAdapter.load_model(output_path, "cpu")
+
+    labels = None
+    if eval_csv:
+        inputs, labels = load_eval_csv(eval_csv, model_path, int(model.inputs[0].shape[1]), settings.MODEL_LABELS)
+    else:
+        inputs = sample_inputs(model, sample_size)
+
+    report: Dict[str, Any] = {
+        "source": model_path,
+        "output": output_path,
+        "format": fmt,
+        "fp32_bytes": int(fp32_bytes),
+        "int8_bytes": os.path.getsize(output_path),
+    }
+    report["size_ratio"] = report["int8_bytes"] / report["fp32_bytes"] if report["fp32_bytes"] else None
+    report.update(compare_predictions(reference, quantized.predict, inputs, labels))
+    return report
+
+
+def quantize_torch_model_file(model_path: str, sample_size: int = 256) -> Dict[str, Any]:
+    """
+    Report the effect of dynamic int8 quantization on a PyTorch model
+
+    MODEL_QUANTIZATION=int8 applies the same quantization when the model is loaded.
+    """
+    import torch
+    from backend.services.model_adapter import ModelAdapter
+
+    model = ModelAdapter.load_model(model_path, "cpu")
+    quantized = ModelAdapter.quantize_pytorch(model)
+
+    def serialized_bytes(module) -> int:
+        buffer = io.BytesIO()
+        torch.save(module.state_dict(), buffer)
+        return buffer.tell()
+
+    vocab_size = model.embedding.num_embeddings if hasattr(model, "embedding") else 1000
+    rng = np.random.default_rng(0)
+    inputs = rng.integers(0, vocab_size, size=(sample_size, 100)).astype(np.int64)
+
+    report: Dict[str, Any] = {
+        "source": model_path,
+        "output": None,
+        "format": "torch-dynamic",
+        "fp32_bytes": serialized_bytes(model),
+        "int8_bytes": serialized_bytes(quantized),
+    }
+    report["size_ratio"] = report["int8_bytes"] / report["fp32_bytes"] if report["fp32_bytes"] else None
+    report.update(compare_predictions(
+        model.predict,
+        lambda x: ModelAdapter._pytorch_predict_wrapper(quantized, x),
+        inputs
+    ))
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Produce int8 model variants and a quantization report")
+    parser.add_argument("--models", nargs="+", default=list(EXPORTABLE_MODEL_TYPES),
+                        choices=EXPORTABLE_MODEL_TYPES, help="Keras model types to quantize")
+    parser.add_argument("--path", help="Quantize a single model file (.h5, .pt, .pth, .safetensors)")
+    parser.add_argument("--format", choices=QUANTIZATION_FORMATS, default="onnx",
+                        help="int8 artifact format for Keras models")
+    parser.add_argument("--eval-csv", help="Labelled CSV (text,label) for the accuracy delta")
+    parser.add_argument("--report", default=DEFAULT_REPORT_PATH, help="Where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    if args.path:
+        paths = [args.path]
+    else:
+        paths = []
+        for model_type in args.models:
+            path = keras_model_path(model_type)
+            if path is None:
+                logger.warning(f"No Keras model file for '{model_type}', skipping")
+                continue
+            paths.append(path)
+
+    reports = []
+    failed = False
+    for path in paths:
+        try:
+            if path.endswith((".pt", ".pth", ".safetensors")):
+                report = quantize_torch_model_file(path)
+            else:
+                report = quantize_keras_model_file(path, fmt=args.format, eval_csv=args.eval_csv)
+        except Exception as e:
+            logger.error(f"Quantization failed for {path}: {e}")
+            reports.append({"source": path, "error": str(e)})
+            failed = True
+            continue
+
+        logger.info(
+            f"{path} -> {report['output']}: size x{report['size_ratio']:.2f}, "
+            f"accuracy delta {report['accuracy_delta']:+.4f}, "
+            f"{report['fp32_ms_per_batch']:.1f}ms -> {report['int8_ms_per_batch']:.1f}ms per batch"
+        )
+        reports.append(report)
+
+    directory = os.path.dirname(args.report)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump({"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "models": reports}, f, indent=2)
+    logger.info(f"Report written to {args.report}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
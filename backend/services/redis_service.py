@@ -7,7 +7,7 @@ Falls back to in-memory storage if Redis is not available.
 
 import json
 import logging
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, List
 from datetime import timedelta
 
 logger = logging.getLogger(__name__)
@@ -54,14 +54,46 @@ class RedisService:
                 return self._memory_store.get(key)
         else:
             # In-memory fallback
-            import time
-            if key in self._memory_expiry:
-                if time.time() > self._memory_expiry[key]:
-                    # Expired
-                    self._memory_store.pop(key, None)
-                    self._memory_expiry.pop(key, None)
-                    return None
-            return self._memory_store.get(key)
+            return self._get_memory(key)
+    
+    def _get_memory(self, key: str) -> Optional[str]:
+        """Get value from memory store, honouring expiry"""
+        import time
+        if key in self._memory_expiry:
+            if time.time() > self._memory_expiry[key]:
+                # Expired
+                self._memory_store.pop(key, None)
+                self._memory_expiry.pop(key, None)
+                return None
+        return self._memory_store.get(key)
+    
+    def mget(self, keys: List[str]) -> List[Optional[str]]:
+        """Get several values in one round trip"""
+        if not keys:
+            return []
+        if self.enabled and self.redis_client:
+            try:
+                return self.redis_client.mget(keys)
+            except Exception as e:
+                logger.error(f"Redis MGET error: {e}")
+        return [self._get_memory(key) for key in keys]
+    
+    def set_many(self, mapping: Dict[str, str], ex: Optional[int] = None) -> bool:
+        """Set several values in one pipelined round trip"""
+        if not mapping:
+            return True
+        if self.enabled and self.redis_client:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key, value in mapping.items():
+                    pipe.set(key, value, ex=ex)
+                pipe.execute()
+                return True
+            except Exception as e:
+                logger.error(f"Redis pipeline SET error: {e}")
+        for key, value in mapping.items():
+            self._set_memory(key, value, ex)
+        return True
     
     def set(
         self, 
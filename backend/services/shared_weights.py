@@ -0,0 +1,259 @@
+"""
+Shared Model Weights
+
+Keeps the weights of ONNX-served models in read-only, page-aligned,
+memory-mapped files so every gunicorn worker reads the same physical pages
+instead of holding a private copy.
+
+For each `<model>.onnx` the large initializers are written once to
+`<model>.onnx.weights` (each tensor starts on a page boundary) with an index
+in `<model>.onnx.weights.json`. The gunicorn master maps these files before
+forking (see gunicorn.conf.py). Workers build their ONNX Runtime sessions
+from a copy of the graph stripped of those tensors and hand the mapped
+arrays to the session as external initializers, which ONNX Runtime uses in
+place. Mapped pages are file-backed and clean, so the kernel shares them
+across processes.
+
+Only the ONNX Runtime backend can run directly from shared buffers. Keras
+copies weights into private TensorFlow variables, so with
+INFERENCE_BACKEND=keras preloading only shares the imported code.
+
+Measure shared versus private memory per worker:
+    python -m backend.services.shared_weights --master <gunicorn master pid>
+"""
+
+import os
+import sys
+import json
+import mmap
+import argparse
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.services.model_registry import DEFAULT_MODEL_PATHS, model_version, serving_path
+
+logger = logging.getLogger(__name__)
+
+# Tensors smaller than this stay inside the graph (shape constants etc.)
+MIN_SHARED_TENSOR_BYTES = 4096
+
+PAGE_SIZE = mmap.PAGESIZE
+
+
+def weights_path_for(onnx_path: str) -> str:
+    """Location of the page-aligned weight file for an ONNX model"""
+    return onnx_path + ".weights"
+
+
+def _write_weight_file(model, weights_path: str, source_version: str) -> Dict[str, Any]:
+    """Write large initializers to a page-aligned file and return its index"""
+    from onnx import numpy_helper
+
+    tensors: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    tmp_path = weights_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        for initializer in model.graph.initializer:
+            array = np.ascontiguousarray(numpy_helper.to_array(initializer))
+            if array.nbytes < MIN_SHARED_TENSOR_BYTES:
+                continue
+            offset = -(-offset // PAGE_SIZE) * PAGE_SIZE
+            f.seek(offset)
+            f.write(array.tobytes())
+            tensors[initializer.name] = {
+                "offset": offset,
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+            }
+            offset += array.nbytes
+    os.replace(tmp_path, weights_path)
+
+    index = {"source_version": source_version, "page_size": PAGE_SIZE, "tensors": tensors}
+    with open(weights_path + ".json.tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(weights_path + ".json.tmp", weights_path + ".json")
+    return index
+
+
+class SharedWeights:
+    """
+    Memory-mapped initializers of one ONNX model and the graph without them
+    """
+
+    def __init__(self, onnx_path: str):
+        """
+        Map the weight file of an ONNX model, writing it first if missing or stale
+
+        Args:
+            onnx_path: Exported ONNX model
+        """
+        import onnx
+
+        self.onnx_path = onnx_path
+        self.weights_path = weights_path_for(onnx_path)
+        self.version = model_version(onnx_path)
+
+        model = onnx.load(onnx_path)
+
+        index = None
+        try:
+            with open(self.weights_path + ".json", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if not index or index.get("source_version") != self.version or not os.path.exists(self.weights_path):
+            logger.info(f"Writing shared weight file {self.weights_path}")
+            index = _write_weight_file(model, self.weights_path, self.version)
+
+        tensors = index["tensors"]
+        self.arrays: Dict[str, np.ndarray] = {}
+        self._buffer = None
+        if tensors:
+            self._buffer = np.memmap(self.weights_path, dtype=np.uint8, mode="r")
+            for name, info in tensors.items():
+                self.arrays[name] = np.ndarray(
+                    tuple(info["shape"]), dtype=np.dtype(info["dtype"]),
+                    buffer=self._buffer, offset=info["offset"]
+                )
+
+        # The graph keeps names and shapes; the data comes from the mapped file
+        for initializer in model.graph.initializer:
+            if initializer.name in self.arrays:
+                for field in ("raw_data", "float_data", "int32_data", "int64_data", "double_data"):
+                    initializer.ClearField(field)
+        self.model_bytes = model.SerializeToString()
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes served from the shared mapping"""
+        return int(sum(array.nbytes for array in self.arrays.values()))
+
+    def create_session(self, sess_options, providers: List[str]):
+        """
+        Build an ONNX Runtime session that reads its weights from the mapping
+
+        Returns:
+            (session, ortvalues) - keep the OrtValues alive as long as the session
+        """
+        import onnxruntime as ort
+
+        # Pre-packing would copy the weights into private, re-laid-out buffers
+        sess_options.add_session_config_entry("session.disable_prepacking", "1")
+        ortvalues = []
+        for name, array in self.arrays.items():
+            value = ort.OrtValue.ortvalue_from_numpy(array)
+            sess_options.add_initializer(name, value)
+            ortvalues.append(value)
+
+        session = ort.InferenceSession(self.model_bytes, sess_options=sess_options, providers=providers)
+        return session, ortvalues
+
+
+# Mapped models of this process (inherited by forked workers)
+_shared_weights: Dict[str, SharedWeights] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_weights(onnx_path: str) -> SharedWeights:
+    """Get the mapping for an ONNX model, creating it on first use"""
+    key = os.path.abspath(onnx_path)
+    with _shared_lock:
+        shared = _shared_weights.get(key)
+        if shared is None or shared.version != model_version(onnx_path):
+            shared = _shared_weights[key] = SharedWeights(onnx_path)
+        return shared
+
+
+def preload_shared_weights(model_types: Optional[List[str]] = None) -> List[str]:
+    """
+    Map the weights of every configured ONNX-served model
+
+    Called in the gunicorn master before workers fork. Only touches numpy and
+    the onnx protobuf - no TensorFlow or ONNX Runtime threads are started.
+
+    Returns:
+        ONNX files that were mapped
+    """
+    from backend.services.model_registry import get_model_registry
+
+    registry = get_model_registry()
+    mapped = []
+    for model_type in model_types or list(DEFAULT_MODEL_PATHS):
+        path = registry.resolve_path(model_type)
+        if path is None:
+            continue
+        path = serving_path(path)
+        if not path.endswith(".onnx"):
+            continue
+        try:
+            shared = get_shared_weights(path)
+            mapped.append(path)
+            logger.info(f"Mapped {shared.nbytes / (1024 * 1024):.1f} MB of shared weights for {path}")
+        except Exception as e:
+            logger.warning(f"Could not map shared weights for {path}: {e}")
+    return mapped
+
+
+def process_memory(pid: Any = "self") -> Dict[str, int]:
+    """
+    Memory breakdown of a process in kB (Linux, from /proc/<pid>/smaps_rollup)
+
+    Shared_* pages are mapped by more than one process; Pss splits shared
+    pages evenly between them, so summing Pss over workers gives their true
+    combined footprint.
+    """
+    fields = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            name = parts[0].rstrip(":")
+            if name in fields:
+                values[name] = int(parts[1])
+    return values
+
+
+def worker_pids(master_pid: int) -> List[int]:
+    """Child processes of a gunicorn master"""
+    pids = []
+    task_dir = f"/proc/{master_pid}/task"
+    for task in os.listdir(task_dir):
+        try:
+            with open(os.path.join(task_dir, task, "children")) as f:
+                pids.extend(int(pid) for pid in f.read().split())
+        except OSError:
+            continue
+    return sorted(set(pids))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Print shared versus private memory of a gunicorn master and its workers"""
+    parser = argparse.ArgumentParser(description="Shared vs private memory per gunicorn worker")
+    parser.add_argument("--master", type=int, required=True, help="gunicorn master pid")
+    args = parser.parse_args(argv)
+
+    rows = [("master", args.master)] + [("worker", pid) for pid in worker_pids(args.master)]
+    print(f"{'role':<8} {'pid':>8} {'rss':>9} {'pss':>9} {'shared':>9} {'private':>9}  (MB)")
+    total_pss = 0
+    for role, pid in rows:
+        try:
+            memory = process_memory(pid)
+        except OSError as e:
+            print(f"{role:<8} {pid:>8} unavailable: {e}")
+            continue
+        shared = memory.get("Shared_Clean", 0) + memory.get("Shared_Dirty", 0)
+        private = memory.get("Private_Clean", 0) + memory.get("Private_Dirty", 0)
+        total_pss += memory.get("Pss", 0)
+        print(
+            f"{role:<8} {pid:>8} {memory.get('Rss', 0) / 1024:>9.1f} {memory.get('Pss', 0) / 1024:>9.1f} "
+            f"{shared / 1024:>9.1f} {private / 1024:>9.1f}"
+        )
+    print(f"total PSS: {total_pss / 1024:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
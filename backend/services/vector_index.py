@@ -0,0 +1,826 @@
+"""
+Comment Vector Index
+
+Approximate nearest-neighbour search over comment feature vectors, so the
+similar-comment routes no longer decode and score every row of the comments
+table per query.
+
+The index is IVF-flat on NumPy:
+- vectors wider than VECTOR_INDEX_DIM are reduced with a fixed-seed Gaussian
+  random projection (cosine similarity is approximately preserved) and
+  L2-normalized, so inner product = cosine;
+- once VECTOR_INDEX_TRAIN_SIZE vectors exist, spherical k-means partitions
+  them into inverted lists; a query scores the centroids and scans only the
+  VECTOR_INDEX_NPROBE closest lists (more when filters leave too few hits);
+- platform, prediction and user_id are stored per row and filter the scan.
+
+Inserts and deletes update the index in place. Every worker keeps its own
+copy in memory, loaded and caught up with the comments table at startup
+(warm_vector_index); before searching the routes call sync(), which adds the
+comments above the highest id synced so far, plus late commits just below
+it, that this worker has not indexed itself. Candidates are
+re-ranked with their exact stored vectors from the database, which also
+drops comments deleted by another worker and re-checks the filters.
+
+With VECTOR_INDEX_ENABLED=False no index is loaded or kept up to date and
+search_similar_comments falls back to exact_search, a full scan of the
+stored vectors.
+
+The index is saved to VECTOR_INDEX_PATH (atomic replace) and loaded at
+startup. Rebuild / backfill it from the comments table with:
+    python -m backend.services.vector_index rebuild [--compute-missing]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from backend.config.settings import settings
+from backend.utils.vector_codec import decode_stored_vector
+from backend.utils.vector_utils import SimilarityMatrix, chunked_top_k
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+_NO_VALUE = -1
+
+
+def _l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """
+    k-means on the unit sphere (cosine distance)
+
+    Args:
+        vectors: (n, dim) L2-normalized rows
+        k: Number of centroids (<= n)
+
+    Returns:
+        (k, dim) L2-normalized centroids
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _nearest(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        counts = np.bincount(assignment, minlength=k)
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            sums[empty] = vectors[rng.choice(len(vectors), size=empty.size, replace=False)]
+        centroids = _l2_normalize(sums)
+    return centroids.astype(np.float32)
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid per row"""
+    return chunked_top_k(vectors, centroids, 1)[0][:, 0].astype(np.int32)
+
+
+class VectorIndex:
+    """
+    IVF-flat index of comment vectors with metadata filters
+    """
+
+    def __init__(
+        self,
+        index_dim: Optional[int] = None,
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        train_size: Optional[int] = None,
+        seed: int = 0
+    ):
+        """
+        Args:
+            index_dim: Dimension vectors are projected to (if wider)
+            nlist: Inverted lists after training (0 = sqrt(n))
+            nprobe: Lists scanned per query
+            train_size: Vectors needed before the lists are trained (exact scan until then)
+            seed: Projection and k-means seed
+        """
+        self.index_dim = int(index_dim or settings.VECTOR_INDEX_DIM)
+        self.nlist = int(settings.VECTOR_INDEX_NLIST if nlist is None else nlist)
+        self.nprobe = max(1, int(nprobe or settings.VECTOR_INDEX_NPROBE))
+        self.train_size = int(train_size or settings.VECTOR_INDEX_TRAIN_SIZE)
+        self.seed = seed
+
+        self.source_dim: Optional[int] = None
+        self._projection: Optional[np.ndarray] = None
+        self._lock = threading.RLock()
+        self._size = 0
+        self._capacity = 0
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._platform = np.zeros(0, dtype=np.int32)
+        self._prediction = np.zeros(0, dtype=np.int32)
+        self._user = np.zeros(0, dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._row_of: Dict[int, int] = {}
+        self._platform_codes: Dict[str, int] = {}
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}
+        self.watermark = 0
+        self.changes_since_save = 0
+
+    # Encoding
+
+    @property
+    def dim(self) -> Optional[int]:
+        if self.source_dim is None:
+            return None
+        return min(self.source_dim, self.index_dim)
+
+    def _set_source_dim(self, source_dim: int):
+        self.source_dim = source_dim
+        if source_dim > self.index_dim:
+            rng = np.random.default_rng(self.seed)
+            self._projection = (
+                rng.standard_normal((source_dim, self.index_dim)) / np.sqrt(self.index_dim)
+            ).astype(np.float32)
+        self._grow(max(1024, self._capacity))
+
+    def encode(self, vectors: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Project and normalize vectors
+
+        Returns:
+            (encoded rows, positions of the inputs that could be encoded)
+        """
+        rows, keep = [], []
+        for position, vector in enumerate(vectors):
+            if vector is None:
+                continue
+            if hasattr(vector, "tocsr") and vector.shape[0] == 1:
+                # One-row scipy.sparse matrix from extract_features_sparse
+                row = vector.tocsr()
+                size, nonzero, values = row.shape[1], row.indices, row.data.astype(np.float32)
+                vector = None
+            else:
+                if hasattr(vector, "toarray"):
+                    vector = vector.toarray()
+                vector = np.asarray(vector, dtype=np.float32).ravel()
+                size = vector.size
+            if size == 0:
+                continue
+            if self.source_dim is None:
+                self._set_source_dim(size)
+            if size != self.source_dim:
+                logger.warning(f"Vector dimension {size} does not match the index ({self.source_dim})")
+                continue
+            if self._projection is not None:
+                # Feature vectors are sparse TF-IDF: project through the non-zero rows only
+                if vector is not None:
+                    nonzero = np.flatnonzero(vector)
+                    values = vector[nonzero]
+                vector = values @ self._projection[nonzero]
+            elif vector is None:
+                vector = row.toarray().ravel().astype(np.float32)
+            norm = np.linalg.norm(vector)
+            if norm == 0:
+                continue
+            rows.append(vector / norm)
+            keep.append(position)
+        if not rows:
+            return np.zeros((0, self.dim or 0), dtype=np.float32), np.zeros(0, dtype=np.int64)
+        return np.vstack(rows).astype(np.float32), np.asarray(keep, dtype=np.int64)
+
+    # Storage
+
+    def _grow(self, needed: int):
+        if needed <= self._capacity and self._vectors.shape[1] == (self.dim or 0):
+            return
+        capacity = max(needed, self._capacity * 2, 1024)
+
+        def grown(array: np.ndarray, fill=0) -> np.ndarray:
+            shape = (capacity,) + array.shape[1:]
+            out = np.full(shape, fill, dtype=array.dtype)
+            out[:self._size] = array[:self._size]
+            return out
+
+        vectors = np.zeros((capacity, self.dim or 0), dtype=np.float32)
+        if self._size:
+            vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+        self._ids = grown(self._ids)
+        self._platform = grown(self._platform, _NO_VALUE)
+        self._prediction = grown(self._prediction, _NO_VALUE)
+        self._user = grown(self._user, _NO_VALUE)
+        self._alive = grown(self._alive, False)
+        self._capacity = capacity
+
+    def _platform_code(self, platform: Optional[str], create: bool) -> int:
+        if platform is None:
+            return _NO_VALUE
+        code = self._platform_codes.get(platform)
+        if code is None:
+            if not create:
+                return -2  # Matches no row
+            code = self._platform_codes[platform] = len(self._platform_codes)
+        return code
+
+    def _assign_lists(self, rows: np.ndarray):
+        if self.centroids is None:
+            lists = np.zeros(len(rows), dtype=np.int32)
+        else:
+            lists = _nearest(self._vectors[rows], self.centroids)
+        for row, list_id in zip(rows.tolist(), lists.tolist()):
+            self._lists[list_id].append(row)
+            self._list_arrays.pop(list_id, None)
+
+    # Updates
+
+    def add_many(self, items: Iterable[Tuple[int, Any, Optional[str], Optional[int], Optional[int]]]) -> int:
+        """
+        Add or replace comments
+
+        Args:
+            items: (comment_id, vector, platform, prediction, user_id) tuples
+
+        Returns:
+            int: Number of vectors indexed
+        """
+        items = list(items)
+        with self._lock:
+            encoded, keep = self.encode([item[1] for item in items])
+            if not len(keep):
+                return 0
+            for position in keep.tolist():
+                self._remove(int(items[position][0]))
+            self._grow(self._size + len(keep))
+            rows = np.arange(self._size, self._size + len(keep))
+            self._vectors[rows] = encoded
+            for row, position in zip(rows.tolist(), keep.tolist()):
+                comment_id, _, platform, prediction, user_id = items[position]
+                self._ids[row] = comment_id
+                self._platform[row] = self._platform_code(platform, create=True)
+                self._prediction[row] = _NO_VALUE if prediction is None else prediction
+                self._user[row] = _NO_VALUE if user_id is None else user_id
+                self._alive[row] = True
+                self._row_of[int(comment_id)] = row
+            self._size += len(keep)
+            if not self._lists:
+                self._lists = [[]]
+            self._assign_lists(rows)
+            self.changes_since_save += len(keep)
+
+            if self.centroids is None and len(self._row_of) >= self.train_size:
+                self.train()
+            return len(keep)
+
+    def add(self, comment_id: int, vector, platform: Optional[str] = None,
+            prediction: Optional[int] = None, user_id: Optional[int] = None) -> bool:
+        """Add or replace one comment; False if its vector cannot be indexed"""
+        return self.add_many([(comment_id, vector, platform, prediction, user_id)]) == 1
+
+    def _remove(self, comment_id: int) -> bool:
+        row = self._row_of.pop(comment_id, None)
+        if row is None:
+            return False
+        self._alive[row] = False
+        return True
+
+    def remove(self, comment_id: int) -> bool:
+        """Remove a comment; dead rows are reclaimed by compact()"""
+        with self._lock:
+            removed = self._remove(int(comment_id))
+            if removed:
+                self.changes_since_save += 1
+                if self._size > 1024 and len(self._row_of) < self._size // 2:
+                    self.compact()
+            return removed
+
+    def compact(self):
+        """Drop removed rows and rebuild the inverted lists"""
+        with self._lock:
+            alive = np.flatnonzero(self._alive[:self._size])
+            for name in ("_vectors", "_ids", "_platform", "_prediction", "_user", "_alive"):
+                array = getattr(self, name)
+                array[:len(alive)] = array[alive]
+            self._alive[len(alive):self._size] = False
+            self._size = len(alive)
+            self._row_of = {int(comment_id): row for row, comment_id in enumerate(self._ids[:self._size].tolist())}
+            self._rebuild_lists()
+
+    def _rebuild_lists(self):
+        self._lists = [[] for _ in range(len(self.centroids) if self.centroids is not None else 1)]
+        self._list_arrays = {}
+        rows = np.flatnonzero(self._alive[:self._size])
+        if rows.size:
+            self._assign_lists(rows)
+
+    def train(self, nlist: Optional[int] = None, iterations: int = 10):
+        """Partition the current vectors into inverted lists (k-means)"""
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self._size])
+            if rows.size < 2:
+                return
+            k = nlist or self.nlist or int(np.sqrt(rows.size))
+            k = max(1, min(k, rows.size))
+            sample = rows
+            if rows.size > 50 * k:
+                sample = np.random.default_rng(self.seed).choice(rows, size=50 * k, replace=False)
+            start = time.perf_counter()
+            self.centroids = spherical_kmeans(self._vectors[sample], k, iterations, self.seed)
+            self._rebuild_lists()
+            logger.info(f"Vector index trained: {k} lists over {rows.size} vectors in {time.perf_counter() - start:.1f}s")
+
+    # Search
+
+    def _list_rows(self, list_id: int) -> np.ndarray:
+        rows = self._list_arrays.get(list_id)
+        if rows is None:
+            rows = self._list_arrays[list_id] = np.asarray(self._lists[list_id], dtype=np.int64)
+        return rows
+
+    def search(
+        self,
+        vector,
+        k: int = 10,
+        platform: Optional[str] = None,
+        prediction: Optional[int] = None,
+        user_id: Optional[int] = None,
+        exclude_ids: Optional[Set[int]] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Approximate top-k comments by cosine similarity
+
+        Returns:
+            List of (comment_id, approximate similarity), most similar first
+        """
+        with self._lock:
+            if not self._row_of:
+                return []
+            query, keep = self.encode([vector])
+            if not len(keep):
+                return []
+            query = query[0]
+            exclude = {int(i) for i in exclude_ids or ()}
+            platform_code = self._platform_code(platform, create=False)
+            nprobe = max(1, nprobe or self.nprobe)
+
+            if self.centroids is None:
+                order = [0]
+            else:
+                order = np.argsort(-(self.centroids @ query)).tolist()
+
+            # Scan lists in centroid order until nprobe lists are done and k hits exist
+            candidates, found = [], 0
+            for probed, list_id in enumerate(order):
+                if probed >= nprobe and found >= k + len(exclude):
+                    break
+                rows = self._list_rows(list_id)
+                if not rows.size:
+                    continue
+                mask = self._alive[rows]
+                if platform is not None:
+                    mask &= self._platform[rows] == platform_code
+                if prediction is not None:
+                    mask &= self._prediction[rows] == prediction
+                if user_id is not None:
+                    mask &= self._user[rows] == user_id
+                rows = rows[mask]
+                candidates.append(rows)
+                found += rows.size
+
+            rows = np.concatenate(candidates) if candidates else np.zeros(0, dtype=np.int64)
+            if not rows.size:
+                return []
+            best, scores = chunked_top_k(query[None, :], self._vectors[rows], k + len(exclude))
+            results = []
+            for position, score in zip(best[0].tolist(), scores[0].tolist()):
+                comment_id = int(self._ids[rows[position]])
+                if comment_id not in exclude:
+                    results.append((comment_id, score))
+            return results[:k]
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, comment_id: int) -> bool:
+        return int(comment_id) in self._row_of
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes = [len(rows) for rows in self._lists]
+            return {
+                "vectors": len(self._row_of),
+                "rows": self._size,
+                "source_dim": self.source_dim,
+                "dim": self.dim,
+                "lists": len(sizes),
+                "largest_list": max(sizes) if sizes else 0,
+                "trained": self.centroids is not None,
+                "nprobe": self.nprobe,
+                "watermark": self.watermark,
+                "memory_mb": round(self._vectors.nbytes / 1e6, 1),
+            }
+
+    # Persistence
+
+    def save(self, path: Optional[str] = None):
+        """Write the index atomically (temp file + rename)"""
+        path = path or settings.VECTOR_INDEX_PATH
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self._size])
+            meta = {
+                "format": INDEX_FORMAT_VERSION,
+                "source_dim": self.source_dim,
+                "index_dim": self.index_dim,
+                "seed": self.seed,
+                "watermark": self.watermark,
+                "platforms": self._platform_codes,
+            }
+            arrays = {
+                "meta": np.array(json.dumps(meta)),
+                "vectors": self._vectors[rows],
+                "ids": self._ids[rows],
+                "platform": self._platform[rows],
+                "prediction": self._prediction[rows],
+                "user": self._user[rows],
+            }
+            if self.centroids is not None:
+                arrays["centroids"] = self.centroids
+            self.changes_since_save = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved vector index ({len(rows)} vectors) to {path}")
+
+    @classmethod
+    def load(cls, path: Optional[str] = None, **kwargs) -> Optional["VectorIndex"]:
+        """Load a saved index, or None if the file is missing or unreadable"""
+        path = path or settings.VECTOR_INDEX_PATH
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("format") != INDEX_FORMAT_VERSION:
+                    logger.warning(f"Vector index {path} has format {meta.get('format')}, rebuild required")
+                    return None
+                index = cls(index_dim=meta["index_dim"], seed=meta["seed"], **kwargs)
+                if meta["source_dim"] is not None:
+                    index._set_source_dim(int(meta["source_dim"]))
+                vectors = data["vectors"]
+                index._grow(len(vectors))
+                index._size = len(vectors)
+                index._vectors[:index._size] = vectors
+                index._ids[:index._size] = data["ids"]
+                index._platform[:index._size] = data["platform"]
+                index._prediction[:index._size] = data["prediction"]
+                index._user[:index._size] = data["user"]
+                index._alive[:index._size] = True
+                index.centroids = data["centroids"] if "centroids" in data else None
+            index._platform_codes = {name: int(code) for name, code in meta["platforms"].items()}
+            index._row_of = {int(comment_id): row for row, comment_id in enumerate(index._ids[:index._size].tolist())}
+            index.watermark = int(meta["watermark"])
+            index._rebuild_lists()
+            logger.info(f"Loaded vector index ({len(index)} vectors) from {path}")
+            return index
+        except Exception as e:
+            logger.error(f"Could not load vector index {path}: {e}")
+            return None
+
+    def maybe_save(self):
+        """Save once VECTOR_INDEX_SAVE_EVERY changes have accumulated"""
+        every = settings.VECTOR_INDEX_SAVE_EVERY
+        if every > 0 and self.changes_since_save >= every:
+            try:
+                self.save()
+            except OSError as e:
+                logger.error(f"Could not save vector index: {e}")
+
+    # Database
+
+    def sync(self, db, batch_size: int = 1000, limit: Optional[int] = None) -> int:
+        """
+        Add stored comments this index is missing (inserted by other workers)
+
+        Scans the ids above the watermark plus the VECTOR_INDEX_SYNC_WINDOW ids
+        just below it, where a transaction that took its id earlier may commit
+        after a higher id is already visible (PostgreSQL sequences). Only the
+        rows not indexed yet are fetched. The watermark is moved here and by
+        rebuild, never by local inserts: a worker's own comment says nothing
+        about the lower ids other workers have committed in the meantime.
+
+        Returns:
+            int: Number of comments added
+        """
+        from sqlalchemy import or_
+        from backend.db.models import Comment
+
+        has_vector = or_(Comment.vector_data.isnot(None), Comment.vector_representation.isnot(None))
+        cursor = max(0, self.watermark - max(0, settings.VECTOR_INDEX_SYNC_WINDOW))
+        read, added = 0, 0
+        while limit is None or read < limit:
+            rows = (
+                db.query(Comment.id, has_vector.label("has_vector"))
+                .filter(Comment.id > cursor)
+                .order_by(Comment.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            with self._lock:
+                missing = [row.id for row in rows if row.has_vector and row.id not in self._row_of]
+            if missing:
+                stored = (
+                    db.query(Comment.id, Comment.vector_data, Comment.vector_representation,
+                             Comment.platform, Comment.prediction, Comment.user_id)
+                    .filter(Comment.id.in_(missing))
+                    .all()
+                )
+                added += self.add_many(
+                    (row.id, decode_stored_vector(row.vector_data, row.vector_representation),
+                     row.platform, row.prediction, row.user_id)
+                    for row in stored
+                )
+            # Rows without a vector still advance the watermark
+            cursor = rows[-1].id
+            self.watermark = max(self.watermark, cursor)
+            read += len(rows)
+            if len(rows) < batch_size:
+                break
+        return added
+
+
+def search_similar_comments(
+    db,
+    vector,
+    limit: int = 10,
+    threshold: float = 0.0,
+    platform: Optional[str] = None,
+    prediction: Optional[int] = None,
+    user_id: Optional[int] = None,
+    exclude_ids: Optional[Set[int]] = None
+) -> List[Tuple[Any, float]]:
+    """
+    Most similar comments to a vector, using the index for candidates
+
+    Candidates (limit * VECTOR_INDEX_OVERSAMPLE) are re-scored with the exact
+    cosine similarity of their stored vectors and filtered again against the
+    current rows.
+
+    Returns:
+        List of (Comment, similarity) with similarity >= threshold, most similar first
+    """
+    from backend.db.models import Comment
+
+    if hasattr(vector, "toarray"):
+        vector = vector.toarray()
+    query = np.asarray(vector, dtype=np.float64).ravel() if vector is not None else None
+    if query is None or query.size == 0 or not np.any(query):
+        return []
+
+    if not settings.VECTOR_INDEX_ENABLED:
+        return exact_search(db, query, limit, threshold, platform, prediction, user_id, exclude_ids)
+
+    index = get_vector_index()
+    index.sync(db)
+    candidates = index.search(
+        query, k=limit * max(1, settings.VECTOR_INDEX_OVERSAMPLE),
+        platform=platform, prediction=prediction, user_id=user_id, exclude_ids=exclude_ids
+    )
+    if not candidates:
+        return []
+
+    comments = [
+        comment for comment in
+        db.query(Comment).filter(Comment.id.in_([comment_id for comment_id, _ in candidates])).all()
+        if (platform is None or comment.platform == platform)
+        and (prediction is None or comment.prediction == prediction)
+        and (user_id is None or comment.user_id == user_id)
+    ]
+    stored = SimilarityMatrix([comment.get_vector() for comment in comments], dim=query.size)
+    return [(comments[position], similarity)
+            for position, similarity in stored.search(query, k=limit, threshold=threshold)[0]]
+
+
+def exact_search(
+    db,
+    query: np.ndarray,
+    limit: int = 10,
+    threshold: float = 0.0,
+    platform: Optional[str] = None,
+    prediction: Optional[int] = None,
+    user_id: Optional[int] = None,
+    exclude_ids: Optional[Set[int]] = None,
+    batch_size: int = 1000
+) -> List[Tuple[Any, float]]:
+    """
+    Score every stored vector matching the filters (VECTOR_INDEX_ENABLED=False)
+
+    Reads the comments table in id batches and keeps the best `limit` rows, so
+    memory stays bounded but every request scans the table.
+    """
+    from backend.db.models import Comment
+
+    query_rows = db.query(Comment.id, Comment.vector_data, Comment.vector_representation)
+    if platform is not None:
+        query_rows = query_rows.filter(Comment.platform == platform)
+    if prediction is not None:
+        query_rows = query_rows.filter(Comment.prediction == prediction)
+    if user_id is not None:
+        query_rows = query_rows.filter(Comment.user_id == user_id)
+    if exclude_ids:
+        query_rows = query_rows.filter(Comment.id.notin_(list(exclude_ids)))
+
+    best: List[Tuple[float, int]] = []
+    last_id = 0
+    while True:
+        rows = query_rows.filter(Comment.id > last_id).order_by(Comment.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        stored = SimilarityMatrix(
+            [decode_stored_vector(row.vector_data, row.vector_representation) for row in rows], dim=query.size
+        )
+        best.extend((similarity, rows[position].id)
+                    for position, similarity in stored.search(query, k=limit, threshold=threshold)[0])
+        best = sorted(best, key=lambda item: (-item[0], item[1]))[:limit]
+        if len(rows) < batch_size:
+            break
+
+    comments = {c.id: c for c in db.query(Comment).filter(Comment.id.in_([i for _, i in best])).all()}
+    return [(comments[comment_id], similarity) for similarity, comment_id in best if comment_id in comments]
+
+
+def index_comment(comment, vector=None):
+    """Add a stored comment to the index (errors are logged, never raised)"""
+    if not settings.VECTOR_INDEX_ENABLED:
+        return
+    try:
+        index = get_vector_index()
+        index.add(comment.id, comment.get_vector() if vector is None else vector,
+                  comment.platform, comment.prediction, comment.user_id)
+        index.maybe_save()
+    except Exception as e:
+        logger.error(f"Could not index comment {getattr(comment, 'id', None)}: {e}")
+
+
+def index_comments(comments, vectors):
+    """Add stored comments with one add_many call (errors are logged, never raised)"""
+    if not settings.VECTOR_INDEX_ENABLED or not comments:
+        return
+    try:
+        index = get_vector_index()
+        index.add_many(
+            (c.id, vector, c.platform, c.prediction, c.user_id) for c, vector in zip(comments, vectors)
+        )
+        index.maybe_save()
+    except Exception as e:
+        logger.error(f"Could not index {len(comments)} comments: {e}")
+
+
+def unindex_comment(comment_id: int):
+    """Remove a deleted comment from the index"""
+    if not settings.VECTOR_INDEX_ENABLED or _vector_index is None:
+        return
+    try:
+        _vector_index.remove(comment_id)
+        _vector_index.maybe_save()
+    except Exception as e:
+        logger.error(f"Could not remove comment {comment_id} from the index: {e}")
+
+
+# Singleton instance
+_vector_index: Optional[VectorIndex] = None
+_vector_index_lock = threading.Lock()
+
+
+def get_vector_index() -> VectorIndex:
+    """Get the process-wide index, loading VECTOR_INDEX_PATH on first use"""
+    global _vector_index
+    if _vector_index is None:
+        with _vector_index_lock:
+            if _vector_index is None:
+                _vector_index = VectorIndex.load() or VectorIndex()
+    return _vector_index
+
+
+def warm_vector_index() -> Optional[VectorIndex]:
+    """
+    Load the saved index and add the comments it is missing, at startup
+
+    Without a saved file this indexes the whole comments table, which would
+    otherwise happen inside the first similar-comment request.
+    """
+    if not settings.VECTOR_INDEX_ENABLED:
+        return None
+    from backend.db.models.base import SessionLocal
+
+    index = get_vector_index()
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        read = index.sync(db)
+        if read:
+            logger.info(f"Vector index caught up {read} comments in {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        logger.error(f"Could not sync vector index at startup: {e}")
+    finally:
+        db.close()
+    return index
+
+
+def save_vector_index():
+    """Save the index if it was loaded and has unsaved changes"""
+    if _vector_index is not None and _vector_index.changes_since_save:
+        try:
+            _vector_index.save()
+        except OSError as e:
+            logger.error(f"Could not save vector index: {e}")
+
+
+def reset_vector_index():
+    """Drop the singleton (tests, rebuilds)"""
+    global _vector_index
+    with _vector_index_lock:
+        _vector_index = None
+
+
+def rebuild(db, compute_missing: bool = False, batch_size: int = 1000) -> VectorIndex:
+    """
+    Build a new index from the comments table
+
+    Args:
+        compute_missing: Extract and store vectors for comments that have none
+    """
+    from backend.db.models import Comment
+
+    index = VectorIndex()
+    last_id, computed = 0, 0
+    while True:
+        comments = (
+            db.query(Comment).filter(Comment.id > last_id).order_by(Comment.id).limit(batch_size).all()
+        )
+        if not comments:
+            break
+        items = []
+        for comment in comments:
+            vector = comment.get_vector()
+            if vector is None and compute_missing:
+                from backend.utils.vector_utils import extract_features
+                vector = extract_features(comment.processed_content or comment.content)
+                comment.set_vector(vector)
+                computed += 1
+            items.append((comment.id, vector, comment.platform, comment.prediction, comment.user_id))
+        if compute_missing:
+            db.commit()
+        index.add_many(items)
+        last_id = comments[-1].id
+        index.watermark = max(index.watermark, last_id)
+        logger.info(f"Indexed comments up to id {last_id} ({len(index)} vectors)")
+    # Lists trained while inserting only saw the first train_size vectors: retrain at full size
+    if len(index) >= max(2, index.train_size):
+        index.train()
+    logger.info(f"Rebuilt vector index: {len(index)} vectors, {computed} vectors computed")
+    return index
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Rebuild the index from the comments table"""
+    parser = argparse.ArgumentParser(description="Comment vector index")
+    parser.add_argument("command", choices=["rebuild", "stats"])
+    parser.add_argument("--output", default=settings.VECTOR_INDEX_PATH)
+    parser.add_argument("--compute-missing", action="store_true",
+                        help="Extract features for comments stored without a vector")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        index = VectorIndex.load(args.output)
+        print(json.dumps(index.stats() if index else {"error": f"No index at {args.output}"}, indent=2))
+        return 0 if index else 1
+
+    from backend.db.models.base import SessionLocal
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        index = rebuild(db, compute_missing=args.compute_missing, batch_size=args.batch_size)
+        index.save(args.output)
+        print(json.dumps({**index.stats(), "seconds": round(time.perf_counter() - start, 1)}, indent=2))
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+"""
+Out-of-Core TF-IDF Training over the Comments Table
+
+train_vectorizer_on_corpus() fits on an in-memory list of strings; on the
+full comment history that means materializing millions of texts. This
+command streams the comments table instead, in id order through a
+server-side cursor (stream_results + yield_per, so PostgreSQL never sends
+more than one chunk), and produces the same TfidfVectorizer:
+
+1. Vocabulary pass: every chunk is tokenized with the shared vectorizer's
+   analyzer and its per-term document and corpus frequencies are added to
+   running totals. The vocabulary, max_df/min_df filtering, max_features
+   selection and smoothed IDF are then computed from the totals exactly as
+   TfidfVectorizer.fit() does. If the number of distinct terms exceeds
+   max_terms, the rarest terms are pruned, which makes the counts of
+   pruned terms approximate; the report says how often that happened.
+2. Optional reduction pass: an IncrementalPCA is fitted chunk by chunk on
+   the TF-IDF rows (densified one chunk at a time) as the SVD reducer.
+
+With --mode hashing (FEATURE_MODE=hashing) there is no vocabulary to
+build: one pass counts the document frequency of every hash bucket and
+writes the IDF weights as a small .npy array (HASHING_IDF_PATH).
+
+All passes read only the ids that existed when training started. Progress
+(stage, last id, running totals, partial models) is checkpointed every few
+chunks, and an interrupted run resumes from the checkpoint. Artifacts are
+written with save_vectorizer() and replaced atomically; the API loads
+VECTORIZER_PATH at startup.
+
+    python -m backend.services.vectorizer_training --svd-components 300
+    python -m backend.services.vectorizer_training --mode hashing
+    python -m backend.services.vectorizer_training --chunk-size 2000 --restart
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from collections import Counter
+from numbers import Integral
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import joblib
+import numpy as np
+from sklearn.decomposition import IncrementalPCA
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sqlalchemy import func, select
+
+from backend.config.settings import settings
+from backend.utils import vector_utils
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FORMAT_VERSION = 1
+
+
+def iter_comment_chunks(
+    db, chunk_size: int, after_id: int = 0, max_id: Optional[int] = None
+) -> Iterator[Tuple[int, List[str]]]:
+    """
+    Stream comment texts in id order
+
+    Yields:
+        (last id of the chunk, preprocessed texts of the chunk)
+    """
+    from backend.db.models import Comment
+
+    stmt = select(Comment.id, Comment.content).where(Comment.id > after_id).order_by(Comment.id)
+    if max_id is not None:
+        stmt = stmt.where(Comment.id <= max_id)
+    result = db.execute(stmt, execution_options={"stream_results": True, "yield_per": chunk_size})
+    try:
+        for rows in result.partitions():
+            yield rows[-1][0], [vector_utils.preprocess_text(content) if content else "" for _, content in rows]
+    finally:
+        result.close()
+
+
+class VocabularyCounts:
+    """Running document and corpus frequencies of the analyzer's terms"""
+
+    def __init__(self, vectorizer: TfidfVectorizer, max_terms: int, state: Optional[Dict[str, Any]] = None):
+        self.analyzer = vectorizer.build_analyzer()
+        self.max_terms = max_terms
+        state = state or {}
+        self.df: Counter = state.get("df", Counter())
+        self.tf: Counter = state.get("tf", Counter())
+        self.documents = state.get("documents", 0)
+        self.pruned = state.get("pruned", 0)
+
+    def state(self) -> Dict[str, Any]:
+        return {"df": self.df, "tf": self.tf, "documents": self.documents, "pruned": self.pruned}
+
+    def update(self, texts: List[str]):
+        self.documents += len(texts)
+        try:
+            counts = CountVectorizer(analyzer=self.analyzer).fit(texts)
+            matrix = counts.transform(texts).tocsc()
+        except ValueError:
+            # Chunk without a single term (empty or stop words only)
+            return
+        terms = counts.get_feature_names_out()
+        df = np.diff(matrix.indptr)
+        tf = np.asarray(matrix.sum(axis=0)).ravel()
+        for term, d, t in zip(terms.tolist(), df.tolist(), tf.tolist()):
+            self.df[term] += d
+            self.tf[term] += t
+        if len(self.df) > self.max_terms:
+            self._prune()
+
+    def _prune(self):
+        """Keep the max_terms // 2 most frequent terms"""
+        keep = {term for term, _ in self.tf.most_common(self.max_terms // 2)}
+        self.df = Counter({term: d for term, d in self.df.items() if term in keep})
+        self.tf = Counter({term: t for term, t in self.tf.items() if term in keep})
+        self.pruned += 1
+        logger.warning(f"Vocabulary pass pruned to {len(keep)} terms; rare term counts are now approximate")
+
+    def build(self, vectorizer: TfidfVectorizer) -> TfidfVectorizer:
+        """Set vocabulary_ and idf_ on the vectorizer the way fit() would"""
+        n = self.documents
+        high = vectorizer.max_df if isinstance(vectorizer.max_df, Integral) else vectorizer.max_df * n
+        low = vectorizer.min_df if isinstance(vectorizer.min_df, Integral) else vectorizer.min_df * n
+        terms = sorted(term for term, d in self.df.items() if low <= d <= high)
+        if vectorizer.max_features is not None and len(terms) > vectorizer.max_features:
+            tf = np.asarray([self.tf[term] for term in terms])
+            keep = np.sort(np.argsort(-tf, kind="stable")[:vectorizer.max_features])
+            terms = [terms[i] for i in keep]
+        if not terms:
+            raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+
+        df = np.asarray([self.df[term] for term in terms], dtype=np.float64)
+        smooth = int(vectorizer.smooth_idf)
+        vectorizer.vocabulary_ = {term: i for i, term in enumerate(terms)}
+        vectorizer.idf_ = np.log((n + smooth) / (df + smooth)) + 1
+        # fit() keeps every dropped term here; it is informational only and would dominate the artifact
+        vectorizer.stop_words_ = set()
+        return vectorizer
+
+
+def _params(chunk_size: int, max_features: int, svd_components: int) -> Dict[str, Any]:
+    return {"chunk_size": chunk_size, "max_features": max_features, "svd_components": svd_components}
+
+
+def _load_checkpoint(path: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    try:
+        state = joblib.load(path)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+        return None
+    if state.get("format") != CHECKPOINT_FORMAT_VERSION or state.get("params") != params:
+        logger.warning(f"Ignoring checkpoint {path} written with different parameters")
+        return None
+    return state
+
+
+def _atomic_dump(obj, path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def train_streaming(
+    db,
+    output: Optional[str] = None,
+    svd_output: Optional[str] = None,
+    svd_components: int = 0,
+    chunk_size: Optional[int] = None,
+    max_features: int = 10000,
+    max_terms: Optional[int] = None,
+    checkpoint: Optional[str] = None,
+    checkpoint_every: int = 10,
+    restart: bool = False,
+) -> Dict[str, Any]:
+    """
+    Fit the shared TF-IDF vectorizer (and optionally the reducer) on the comments table
+
+    Args:
+        db: Database session
+        output: Vectorizer artifact (default VECTORIZER_PATH)
+        svd_output: Reducer artifact (default VECTORIZER_SVD_PATH), written if svd_components > 0
+        svd_components: Reduced dimension; 0 skips the reduction pass
+        chunk_size: Comments per chunk (raised to svd_components for the reduction pass)
+        max_features: Vocabulary size
+        max_terms: Distinct terms counted before the rarest are pruned
+        checkpoint: Progress file (default `<output>.checkpoint`)
+        checkpoint_every: Chunks between checkpoints
+        restart: Ignore an existing checkpoint
+
+    Returns:
+        Dict: Training report
+    """
+    from backend.db.models import Comment
+
+    output = output or settings.VECTORIZER_PATH
+    svd_output = svd_output or settings.VECTORIZER_SVD_PATH
+    chunk_size = max(1, chunk_size or settings.VECTORIZER_TRAIN_CHUNK_SIZE, svd_components)
+    max_terms = max_terms or settings.VECTORIZER_TRAIN_MAX_TERMS
+    checkpoint = checkpoint or f"{output}.checkpoint"
+    params = _params(chunk_size, max_features, svd_components)
+    start = time.time()
+
+    state = None if restart else _load_checkpoint(checkpoint, params)
+    if state is not None:
+        logger.info(f"Resuming vectorizer training at stage {state['stage']}, id > {state['last_id']}")
+    else:
+        state = {
+            "format": CHECKPOINT_FORMAT_VERSION,
+            "params": params,
+            "stage": "vocabulary",
+            "last_id": 0,
+            "max_id": db.execute(select(func.max(Comment.id))).scalar() or 0,
+            "counts": None,
+            "vectorizer": None,
+            "svd": None,
+            "rows": 0,
+        }
+
+    def save_progress(last_id: int, chunks: int):
+        state["last_id"] = last_id
+        if checkpoint_every and chunks % checkpoint_every == 0:
+            _atomic_dump(state, checkpoint)
+
+    if state["stage"] == "vocabulary":
+        vectorizer = vector_utils._get_vectorizer(force_new=True)
+        vectorizer.max_features = max_features
+        counts = VocabularyCounts(vectorizer, max_terms, state["counts"])
+        chunks = 0
+        for last_id, texts in iter_comment_chunks(db, chunk_size, state["last_id"], state["max_id"]):
+            counts.update(texts)
+            chunks += 1
+            state["counts"] = counts.state()
+            save_progress(last_id, chunks)
+        if not counts.documents:
+            raise ValueError("No comments to train the vectorizer on")
+
+        state["vectorizer"] = counts.build(vectorizer)
+        state["documents"], state["pruned"] = counts.documents, counts.pruned
+        state["counts"], state["last_id"] = None, 0
+        state["stage"] = "reduction" if svd_components else "done"
+        _atomic_dump(state, checkpoint)
+        logger.info(f"Vocabulary pass: {counts.documents} comments, {len(vectorizer.vocabulary_)} terms")
+
+    vectorizer = state["vectorizer"]
+    if state["stage"] == "reduction":
+        svd = state["svd"] or IncrementalPCA(n_components=svd_components)
+        chunks = 0
+        for last_id, texts in iter_comment_chunks(db, chunk_size, state["last_id"], state["max_id"]):
+            if len(texts) < svd_components:
+                # Only the final chunk can be this short; a partial_fit needs n_components rows
+                logger.info(f"Reduction pass skips the last {len(texts)} comments")
+                continue
+            svd.partial_fit(vectorizer.transform(texts).toarray())
+            state["svd"], state["rows"] = svd, state["rows"] + len(texts)
+            chunks += 1
+            save_progress(last_id, chunks)
+        if state["svd"] is None:
+            raise ValueError(f"Need at least {svd_components} comments for {svd_components} components")
+        # Set by fit() but not partial_fit(); transform() of sparse rows batches with it
+        svd.batch_size_ = chunk_size
+        state["stage"] = "done"
+        _atomic_dump(state, checkpoint)
+
+    vector_utils._vectorizer = vectorizer
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    if not vector_utils.save_vectorizer(tmp_path):
+        raise OSError(f"Could not write {output}")
+    os.replace(tmp_path, output)
+    report = {
+        "output": output,
+        "documents": state["documents"],
+        "max_id": state["max_id"],
+        "features": len(vectorizer.vocabulary_),
+        "pruned": state["pruned"],
+    }
+    if state["svd"] is not None:
+        vector_utils._svd = state["svd"]
+        _atomic_dump(state["svd"], svd_output)
+        report.update({"svd_output": svd_output, "svd_components": svd_components, "svd_rows": state["rows"]})
+
+    os.remove(checkpoint)
+    report["seconds"] = round(time.time() - start, 1)
+    return report
+
+
+def train_hashing_idf(
+    db,
+    output: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    checkpoint: Optional[str] = None,
+    checkpoint_every: int = 10,
+    restart: bool = False,
+) -> Dict[str, Any]:
+    """
+    Compute the IDF weights of the hashing feature mode from the comments table
+
+    Args:
+        db: Database session
+        output: IDF array (default HASHING_IDF_PATH)
+        chunk_size: Comments per chunk
+        checkpoint: Progress file (default `<output>.checkpoint`)
+        checkpoint_every: Chunks between checkpoints
+        restart: Ignore an existing checkpoint
+
+    Returns:
+        Dict: Training report
+    """
+    from backend.db.models import Comment
+
+    output = output or settings.HASHING_IDF_PATH
+    chunk_size = max(1, chunk_size or settings.VECTORIZER_TRAIN_CHUNK_SIZE)
+    checkpoint = checkpoint or f"{output}.checkpoint"
+    n_features = settings.HASHING_N_FEATURES
+    params = {"mode": "hashing", "chunk_size": chunk_size, "n_features": n_features}
+    start = time.time()
+
+    state = None if restart else _load_checkpoint(checkpoint, params)
+    if state is None:
+        state = {
+            "format": CHECKPOINT_FORMAT_VERSION,
+            "params": params,
+            "last_id": 0,
+            "max_id": db.execute(select(func.max(Comment.id))).scalar() or 0,
+            "df": np.zeros(n_features, dtype=np.int64),
+            "documents": 0,
+        }
+
+    hashing = vector_utils._get_hashing_vectorizer()
+    chunks = 0
+    for last_id, texts in iter_comment_chunks(db, chunk_size, state["last_id"], state["max_id"]):
+        matrix = hashing.transform(texts).tocsr()
+        matrix.eliminate_zeros()
+        # Indices are unique within a row: one count per document and bucket
+        state["df"] += np.bincount(matrix.indices, minlength=n_features)
+        state["documents"] += len(texts)
+        state["last_id"] = last_id
+        chunks += 1
+        if checkpoint_every and chunks % checkpoint_every == 0:
+            _atomic_dump(state, checkpoint)
+    if not state["documents"]:
+        raise ValueError("No comments to compute IDF weights on")
+
+    idf = vector_utils.compute_hashing_idf(state["df"], state["documents"])
+    if not vector_utils.save_hashing_idf(idf, output):
+        raise OSError(f"Could not write {output}")
+    vector_utils.load_hashing_idf(output)
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return {
+        "output": output,
+        "documents": state["documents"],
+        "max_id": state["max_id"],
+        "features": n_features,
+        "used_buckets": int(np.count_nonzero(state["df"])),
+        "seconds": round(time.time() - start, 1),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Train the TF-IDF vectorizer on the comments table in bounded memory")
+    parser.add_argument("--mode", choices=["tfidf", "hashing"], default=settings.FEATURE_MODE)
+    parser.add_argument("--output", default=None, help="Default: VECTORIZER_PATH, or HASHING_IDF_PATH with --mode hashing")
+    parser.add_argument("--svd-output", default=settings.VECTORIZER_SVD_PATH)
+    parser.add_argument("--svd-components", type=int, default=0, help="Also fit a reducer with this many components")
+    parser.add_argument("--chunk-size", type=int, default=settings.VECTORIZER_TRAIN_CHUNK_SIZE)
+    parser.add_argument("--max-features", type=int, default=10000)
+    parser.add_argument("--max-terms", type=int, default=settings.VECTORIZER_TRAIN_MAX_TERMS)
+    parser.add_argument("--checkpoint", default=None, help="Progress file (default: <output>.checkpoint)")
+    parser.add_argument("--checkpoint-every", type=int, default=10, help="Chunks between checkpoints")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args(argv)
+
+    from backend.db.models.base import SessionLocal
+    db = SessionLocal()
+    try:
+        if args.mode == "hashing":
+            report = train_hashing_idf(
+                db, args.output, args.chunk_size, args.checkpoint, args.checkpoint_every, args.restart
+            )
+        else:
+            report = train_streaming(
+                db, args.output, args.svd_output, args.svd_components, args.chunk_size,
+                args.max_features, args.max_terms, args.checkpoint, args.checkpoint_every, args.restart,
+            )
+    except ValueError as e:
+        print(f"Training failed: {e}")
+        return 1
+    finally:
+        db.close()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Aho-Corasick Keyword Automaton
+
+Finds every occurrence of a fixed set of keywords in one pass over the text,
+independent of how many keywords there are. Uses the C implementation from
+pyahocorasick when installed and an equivalent pure-Python automaton
+otherwise.
+"""
+
+import logging
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+class KeywordAutomaton:
+    """
+    Multi-keyword matcher
+
+    Keywords are identified by their position in the list passed to the
+    constructor; a keyword listed twice reports both positions.
+    """
+
+    def __init__(self, keywords: Iterable[str], use_native: bool = True):
+        """
+        Build the automaton
+
+        Args:
+            keywords: Keywords to search for (empty strings are ignored)
+            use_native: Use pyahocorasick when available
+        """
+        self.keywords: Tuple[str, ...] = tuple(keywords)
+
+        ids_by_keyword: Dict[str, List[int]] = {}
+        for index, keyword in enumerate(self.keywords):
+            if keyword:
+                ids_by_keyword.setdefault(keyword, []).append(index)
+
+        self._native = None
+        if use_native and AHOCORASICK_AVAILABLE and ids_by_keyword:
+            self._native = ahocorasick.Automaton()
+            for keyword, ids in ids_by_keyword.items():
+                self._native.add_word(keyword, tuple(ids))
+            self._native.make_automaton()
+        else:
+            self._build(ids_by_keyword)
+
+    @property
+    def native(self) -> bool:
+        """Whether the C implementation is used"""
+        return self._native is not None
+
+    def _build(self, ids_by_keyword: Dict[str, List[int]]):
+        """Build goto/fail/output tables of the pure-Python automaton"""
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Tuple[int, ...]] = [()]
+
+        for keyword, ids in ids_by_keyword.items():
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append(())
+                state = next_state
+            outputs[state] = tuple(ids)
+
+        # Breadth-first: the fail link of a state is the longest proper suffix that is a trie state
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                if fail[next_state] == next_state:
+                    fail[next_state] = 0
+                outputs[next_state] = outputs[next_state] + outputs[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        Yield (end_index, keyword_id) for every occurrence, overlapping ones included
+
+        end_index is the index of the last character of the match.
+        """
+        if self._native is not None:
+            for end, ids in self._native.iter(text):
+                for keyword_id in ids:
+                    yield end, keyword_id
+            return
+
+        if len(self._goto) == 1:
+            return
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                for keyword_id in outputs[state]:
+                    yield end, keyword_id
+
+    def find_ids(self, text: str) -> Set[int]:
+        """Ids of the keywords that occur in the text"""
+        return {keyword_id for _, keyword_id in self.iter(text)}
+
+    def find(self, text: str) -> List[str]:
+        """Keywords that occur in the text, in keyword-list order"""
+        return [self.keywords[keyword_id] for keyword_id in sorted(self.find_ids(text))]
@@ -0,0 +1,250 @@
+"""
+Lexicon Matcher
+
+Matches texts against the offensive-word and hate-speech lexicons with one
+Aho-Corasick automaton built over both. The automaton is built once per
+process and rebuilt only when a lexicon file's mtime changes; the new index
+is swapped in atomically, so concurrent matches always see either the old or
+the new lexicons, never a mix.
+
+Matching is word-aligned and diacritic-insensitive: entries and texts are
+folded with remove_diacritics, so "do ngu" matches the entry "đồ ngu". A
+character that carries a different diacritic than the entry ("dỗ" vs "đồ")
+is a different word and does not match.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.config.settings import settings
+from backend.utils.aho_corasick import KeywordAutomaton
+from backend.utils.text_processing import remove_diacritics
+
+logger = logging.getLogger(__name__)
+
+# Used when a lexicon file does not exist (examples only, not exhaustive)
+DEFAULT_LEXICONS: Dict[str, Tuple[str, ...]] = {
+    "offensive": (
+        'đồ', 'thằng', 'con', 'đm', 'vl', 'cmm', 'đcm', 'đéo', 'lồn', 'cặc', 'buồi',
+        'ngu', 'dốt', 'khốn', 'chết', 'tiên sư', 'tổ sư', 'mẹ', 'má', 'cave', 'điếm'
+    ),
+    "hate": (
+        'bọn', 'lũ', 'phường', 'đồ', 'quân', 'giết', 'tiêu diệt', 'xóa sổ', 'tàn sát',
+        'diệt chủng', 'đánh đập', 'chém giết', 'loại trừ', 'trục xuất', 'cút về', 'cướp'
+    ),
+}
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def _build_fold_table() -> Dict[int, str]:
+    """One-to-one character map that strips Vietnamese diacritics (keeps string length)"""
+    table = {ord('đ'): 'd', ord('Đ'): 'D'}
+    for code in range(0x00C0, 0x1F00):
+        folded = remove_diacritics(chr(code))
+        if len(folded) == 1 and folded != chr(code):
+            table[code] = folded
+    return table
+
+
+_FOLD_TABLE = _build_fold_table()
+
+
+def normalize_words(text: str) -> str:
+    """Lower-cased NFC words joined by single spaces"""
+    return ' '.join(_WORD_RE.findall(unicodedata.normalize('NFC', text).lower()))
+
+
+def fold(text: str) -> str:
+    """Strip diacritics character by character"""
+    return text.translate(_FOLD_TABLE)
+
+
+def read_lexicon(path: str) -> List[str]:
+    """One entry per line; blank lines and lines starting with '#' are skipped"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+class _LexiconIndex:
+    """Immutable automaton over all lexicons (replaced as a whole on reload)"""
+
+    def __init__(self, lexicons: Dict[str, List[str]]):
+        # Per automaton id: (lexicon name, original entry, normalized entry)
+        self.entries: List[Tuple[str, str, str]] = []
+        seen = set()
+        for name, words in lexicons.items():
+            for word in words:
+                normalized = normalize_words(word)
+                if normalized and (name, normalized) not in seen:
+                    seen.add((name, normalized))
+                    self.entries.append((name, word, normalized))
+
+        self.names = tuple(lexicons)
+        self.sizes = {name: len(words) for name, words in lexicons.items()}
+        self.automaton = KeywordAutomaton(fold(normalized) for _, _, normalized in self.entries)
+
+    def match(self, text: str) -> Dict[str, List[str]]:
+        found: Dict[str, List[str]] = {name: [] for name in self.names}
+        if not text:
+            return found
+
+        # Padding spaces make word boundaries uniform at both ends
+        exact = ' ' + normalize_words(text) + ' '
+        folded = fold(exact)
+
+        hits = []
+        for end, entry_id in self.automaton.iter(folded):
+            name, word, normalized = self.entries[entry_id]
+            start = end - len(normalized) + 1
+            if folded[start - 1] != ' ' or folded[end + 1] != ' ':
+                continue
+            # Every character is either as in the entry or written without its diacritic
+            span = exact[start:end + 1]
+            if span != normalized and not all(
+                s == e or s == f for s, e, f in zip(span, normalized, folded[start:end + 1])
+            ):
+                continue
+            hits.append((start, entry_id))
+
+        # In order of first occurrence, each entry once
+        reported = set()
+        for _, entry_id in sorted(hits):
+            if entry_id not in reported:
+                reported.add(entry_id)
+                name, word, _ = self.entries[entry_id]
+                found[name].append(word)
+        return found
+
+
+class LexiconMatcher:
+    """
+    Offensive and hate-speech lexicon matcher with hot reload
+    """
+
+    def __init__(
+        self,
+        paths: Optional[Dict[str, str]] = None,
+        defaults: Optional[Dict[str, Iterable[str]]] = None,
+        check_interval: float = 1.0
+    ):
+        """
+        Build the matcher
+
+        Args:
+            paths: Lexicon name -> file path
+            defaults: Lexicon name -> entries used while the file does not exist
+            check_interval: Minimum seconds between mtime checks (0 = every call)
+        """
+        if paths is None:
+            paths = {
+                "offensive": settings.VIETNAMESE_OFFENSIVE_WORDLIST_FILE,
+                "hate": settings.VIETNAMESE_HATE_SPEECH_FILE,
+            }
+        self.paths = dict(paths)
+        self.defaults = {name: list(words) for name, words in (defaults or DEFAULT_LEXICONS).items()}
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._mtimes: Dict[str, Optional[int]] = {}
+        self._index: Optional[_LexiconIndex] = None
+        self.reloads = 0
+        self._reload(self._current_mtimes())
+        self._next_check = time.monotonic() + check_interval
+
+    def _current_mtimes(self) -> Dict[str, Optional[int]]:
+        mtimes = {}
+        for name, path in self.paths.items():
+            try:
+                mtimes[name] = os.stat(path).st_mtime_ns
+            except (OSError, TypeError):
+                mtimes[name] = None
+        return mtimes
+
+    def _reload(self, mtimes: Dict[str, Optional[int]]):
+        """Build a new index from the files and swap it in"""
+        lexicons = {}
+        for name in dict.fromkeys(list(self.paths) + list(self.defaults)):
+            words = None
+            if mtimes.get(name) is not None:
+                try:
+                    words = read_lexicon(self.paths[name])
+                except OSError as e:
+                    logger.warning(f"Could not read lexicon {self.paths[name]}: {e}")
+            lexicons[name] = words if words is not None else self.defaults.get(name, [])
+
+        index = _LexiconIndex(lexicons)
+        # Single reference assignment: readers see the old or the new index
+        self._index = index
+        self._mtimes = mtimes
+        self.reloads += 1
+        logger.info(f"Lexicons loaded: {index.sizes}")
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            mtimes = self._current_mtimes()
+            if mtimes != self._mtimes:
+                try:
+                    self._reload(mtimes)
+                except Exception as e:
+                    # Keep serving the previous lexicons
+                    logger.error(f"Lexicon reload failed: {e}")
+
+    def match(self, text: str) -> Dict[str, List[str]]:
+        """
+        Find lexicon entries in a text
+
+        Returns:
+            Dict[str, List[str]]: Lexicon name -> matched entries in order of first occurrence
+        """
+        self._maybe_reload()
+        return self._index.match(text)
+
+    def match_batch(self, texts: List[str]) -> List[Dict[str, List[str]]]:
+        """Match several texts against the same lexicon snapshot"""
+        self._maybe_reload()
+        index = self._index
+        return [index.match(text) for text in texts]
+
+    def stats(self) -> Dict[str, object]:
+        """Lexicon sizes and reload count"""
+        index = self._index
+        return {
+            "lexicons": dict(index.sizes),
+            "entries": len(index.entries),
+            "native_automaton": index.automaton.native,
+            "reloads": self.reloads,
+        }
+
+
+# Singleton instance
+_lexicon_matcher: Optional[LexiconMatcher] = None
+_lexicon_lock = threading.Lock()
+
+
+def get_lexicon_matcher() -> LexiconMatcher:
+    """Get the process-wide lexicon matcher"""
+    global _lexicon_matcher
+    if _lexicon_matcher is None:
+        with _lexicon_lock:
+            if _lexicon_matcher is None:
+                _lexicon_matcher = LexiconMatcher()
+    return _lexicon_matcher
+
+
+def reset_lexicon_matcher():
+    """Drop the singleton (tests, settings changes)"""
+    global _lexicon_matcher
+    with _lexicon_lock:
+        _lexicon_matcher = None
@@ -65,6 +65,8 @@ from typing import Dict, Any, List, Tuple, Optional
 import json
 from collections import Counter
 
+from backend.utils.aho_corasick import KeywordAutomaton
+
 # Thiết lập logging
 logger = logging.getLogger("utils.text_processing")
 
@@ -108,6 +110,80 @@ def remove_diacritics(text: str) -> str:
     return ''.join(c for c in unicodedata.normalize('NFKD', text)
                    if not unicodedata.combining(c))
 
+# Từ khóa spam tiếng Việt phổ biến (so khớp trên văn bản chữ thường đã bỏ dấu câu)
+SPAM_KEYWORDS = (
+    'giảm giá', 'khuyến mãi', 'siêu sale', 'mua ngay', 'giá sốc', 'giá rẻ', 'rẻ vô địch',
+    'liên hệ ngay', 'số lượng có hạn', 'cơ hội cuối', 'miễn phí', 'làm giàu', 'hot', 'sốc',
+    'kiếm tiền tại nhà', 'thu nhập thụ động', 'việc làm thêm', 'đầu tư', 'lợi nhuận cao',
+    'chiết khấu', 'sale off', 'freeship', 'mua 1 tặng 1', 'chỉ hôm nay', 'click ngay',
+    'cơ hội vàng', 'trúng thưởng', 'quà tặng', 'tri ân', 'ưu đãi', 'chỉ còn', 'trả góp',
+    'không lãi suất', 'săn sale', 'flash sale', 'đồng giá', 'thanh lý', 'mua sỉ', 'giao hàng',
+    'zalo', 'inbox', 'nhắn tin', 'liên hệ', 'hotline', 'bảo hành', 'đặt hàng', 'nhận chiết khấu'
+)
+
+# Các domain rút gọn link thường gặp trong spam (so khớp trên URL chữ thường)
+SUSPICIOUS_DOMAINS = (
+    'bit.ly', 'goo.gl', 'tinyurl.com', 't.co', 'shorturl', 'tiny.cc', 'fb.me',
+    'clck.ru', 'ow.ly', 'j.mp', 'is.gd', 'rebrand.ly', 'soo.gd', 'x.co', 'tiny.ie'
+)
+
+# Một automaton cho cả từ khóa và domain: id < len(SPAM_KEYWORDS) là từ khóa, còn lại là domain
+_SPAM_AUTOMATON = KeywordAutomaton([keyword.lower() for keyword in SPAM_KEYWORDS] + list(SUSPICIOUS_DOMAINS))
+_SPAM_KEYWORD_IDS = len(SPAM_KEYWORDS)
+
+_URL_RE = re.compile(r'https?://\S+|www\.\S+|bit\.ly/\S+|goo\.gl/\S+|t\.co/\S+|tinyurl\.com/\S+|fb\.me/\S+')
+_SPAM_NORMALIZE_RE = re.compile(r'[^\w\sÀÁÂÃÈÉÊÌÍÒÓÔÕÙÚĂĐĨŨƠàáâãèéêìíòóôõùúăđĩũơƯĂẠẢẤẦẨẪẬẮẰẲẴẶẸẺẼỀỀỂưăạảấầẩẫậắằẳẵặẹẻẽềềểỄỆỈỊỌỎỐỒỔỖỘỚỜỞỠỢỤỦỨỪễệỉịọỏốồổỗộớờởỡợụủứừỬỮỰỲỴÝỶỸửữựỳỵỷỹ]')
+_PHONE_RE = re.compile(r'(0|\+84)\s*\d{1,3}[\s.-]?\d{3,4}[\s.-]?\d{3,4}')
+_PRICE_RE = re.compile(r'\d+[.,]?\d*\s*([kK]|[đÐ]|VND|VNĐ|nghìn|triệu|[tT][rR])')
+_EMOJI_RE = re.compile(
+    "["
+    "\U0001F1E0-\U0001F1FF"  # flags (iOS)
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F680-\U0001F6FF"  # transport & map symbols
+    "\U0001F700-\U0001F77F"  # alchemical symbols
+    "\U0001F780-\U0001F7FF"  # Geometric Shapes
+    "\U0001F800-\U0001F8FF"  # Supplemental Arrows-C
+    "\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
+    "\U0001FA00-\U0001FA6F"  # Chess Symbols
+    "\U0001FA70-\U0001FAFF"  # Symbols and Pictographs Extended-A
+    "\U00002702-\U000027B0"  # Dingbats
+    "\U000024C2-\U0001F251"
+    "]+"
+)
+_ALL_CAPS_WORD_RE = re.compile(r'\b[A-Z]{3,}\b')
+
+# Các mẫu đáng ngờ (chỉ cần biết có mẫu nào khớp hay không).
+# Phần trăm và email chỉ thử khi văn bản có '%' / '@'
+_PERCENT_RE = re.compile(r'\d+\s*%')
+_SUSPICIOUS_PHRASE_RE = re.compile('|'.join('(?:%s)' % pattern for pattern in (
+    r'[cC][òoÒO][nN]\s*[íiÍI][tT]',  # "còn ít" - dùng để tạo cảm giác khan hiếm
+    r'[hH][êeÊE][tT]\s*[hH][àaÀA][nN][gG]',  # "hết hàng"
+    r'[mM][uU][aA]\s*[nN][gG][aA][yY]',  # "mua ngay"
+    r'[lL][iI][êeÊE][nN]\s*[hH][eêÊE]',  # "liên hệ"
+)))
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+
+# Ký tự nhỏ nhất trong các khoảng emoji ở trên: văn bản không có ký tự nào từ đây trở lên thì không có emoji
+_EMOJI_MIN_CHAR = '\U000024C2'
+
+
+def _empty_spam_features() -> Dict[str, Any]:
+    return {
+        'has_url': False,
+        'url_count': 0,
+        'has_suspicious_url': False,
+        'spam_keyword_count': 0,
+        'has_excessive_punctuation': False,
+        'has_all_caps_words': False,
+        'has_phone_number': False,
+        'has_price': False,
+        'has_suspicious_patterns': False,
+        'emoji_count': 0,
+        'capitalization_ratio': 0.0
+    }
+
+
 def preprocess_for_spam_detection(text: str) -> Tuple[str, Dict[str, Any]]:
     """
     Tiền xử lý đặc biệt cho việc phát hiện spam
@@ -119,131 +195,75 @@ def preprocess_for_spam_detection(text: str) -> Tuple[str, Dict[str, Any]]:
         Tuple[str, Dict[str, Any]]: (Văn bản đã xử lý, đặc trưng spam)
     """
     if not text:
-        return "", {
-            'has_url': False,
-            'url_count': 0,
-            'has_suspicious_url': False,
-            'spam_keyword_count': 0,
-            'has_excessive_punctuation': False,
-            'has_all_caps_words': False,
-            'has_phone_number': False,
-            'has_price': False,
-            'has_suspicious_patterns': False,
-            'emoji_count': 0,
-            'capitalization_ratio': 0.0
-        }
+        return "", _empty_spam_features()
     
-    # Bản sao văn bản gốc để phân tích
-    original_text = text
-    
-    # Xử lý các URL
     # Tìm tất cả các URL trong văn bản
-    url_pattern = r'https?://\S+|www\.\S+|bit\.ly/\S+|goo\.gl/\S+|t\.co/\S+|tinyurl\.com/\S+|fb\.me/\S+'
-    urls = re.findall(url_pattern, original_text)
-    
-    # Đánh dấu có URL
-    has_url = len(urls) > 0
-    
-    # Đếm số lượng URL
-    url_count = len(urls)
-    
-    # Kiểm tra các domain đáng ngờ trong spam
-    suspicious_domains = [
-        'bit.ly', 'goo.gl', 'tinyurl.com', 't.co', 'shorturl', 'tiny.cc', 'fb.me',
-        'clck.ru', 'ow.ly', 'j.mp', 'is.gd', 'rebrand.ly', 'soo.gd', 'x.co', 'tiny.ie'
-    ]
-    has_suspicious_url = any(domain in url.lower() for url in urls for domain in suspicious_domains)
-    
-    # Xử lý các từ khóa spam tiếng Việt phổ biến
-    spam_keywords = [
-        'giảm giá', 'khuyến mãi', 'siêu sale', 'mua ngay', 'giá sốc', 'giá rẻ', 'rẻ vô địch',
-        'liên hệ ngay', 'số lượng có hạn', 'cơ hội cuối', 'miễn phí', 'làm giàu', 'hot', 'sốc',
-        'kiếm tiền tại nhà', 'thu nhập thụ động', 'việc làm thêm', 'đầu tư', 'lợi nhuận cao',
-        'chiết khấu', 'sale off', 'freeship', 'mua 1 tặng 1', 'chỉ hôm nay', 'click ngay',
-        'cơ hội vàng', 'trúng thưởng', 'quà tặng', 'tri ân', 'ưu đãi', 'chỉ còn', 'trả góp',
-        'không lãi suất', 'săn sale', 'flash sale', 'đồng giá', 'thanh lý', 'mua sỉ', 'giao hàng',
-        'zalo', 'inbox', 'nhắn tin', 'liên hệ', 'hotline', 'bảo hành', 'đặt hàng', 'nhận chiết khấu'
-    ]
-    
-    # Chuẩn hóa văn bản để kiểm tra từ khóa
-    normalized_text = text.lower()
-    # Loại bỏ dấu câu
-    normalized_text = re.sub(r'[^\w\sÀÁÂÃÈÉÊÌÍÒÓÔÕÙÚĂĐĨŨƠàáâãèéêìíòóôõùúăđĩũơƯĂẠẢẤẦẨẪẬẮẰẲẴẶẸẺẼỀỀỂưăạảấầẩẫậắằẳẵặẹẻẽềềểỄỆỈỊỌỎỐỒỔỖỘỚỜỞỠỢỤỦỨỪễệỉịọỏốồổỗộớờởỡợụủứừỬỮỰỲỴÝỶỸửữựỳỵỷỹ]', ' ', normalized_text)
-    
-    # Đếm số từ khóa spam xuất hiện
-    spam_keyword_count = 0
-    for keyword in spam_keywords:
-        if keyword.lower() in normalized_text:
-            spam_keyword_count += 1
-    
-    # Kiểm tra số điện thoại
-    phone_pattern = r'(0|\+84)\s*\d{1,3}[\s.-]?\d{3,4}[\s.-]?\d{3,4}'
-    has_phone_number = bool(re.search(phone_pattern, original_text))
-    
-    # Kiểm tra giá tiền
-    price_pattern = r'\d+[.,]?\d*\s*([kK]|[đÐ]|VND|VNĐ|nghìn|triệu|[tT][rR])'
-    has_price = bool(re.search(price_pattern, original_text))
-    
-    # Đếm emoji
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F1E0-\U0001F1FF"  # flags (iOS)
-        "\U0001F300-\U0001F5FF"  # symbols & pictographs
-        "\U0001F600-\U0001F64F"  # emoticons
-        "\U0001F680-\U0001F6FF"  # transport & map symbols
-        "\U0001F700-\U0001F77F"  # alchemical symbols
-        "\U0001F780-\U0001F7FF"  # Geometric Shapes
-        "\U0001F800-\U0001F8FF"  # Supplemental Arrows-C
-        "\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
-        "\U0001FA00-\U0001FA6F"  # Chess Symbols
-        "\U0001FA70-\U0001FAFF"  # Symbols and Pictographs Extended-A
-        "\U00002702-\U000027B0"  # Dingbats
-        "\U000024C2-\U0001F251" 
-        "]+"
-    )
-    emojis = emoji_pattern.findall(original_text)
-    emoji_count = len(emojis)
-    
-    # Kiểm tra các đặc điểm đặc trưng của spam
-    has_excessive_punctuation = len(re.findall(r'[!?.]', text)) > 5
-    has_all_caps_words = len(re.findall(r'\b[A-Z]{3,}\b', text)) > 1
+    urls = _URL_RE.findall(text)
+    
+    # Chuẩn hóa văn bản để kiểm tra từ khóa: chữ thường, bỏ dấu câu
+    normalized_text = _SPAM_NORMALIZE_RE.sub(' ', text.lower())
+    
+    # Một lượt quét automaton: từ khóa trong văn bản chuẩn hóa, domain trong các URL.
+    # Từ khóa và domain không chứa '\n' nên không có kết quả nào vắt qua ranh giới hai phần
+    boundary = len(normalized_text)
+    scanned = normalized_text + '\n' + ' '.join(urls).lower() if urls else normalized_text
+    keyword_ids = set()
+    has_suspicious_url = False
+    for end, keyword_id in _SPAM_AUTOMATON.iter(scanned):
+        if end < boundary:
+            if keyword_id < _SPAM_KEYWORD_IDS:
+                keyword_ids.add(keyword_id)
+        elif keyword_id >= _SPAM_KEYWORD_IDS:
+            has_suspicious_url = True
     
     # Tỷ lệ chữ hoa
-    if len(text) > 0:
-        upper_chars = sum(1 for c in text if c.isupper())
-        capitalization_ratio = upper_chars / len(text)
-    else:
-        capitalization_ratio = 0
-    
-    # Các mẫu đáng ngờ
-    suspicious_patterns = [
-        r'\d+\s*%', # Phần trăm
-        r'[cC][òoÒO][nN]\s*[íiÍI][tT]', # "còn ít" - dùng để tạo cảm giác khan hiếm
-        r'[hH][êeÊE][tT]\s*[hH][àaÀA][nN][gG]', # "hết hàng"
-        r'[mM][uU][aA]\s*[nN][gG][aA][yY]', # "mua ngay"
-        r'[lL][iI][êeÊE][nN]\s*[hH][eêÊE]', # "liên hệ"
-        r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b' # Email
-    ]
-    
-    has_suspicious_patterns = any(bool(re.search(pattern, text)) for pattern in suspicious_patterns)
+    capitalization_ratio = sum(map(str.isupper, text)) / len(text)
     
     # Tạo đặc trưng bổ sung cho mô hình
     spam_features = {
-        'has_url': has_url,
-        'url_count': url_count,
+        'has_url': len(urls) > 0,
+        'url_count': len(urls),
         'has_suspicious_url': has_suspicious_url,
-        'spam_keyword_count': spam_keyword_count,
-        'has_excessive_punctuation': has_excessive_punctuation,
-        'has_all_caps_words': has_all_caps_words,
-        'has_phone_number': has_phone_number,
-        'has_price': has_price,
-        'has_suspicious_patterns': has_suspicious_patterns,
-        'emoji_count': emoji_count,
+        'spam_keyword_count': len(keyword_ids),
+        'has_excessive_punctuation': text.count('!') + text.count('?') + text.count('.') > 5,
+        'has_all_caps_words': len(_ALL_CAPS_WORD_RE.findall(text)) > 1,
+        'has_phone_number': _PHONE_RE.search(text) is not None,
+        'has_price': _PRICE_RE.search(text) is not None,
+        'has_suspicious_patterns': (
+            ('%' in text and _PERCENT_RE.search(text) is not None)
+            or _SUSPICIOUS_PHRASE_RE.search(text) is not None
+            or ('@' in text and _EMAIL_RE.search(text) is not None)
+        ),
+        'emoji_count': len(_EMOJI_RE.findall(text)) if max(text) >= _EMOJI_MIN_CHAR else 0,
         'capitalization_ratio': capitalization_ratio
     }
     
     return text, spam_features
 
+def preprocess_for_spam_detection_batch(texts: List[str]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Tính đặc trưng spam cho nhiều văn bản (văn bản trùng lặp chỉ tính một lần)
+    
+    Args:
+        texts: Danh sách văn bản
+        
+    Returns:
+        List[Tuple[str, Dict[str, Any]]]: Kết quả theo thứ tự đầu vào
+    """
+    computed: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    results = []
+    for text in texts:
+        result = computed.get(text)
+        if result is None:
+            result = preprocess_for_spam_detection(text)
+            if text:
+                computed[text] = result
+        else:
+            # Mỗi kết quả một dict riêng để caller có thể sửa
+            result = (result[0], dict(result[1]))
+        results.append(result)
+    return results
+
 def extract_keywords(text: str, top_n: int = 10) -> List[str]:
     """
     Trích xuất từ khóa từ văn bản
@@ -299,36 +319,10 @@ def detect_offensive_words(text: str) -> Tuple[bool, List[str]]:
     Returns:
         Tuple[bool, List[str]]: (Có từ xúc phạm hay không, danh sách từ xúc phạm)
     """
-    # Tải danh sách từ ngữ xúc phạm tiếng Việt từ file nếu có
-    try:
-        with open('data/vietnamese_offensive_words.txt', 'r', encoding='utf-8') as f:
-            offensive_words = set(line.strip() for line in f)
-    except:
-        # Danh sách từ ngữ xúc phạm mặc định nếu file không tồn tại
-        # Chú ý: Chỉ dùng một số từ làm ví dụ, không liệt kê đầy đủ
-        offensive_words = {
-            'đồ', 'thằng', 'con', 'đm', 'vl', 'cmm', 'đcm', 'đéo', 'lồn', 'cặc', 'buồi',
-            'ngu', 'dốt', 'khốn', 'chết', 'tiên sư', 'tổ sư', 'mẹ', 'má', 'cave', 'điếm'
-        }
-    
-    # Chuẩn hóa văn bản
-    normalized_text = text.lower()
-    # Loại bỏ dấu câu và ký tự đặc biệt
-    normalized_text = re.sub(r'[^\w\sÀÁÂÃÈÉÊÌÍÒÓÔÕÙÚĂĐĨŨƠàáâãèéêìíòóôõùúăđĩũơƯĂẠẢẤẦẨẪẬẮẰẲẴẶẸẺẼỀỀỂưăạảấầẩẫậắằẳẵặẹẻẽềềểỄỆỈỊỌỎỐỒỔỖỘỚỜỞỠỢỤỦỨỪễệỉịọỏốồổỗộớờởỡợụủứừỬỮỰỲỴÝỶỸửữựỳỵỷỹ]', ' ', normalized_text)
-    # Chuẩn hóa dấu cách
-    normalized_text = re.sub(r'\s+', ' ', normalized_text).strip()
-    
-    # Tách thành từng từ
-    words = normalized_text.split()
-    
-    # Tìm các từ xúc phạm
-    found_offensive_words = [word for word in words if word in offensive_words]
-    
-    # Tìm các cụm từ xúc phạm
-    for phrase in offensive_words:
-        if ' ' in phrase and phrase in normalized_text:
-            found_offensive_words.append(phrase)
+    # Lexicon được nạp một lần và chỉ nạp lại khi file thay đổi (xem backend/utils/lexicon.py)
+    from backend.utils.lexicon import get_lexicon_matcher
     
+    found_offensive_words = get_lexicon_matcher().match(text)["offensive"]
     return len(found_offensive_words) > 0, found_offensive_words
 
 def detect_hate_speech(text: str) -> Tuple[bool, List[str]]:
@@ -341,27 +335,9 @@ def detect_hate_speech(text: str) -> Tuple[bool, List[str]]:
     Returns:
         Tuple[bool, List[str]]: (Có phát ngôn thù ghét hay không, danh sách cụm từ thù ghét)
     """
-    # Tải danh sách từ ngữ thù ghét tiếng Việt từ file nếu có
-    try:
-        with open('data/vietnamese_hate_speech.txt', 'r', encoding='utf-8') as f:
-            hate_phrases = set(line.strip() for line in f)
-    except:
-        # Danh sách từ ngữ thù ghét mặc định nếu file không tồn tại
-        # Chú ý: Chỉ dùng một số từ làm ví dụ, không liệt kê đầy đủ
-        hate_phrases = {
-            'bọn', 'lũ', 'phường', 'đồ', 'quân', 'giết', 'tiêu diệt', 'xóa sổ', 'tàn sát',
-            'diệt chủng', 'đánh đập', 'chém giết', 'loại trừ', 'trục xuất', 'cút về', 'cướp'
-        }
-    
-    # Chuẩn hóa văn bản
-    normalized_text = text.lower()
-    
-    # Tìm các từ/cụm từ thù ghét
-    found_hate_phrases = []
-    for phrase in hate_phrases:
-        if phrase in normalized_text:
-            found_hate_phrases.append(phrase)
+    from backend.utils.lexicon import get_lexicon_matcher
     
+    found_hate_phrases = get_lexicon_matcher().match(text)["hate"]
     return len(found_hate_phrases) > 0, found_hate_phrases
 
 def compute_text_statistics(text: str) -> Dict[str, Any]:
@@ -0,0 +1,151 @@
+"""
+Compact Binary Vector Codec
+
+Encodes feature vectors for the comments.vector_data column. A TF-IDF vector
+has 10000 dimensions but only a few dozen non-zeros, so it is stored as
+sparse index/value arrays; vectors that are mostly non-zero (reduced or
+embedding vectors) are stored densely as float16.
+
+Layout (little-endian):
+    header  magic b"TV", version (uint8), kind (uint8), dim (uint32), nnz (uint32)
+    sparse  nnz indices (uint16 when dim <= 65536, else uint32), nnz float32 values
+    dense   dim float16 values
+
+The version byte lets the format change without touching rows already
+written: decode_vector rejects unknown versions instead of misreading them.
+"""
+
+import json
+import struct
+from typing import Optional, Union
+
+import numpy as np
+
+MAGIC = b"TV"
+VERSION = 1
+
+KIND_SPARSE = 0
+KIND_DENSE_F16 = 1
+
+_HEADER = struct.Struct("<2sBBII")
+HEADER_SIZE = _HEADER.size
+
+
+class VectorCodecError(ValueError):
+    """Raised when a blob is not a vector written by this codec"""
+
+
+def _index_dtype(dim: int) -> np.dtype:
+    return np.dtype("<u2") if dim <= 65536 else np.dtype("<u4")
+
+
+def encode_vector(vector, kind: Optional[int] = None) -> bytes:
+    """
+    Encode a 1-D vector
+
+    Args:
+        vector: numpy array, list of floats or a one-row scipy.sparse matrix
+        kind: KIND_SPARSE or KIND_DENSE_F16; by default the smaller of the two
+
+    Returns:
+        bytes: Header followed by the payload
+    """
+    if hasattr(vector, "tocsr"):
+        row = vector.tocsr(copy=True)
+        if row.shape[0] != 1:
+            return encode_vector(row.toarray().ravel(), kind)
+        row.sum_duplicates()
+        row.eliminate_zeros()
+        dim = int(row.shape[1])
+        nonzero = row.indices.astype(np.intp)
+        nnz = int(nonzero.size)
+        if kind == KIND_DENSE_F16 or (kind is None and nnz * (_index_dtype(dim).itemsize + 4) > dim * 2):
+            return encode_vector(row.toarray().ravel(), kind)
+        header = _HEADER.pack(MAGIC, VERSION, KIND_SPARSE, dim, nnz)
+        return header + nonzero.astype(_index_dtype(dim)).tobytes() + row.data.astype("<f4").tobytes()
+
+    values = np.asarray(vector, dtype=np.float32).ravel()
+    dim = int(values.size)
+    nonzero = np.flatnonzero(values)
+    nnz = int(nonzero.size)
+
+    if kind is None:
+        sparse_size = nnz * (_index_dtype(dim).itemsize + 4)
+        kind = KIND_SPARSE if sparse_size <= dim * 2 else KIND_DENSE_F16
+
+    if kind == KIND_SPARSE:
+        header = _HEADER.pack(MAGIC, VERSION, KIND_SPARSE, dim, nnz)
+        indices = nonzero.astype(_index_dtype(dim))
+        return header + indices.tobytes() + values[nonzero].astype("<f4").tobytes()
+    if kind == KIND_DENSE_F16:
+        header = _HEADER.pack(MAGIC, VERSION, KIND_DENSE_F16, dim, nnz)
+        return header + values.astype("<f2").tobytes()
+    raise ValueError(f"Unknown vector kind: {kind}")
+
+
+def is_encoded(blob: Union[bytes, bytearray, memoryview, None]) -> bool:
+    """True if blob starts with this codec's header"""
+    return blob is not None and len(blob) >= HEADER_SIZE and bytes(blob[:2]) == MAGIC
+
+
+def decode_header(blob: Union[bytes, bytearray, memoryview]):
+    """Return (version, kind, dim, nnz), raising VectorCodecError on a foreign blob"""
+    if not is_encoded(blob):
+        raise VectorCodecError("Not an encoded vector")
+    _, version, kind, dim, nnz = _HEADER.unpack_from(blob)
+    if version != VERSION:
+        raise VectorCodecError(f"Unsupported vector format version: {version}")
+    return version, kind, dim, nnz
+
+
+def decode_sparse(blob: Union[bytes, bytearray, memoryview]):
+    """
+    Decode to (dim, indices, values) without materializing the dense vector
+
+    Dense blobs return every index.
+    """
+    _, kind, dim, nnz = decode_header(blob)
+    buffer = memoryview(blob)[HEADER_SIZE:]
+    if kind == KIND_SPARSE:
+        index_dtype = _index_dtype(dim)
+        index_bytes = nnz * index_dtype.itemsize
+        if len(buffer) != index_bytes + nnz * 4:
+            raise VectorCodecError("Truncated sparse vector")
+        indices = np.frombuffer(buffer[:index_bytes], dtype=index_dtype).astype(np.intp)
+        values = np.frombuffer(buffer[index_bytes:], dtype="<f4").astype(np.float32)
+        return dim, indices, values
+    if kind == KIND_DENSE_F16:
+        if len(buffer) != dim * 2:
+            raise VectorCodecError("Truncated dense vector")
+        return dim, np.arange(dim), np.frombuffer(buffer, dtype="<f2").astype(np.float32)
+    raise VectorCodecError(f"Unknown vector kind: {kind}")
+
+
+def decode_vector(blob: Union[bytes, bytearray, memoryview]) -> np.ndarray:
+    """Decode to a dense float32 vector"""
+    dim, indices, values = decode_sparse(blob)
+    if indices.size == dim:
+        return values
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[indices] = values
+    return vector
+
+
+def decode_stored_vector(data, legacy: Optional[str] = None) -> Optional[np.ndarray]:
+    """
+    Decode a comment's vector columns: vector_data, or the JSON text of rows
+    not yet converted by the compact_vector_storage migration
+
+    Returns None when neither holds a readable vector.
+    """
+    if data:
+        try:
+            return decode_vector(data)
+        except VectorCodecError:
+            return None
+    if not legacy:
+        return None
+    try:
+        return np.asarray(json.loads(legacy), dtype=np.float32)
+    except (ValueError, TypeError):
+        return None
@@ -132,9 +132,10 @@
 #     return similarities[:top_n]
 # utils/vector_utils.py
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
 from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
 import re
 import os
 import pickle
@@ -150,6 +151,13 @@ logger = logging.getLogger("utils.vector_utils")
 _vectorizer = None
 _svd = None
 _vietnamese_stopwords = None
+# Chế độ băm (FEATURE_MODE=hashing): không có vocabulary, chỉ có mảng IDF nhỏ
+_hashing_vectorizer = None
+_hashing_idf = None
+_hashing_idf_loaded = False
+
+# Pattern mở rộng để bao gồm ký tự tiếng Việt (dùng chung cho TF-IDF và chế độ băm)
+_TOKEN_PATTERN = r'(?u)\b\w\w+\b|[^\s]+'
 
 def _get_vietnamese_stopwords() -> List[str]:
     """
@@ -216,13 +224,135 @@ def _get_vectorizer(force_new: bool = False) -> TfidfVectorizer:
             sublinear_tf=True,   # Áp dụng log-scaling cho tf
             lowercase=True,      # Chuyển đổi text thành chữ thường
             analyzer='word',     # Phân tích theo từ (thay vì ký tự)
-            token_pattern=r'(?u)\b\w\w+\b|[^\s]+'  # Pattern mở rộng để bao gồm ký tự tiếng Việt
+            token_pattern=_TOKEN_PATTERN
         )
         
         logger.info("Đã khởi tạo TF-IDF vectorizer mới")
     
     return _vectorizer
 
+def _get_hashing_vectorizer() -> HashingVectorizer:
+    """
+    Lấy vectorizer băm (signed feature hashing) cho FEATURE_MODE=hashing
+    
+    Cùng bộ phân tích với TF-IDF (stopwords, unigram + bigram) nhưng chỉ số
+    đặc trưng là hash MurmurHash3 cố định của n-gram: không cần huấn luyện,
+    không giữ vocabulary, và cho cùng kết quả ở mọi process.
+    
+    Returns:
+        HashingVectorizer: Vectorizer băm (không trạng thái)
+    """
+    global _hashing_vectorizer
+    
+    if _hashing_vectorizer is None or _hashing_vectorizer.n_features != settings.HASHING_N_FEATURES:
+        _hashing_vectorizer = HashingVectorizer(
+            n_features=settings.HASHING_N_FEATURES,
+            stop_words=_get_vietnamese_stopwords(),
+            ngram_range=(1, 2),
+            lowercase=True,
+            analyzer='word',
+            token_pattern=_TOKEN_PATTERN,
+            alternate_sign=True,  # Dấu theo hash để các va chạm triệt tiêu nhau thay vì cộng dồn
+            norm=None,            # Chuẩn hóa sau khi nhân IDF
+            dtype=np.float32
+        )
+    
+    return _hashing_vectorizer
+
+def compute_hashing_idf(document_frequency: np.ndarray, documents: int) -> np.ndarray:
+    """
+    Tính trọng số IDF (smooth, giống TfidfVectorizer) cho các bucket băm
+    
+    Args:
+        document_frequency: Số văn bản có mỗi bucket khác 0
+        documents: Tổng số văn bản
+        
+    Returns:
+        np.ndarray: Mảng float32 (HASHING_N_FEATURES,)
+    """
+    df = np.asarray(document_frequency, dtype=np.float64)
+    return (np.log((documents + 1) / (df + 1)) + 1).astype(np.float32)
+
+def save_hashing_idf(idf: np.ndarray, filepath: Optional[str] = None) -> bool:
+    """
+    Lưu mảng IDF của chế độ băm (file .npy, thay thế nguyên tử)
+    
+    Args:
+        idf: Mảng IDF
+        filepath: Đường dẫn (mặc định HASHING_IDF_PATH)
+        
+    Returns:
+        bool: True nếu lưu thành công
+    """
+    filepath = filepath or settings.HASHING_IDF_PATH
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        tmp_path = f"{filepath}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, np.asarray(idf, dtype=np.float32))
+        os.replace(tmp_path, filepath)
+        logger.info(f"Đã lưu IDF chế độ băm vào {filepath}")
+        return True
+    except Exception as e:
+        logger.error(f"Lỗi khi lưu IDF chế độ băm vào {filepath}: {str(e)}")
+        return False
+
+def load_hashing_idf(filepath: Optional[str] = None) -> bool:
+    """
+    Tải mảng IDF của chế độ băm
+    
+    Args:
+        filepath: Đường dẫn (mặc định HASHING_IDF_PATH)
+        
+    Returns:
+        bool: True nếu tải thành công; nếu không, chế độ băm chỉ dùng tần suất từ
+    """
+    global _hashing_idf, _hashing_idf_loaded
+    
+    filepath = filepath or settings.HASHING_IDF_PATH
+    _hashing_idf_loaded = True
+    try:
+        idf = np.load(filepath)
+        if idf.shape != (settings.HASHING_N_FEATURES,):
+            raise ValueError(f"kích thước {idf.shape} khác HASHING_N_FEATURES={settings.HASHING_N_FEATURES}")
+        _hashing_idf = idf.astype(np.float32)
+        logger.info(f"Đã tải IDF chế độ băm từ {filepath}")
+        return True
+    except Exception as e:
+        logger.warning(f"Không tải được IDF chế độ băm từ {filepath}: {str(e)}. Chỉ dùng tần suất từ")
+        _hashing_idf = None
+        return False
+
+def _hashing_features(processed_texts: List[str]) -> sp.csr_matrix:
+    """
+    Đặc trưng chế độ băm: tf log có dấu * IDF, chuẩn hóa L2
+    
+    Args:
+        processed_texts: Các văn bản đã tiền xử lý
+        
+    Returns:
+        sp.csr_matrix: Ma trận (len(processed_texts), HASHING_N_FEATURES)
+    """
+    if not _hashing_idf_loaded and os.path.exists(settings.HASHING_IDF_PATH):
+        load_hashing_idf()
+    
+    matrix = _get_hashing_vectorizer().transform(processed_texts).tocsr()
+    # Va chạm trái dấu có thể triệt tiêu về 0
+    matrix.eliminate_zeros()
+    # sublinear_tf như TF-IDF, giữ dấu của hash
+    matrix.data = np.sign(matrix.data) * (1 + np.log(np.abs(matrix.data)))
+    if _hashing_idf is not None:
+        matrix.data *= _hashing_idf[matrix.indices]
+    return normalize(matrix, norm='l2', copy=False)
+
+def feature_dim() -> int:
+    """
+    Số chiều vector đặc trưng theo FEATURE_MODE hiện tại
+    """
+    if settings.FEATURE_MODE == "hashing":
+        return settings.HASHING_N_FEATURES
+    vectorizer = _get_vectorizer()
+    return len(vectorizer.vocabulary_) if hasattr(vectorizer, 'vocabulary_') else DEFAULT_FEATURE_DIM
+
 def _get_svd_reducer(n_components: int = 300, force_new: bool = False) -> TruncatedSVD:
     """
     Lấy hoặc khởi tạo SVD reducer để giảm chiều vector
@@ -264,6 +394,26 @@ def load_vectorizer(filepath: str) -> bool:
         _vectorizer = _get_vectorizer(force_new=True)
         return False
 
+def load_svd_reducer(filepath: str) -> bool:
+    """
+    Tải bộ giảm chiều đã huấn luyện cùng vectorizer (TruncatedSVD hoặc IncrementalPCA)
+    
+    Args:
+        filepath: Đường dẫn đến file reducer
+        
+    Returns:
+        bool: True nếu tải thành công, False nếu không
+    """
+    global _svd
+    
+    try:
+        _svd = joblib.load(filepath)
+        logger.info(f"Đã tải SVD reducer từ {filepath}")
+        return True
+    except Exception as e:
+        logger.error(f"Lỗi khi tải SVD reducer từ {filepath}: {str(e)}")
+        return False
+
 def save_vectorizer(filepath: str) -> bool:
     """
     Lưu vectorizer hiện tại vào file
@@ -332,6 +482,53 @@ def preprocess_text(text: str) -> str:
     
     return text
 
+# Số chiều mặc định khi vectorizer chưa được huấn luyện
+DEFAULT_FEATURE_DIM = 10000
+
+def _zero_features(rows: int, dim: int = DEFAULT_FEATURE_DIM) -> sp.csr_matrix:
+    return sp.csr_matrix((rows, dim), dtype=np.float64)
+
+def extract_features_batch(texts: List[str]) -> sp.csr_matrix:
+    """
+    Trích xuất đặc trưng TF-IDF cho nhiều văn bản bằng một lần transform
+    
+    Ma trận giữ dạng thưa (CSR): mỗi hàng chỉ lưu vài chục giá trị khác 0
+    thay vì 10000 số thực. Với FEATURE_MODE=hashing dùng vectorizer băm
+    (không cần huấn luyện, HASHING_N_FEATURES chiều).
+    
+    Args:
+        texts: Danh sách văn bản đầu vào
+        
+    Returns:
+        sp.csr_matrix: Ma trận (len(texts), số đặc trưng); hàng rỗng với văn bản rỗng
+    """
+    if settings.FEATURE_MODE == "hashing":
+        return _hashing_features([preprocess_text(text) if text else "" for text in texts])
+    
+    vectorizer = _get_vectorizer()
+    if not hasattr(vectorizer, 'vocabulary_'):
+        logger.warning("Vectorizer chưa được huấn luyện, sử dụng vector 0")
+        return _zero_features(len(texts))
+    
+    processed_texts = [preprocess_text(text) if text else "" for text in texts]
+    try:
+        return vectorizer.transform(processed_texts).tocsr()
+    except ValueError as e:
+        logger.error(f"Lỗi khi vector hóa văn bản: {e}. Trả về vector 0.")
+        return _zero_features(len(texts), len(vectorizer.vocabulary_))
+
+def extract_features_sparse(text: str) -> sp.csr_matrix:
+    """
+    Trích xuất vector đặc trưng dạng thưa (một hàng CSR) từ văn bản
+    
+    Args:
+        text: Văn bản đầu vào
+        
+    Returns:
+        sp.csr_matrix: Ma trận (1, số đặc trưng)
+    """
+    return extract_features_batch([text])
+
 def extract_features(text: str, reduce_dim: bool = False) -> np.ndarray:
     """
     Trích xuất vector đặc trưng từ văn bản
@@ -341,7 +538,7 @@ def extract_features(text: str, reduce_dim: bool = False) -> np.ndarray:
         reduce_dim: Có giảm chiều vector không
         
     Returns:
-        np.ndarray: Vector đặc trưng
+        np.ndarray: Vector đặc trưng (dạng đặc, xem extract_features_sparse cho dạng thưa)
     """
     if not text:
         if reduce_dim:
@@ -350,45 +547,270 @@ def extract_features(text: str, reduce_dim: bool = False) -> np.ndarray:
         else:
             return np.array([])
     
-    # Lấy vectorizer
-    vectorizer = _get_vectorizer()
-    
-    # Tiền xử lý văn bản
-    processed_text = preprocess_text(text)
+    if not preprocess_text(text).strip():
+        return np.zeros(feature_dim())
     
-    if not processed_text.strip():
-        return np.zeros(10000)
-
-    try:
-#        vector = vectorizer.fit_transform([processed_text]).toarray()[0]
-        # Thay vì fit_transform, chỉ sử dụng transform
-        # Nếu vectorizer chưa được fit, hãy trả về vector 0
-        if not hasattr(vectorizer, 'vocabulary_'):
-            logger.warning("Vectorizer chưa được huấn luyện, sử dụng vector 0")
-            return np.zeros(10000)
-            
-        vector = vectorizer.transform([processed_text]).toarray()[0]
-    except ValueError as e:
-        logging.error("Error in vectorizer.fit_transform: %s. Returning zero vector.", e)
-        vector = np.zeros(10000)
+    vector = extract_features_sparse(text)
     
-    # Giảm chiều nếu được yêu cầu
+    # Giảm chiều nếu được yêu cầu (SVD nhận trực tiếp ma trận thưa)
     if reduce_dim:
         svd = _get_svd_reducer()
-        if not hasattr(svd, 'components_'):
-            logger.warning("SVD chưa được huấn luyện, không thể giảm chiều vector")
-            # Trả về vector đặc mật (sparse) dưới dạng mảng đặc (dense)
-            return vector
-        
-        reduced_vector = svd.transform(vector.reshape(1, -1))
-        return reduced_vector[0]
+        if hasattr(svd, 'components_'):
+            return svd.transform(vector)[0]
+        logger.warning("SVD chưa được huấn luyện, không thể giảm chiều vector")
     
     # Trả về vector dưới dạng mảng đặc (dense)
-    return vector
+    return vector.toarray()[0]
+
+def _as_row(vector) -> Optional[Union[np.ndarray, sp.csr_matrix]]:
+    """Đưa vector (đặc hoặc thưa) về dạng một hàng (1, d); None nếu rỗng"""
+    if vector is None:
+        return None
+    if sp.issparse(vector):
+        row = vector.tocsr()
+        if row.shape[0] != 1:
+            row = row.reshape(1, -1).tocsr()
+        return row if row.shape[1] else None
+    row = np.asarray(vector, dtype=np.float64)
+    if row.size == 0:
+        return None
+    return row.reshape(1, -1)
+
+def _stack_rows(vectors, dim: int) -> Tuple[Optional[Union[np.ndarray, sp.csr_matrix]], List[int]]:
+    """
+    Ghép danh sách vector thành một ma trận, bỏ qua vector rỗng hoặc sai kích thước
+    
+    Returns:
+        (ma trận hoặc None, vị trí của các hàng trong danh sách gốc)
+    """
+    if sp.issparse(vectors) or (isinstance(vectors, np.ndarray) and vectors.ndim == 2):
+        if vectors.shape[1] != dim:
+            logger.warning(f"Kích thước ma trận không khớp ({vectors.shape[1]} vs {dim})")
+            return None, []
+        return (vectors.tocsr() if sp.issparse(vectors) else vectors), list(range(vectors.shape[0]))
+    
+    rows, positions = [], []
+    for i, vec in enumerate(vectors):
+        row = _as_row(vec)
+        if row is None:
+            continue
+        if row.shape[1] != dim:
+            logger.warning(f"Bỏ qua vector {i}: Kích thước không khớp ({row.shape[1]} vs {dim})")
+            continue
+        rows.append(row)
+        positions.append(i)
+    if not rows:
+        return None, []
+    if any(sp.issparse(row) for row in rows):
+        return sp.vstack([sp.csr_matrix(row) for row in rows], format='csr'), positions
+    return np.vstack(rows), positions
+
+def normalize_rows(matrix) -> np.ndarray:
+    """
+    Sao chép ma trận đặc thành float32 liền bộ nhớ, các hàng chuẩn hóa L2
+
+    Hàng toàn 0 được giữ nguyên (độ tương tự với mọi truy vấn là 0).
+    """
+    matrix = np.array(matrix, dtype=np.float32, order='C', ndmin=2)
+    norms = np.sqrt(np.einsum('ij,ij->i', matrix, matrix))
+    norms[norms == 0] = 1.0
+    matrix /= norms[:, None]
+    return matrix
+
+def chunked_top_k(queries: np.ndarray, matrix: np.ndarray, k: int,
+                  threshold: Optional[float] = None,
+                  block_rows: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k hàng của ma trận cho nhiều truy vấn, nhân theo từng khối hàng
+
+    queries và matrix phải đã qua normalize_rows, khi đó tích vô hướng chính
+    là cosine. Mỗi khối block_rows hàng được nhân với một nhóm truy vấn, chỉ k
+    điểm tốt nhất của khối (argpartition) được gộp với kết quả trước, nên bộ
+    nhớ tạm không phụ thuộc số hàng của ma trận.
+
+    Args:
+        queries: Ma trận truy vấn (q, d) float32
+        matrix: Ma trận ứng viên (n, d) float32
+        k: Số kết quả mỗi truy vấn
+        threshold: Ngưỡng tương tự tối thiểu
+        block_rows: Số hàng ứng viên mỗi khối (mặc định SIMILARITY_BLOCK_ROWS)
+
+    Returns:
+        (chỉ số (q, k), điểm (q, k)) giảm dần theo từng hàng, cùng điểm thì
+        chỉ số nhỏ đứng trước; ô không có kết quả có chỉ số -1 và điểm -inf
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    matrix = np.asarray(matrix, dtype=np.float32)
+    n = matrix.shape[0]
+    k = max(0, min(k, n))
+    indices = np.full((queries.shape[0], k), -1, dtype=np.int64)
+    scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+    if k == 0 or queries.shape[0] == 0:
+        return indices, scores
+
+    block_rows = max(k, block_rows or settings.SIMILARITY_BLOCK_ROWS)
+    # Giới hạn khối điểm (nhóm truy vấn x khối hàng) ở khoảng block_rows * 64 phần tử
+    query_rows = max(1, block_rows * 64 // min(n, block_rows))
+    for q_start in range(0, queries.shape[0], query_rows):
+        group = queries[q_start:q_start + query_rows]
+        best_indices = indices[q_start:q_start + query_rows]
+        best_scores = scores[q_start:q_start + query_rows]
+        if k == n:
+            # Lấy tất cả: không cần gộp, chỉ tính điểm theo khối rồi sắp xếp
+            best_scores = np.empty((group.shape[0], n), dtype=np.float32)
+            for start in range(0, n, block_rows):
+                best_scores[:, start:start + block_rows] = group @ matrix[start:start + block_rows].T
+            best_indices = np.broadcast_to(np.arange(n), best_scores.shape)
+        for start in range(0, n if k < n else 0, block_rows):
+            block = group @ matrix[start:start + block_rows].T
+            if block.shape[1] > k:
+                part = np.argpartition(block, -k, axis=1)[:, -k:]
+                block = np.take_along_axis(block, part, axis=1)
+            else:
+                part = np.broadcast_to(np.arange(block.shape[1]), block.shape)
+            merged_scores = np.concatenate([best_scores, block], axis=1)
+            merged_indices = np.concatenate([best_indices, part + start], axis=1)
+            keep = np.argpartition(merged_scores, -k, axis=1)[:, -k:]
+            best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+            best_indices = np.take_along_axis(merged_indices, keep, axis=1)
+        order = np.lexsort((best_indices, -best_scores), axis=1)
+        scores[q_start:q_start + query_rows] = np.take_along_axis(best_scores, order, axis=1)
+        indices[q_start:q_start + query_rows] = np.take_along_axis(best_indices, order, axis=1)
+
+    if threshold is not None:
+        below = scores < threshold
+        scores[below] = -np.inf
+        indices[below] = -1
+    return indices, scores
+
+class SimilarityMatrix:
+    """
+    Tập vector ứng viên cho các truy vấn cosine lặp lại
+
+    Vector được ghép một lần thành ma trận float32 liền bộ nhớ và chuẩn hóa
+    L2, mỗi truy vấn sau đó chỉ còn là phép nhân theo khối (chunked_top_k).
+    """
+
+    def __init__(self, vectors, dim: Optional[int] = None, normalized: bool = False):
+        """
+        Args:
+            vectors: Danh sách vector, hoặc ma trận (n, d) đặc/CSR
+            dim: Số chiều (mặc định lấy từ vector đầu tiên không rỗng);
+                vector rỗng hoặc sai kích thước bị bỏ qua
+            normalized: Các hàng đã là float32 chuẩn hóa L2, dùng trực tiếp không sao chép
+        """
+        if dim is None:
+            first = vectors if sp.issparse(vectors) else next(
+                (row for row in map(_as_row, vectors) if row is not None), None)
+            dim = first.shape[-1] if first is not None else 0
+        matrix, positions = _stack_rows(vectors, dim)
+        if matrix is None:
+            matrix = np.zeros((0, dim), dtype=np.float32)
+        elif sp.issparse(matrix):
+            matrix = matrix.toarray()
+        if normalized and matrix.dtype == np.float32 and matrix.flags.c_contiguous:
+            self.matrix = matrix
+        else:
+            self.matrix = normalize_rows(matrix)
+        self.positions = np.asarray(positions, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def search(self, queries, k: Optional[int] = 10,
+               threshold: Optional[float] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Top-k vector tương tự nhất cho từng truy vấn
+
+        Args:
+            queries: Một vector, danh sách vector hoặc ma trận (q, d)
+            k: Số kết quả tối đa mỗi truy vấn (None để lấy tất cả)
+            threshold: Ngưỡng tương tự tối thiểu
+
+        Returns:
+            Mỗi truy vấn một danh sách (vị trí trong danh sách gốc, độ tương tự),
+            giảm dần; truy vấn rỗng hoặc sai kích thước cho danh sách rỗng
+        """
+        if isinstance(queries, np.ndarray) and queries.ndim == 1:
+            queries = [queries]
+        results = [[] for _ in range(_count(queries))]
+        if not results or not len(self):
+            return results
+        rows, keep = _stack_rows(queries, self.dim)
+        if rows is None:
+            return results
 
-def compute_similarity(vec1: np.ndarray, vec2: np.ndarray) -> float:
+        rows = normalize_rows(rows.toarray() if sp.issparse(rows) else rows)
+        indices, scores = chunked_top_k(rows, self.matrix, len(self) if k is None else k, threshold=threshold)
+        for position, row_indices, row_scores in zip(keep, indices, scores):
+            found = row_indices >= 0
+            results[position] = list(zip(self.positions[row_indices[found]].tolist(),
+                                         row_scores[found].astype(float).tolist()))
+        return results
+
+def _cosine_scores(query, matrix) -> np.ndarray:
+    """
+    Độ tương tự cosine giữa một hàng truy vấn và mọi hàng của ma trận
+    
+    Ma trận thưa được chuẩn hóa L2 theo hàng rồi nhân với truy vấn (tích vô
+    hướng thưa, chi phí tỉ lệ với số phần tử khác 0).
+    """
+    if sp.issparse(matrix):
+        matrix = normalize(matrix, norm='l2', copy=True)
+        if sp.issparse(query):
+            return (matrix @ normalize(query, norm='l2').T).toarray().ravel()
+        query = query.ravel()
+    else:
+        matrix = np.asarray(matrix, dtype=np.float64)
+        norms = np.linalg.norm(matrix, axis=1)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms[:, None]
+        query = query.toarray().ravel() if sp.issparse(query) else query.ravel()
+    norm = np.linalg.norm(query)
+    if norm == 0:
+        return np.zeros(matrix.shape[0])
+    return np.asarray(matrix @ (query / norm)).ravel()
+
+def top_k_similar(query_vector, matrix, k: Optional[int] = 10,
+                  threshold: float = 0.0) -> List[Tuple[int, float]]:
+    """
+    Chọn k hàng của ma trận tương tự nhất với vector truy vấn
+    
+    Dùng argpartition nên chỉ k kết quả tốt nhất được sắp xếp; ma trận đặc
+    đi qua chunked_top_k (float32, nhân theo khối).
+    
+    Args:
+        query_vector: Vector truy vấn (đặc hoặc thưa)
+        matrix: Ma trận (n, d) đặc hoặc CSR
+        k: Số lượng kết quả tối đa (None để lấy tất cả)
+        threshold: Ngưỡng tương tự tối thiểu
+        
+    Returns:
+        List[Tuple[int, float]]: Danh sách (chỉ số hàng, độ tương tự), giảm dần
+    """
+    query = _as_row(query_vector)
+    if query is None or matrix is None or matrix.shape[0] == 0 or query.shape[1] != matrix.shape[1]:
+        return []
+    if not sp.issparse(matrix):
+        return SimilarityMatrix(matrix, dim=query.shape[1]).search(query, k=k, threshold=threshold)[0]
+    
+    scores = _cosine_scores(query, matrix)
+    candidates = np.flatnonzero(scores >= threshold)
+    if k is not None and candidates.size > k:
+        if k <= 0:
+            return []
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    # Sắp xếp ổn định: cùng điểm thì chỉ số nhỏ hơn đứng trước
+    candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+    return [(int(i), float(scores[i])) for i in candidates]
+
+def compute_similarity(vec1, vec2) -> float:
     """
-    Tính độ tương tự cosine giữa hai vector
+    Tính độ tương tự cosine giữa hai vector (đặc hoặc thưa)
     
     Args:
         vec1: Vector thứ nhất
@@ -397,130 +819,59 @@ def compute_similarity(vec1: np.ndarray, vec2: np.ndarray) -> float:
     Returns:
         float: Điểm tương tự (0-1)
     """
-    if vec1 is None or vec2 is None:
+    row1, row2 = _as_row(vec1), _as_row(vec2)
+    if row1 is None or row2 is None:
         return 0.0
     
-    if len(vec1) == 0 or len(vec2) == 0:
-        return 0.0
-    
-    # Reshape vectors nếu cần
-    if len(vec1.shape) == 1:
-        vec1 = vec1.reshape(1, -1)
-    if len(vec2.shape) == 1:
-        vec2 = vec2.reshape(1, -1)
-    
     # Kiểm tra kích thước
-    if vec1.shape[1] != vec2.shape[1]:
-        logger.warning(f"Không thể tính cosine similarity: Kích thước vector không khớp ({vec1.shape[1]} vs {vec2.shape[1]})")
-        # Có thể fallback về padding hoặc truncating, nhưng tốt nhất là báo lỗi
+    if row1.shape[1] != row2.shape[1]:
+        logger.warning(f"Không thể tính cosine similarity: Kích thước vector không khớp ({row1.shape[1]} vs {row2.shape[1]})")
         return 0.0
     
-    # Tính độ tương tự
-    sim = cosine_similarity(vec1, vec2)[0][0]
-    
-    return float(sim)
+    return float(_cosine_scores(row1, row2)[0])
 
-def find_similar_vectors(query_vector: np.ndarray, vectors: List[np.ndarray], 
-                         threshold: float = 0.7, top_n: int = 10) -> List[Tuple[int, float]]:
+def find_similar_vectors(query_vector, vectors, threshold: float = 0.7,
+                         top_n: int = 10) -> List[Tuple[int, float]]:
     """
     Tìm các vector tương tự với vector truy vấn
     
     Args:
-        query_vector: Vector truy vấn
-        vectors: Danh sách vector để so sánh
+        query_vector: Vector truy vấn (đặc hoặc thưa)
+        vectors: Danh sách vector, hoặc ma trận (n, d) đặc/CSR
         threshold: Ngưỡng tương tự tối thiểu
         top_n: Số lượng kết quả tối đa trả về
         
     Returns:
         List[Tuple[int, float]]: Danh sách các tuple (index, độ tương tự)
     """
-    if query_vector is None or len(vectors) == 0:
+    query = _as_row(query_vector)
+    if query is None or vectors is None or _count(vectors) == 0:
         return []
     
-    # Reshape query vector
-    if len(query_vector.shape) == 1:
-        query_vector = query_vector.reshape(1, -1)
-    
-    similarities = []
-    
-    for i, vec in enumerate(vectors):
-        if vec is None or len(vec) == 0:
-            continue
-            
-        # Reshape vector
-        if len(vec.shape) == 1:
-            vec = vec.reshape(1, -1)
-        
-        # Kiểm tra kích thước
-        if vec.shape[1] != query_vector.shape[1]:
-            logger.warning(f"Bỏ qua vector {i}: Kích thước không khớp ({vec.shape[1]} vs {query_vector.shape[1]})")
-            continue
-        
-        # Tính độ tương tự
-        sim = compute_similarity(query_vector, vec)
-        
-        if sim >= threshold:
-            similarities.append((i, float(sim)))
-    
-    # Sắp xếp theo độ tương tự (giảm dần)
-    similarities.sort(key=lambda x: x[1], reverse=True)
-    
-    # Trả về top N kết quả
-    return similarities[:top_n]
+    matrix, positions = _stack_rows(vectors, query.shape[1])
+    return [(positions[i], sim) for i, sim in top_k_similar(query, matrix, k=top_n, threshold=threshold)]
 
-def batch_compute_similarity(query_vector: np.ndarray, vectors: List[np.ndarray], 
-                            threshold: float = 0.0) -> List[Tuple[int, float]]:
+def batch_compute_similarity(query_vector, vectors, threshold: float = 0.0) -> List[Tuple[int, float]]:
     """
     Tính độ tương tự hàng loạt giữa một vector truy vấn và nhiều vector khác
     
     Args:
-        query_vector: Vector truy vấn
-        vectors: Danh sách vector để so sánh
+        query_vector: Vector truy vấn (đặc hoặc thưa)
+        vectors: Danh sách vector, hoặc ma trận (n, d) đặc/CSR
         threshold: Ngưỡng tương tự tối thiểu
         
     Returns:
         List[Tuple[int, float]]: Danh sách các tuple (index, độ tương tự)
     """
-    if query_vector is None or len(vectors) == 0:
+    query = _as_row(query_vector)
+    if query is None or vectors is None or _count(vectors) == 0:
         return []
     
-    # Reshape query vector
-    if len(query_vector.shape) == 1:
-        query_vector = query_vector.reshape(1, -1)
-    
-    # Lọc các vector có cùng kích thước với query_vector
-    valid_vectors = []
-    valid_indices = []
-    
-    for i, vec in enumerate(vectors):
-        if vec is None or len(vec) == 0:
-            continue
-            
-        # Reshape vector
-        if len(vec.shape) == 1:
-            vec = vec.reshape(1, -1)
-        
-        # Kiểm tra kích thước
-        if vec.shape[1] == query_vector.shape[1]:
-            valid_vectors.append(vec)
-            valid_indices.append(i)
-    
-    if not valid_vectors:
-        return []
-    
-    # Ghép các vector lại thành một ma trận
-    matrix = np.vstack(valid_vectors)
-    
-    # Tính độ tương tự hàng loạt
-    similarities = cosine_similarity(query_vector, matrix)[0]
-    
-    # Lọc các kết quả trên ngưỡng
-    results = [(valid_indices[i], float(sim)) for i, sim in enumerate(similarities) if sim >= threshold]
-    
-    # Sắp xếp theo độ tương tự (giảm dần)
-    results.sort(key=lambda x: x[1], reverse=True)
-    
-    return results
+    matrix, positions = _stack_rows(vectors, query.shape[1])
+    return [(positions[i], sim) for i, sim in top_k_similar(query, matrix, k=None, threshold=threshold)]
+
+def _count(vectors) -> int:
+    return vectors.shape[0] if sp.issparse(vectors) else len(vectors)
 
 def train_vectorizer_on_corpus(corpus: List[str], max_features: int = 10000, 
                               save_path: Optional[str] = None) -> TfidfVectorizer:
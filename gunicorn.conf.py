@@ -0,0 +1,81 @@
+"""
+Gunicorn configuration: preload the app in the master, then fork workers
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The master imports the application once and maps the ONNX model weights into
+read-only, page-aligned memory (backend/services/shared_weights.py). Forked
+workers inherit the mappings copy-on-write, so N workers keep one physical
+copy of the weights instead of N.
+
+TensorFlow is not fork-safe once it has run a graph, so models are never
+built in the master: each worker builds its own in post_worker_init. With
+INFERENCE_BACKEND=onnx and MODEL_SHARED_WEIGHTS=True the worker sessions read
+their weights from the shared mappings.
+
+Measure shared vs private memory per worker:
+    python -m backend.services.shared_weights --master <master pid>
+"""
+
+import os
+import multiprocessing
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '7860')}")
+workers = int(os.getenv("GUNICORN_WORKERS", str(min(4, multiprocessing.cpu_count()))))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "uvicorn.workers.UvicornWorker")
+preload_app = os.getenv("GUNICORN_PRELOAD", "True").lower() == "true"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+accesslog = "-"
+errorlog = "-"
+
+# Whether workers should load their models at startup (MODEL_PRELOAD before we override it)
+_warm_up_workers = os.getenv("MODEL_PRELOAD", "True").lower() == "true"
+
+if preload_app:
+    # Importing the app in the master must not build TensorFlow models
+    os.environ["MODEL_PRELOAD"] = "False"
+    os.environ["SERVER_FORK_PRELOAD"] = "1"
+
+
+def on_starting(server):
+    """Map shared model weights in the master, before any worker forks"""
+    if not preload_app:
+        return
+    from backend.config.settings import settings
+
+    # Workers only read the mappings with INFERENCE_BACKEND=onnx and MODEL_SHARED_WEIGHTS=True;
+    # otherwise writing .weights files in the master is wasted work
+    if not settings.MODEL_SHARED_WEIGHTS or settings.INFERENCE_BACKEND != "onnx":
+        server.log.info("Shared weights disabled (needs INFERENCE_BACKEND=onnx and MODEL_SHARED_WEIGHTS=True)")
+        return
+    from backend.services.shared_weights import preload_shared_weights
+
+    mapped = preload_shared_weights()
+    server.log.info(f"Preloaded shared weights: {mapped or 'none (no ONNX-served models)'}")
+
+
+def post_fork(server, worker):
+    """Drop connections inherited from the master"""
+    # Pooled DB connections must not be shared between processes; redis-py
+    # resets its own pool when it sees a new pid
+    try:
+        from backend.db.models.base import engine
+        engine.dispose(close=False)
+    except Exception as e:
+        server.log.warning(f"Could not reset DB pool after fork: {e}")
+
+
+def post_worker_init(worker):
+    """Build the models in the worker process"""
+    if not preload_app:
+        return
+    import sys
+
+    app_module = sys.modules.get("app")
+    if app_module is not None and hasattr(app_module, "init_model"):
+        app_module.init_model()
+
+    if _warm_up_workers:
+        from backend.services.ml_model import warm_up_models
+        loaded = warm_up_models()
+        worker.log.info(f"Worker {worker.pid} loaded {loaded} model instance(s)")
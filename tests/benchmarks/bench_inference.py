@@ -0,0 +1,169 @@
+"""
+Benchmark: Inference Hot Path
+
+Measures p50/p95/p99 latency and throughput of each step a prediction goes
+through: preprocess_text, preprocess_for_spam_detection, MLModel.preprocess,
+MLModel.predict, MLModel.predict_batch across batch sizes, the batched spam
+heuristics and extract_features / extract_features_batch, for short, medium and long comments.
+
+Runs offline: the model is the seeded dummy LSTM from
+MLModel._create_dummy_model with a tokenizer and TF-IDF vectorizer fitted on
+the synthetic corpus, and the prediction cache is disabled so every call
+pays for the model.
+
+Usage:
+    python -m tests.benchmarks.bench_inference --output baseline.json
+    python -m tests.benchmarks.bench_inference --compare baseline.json --tolerance 0.2
+    python -m tests.benchmarks.bench_inference --quick --only predict_batch
+
+--compare exits with status 1 when a benchmark regressed beyond the tolerance.
+"""
+
+import sys
+import random
+import argparse
+from typing import Dict, List
+
+import numpy as np
+
+from backend.config.settings import settings
+from tests.benchmarks.bench_spam_features import synthetic_comments
+from tests.benchmarks.harness import (
+    compare_reports, load_report, measure, print_comparison, print_results, write_report
+)
+
+# Word count ranges per text-length distribution (long exceeds the model's max_length)
+LENGTH_DISTRIBUTIONS = {
+    "short": (3, 15),
+    "medium": (20, 60),
+    "long": (100, 300),
+}
+
+
+def synthetic_texts(count: int, distribution: str, seed: int = 0) -> List[str]:
+    """Comments of the given length distribution, built from the spam benchmark corpus"""
+    low, high = LENGTH_DISTRIBUTIONS[distribution]
+    rng = random.Random(seed)
+    words = " ".join(synthetic_comments(2000, seed=seed)).split()
+    texts = []
+    for _ in range(count):
+        length = rng.randint(low, high)
+        start = rng.randrange(len(words) - high)
+        texts.append(" ".join(words[start:start + length]))
+    return texts
+
+
+def offline_model(corpus: List[str], seed: int = 0):
+    """Dummy LSTM with seeded weights and a tokenizer fitted on the corpus"""
+    import tensorflow as tf
+    from backend.services.ml_model import MLModel
+    from backend.services.prediction_cache import reset_prediction_cache
+    from backend.utils.text_processing import preprocess_text
+
+    settings.MODEL_PRELOAD = False
+    settings.PREDICTION_CACHE_ENABLED = False
+    reset_prediction_cache()
+
+    tf.keras.utils.set_random_seed(seed)
+    model = MLModel()
+    model.model_type = "lstm"
+    model._create_dummy_model()
+    model.tokenizer.fit_on_texts([preprocess_text(text) for text in corpus])
+    return model
+
+
+def batches(texts: List[str], batch_size: int, calls: int) -> List[List[str]]:
+    """`calls` batches of batch_size texts, cycling through the texts"""
+    return [
+        [texts[(call * batch_size + i) % len(texts)] for i in range(batch_size)]
+        for call in range(calls)
+    ]
+
+
+def run(args) -> Dict[str, Dict[str, float]]:
+    from backend.utils import vector_utils
+    from backend.utils.text_processing import preprocess_for_spam_detection, preprocess_text
+
+    texts_by_distribution = {
+        name: synthetic_texts(args.texts, name, seed=args.seed) for name in args.distributions
+    }
+    corpus = [text for texts in texts_by_distribution.values() for text in texts]
+    model = offline_model(corpus, seed=args.seed)
+    vector_utils.train_vectorizer_on_corpus(corpus)
+
+    rng = np.random.default_rng(args.seed)
+    results = {}
+
+    def bench(name, fn, inputs, items_per_call=1, rounds=args.rounds):
+        if args.only and not any(part in name for part in args.only):
+            return
+        results[name] = measure(fn, inputs, items_per_call=items_per_call, rounds=rounds)
+        print(f"  {name}", file=sys.stderr)
+
+    for distribution, texts in texts_by_distribution.items():
+        model_texts = texts[:args.model_calls]
+        bench(f"preprocess_text/{distribution}", preprocess_text, texts)
+        bench(f"preprocess_for_spam_detection/{distribution}", preprocess_for_spam_detection, texts)
+        bench(f"extract_features/{distribution}", vector_utils.extract_features, texts)
+        bench(f"model_preprocess/{distribution}", model.preprocess, model_texts)
+        bench(f"predict/{distribution}", model.predict, model_texts, rounds=1)
+
+        for batch_size in args.batch_sizes:
+            calls = max(args.min_batch_calls, args.model_calls // batch_size)
+            text_batches = batches(texts, batch_size, calls)
+            bench(f"predict_batch/{distribution}/bs={batch_size}", model.predict_batch,
+                  text_batches, items_per_call=batch_size, rounds=1)
+            bench(f"extract_features_batch/{distribution}/bs={batch_size}", vector_utils.extract_features_batch,
+                  text_batches, items_per_call=batch_size)
+
+            # Low-confidence probabilities so every row goes through the spam features
+            inputs = [(batch, rng.dirichlet(np.ones(len(model.labels)), size=batch_size) * 0.7)
+                      for batch in text_batches]
+            bench(f"spam_heuristics/{distribution}/bs={batch_size}",
+                  lambda x: model._apply_spam_heuristics_batch(*x), inputs, items_per_call=batch_size)
+
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Inference hot path benchmark")
+    parser.add_argument("--texts", type=int, default=500, help="Texts per length distribution")
+    parser.add_argument("--model-calls", type=int, default=200, help="Texts per single-text model benchmark")
+    parser.add_argument("--min-batch-calls", type=int, default=20)
+    parser.add_argument("--batch-sizes", default="1,8,32,128")
+    parser.add_argument("--distributions", default=",".join(LENGTH_DISTRIBUTIONS))
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over the texts for the cheap steps")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", default="", help="Comma-separated name filters, e.g. predict_batch,extract")
+    parser.add_argument("--quick", action="store_true", help="Small sizes for a smoke run")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    args.batch_sizes = [int(b) for b in args.batch_sizes.split(",") if b.strip()]
+    args.distributions = [d for d in args.distributions.split(",") if d.strip()]
+    args.only = [o for o in args.only.split(",") if o.strip()]
+    if args.quick:
+        args.texts, args.model_calls, args.min_batch_calls, args.rounds = 100, 30, 5, 1
+
+    results = run(args)
+    print_results(results)
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    if args.output:
+        write_report(args.output, results, config)
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        baseline = load_report(args.compare)
+        rows = compare_reports(results, baseline["results"], args.tolerance)
+        regressions = print_comparison(rows, args.tolerance)
+        if regressions:
+            print(f"{regressions} benchmark(s) regressed")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
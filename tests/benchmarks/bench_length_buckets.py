@@ -0,0 +1,105 @@
+"""
+Benchmark: Length-bucketed Padding
+
+Compares the fixed max_length padding baseline with INFERENCE_LENGTH_BUCKETS
+on a synthetic social-media length distribution (mostly 5-20 tokens, with a
+long tail), and reports per-bucket latency and the largest probability
+deviation between the two modes.
+
+Usage:
+    python -m tests.benchmarks.bench_length_buckets
+    python -m tests.benchmarks.bench_length_buckets --texts 2000 --buckets 16,32,64 --rounds 5
+"""
+
+import argparse
+import time
+
+import numpy as np
+from tensorflow.keras.preprocessing.sequence import pad_sequences
+
+from backend.config.settings import settings
+from backend.services.ml_model import MLModel
+
+
+def synthetic_sequences(count: int, vocab_size: int, max_length: int, seed: int = 0):
+    """Token id sequences with a comment-like length distribution"""
+    rng = np.random.default_rng(seed)
+    lengths = np.clip(rng.lognormal(mean=2.4, sigma=0.6, size=count).astype(int), 1, max_length * 2)
+    return [list(rng.integers(1, vocab_size, size=length)) for length in lengths]
+
+
+class SequenceTokenizer:
+    """Stand-in tokenizer: the benchmark texts are already token ids"""
+
+    def __init__(self, sequences):
+        self.sequences = sequences
+
+    def texts_to_sequences(self, texts):
+        return [self.sequences[int(t)] for t in texts]
+
+
+def timed(fn, rounds: int):
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    return result, (time.perf_counter() - start) / rounds * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Length-bucketed padding benchmark")
+    parser.add_argument("--texts", type=int, default=1000)
+    parser.add_argument("--buckets", default="16,32,64")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--chunk-size", type=int, default=settings.INFERENCE_BATCH_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    settings.MODEL_PRELOAD = False
+    model = MLModel()
+    model._create_dummy_model()
+    keras_model = model.model
+
+    settings.INFERENCE_LENGTH_BUCKETS = args.buckets
+    buckets = model._length_buckets(keras_model)
+    max_length = buckets[-1]
+
+    sequences = synthetic_sequences(args.texts, model.max_words, max_length)
+    tokenizer = SequenceTokenizer(sequences)
+    texts = [str(i) for i in range(len(sequences))]
+    chunk_size = max(1, args.chunk_size)
+
+    def fixed():
+        inputs = pad_sequences(sequences, maxlen=max_length)
+        return np.vstack([
+            model._forward(keras_model, inputs[start:start + chunk_size])
+            for start in range(0, len(inputs), chunk_size)
+        ])
+
+    def bucketed():
+        return model._forward_bucketed(keras_model, texts, tokenizer, buckets, chunk_size)
+
+    baseline, baseline_ms = timed(fixed, args.rounds)
+    result, bucketed_ms = timed(bucketed, args.rounds)
+
+    lengths = np.array([len(seq) for seq in sequences])
+    bucket_ids = np.minimum(np.searchsorted(buckets, lengths), len(buckets) - 1)
+    dynamic = model._dynamic_length_model(keras_model)
+
+    print(f"{len(sequences)} texts, median length {int(np.median(lengths))} tokens, chunk size {chunk_size}")
+    print(f"{'bucket':>8} {'texts':>7} {'ms':>10} {'ms@fixed':>10}")
+    for bucket_id, bucket in enumerate(buckets):
+        rows = [sequences[r] for r in np.flatnonzero(bucket_ids == bucket_id)]
+        if not rows:
+            continue
+        _, bucket_ms = timed(lambda: model._forward(dynamic, pad_sequences(rows, maxlen=bucket)), args.rounds)
+        _, fixed_bucket_ms = timed(lambda: model._forward(keras_model, pad_sequences(rows, maxlen=max_length)), args.rounds)
+        print(f"{bucket:>8} {len(rows):>7} {bucket_ms:>10.1f} {fixed_bucket_ms:>10.1f}")
+
+    print(f"fixed-{max_length}: {baseline_ms:.1f} ms, bucketed: {bucketed_ms:.1f} ms "
+          f"({baseline_ms / bucketed_ms:.2f}x)")
+    print(f"max |p_bucketed - p_fixed| = {np.max(np.abs(result - baseline)):.2e}, "
+          f"argmax agreement = {np.mean(result.argmax(1) == baseline.argmax(1)):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: Top-k Similarity Kernel
+
+Measures top-k cosine search over 100k and 1M candidate vectors with the
+chunked kernel (SimilarityMatrix / chunked_top_k) for single queries and
+query batches, against the former per-vector path (sklearn
+cosine_similarity per candidate, then a sort of the full result list),
+which is only run up to --loop-max candidates and extrapolated beyond.
+
+Candidates are random Gaussian rows of VECTOR_INDEX_DIM columns, the width
+the vector index and feature store work at.
+
+Usage:
+    python -m tests.benchmarks.bench_similarity
+    python -m tests.benchmarks.bench_similarity --sizes 100000 --block-rows 1024,4096,16384
+    python -m tests.benchmarks.bench_similarity --output similarity.json --compare baseline.json
+"""
+
+import sys
+import time
+import argparse
+from typing import Dict
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from backend.config.settings import settings
+from backend.utils.vector_utils import SimilarityMatrix
+from tests.benchmarks.harness import (
+    compare_reports, load_report, measure, print_comparison, print_results, write_report
+)
+
+
+def random_vectors(count: int, dim: int, seed: int = 0, chunk: int = 100000) -> np.ndarray:
+    """(count, dim) float32 rows, generated in chunks to avoid a float64 copy"""
+    rng = np.random.default_rng(seed)
+    out = np.empty((count, dim), dtype=np.float32)
+    for start in range(0, count, chunk):
+        out[start:start + chunk] = rng.standard_normal((min(chunk, count - start), dim), dtype=np.float32)
+    return out
+
+
+def per_vector_top_k(query: np.ndarray, vectors, k: int):
+    """The former path: one cosine_similarity call per candidate, then a full sort"""
+    similarities = []
+    for i, vec in enumerate(vectors):
+        similarities.append((i, float(cosine_similarity(query.reshape(1, -1), vec.reshape(1, -1))[0][0])))
+    similarities.sort(key=lambda x: x[1], reverse=True)
+    return similarities[:k]
+
+
+def run(args) -> Dict[str, Dict[str, float]]:
+    results = {}
+    queries = random_vectors(max(args.query_batches), args.dim, seed=args.seed + 1)
+
+    for size in args.sizes:
+        candidates = random_vectors(size, args.dim, seed=args.seed)
+        start = time.perf_counter()
+        stored = SimilarityMatrix(candidates)
+        print(f"{size} x {args.dim}: stacked and normalized in {(time.perf_counter() - start) * 1000:.0f} ms",
+              file=sys.stderr)
+
+        for block_rows in args.block_rows:
+            settings.SIMILARITY_BLOCK_ROWS = block_rows
+            for batch in args.query_batches:
+                inputs = [queries[:batch]] * args.calls
+                results[f"kernel/n={size}/q={batch}/block={block_rows}"] = measure(
+                    lambda q: stored.search(q, k=args.k), inputs, items_per_call=batch, warmup=1
+                )
+                print(f"  kernel n={size} q={batch} block={block_rows}", file=sys.stderr)
+
+        loop_size = min(size, args.loop_max)
+        if loop_size:
+            vectors = list(candidates[:loop_size])
+            stats = measure(lambda q: per_vector_top_k(q, vectors, args.k), [queries[0]], warmup=0)
+            # Linear in the number of candidates: scale the latency to the full size
+            scale = size / loop_size
+            for key in ("p50_ms", "p95_ms", "p99_ms", "mean_ms"):
+                stats[key] *= scale
+            stats["throughput_per_s"] /= scale
+            stats["extrapolated_from"] = loop_size
+            results[f"per_vector/n={size}/q=1"] = stats
+            print(f"  per_vector n={size} (measured on {loop_size})", file=sys.stderr)
+        del stored, candidates
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Top-k similarity kernel benchmark")
+    parser.add_argument("--sizes", default="100000,1000000", help="Candidate counts")
+    parser.add_argument("--dim", type=int, default=settings.VECTOR_INDEX_DIM)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--query-batches", default="1,16", help="Queries per call")
+    parser.add_argument("--block-rows", default=str(settings.SIMILARITY_BLOCK_ROWS))
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--loop-max", type=int, default=20000, help="Largest candidate count for the per-vector path")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    args.sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    args.query_batches = [int(q) for q in args.query_batches.split(",") if q.strip()]
+    args.block_rows = [int(b) for b in args.block_rows.split(",") if b.strip()]
+
+    results = run(args)
+    print_results(results)
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    if args.output:
+        write_report(args.output, results, config)
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        baseline = load_report(args.compare)
+        rows = compare_reports(results, baseline["results"], args.tolerance)
+        regressions = print_comparison(rows, args.tolerance)
+        if regressions:
+            print(f"{regressions} benchmark(s) regressed")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Benchmark: Spam Feature Extraction
+
+Compares preprocess_for_spam_detection (Aho-Corasick automaton and
+precompiled regexes) with the previous implementation, kept below as
+legacy_preprocess_for_spam_detection, on a synthetic mix of clean comments
+and spam. The unit tests use the same legacy function as the golden
+reference.
+
+Usage:
+    python -m tests.benchmarks.bench_spam_features
+    python -m tests.benchmarks.bench_spam_features --texts 5000 --rounds 5
+"""
+
+import argparse
+import random
+import re
+import time
+from typing import Any, Dict, List, Tuple
+
+from backend.utils.aho_corasick import AHOCORASICK_AVAILABLE
+from backend.utils.text_processing import (
+    SPAM_KEYWORDS, SUSPICIOUS_DOMAINS,
+    preprocess_for_spam_detection, preprocess_for_spam_detection_batch
+)
+
+
+def legacy_preprocess_for_spam_detection(text: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Tiền xử lý đặc biệt cho việc phát hiện spam
+    
+    Args:
+        text: Văn bản cần phân tích
+        
+    Returns:
+        Tuple[str, Dict[str, Any]]: (Văn bản đã xử lý, đặc trưng spam)
+    """
+    if not text:
+        return "", {
+            'has_url': False,
+            'url_count': 0,
+            'has_suspicious_url': False,
+            'spam_keyword_count': 0,
+            'has_excessive_punctuation': False,
+            'has_all_caps_words': False,
+            'has_phone_number': False,
+            'has_price': False,
+            'has_suspicious_patterns': False,
+            'emoji_count': 0,
+            'capitalization_ratio': 0.0
+        }
+    
+    # Bản sao văn bản gốc để phân tích
+    original_text = text
+    
+    # Xử lý các URL
+    # Tìm tất cả các URL trong văn bản
+    url_pattern = r'https?://\S+|www\.\S+|bit\.ly/\S+|goo\.gl/\S+|t\.co/\S+|tinyurl\.com/\S+|fb\.me/\S+'
+    urls = re.findall(url_pattern, original_text)
+    
+    # Đánh dấu có URL
+    has_url = len(urls) > 0
+    
+    # Đếm số lượng URL
+    url_count = len(urls)
+    
+    # Kiểm tra các domain đáng ngờ trong spam
+    suspicious_domains = [
+        'bit.ly', 'goo.gl', 'tinyurl.com', 't.co', 'shorturl', 'tiny.cc', 'fb.me',
+        'clck.ru', 'ow.ly', 'j.mp', 'is.gd', 'rebrand.ly', 'soo.gd', 'x.co', 'tiny.ie'
+    ]
+    has_suspicious_url = any(domain in url.lower() for url in urls for domain in suspicious_domains)
+    
+    # Xử lý các từ khóa spam tiếng Việt phổ biến
+    spam_keywords = [
+        'giảm giá', 'khuyến mãi', 'siêu sale', 'mua ngay', 'giá sốc', 'giá rẻ', 'rẻ vô địch',
+        'liên hệ ngay', 'số lượng có hạn', 'cơ hội cuối', 'miễn phí', 'làm giàu', 'hot', 'sốc',
+        'kiếm tiền tại nhà', 'thu nhập thụ động', 'việc làm thêm', 'đầu tư', 'lợi nhuận cao',
+        'chiết khấu', 'sale off', 'freeship', 'mua 1 tặng 1', 'chỉ hôm nay', 'click ngay',
+        'cơ hội vàng', 'trúng thưởng', 'quà tặng', 'tri ân', 'ưu đãi', 'chỉ còn', 'trả góp',
+        'không lãi suất', 'săn sale', 'flash sale', 'đồng giá', 'thanh lý', 'mua sỉ', 'giao hàng',
+        'zalo', 'inbox', 'nhắn tin', 'liên hệ', 'hotline', 'bảo hành', 'đặt hàng', 'nhận chiết khấu'
+    ]
+    
+    # Chuẩn hóa văn bản để kiểm tra từ khóa
+    normalized_text = text.lower()
+    # Loại bỏ dấu câu
+    normalized_text = re.sub(r'[^\w\sÀÁÂÃÈÉÊÌÍÒÓÔÕÙÚĂĐĨŨƠàáâãèéêìíòóôõùúăđĩũơƯĂẠẢẤẦẨẪẬẮẰẲẴẶẸẺẼỀỀỂưăạảấầẩẫậắằẳẵặẹẻẽềềểỄỆỈỊỌỎỐỒỔỖỘỚỜỞỠỢỤỦỨỪễệỉịọỏốồổỗộớờởỡợụủứừỬỮỰỲỴÝỶỸửữựỳỵỷỹ]', ' ', normalized_text)
+    
+    # Đếm số từ khóa spam xuất hiện
+    spam_keyword_count = 0
+    for keyword in spam_keywords:
+        if keyword.lower() in normalized_text:
+            spam_keyword_count += 1
+    
+    # Kiểm tra số điện thoại
+    phone_pattern = r'(0|\+84)\s*\d{1,3}[\s.-]?\d{3,4}[\s.-]?\d{3,4}'
+    has_phone_number = bool(re.search(phone_pattern, original_text))
+    
+    # Kiểm tra giá tiền
+    price_pattern = r'\d+[.,]?\d*\s*([kK]|[đÐ]|VND|VNĐ|nghìn|triệu|[tT][rR])'
+    has_price = bool(re.search(price_pattern, original_text))
+    
+    # Đếm emoji
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F1E0-\U0001F1FF"  # flags (iOS)
+        "\U0001F300-\U0001F5FF"  # symbols & pictographs
+        "\U0001F600-\U0001F64F"  # emoticons
+        "\U0001F680-\U0001F6FF"  # transport & map symbols
+        "\U0001F700-\U0001F77F"  # alchemical symbols
+        "\U0001F780-\U0001F7FF"  # Geometric Shapes
+        "\U0001F800-\U0001F8FF"  # Supplemental Arrows-C
+        "\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
+        "\U0001FA00-\U0001FA6F"  # Chess Symbols
+        "\U0001FA70-\U0001FAFF"  # Symbols and Pictographs Extended-A
+        "\U00002702-\U000027B0"  # Dingbats
+        "\U000024C2-\U0001F251" 
+        "]+"
+    )
+    emojis = emoji_pattern.findall(original_text)
+    emoji_count = len(emojis)
+    
+    # Kiểm tra các đặc điểm đặc trưng của spam
+    has_excessive_punctuation = len(re.findall(r'[!?.]', text)) > 5
+    has_all_caps_words = len(re.findall(r'\b[A-Z]{3,}\b', text)) > 1
+    
+    # Tỷ lệ chữ hoa
+    if len(text) > 0:
+        upper_chars = sum(1 for c in text if c.isupper())
+        capitalization_ratio = upper_chars / len(text)
+    else:
+        capitalization_ratio = 0
+    
+    # Các mẫu đáng ngờ
+    suspicious_patterns = [
+        r'\d+\s*%', # Phần trăm
+        r'[cC][òoÒO][nN]\s*[íiÍI][tT]', # "còn ít" - dùng để tạo cảm giác khan hiếm
+        r'[hH][êeÊE][tT]\s*[hH][àaÀA][nN][gG]', # "hết hàng"
+        r'[mM][uU][aA]\s*[nN][gG][aA][yY]', # "mua ngay"
+        r'[lL][iI][êeÊE][nN]\s*[hH][eêÊE]', # "liên hệ"
+        r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b' # Email
+    ]
+    
+    has_suspicious_patterns = any(bool(re.search(pattern, text)) for pattern in suspicious_patterns)
+    
+    # Tạo đặc trưng bổ sung cho mô hình
+    spam_features = {
+        'has_url': has_url,
+        'url_count': url_count,
+        'has_suspicious_url': has_suspicious_url,
+        'spam_keyword_count': spam_keyword_count,
+        'has_excessive_punctuation': has_excessive_punctuation,
+        'has_all_caps_words': has_all_caps_words,
+        'has_phone_number': has_phone_number,
+        'has_price': has_price,
+        'has_suspicious_patterns': has_suspicious_patterns,
+        'emoji_count': emoji_count,
+        'capitalization_ratio': capitalization_ratio
+    }
+    
+    return text, spam_features
+
+
+FILLER = (
+    "bài viết này hay quá", "mình thấy không ổn lắm", "cảm ơn bạn đã chia sẻ", "đồ ngu",
+    "Hôm nay trời đẹp", "ai biết chỗ nào bán không", "THẬT SỰ QUÁ ĐÁNG", "haha", "ok",
+    "liên hệ em nhé", "con ít thôi", "Hết hàng rồi à?", "email: shop@example.vn",
+)
+EXTRAS = (
+    "https://{domain}/abc123", "www.{domain}/x", "http://example.com/{domain}", "0912 345 678",
+    "+84 98 765 4321", "giá 200k", "chỉ 1.5 triệu", "50% OFF", "😀😀", "🔥", "!!!", "???",
+    "SALE SALE", "MUA NGAY", "Liên Hệ", "CÒN ÍT",
+)
+
+
+def synthetic_comments(count: int, seed: int = 0) -> List[str]:
+    """Mostly short clean comments with a share of keyword/URL/phone heavy spam"""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        parts = [rng.choice(FILLER) for _ in range(rng.randint(1, 4))]
+        if rng.random() < 0.4:
+            parts += [rng.choice(SPAM_KEYWORDS) for _ in range(rng.randint(1, 4))]
+            parts += [rng.choice(EXTRAS).format(domain=rng.choice(SUSPICIOUS_DOMAINS))
+                      for _ in range(rng.randint(1, 3))]
+            if rng.random() < 0.3:
+                parts = [part.upper() for part in parts]
+        rng.shuffle(parts)
+        texts.append(" ".join(parts))
+    return texts
+
+
+def timed(fn, rounds: int):
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spam feature extraction benchmark")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = synthetic_comments(args.texts)
+    mismatches = sum(
+        legacy_preprocess_for_spam_detection(text) != preprocess_for_spam_detection(text) for text in texts
+    )
+
+    legacy_ms = timed(lambda: [legacy_preprocess_for_spam_detection(text) for text in texts], args.rounds)
+    single_ms = timed(lambda: [preprocess_for_spam_detection(text) for text in texts], args.rounds)
+    batch_ms = timed(lambda: preprocess_for_spam_detection_batch(texts), args.rounds)
+
+    engine = "pyahocorasick" if AHOCORASICK_AVAILABLE else "pure Python"
+    print(f"{len(texts)} texts, mean length {sum(map(len, texts)) / len(texts):.0f} chars, automaton: {engine}")
+    print(f"legacy:  {legacy_ms:8.1f} ms  ({legacy_ms * 1000 / len(texts):6.1f} us/text)")
+    print(f"single:  {single_ms:8.1f} ms  ({single_ms * 1000 / len(texts):6.1f} us/text)  {legacy_ms / single_ms:.2f}x")
+    print(f"batch:   {batch_ms:8.1f} ms  ({batch_ms * 1000 / len(texts):6.1f} us/text)  {legacy_ms / batch_ms:.2f}x")
+    print(f"feature mismatches vs legacy: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
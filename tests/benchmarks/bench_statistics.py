@@ -0,0 +1,147 @@
+"""
+Benchmark: /api/toxic/statistics Aggregates
+
+Builds a synthetic SQLite comments table (1M rows by default, reused when
+the file already exists) and times compute_statistics against the former
+route body, which ran five count() queries and bound every matching
+comment id three times (Comment.id.in_([c.id for c in query])), for
+several filter combinations. Also reports the cached path.
+
+Usage:
+    python -m tests.benchmarks.bench_statistics
+    python -m tests.benchmarks.bench_statistics --rows 200000 --db /tmp/stats.db --rounds 3
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from backend.config.settings import settings
+from backend.db.models import Comment
+from backend.db.models.base import Base
+from backend.services import comment_statistics
+from backend.services.comment_statistics import cached_statistics, comment_conditions, compute_statistics
+
+START = datetime(2026, 1, 1)
+PLATFORMS = ["facebook", "youtube", "tiktok", "twitter"]
+
+
+def build_database(path: str, rows: int, seed: int = 0, chunk: int = 50000):
+    """Synthetic comments: platform, label, confidence, source user, owner and creation time"""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    rng = np.random.default_rng(seed)
+    with engine.begin() as connection:
+        for start in range(0, rows, chunk):
+            count = min(chunk, rows - start)
+            platforms = rng.integers(len(PLATFORMS), size=count)
+            labels = rng.choice(4, size=count, p=[0.7, 0.15, 0.05, 0.1])
+            confidence = rng.random(count)
+            users = rng.integers(5000, size=count)
+            owners = rng.integers(1, 51, size=count)
+            minutes = np.sort(rng.integers(0, 365 * 24 * 60, size=count))
+            connection.execute(insert(Comment.__table__), [
+                {
+                    "content": "synthetic comment",
+                    "platform": PLATFORMS[platforms[i]],
+                    "prediction": int(labels[i]),
+                    "confidence": float(confidence[i]),
+                    "source_user_name": f"user{users[i]}",
+                    "user_id": int(owners[i]),
+                    "created_at": START + timedelta(minutes=int(minutes[i])),
+                }
+                for i in range(count)
+            ])
+            print(f"  inserted {start + count}/{rows}", file=sys.stderr)
+    engine.dispose()
+
+
+def legacy_statistics(db, platform=None, start_date=None, end_date=None, user_id=None, include_toxic_users=False):
+    """The former get_statistics body (five counts, then three id lists)"""
+    query = db.query(Comment).filter(*comment_conditions(platform, start_date, end_date, user_id))
+    total = query.count()
+    counts = [query.filter(Comment.prediction == label).count() for label in range(4)]
+    ids = lambda: [c.id for c in query]
+    platforms = db.query(Comment.platform, sa.func.count(Comment.id)).filter(
+        Comment.id.in_(ids())).group_by(Comment.platform).all()
+    confidence = db.query(sa.func.avg(Comment.confidence), sa.func.min(Comment.confidence),
+                          sa.func.max(Comment.confidence)).filter(Comment.id.in_(ids())).first()
+    toxic_users = []
+    if include_toxic_users:
+        toxic_users = db.query(Comment.source_user_name, sa.func.count(Comment.id).label('count')).filter(
+            Comment.id.in_(ids()), Comment.prediction.in_([1, 2, 3]), Comment.source_user_name != None
+        ).group_by(Comment.source_user_name).order_by(sa.desc('count')).limit(10).all()
+    return total, counts, dict(platforms), confidence, toxic_users
+
+
+def timed(fn, rounds: int):
+    durations = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return min(durations) * 1000.0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Statistics aggregate benchmark")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--db", default="/tmp/bench_statistics.db", help="SQLite file, built when missing")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--legacy-max-rows", type=int, default=200000,
+                        help="Skip the former path for filters matching more rows (it loads every row)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        build_database(args.db, args.rows, seed=args.seed)
+    engine = create_engine(f"sqlite:///{args.db}")
+    db = sessionmaker(bind=engine)()
+    rows = db.query(sa.func.count(Comment.id)).scalar()
+
+    scenarios = {
+        "all (admin)": {"include_toxic_users": True},
+        "platform (admin)": {"platform": "youtube", "include_toxic_users": True},
+        "platform + 30 days": {"platform": "youtube", "start_date": START + timedelta(days=100),
+                               "end_date": START + timedelta(days=130)},
+        "one user": {"user_id": 7},
+        "one user + 30 days": {"user_id": 7, "start_date": START + timedelta(days=100),
+                               "end_date": START + timedelta(days=130)},
+    }
+
+    print(f"{rows} comments in {args.db}")
+    print(f"{'filter':<22} {'matched':>9} {'legacy ms':>11} {'grouped ms':>11} {'cached ms':>10}")
+    for name, filters in scenarios.items():
+        grouped_ms = timed(lambda: compute_statistics(db, **filters), args.rounds)
+        stats = compute_statistics(db, **filters)
+
+        if stats["total"] <= args.legacy_max_rows:
+            try:
+                legacy_ms = f"{timed(lambda: legacy_statistics(db, **filters), 1):.1f}"
+            except sa.exc.OperationalError as e:
+                legacy_ms = "error"
+                print(f"  legacy failed: {str(e.orig)}", file=sys.stderr)
+                db.rollback()
+        else:
+            legacy_ms = "skipped"
+
+        settings.STATISTICS_CACHE_TTL = 60
+        comment_statistics.reset_statistics_cache()
+        cached_statistics(db, **filters)
+        cached_ms = timed(lambda: cached_statistics(db, **filters), args.rounds)
+        print(f"{name:<22} {stats['total']:>9} {legacy_ms:>11} {grouped_ms:>11.1f} {cached_ms:>10.3f}")
+
+    db.close()
+    engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
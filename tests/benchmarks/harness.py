@@ -0,0 +1,150 @@
+"""
+Benchmark Harness
+
+Latency percentiles, throughput, JSON reports and baseline comparison shared
+by the benchmark scripts.
+
+A report is {"meta": {...}, "results": {name: stats}} where stats holds
+p50_ms / p95_ms / p99_ms / mean_ms per call and throughput_per_s in items
+(texts) per second. compare_reports flags a benchmark as a regression when
+its p50 or p95 grew, or its throughput fell, by more than the tolerance.
+"""
+
+import gc
+import json
+import time
+import platform
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# (metric, True if higher is worse)
+COMPARED_METRICS = (("p50_ms", True), ("p95_ms", True), ("throughput_per_s", False))
+
+
+def latency_stats(durations: List[float], items_per_call: int = 1) -> Dict[str, float]:
+    """
+    Summarize per-call durations
+
+    Args:
+        durations: Seconds per call
+        items_per_call: Texts processed by one call (throughput unit)
+    """
+    samples = np.asarray(durations, dtype=np.float64) * 1000.0
+    total_seconds = float(np.sum(durations))
+    return {
+        "calls": int(samples.size),
+        "items_per_call": int(items_per_call),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "mean_ms": float(samples.mean()),
+        "throughput_per_s": samples.size * items_per_call / total_seconds if total_seconds else 0.0,
+    }
+
+
+def measure(
+    fn: Callable[[Any], Any],
+    inputs: List[Any],
+    items_per_call: int = 1,
+    rounds: int = 1,
+    warmup: int = 3
+) -> Dict[str, float]:
+    """
+    Time fn(x) once per input, for `rounds` passes over the inputs
+
+    The first `warmup` inputs are run untimed first; the garbage collector is
+    disabled while timing so collections do not land in the tail percentiles.
+    """
+    for x in inputs[:warmup]:
+        fn(x)
+
+    durations = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            for x in inputs:
+                start = time.perf_counter()
+                fn(x)
+                durations.append(time.perf_counter() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return latency_stats(durations, items_per_call)
+
+
+def environment() -> Dict[str, str]:
+    """Versions and host details recorded with every report"""
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+    try:
+        import tensorflow as tf
+        info["tensorflow"] = tf.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def write_report(path: str, results: Dict[str, Dict[str, float]], config: Optional[Dict[str, Any]] = None):
+    """Write a JSON report"""
+    report = {"meta": {**environment(), "config": config or {}}, "results": results}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_reports(
+    current: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float = 0.15
+) -> List[Dict[str, Any]]:
+    """
+    Compare result sets benchmark by benchmark
+
+    Returns:
+        One row per benchmark present in both: name, metric changes (ratio
+        current / baseline) and the metrics that regressed beyond the tolerance
+    """
+    rows = []
+    for name in sorted(set(current) & set(baseline)):
+        changes, regressed = {}, []
+        for metric, higher_is_worse in COMPARED_METRICS:
+            old, new = baseline[name].get(metric), current[name].get(metric)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            changes[metric] = ratio
+            if (ratio > 1.0 + tolerance) if higher_is_worse else (ratio < 1.0 - tolerance):
+                regressed.append(metric)
+        rows.append({"name": name, "changes": changes, "regressed": regressed})
+    return rows
+
+
+def print_results(results: Dict[str, Dict[str, float]]):
+    print(f"{'benchmark':<52} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'items/s':>11}")
+    for name, stats in results.items():
+        print(f"{name:<52} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} "
+              f"{stats['p99_ms']:>9.3f} {stats['throughput_per_s']:>11.1f}")
+
+
+def print_comparison(rows: List[Dict[str, Any]], tolerance: float) -> int:
+    """Print the comparison table; returns the number of regressed benchmarks"""
+    print(f"{'benchmark':<52} {'p50':>7} {'p95':>7} {'items/s':>8}  (current / baseline, tolerance {tolerance:.0%})")
+    regressions = 0
+    for row in rows:
+        cells = [f"{row['changes'].get(metric, float('nan')):>7.2f}" for metric, _ in COMPARED_METRICS]
+        flag = "  REGRESSION: " + ", ".join(row["regressed"]) if row["regressed"] else ""
+        regressions += bool(row["regressed"])
+        print(f"{row['name']:<52} {cells[0]} {cells[1]} {cells[2]:>8}{flag}")
+    return regressions
@@ -56,6 +56,19 @@ def db_session(test_engine) -> Generator[Session, None, None]:
         session.close()
 
 
+@pytest.fixture(scope="function")
+def memory_db_session() -> Generator[Session, None, None]:
+    """Create a session on a fresh in-memory database, for tests that count rows"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
 @pytest.fixture(scope="function")
 def client() -> Generator[TestClient, None, None]:
     """Create a test client"""
@@ -66,6 +79,22 @@ def client() -> Generator[TestClient, None, None]:
         yield test_client
 
 
+@pytest.fixture(scope="function")
+def tiny_keras_model():
+    """Factory for a small Embedding + LSTM classifier shaped like the production models"""
+    import tensorflow as tf
+
+    def build(max_length=12, vocab_size=500, units=32):
+        tf.keras.utils.set_random_seed(0)
+        inputs = tf.keras.Input(shape=(max_length,))
+        x = tf.keras.layers.Embedding(vocab_size, units)(inputs)
+        x = tf.keras.layers.LSTM(units)(x)
+        outputs = tf.keras.layers.Dense(4, activation="softmax")(x)
+        return tf.keras.Model(inputs=inputs, outputs=outputs)
+
+    return build
+
+
 @pytest.fixture(scope="function")
 def test_user_data():
     """Sample user data for testing"""
@@ -0,0 +1,144 @@
+"""
+Unit Tests for Micro-batching Scheduler
+
+Tests request coalescing with a stub model.
+"""
+
+import asyncio
+import threading
+import pytest
+from backend.services.batch_scheduler import MicroBatchScheduler
+
+
+class StubModel:
+    """Minimal MLModel stand-in recording batch sizes"""
+
+    model_type = "lstm"
+
+    def __init__(self):
+        self.batches = []
+        self.single_calls = []
+
+    def predict_batch(self, texts, model_type=None):
+        self.batches.append((list(texts), model_type))
+        return [(len(t) % 4, 0.9, {"text": t, "model_type": model_type}) for t in texts]
+
+    def predict(self, text, model_type=None):
+        self.single_calls.append((text, model_type))
+        return (0, 1.0, {"text": text, "model_type": model_type})
+
+
+class TestMicroBatchScheduler:
+    """Test micro-batching scheduler functionality"""
+
+    def test_concurrent_requests_share_batch(self):
+        """Concurrent requests are served by one forward pass"""
+        model = StubModel()
+        scheduler = MicroBatchScheduler(model, max_batch_size=16, max_wait_ms=50, enabled=True)
+
+        async def run():
+            texts = [f"text {i}" for i in range(10)]
+            results = await asyncio.gather(*(scheduler.predict(t) for t in texts))
+            await scheduler.stop()
+            return texts, results
+
+        texts, results = asyncio.run(run())
+
+        assert len(model.batches) == 1
+        assert sorted(model.batches[0][0]) == sorted(texts)
+        # Each caller receives the result for its own text
+        for text, result in zip(texts, results):
+            assert result[2]["text"] == text
+
+    def test_max_batch_size_respected(self):
+        """Batches never exceed max_batch_size"""
+        model = StubModel()
+        scheduler = MicroBatchScheduler(model, max_batch_size=4, max_wait_ms=20, enabled=True)
+
+        async def run():
+            await asyncio.gather(*(scheduler.predict(f"t{i}") for i in range(10)))
+            await scheduler.stop()
+
+        asyncio.run(run())
+
+        assert all(len(batch) <= 4 for batch, _ in model.batches)
+        assert sum(len(batch) for batch, _ in model.batches) == 10
+
+    def test_model_type_override_grouped_separately(self):
+        """Requests for another model type get their own forward pass"""
+        model = StubModel()
+        scheduler = MicroBatchScheduler(model, max_batch_size=8, max_wait_ms=20, enabled=True)
+
+        async def run():
+            results = await asyncio.gather(
+                scheduler.predict("a"),
+                scheduler.predict("b", model_type="cnn"),
+                scheduler.predict("c", model_type="lstm"),
+            )
+            await scheduler.stop()
+            return results
+
+        results = asyncio.run(run())
+
+        batches = {model_type: sorted(texts) for texts, model_type in model.batches}
+        assert batches == {None: ["a", "c"], "cnn": ["b"]}
+        assert results[1][2]["model_type"] == "cnn"
+
+    def test_disabled_calls_predict_directly(self):
+        """Disabled scheduler calls model.predict without queueing"""
+        model = StubModel()
+        scheduler = MicroBatchScheduler(model, enabled=False)
+
+        result = asyncio.run(scheduler.predict("hello"))
+
+        assert result[2]["text"] == "hello"
+        assert model.batches == []
+        assert scheduler.stats()["queue_depth"] == 0
+
+    def test_errors_propagate_to_callers(self):
+        """A failing forward pass raises in every awaiting caller"""
+        class FailingModel(StubModel):
+            def predict_batch(self, texts, model_type=None):
+                raise RuntimeError("boom")
+
+        scheduler = MicroBatchScheduler(FailingModel(), max_wait_ms=5, enabled=True)
+
+        async def run():
+            results = await asyncio.gather(
+                scheduler.predict("x"), scheduler.predict("y"), return_exceptions=True
+            )
+            await scheduler.stop()
+            return results
+
+        results = asyncio.run(run())
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_stop_fails_in_flight_batch(self):
+        """Callers whose batch is running when the scheduler stops don't hang"""
+        started, release = threading.Event(), threading.Event()
+
+        class SlowModel(StubModel):
+            def predict_batch(self, texts, model_type=None):
+                started.set()
+                release.wait(5)
+                return super().predict_batch(texts, model_type)
+
+        scheduler = MicroBatchScheduler(SlowModel(), max_wait_ms=5, enabled=True)
+
+        async def run():
+            pending = asyncio.gather(scheduler.predict("x"), scheduler.predict("y"), return_exceptions=True)
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            await scheduler.stop()
+            try:
+                return await asyncio.wait_for(pending, 1)
+            finally:
+                release.set()
+
+        results = asyncio.run(run())
+
+        assert all(isinstance(r, RuntimeError) and "stopped" in str(r) for r in results)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
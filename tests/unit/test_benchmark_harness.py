@@ -0,0 +1,69 @@
+"""
+Unit Tests for the Benchmark Harness
+
+Tests latency statistics, JSON reports and regression detection against a
+baseline.
+"""
+
+import pytest
+
+from tests.benchmarks.harness import compare_reports, latency_stats, load_report, measure, write_report
+
+
+def stats(p50, p95, throughput):
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p95, "mean_ms": p50, "throughput_per_s": throughput}
+
+
+class TestLatencyStats:
+    """Test percentile and throughput computation"""
+
+    def test_percentiles_and_throughput(self):
+        """Durations in seconds become millisecond percentiles and items per second"""
+        result = latency_stats([0.001] * 98 + [0.010, 0.100], items_per_call=10)
+
+        assert result["calls"] == 100
+        assert result["p50_ms"] == pytest.approx(1.0)
+        assert result["p99_ms"] > 10.0
+        assert result["throughput_per_s"] == pytest.approx(1000 / 0.208)
+
+    def test_measure_counts_every_call(self):
+        """Each input is timed once per round, warmup calls are not timed"""
+        calls = []
+        result = measure(calls.append, [1, 2, 3], items_per_call=2, rounds=2, warmup=1)
+
+        assert calls == [1, 1, 2, 3, 1, 2, 3]
+        assert result["calls"] == 6 and result["items_per_call"] == 2
+
+
+class TestCompareReports:
+    """Test baseline comparison"""
+
+    def test_flags_slowdowns_beyond_tolerance(self):
+        """Latency growth and throughput loss beyond the tolerance are regressions"""
+        baseline = {"a": stats(1.0, 2.0, 1000), "b": stats(1.0, 2.0, 1000), "c": stats(1.0, 2.0, 1000)}
+        current = {"a": stats(1.1, 2.1, 950), "b": stats(1.3, 2.0, 1000), "c": stats(1.0, 2.0, 700),
+                   "new": stats(1.0, 1.0, 1)}
+
+        rows = {row["name"]: row for row in compare_reports(current, baseline, tolerance=0.2)}
+
+        assert set(rows) == {"a", "b", "c"}
+        assert rows["a"]["regressed"] == []
+        assert rows["b"]["regressed"] == ["p50_ms"]
+        assert rows["c"]["regressed"] == ["throughput_per_s"]
+        assert rows["b"]["changes"]["p50_ms"] == pytest.approx(1.3)
+
+    def test_report_round_trip(self, tmp_path):
+        """Written reports carry the environment and load back unchanged"""
+        path = tmp_path / "report.json"
+        results = {"predict/short": stats(1.0, 2.0, 100.0)}
+
+        write_report(str(path), results, config={"texts": 10})
+        report = load_report(str(path))
+
+        assert report["results"] == results
+        assert report["meta"]["config"] == {"texts": 10}
+        assert "python" in report["meta"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
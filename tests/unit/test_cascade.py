@@ -0,0 +1,140 @@
+"""
+Unit Tests for the Cascade Classifier
+
+Tests that confident texts are answered by the linear stage, uncertain ones
+fall through to the model stages, and that stage statistics and the shadow
+check are recorded.
+"""
+
+import pytest
+
+pytest.importorskip("sklearn")
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from backend.config.settings import settings
+from backend.services.cascade import (
+    CascadeClassifier, LinearStage, SIGNAL_FEATURES, STAGE_EMPTY, STAGE_LINEAR,
+    signal_features, train_linear_stage
+)
+
+LABELS = ["clean", "offensive", "hate", "spam"]
+
+CLEAN = ["hôm nay trời đẹp quá", "cảm ơn bạn nhiều nhé", "bài viết rất hay", "chúc mọi người vui vẻ"]
+SPAM = ["mua ngay giảm giá sốc", "khuyến mãi liên hệ ngay", "sale off mua ngay", "giá sốc khuyến mãi hot"]
+
+
+class StubModel:
+    """Records calls; answers with a fixed class and confidence per model type"""
+
+    def __init__(self, model_type="lstm", answers=None):
+        self.model_type = model_type
+        self.labels = LABELS
+        self.answers = answers or {None: (1, 0.95)}
+        self.calls = []
+
+    def predict_batch(self, texts, model_type=None):
+        self.calls.append((model_type, list(texts)))
+        predicted, confidence = self.answers[model_type]
+        probabilities = {label: 0.0 for label in LABELS}
+        probabilities[LABELS[predicted]] = confidence
+        return [(predicted, confidence, dict(probabilities)) for _ in texts]
+
+
+@pytest.fixture(scope="module")
+def linear_stage():
+    vectorizer = TfidfVectorizer().fit(CLEAN + SPAM)
+    texts = CLEAN * 5 + SPAM * 5
+    targets = [0] * (len(CLEAN) * 5) + [3] * (len(SPAM) * 5)
+    return LinearStage(train_linear_stage(texts, targets, LABELS, vectorizer=vectorizer, C=50.0))
+
+
+@pytest.fixture
+def cascade_settings(monkeypatch):
+    monkeypatch.setattr(settings, "CASCADE_LINEAR_THRESHOLD", 0.8)
+    monkeypatch.setattr(settings, "CASCADE_MODEL_THRESHOLD", 0.8)
+    monkeypatch.setattr(settings, "CASCADE_SHADOW_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(settings, "CASCADE_ESCALATION_MODEL", "")
+    monkeypatch.setattr(settings, "CASCADE_LINEAR_MODEL_PATH", "/nonexistent/cascade.joblib")
+    return settings
+
+
+class TestLinearStage:
+    """Test the linear stage features and probabilities"""
+
+    def test_signal_features_shape(self):
+        """One row per text, one column per signal"""
+        matrix = signal_features(["đồ ngu", "", "mua ngay https://bit.ly/x"])
+        assert matrix.shape == (3, len(SIGNAL_FEATURES))
+        assert matrix[0, SIGNAL_FEATURES.index("offensive_hits")] > 0
+        assert matrix[2, SIGNAL_FEATURES.index("has_suspicious_url")] == 1
+
+    def test_unseen_classes_get_zero(self, linear_stage):
+        """Probabilities cover every label even if only two were trained"""
+        probs = linear_stage.predict_proba(["bài viết rất hay", "mua ngay giảm giá sốc"])
+        assert probs.shape == (2, len(LABELS))
+        assert probs[:, [1, 2]].sum() == 0
+        assert probs[0].argmax() == 0 and probs[1].argmax() == 3
+
+
+class TestCascadeClassifier:
+    """Test routing between the cascade stages"""
+
+    def test_confident_texts_stop_at_linear(self, linear_stage, cascade_settings):
+        """The model is not called when the linear stage answers everything"""
+        model = StubModel()
+        cascade = CascadeClassifier(model, linear_stage)
+
+        results = cascade.predict_batch(["bài viết rất hay", "mua ngay giảm giá sốc"])
+
+        assert [r[3] for r in results] == [STAGE_LINEAR, STAGE_LINEAR]
+        assert [r[0] for r in results] == [0, 3]
+        assert model.calls == []
+
+    def test_uncertain_texts_go_to_model(self, linear_stage, cascade_settings):
+        """Only texts below the linear threshold reach the model, in input order"""
+        cascade_settings.CASCADE_LINEAR_THRESHOLD = 1.01
+        model = StubModel()
+        cascade = CascadeClassifier(model, linear_stage)
+
+        results = cascade.predict_batch(["bài viết rất hay", "", "một câu lạ"])
+
+        assert [r[3] for r in results] == ["lstm", STAGE_EMPTY, "lstm"]
+        assert results[0][:2] == (1, 0.95)
+        assert model.calls == [(None, ["bài viết rất hay", "một câu lạ"])]
+
+    def test_escalation(self, linear_stage, cascade_settings, monkeypatch):
+        """Low-confidence model answers escalate to the last stage"""
+        cascade_settings.CASCADE_LINEAR_THRESHOLD = 1.01
+        model = StubModel(answers={None: (1, 0.5), "phobert": (2, 0.7)})
+        cascade = CascadeClassifier(model, linear_stage)
+        monkeypatch.setattr(cascade, "_escalation_model", lambda: "phobert")
+
+        result = cascade.predict("một câu lạ")
+
+        assert result[0] == 2 and result[3] == "phobert"
+        assert [call[0] for call in model.calls] == [None, "phobert"]
+
+    def test_without_linear_stage(self, cascade_settings):
+        """A missing linear artifact starts texts at the model stage"""
+        model = StubModel()
+        cascade = CascadeClassifier(model)
+
+        assert cascade.predict("bài viết rất hay")[3] == "lstm"
+
+    def test_stats_and_shadow(self, linear_stage, cascade_settings):
+        """Answered shares per stage and shadow agreement are tracked"""
+        cascade_settings.CASCADE_SHADOW_SAMPLE_RATE = 1.0
+        model = StubModel(answers={None: (0, 0.95)})
+        cascade = CascadeClassifier(model, linear_stage)
+
+        cascade.predict_batch(["bài viết rất hay", "mua ngay giảm giá sốc"])
+        stats = cascade.stats()
+
+        assert stats["texts"] == 2
+        assert stats["stages"][STAGE_LINEAR]["answered_share"] == 1.0
+        assert stats["shadow"] == {"checked": 2, "agreed": 1, "agreement_rate": 0.5}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,181 @@
+"""
+Unit Tests for Incremental Comment Clustering
+
+Tests partial_fit updates fed from the feature store, per-label separation,
+reading the store in append order across compaction, drift snapshots,
+persistence and leader election.
+"""
+
+import numpy as np
+import pytest
+
+from backend.config.settings import settings
+from backend.db.models import Comment
+from backend.services import comment_clusters
+from backend.services.comment_clusters import CommentClusterService, LabelClusters, main
+from backend.services.feature_store import FeatureStore
+
+
+def grouped_vectors(count, dim=16, groups=3, seed=0):
+    """Vectors around `groups` orthogonal directions; returns (vectors, group of each)"""
+    rng = np.random.default_rng(seed)
+    centers = np.eye(dim)[:groups] * 5
+    group = rng.integers(0, groups, size=count)
+    return centers[group] + 0.2 * rng.standard_normal((count, dim)), group
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch, memory_db_session):
+    monkeypatch.setattr(settings, "CLUSTER_COUNT", 3)
+    monkeypatch.setattr(settings, "CLUSTER_DRIFT_INTERVAL", 3600)
+    store = FeatureStore(str(tmp_path / "store"), dim=16)
+    return memory_db_session, store
+
+
+def add_comments(db, store, vectors, prediction):
+    ids = []
+    for vector in vectors:
+        comment = Comment(content="x", platform="facebook", prediction=prediction)
+        db.add(comment)
+        db.flush()
+        ids.append(comment.id)
+    db.commit()
+    if store is not None:
+        store.append_many(zip(ids, vectors))
+    return ids
+
+
+def clustered(service, label=1):
+    return sum(c["size"] for c in service.clusters(label) or [])
+
+
+class TestLabelClusters:
+    """Test the per-label model"""
+
+    def test_waits_for_enough_points_then_assigns(self):
+        """The first fit needs n_clusters points; later batches are assigned at once"""
+        clusters = LabelClusters(1, n_clusters=3, members_kept=5, history=10)
+        vectors, _ = grouped_vectors(10)
+
+        assert clusters.update([1, 2], vectors[:2]) == {} and not clusters.fitted
+        assert len(clusters.update([3, 4, 5], vectors[2:5])) == 5
+        assert len(clusters.update([6], vectors[5:6])) == 1
+        assert clusters.points == 6 and int(clusters.counts.sum()) == 6
+
+    def test_clusters_largest_first_with_recent_members(self):
+        """Members are most recent first and bounded by members_kept and limit"""
+        clusters = LabelClusters(1, n_clusters=3, members_kept=4, history=10)
+        vectors, _ = grouped_vectors(60)
+        clusters.update(list(range(60)), vectors)
+
+        result = clusters.clusters(limit=6)
+
+        assert [c["size"] for c in result] == sorted((c["size"] for c in result), reverse=True)
+        assert all(len(c["members"]) <= 4 for c in result)
+        assert sum(len(c["members"]) for c in result) <= 6 + len(result)
+        assert result[0]["members"] == sorted(result[0]["members"], reverse=True)
+
+
+class TestCommentClusterService:
+    """Test updates from the feature store"""
+
+    def test_update_clusters_each_label_from_the_store(self, env):
+        """Comments of one group share a cluster; clean comments are not clustered"""
+        db, store = env
+        vectors, group = grouped_vectors(90)
+        ids = add_comments(db, store, vectors, prediction=1)
+        add_comments(db, store, grouped_vectors(20, seed=1)[0], prediction=0)
+        service = CommentClusterService(labels=[1, 3])
+
+        assert service.update(db, store) == 110
+        assert service.watermark == 110
+        cluster_of = {i: c["cluster"] for c in service.clusters(1, limit=1000) for i in c["members"]}
+        for g in range(3):
+            assert len({cluster_of[i] for i, gi in zip(ids, group) if gi == g}) == 1
+        assert service.clusters(0) is None and service.clusters(3) is None
+        assert sum(c["size"] for c in service.clusters(1)) == 90
+
+        more = add_comments(db, store, grouped_vectors(9, seed=2)[0], prediction=1)
+        assert service.update(db, store) == 9
+        members = {i for c in service.clusters(1, limit=1000) for i in c["members"]}
+        assert set(more) <= members
+
+    def test_reads_the_store_in_append_order(self, env):
+        """Lower ids appended after a higher id and an update are still clustered, once"""
+        db, store = env
+        vectors, _ = grouped_vectors(50)
+        ids = add_comments(db, None, vectors[:40], prediction=1)
+        service = CommentClusterService(labels=[1])
+
+        # A persistence flush of ids 1-30 reaches the store after another worker's 31-40
+        store.append_many(zip(ids[30:], vectors[30:40]))
+        assert service.update(db, store) == 10
+        store.append_many(zip(ids[:30], vectors[:30]))
+        store.append(ids[35], vectors[35])
+        assert service.update(db, store) == 30 and clustered(service) == 40
+
+        # Compaction keeps append order: the offset carries over and nothing is read twice
+        store.delete(ids[0])
+        store.compact()
+        more = add_comments(db, store, vectors[40:], prediction=1)
+        assert service.update(db, store) == 10 and clustered(service) == 50
+        assert service.generation == store.generation and service.watermark == 49
+
+        # A cleared store is re-read from the start into new models
+        store.clear()
+        store.append_many(zip(ids[1:] + more, vectors[1:]))
+        assert service.update(db, store) == 49 and clustered(service) == 49
+
+    def test_drift_snapshots(self, env):
+        """A snapshot is taken once the drift interval elapsed"""
+        db, store = env
+        add_comments(db, store, grouped_vectors(30)[0], prediction=2)
+        service = CommentClusterService(labels=[2])
+        service.update(db, store, now=service._last_drift + 1)
+        assert service.drift(2) == []
+
+        add_comments(db, store, grouped_vectors(30, seed=3)[0] + 1.0, prediction=2)
+        service.update(db, store, now=service._last_drift + 3601)
+
+        entry = service.drift(2)[-1]
+        assert entry["max_shift"] > 0 and sum(entry["new_points"]) == 60
+        assert service.clusters(2)[0]["drift"] is not None
+
+    def test_save_and_load(self, env, tmp_path):
+        """A saved service keeps its models and watermark"""
+        db, store = env
+        add_comments(db, store, grouped_vectors(30)[0], prediction=1)
+        service = CommentClusterService(labels=[1])
+        service.update(db, store)
+        path = str(tmp_path / "clusters.joblib")
+
+        service.save(path)
+        loaded = CommentClusterService.load(path)
+
+        assert loaded.watermark == service.watermark
+        assert loaded.clusters(1) == service.clusters(1)
+        assert CommentClusterService.load(str(tmp_path / "missing.joblib")) is None
+
+    @pytest.mark.skipif(comment_clusters.fcntl is None, reason="leader election needs fcntl")
+    def test_one_leader_and_followers_reload(self, env, tmp_path):
+        """Only the lock holder updates; the others pick up its saved state"""
+        db, store = env
+        path = str(tmp_path / "clusters.joblib")
+        leader, follower = CommentClusterService(labels=[1]), CommentClusterService(labels=[1])
+
+        assert leader.acquire_leadership(path) and not follower.acquire_leadership(path)
+        assert main(["update", "--path", path]) == 1
+
+        add_comments(db, store, grouped_vectors(30)[0], prediction=1)
+        leader.update(db, store)
+        leader.save(path)
+        assert follower.reload(path) and not follower.reload(path)
+        assert follower.watermark == leader.watermark and follower.clusters(1) == leader.clusters(1)
+
+        leader.release_leadership()
+        assert follower.acquire_leadership(path) and follower.stats()["leader"]
+        follower.release_leadership()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
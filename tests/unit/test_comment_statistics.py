@@ -0,0 +1,130 @@
+"""
+Unit Tests for Comment Statistics
+
+Tests that the grouped aggregate matches counts computed in Python for
+several filter combinations, the empty result, and the TTL cache.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from backend.config.settings import settings
+from backend.db.models import Comment
+from backend.services import comment_statistics
+from backend.services.comment_statistics import StatisticsCache, cached_statistics, compute_statistics
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def db(memory_db_session):
+    session = memory_db_session
+    rng = np.random.default_rng(0)
+    rows = []
+    for i in range(400):
+        rows.append(Comment(
+            content=f"comment {i}",
+            platform=["facebook", "youtube", "tiktok"][int(rng.integers(3))],
+            prediction=int(rng.integers(4)),
+            confidence=None if i % 50 == 0 else float(rng.random()),
+            source_user_name=None if i % 7 == 0 else f"user{int(rng.integers(20))}",
+            user_id=int(rng.integers(1, 4)),
+            created_at=START + timedelta(hours=i),
+        ))
+    session.add_all(rows)
+    session.commit()
+    session.rows = rows
+    return session
+
+
+def expected(rows, platform=None, start_date=None, end_date=None, user_id=None):
+    rows = [r for r in rows if (platform is None or r.platform == platform)
+            and (start_date is None or r.created_at >= start_date)
+            and (end_date is None or r.created_at <= end_date)
+            and (user_id is None or r.user_id == user_id)]
+    confidences = [r.confidence for r in rows if r.confidence is not None]
+    users = {}
+    for r in rows:
+        if r.prediction in (1, 2, 3) and r.source_user_name is not None:
+            users[r.source_user_name] = users.get(r.source_user_name, 0) + 1
+    platforms = {}
+    for r in rows:
+        platforms[r.platform] = platforms.get(r.platform, 0) + 1
+    return {
+        "total": len(rows),
+        **{name: sum(r.prediction == label for r in rows) for label, name in comment_statistics.LABELS.items()},
+        "platforms": platforms,
+        "average": np.mean(confidences) if confidences else 0,
+        "min": min(confidences, default=0),
+        "max": max(confidences, default=0),
+        "user_counts": sorted(users.values(), reverse=True)[:10],
+    }
+
+
+class TestComputeStatistics:
+    """Test agreement with counts computed in Python"""
+
+    @pytest.mark.parametrize("filters", [
+        {},
+        {"platform": "youtube"},
+        {"user_id": 2, "start_date": START + timedelta(days=3)},
+        {"platform": "facebook", "start_date": START + timedelta(days=2), "end_date": START + timedelta(days=10)},
+    ])
+    def test_matches_python_counts(self, db, filters):
+        stats = compute_statistics(db, include_toxic_users=True, **filters)
+        want = expected(db.rows, **filters)
+
+        assert {key: stats[key] for key in ("total", "clean", "offensive", "hate", "spam")} == \
+            {key: want[key] for key in ("total", "clean", "offensive", "hate", "spam")}
+        assert stats["platforms"] == want["platforms"]
+        assert sum(stats["percentages"].values()) == pytest.approx(100.0)
+        assert stats["confidence"]["average"] == pytest.approx(want["average"])
+        assert (stats["confidence"]["min"], stats["confidence"]["max"]) == (want["min"], want["max"])
+        assert [u["count"] for u in stats["toxic_users"]] == want["user_counts"]
+
+    def test_empty_result(self, db):
+        stats = compute_statistics(db, platform="twitter", include_toxic_users=True)
+
+        assert stats["total"] == 0 and stats["platforms"] == {} and stats["toxic_users"] == []
+        assert stats["percentages"]["spam"] == 0 and stats["confidence"] == {"average": 0, "min": 0, "max": 0}
+
+    def test_toxic_users_only_when_requested(self, db):
+        assert compute_statistics(db)["toxic_users"] == []
+
+
+class TestStatisticsCache:
+    """Test TTL expiry, eviction and the filter key"""
+
+    def test_entries_expire_and_evict(self):
+        cache = StatisticsCache(ttl=10, max_entries=2)
+        cache.set("a", {"total": 1}, now=0)
+        cache.set("b", {"total": 2}, now=0)
+        assert cache.get("a", now=5) == {"total": 1}
+
+        cache.set("c", {"total": 3}, now=5)
+
+        assert cache.get("b", now=6) is None and cache.get("a", now=6) is not None
+        assert cache.get("a", now=11) is None
+        assert StatisticsCache(ttl=0).set("a", {}) is None and StatisticsCache(ttl=0).get("a") is None
+
+    def test_cached_statistics_keys_on_filters(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "STATISTICS_CACHE_TTL", 60)
+        comment_statistics.reset_statistics_cache()
+        calls = []
+        compute = comment_statistics.compute_statistics
+        monkeypatch.setattr(comment_statistics, "compute_statistics", lambda *a: calls.append(a) or compute(*a))
+
+        first = cached_statistics(db, platform="youtube")
+        assert cached_statistics(db, platform="youtube") is first
+        cached_statistics(db, platform="youtube", user_id=1)
+        cached_statistics(db, platform="youtube", include_toxic_users=True)
+
+        assert len(calls) == 3
+        assert comment_statistics.get_statistics_cache().stats()["hits"] == 1
+        comment_statistics.reset_statistics_cache()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,132 @@
+"""
+Unit Tests for the Comment Feature Store
+
+Tests appends and reads through the memory map, tombstones, compaction,
+sharing between instances, crash recovery and the consistency check against
+the comments table.
+"""
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from backend.db.models import Comment
+from backend.services.feature_store import FeatureStore, rebuild
+
+
+def unit_rows(count, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = rng.standard_normal((count, dim)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FeatureStore(str(tmp_path / "store"), dim=16)
+
+
+class TestFeatureStore:
+    """Test writing and reading rows"""
+
+    def test_append_and_get(self, store):
+        """Rows come back in request order as float16-rounded unit vectors"""
+        rows = unit_rows(20, 16)
+        assert store.append_many(enumerate(rows)) == 20
+
+        found, vectors = store.get([7, 3, 99, 0])
+
+        assert found == [7, 3, 0]
+        np.testing.assert_allclose(vectors, rows[[7, 3, 0]], atol=1e-3)
+        assert isinstance(store.matrix(), np.memmap) and store.matrix().dtype == np.float16
+        assert not store.append(50, np.zeros(16)) and not store.append(51, np.ones(3))
+
+    def test_overwrite_delete_and_readd(self, store):
+        """The last row of an id wins; tombstones hide only earlier rows"""
+        rows = unit_rows(4, 16)
+        store.append_many([(1, rows[0]), (2, rows[1])])
+        store.append(1, rows[2])
+        store.delete(2)
+        assert store.live()[0].tolist() == [1]
+        np.testing.assert_allclose(store.get([1])[1][0], rows[2], atol=1e-3)
+
+        store.append(2, rows[3])
+        assert 2 in store and len(store) == 2
+
+    def test_wide_sparse_vectors_are_projected(self, tmp_path):
+        """TF-IDF sized vectors are projected; sparse and dense inputs agree"""
+        store = FeatureStore(str(tmp_path / "wide"), dim=64)
+        wide = np.zeros((30, 5000), dtype=np.float32)
+        rng = np.random.default_rng(0)
+        for row in wide:
+            row[rng.choice(5000, size=20, replace=False)] = rng.random(20)
+        store.append_many((i, sp.csr_matrix(row)) for i, row in enumerate(wide))
+
+        assert store.stats()["dim"] == 64 and store.stats()["source_dim"] == 5000
+        assert all(store.similar(wide[i], k=1)[0][0] == i for i in range(30))
+        assert store.similar(wide[4], k=3, exclude_ids={4})[0][0] != 4
+
+    def test_instances_share_writes_and_compaction(self, tmp_path):
+        """A second view (another worker) sees appends, deletes and compaction"""
+        path = str(tmp_path / "shared")
+        writer, reader = FeatureStore(path, dim=16), FeatureStore(path, dim=16)
+        rows = unit_rows(10, 16)
+        writer.append_many(enumerate(rows))
+        assert len(reader) == 10
+
+        old_view = reader.matrix()
+        writer.delete_many([1, 2])
+        writer.append(3, rows[0])
+        assert writer.compact() == {"rows_before": 11, "rows_after": 8}
+
+        assert reader.stats()["generation"] == 1 and reader.stats()["rows"] == 8
+        assert reader.live()[0].tolist() == [0, 3, 4, 5, 6, 7, 8, 9]
+        np.testing.assert_allclose(reader.get([3])[1][0], rows[0], atol=1e-3)
+        assert old_view.shape == (10, 16) and float(np.abs(old_view).sum()) > 0
+
+    def test_torn_tail_is_ignored_and_repaired(self, store):
+        """A row without its id is invisible and truncated by the next append"""
+        rows = unit_rows(3, 16)
+        store.append_many(enumerate(rows[:2]))
+        with open(store._file("features", 0), "ab") as f:
+            f.write(rows[2].astype(np.float16).tobytes())
+
+        assert len(store) == 2
+        store.append(5, rows[2])
+        assert store.live()[0].tolist() == [0, 1, 5]
+        np.testing.assert_allclose(store.get([5])[1][0], rows[2], atol=1e-3)
+
+    def test_export(self, store, tmp_path):
+        """Export writes live ids and rows, ordered by id"""
+        rows = unit_rows(6, 16)
+        store.append_many([(5, rows[0]), (2, rows[1]), (9, rows[2])])
+        store.delete(2)
+
+        assert store.export(str(tmp_path / "out")) == 2
+        assert np.load(str(tmp_path / "out.ids.npy")).tolist() == [5, 9]
+        np.testing.assert_allclose(np.load(str(tmp_path / "out.vectors.npy"))[1], rows[2], atol=1e-3)
+
+
+class TestConsistency:
+    """Test the check against the comments table"""
+
+    def test_check_repair_and_rebuild(self, store, memory_db_session):
+        db = memory_db_session
+        rows = unit_rows(5, 16)
+        for i, row in enumerate(rows):
+            comment = Comment(content=f"c{i}", platform="facebook")
+            comment.set_vector(row)
+            db.add(comment)
+        db.commit()
+        store.append_many([(1, rows[0]), (2, rows[1]), (42, rows[2])])
+
+        report = store.check(db, repair=True)
+        assert (report["missing"], report["orphaned"], report["appended"]) == (3, 1, 3)
+        assert store.check(db)["missing"] == 0 and store.live()[0].tolist() == [1, 2, 3, 4, 5]
+
+        rebuild(db, store)
+        assert store.stats()["rows"] == 5 and store.stats()["tombstones"] == 0
+        db.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,120 @@
+"""
+Unit Tests for the Hashing Feature Mode
+
+Tests that FEATURE_MODE=hashing needs no fitted vocabulary, is identical
+across processes, applies the stored IDF weights and that the IDF pass over
+the comments table matches an in-memory count.
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from backend.config.settings import settings
+from backend.db.models import Comment
+from backend.services.vectorizer_training import train_hashing_idf
+from backend.utils import vector_utils
+from backend.utils.vector_codec import decode_vector, encode_vector
+from backend.utils.vector_utils import compute_similarity, extract_features, extract_features_batch
+
+CORPUS = [
+    "sản phẩm này rất tốt giao hàng nhanh",
+    "đồ ngu như con bò cút đi",
+    "mua ngay giảm giá sốc liên hệ zalo",
+    "bài viết hay cảm ơn bạn đã chia sẻ",
+    "giao hàng chậm sản phẩm không như mô tả",
+    "click link nhận quà miễn phí ngay hôm nay",
+]
+
+
+@pytest.fixture
+def hashing(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "FEATURE_MODE", "hashing")
+    monkeypatch.setattr(settings, "HASHING_N_FEATURES", 2 ** 12)
+    monkeypatch.setattr(settings, "HASHING_IDF_PATH", str(tmp_path / "idf.npy"))
+    monkeypatch.setattr(vector_utils, "_vectorizer", None)
+    monkeypatch.setattr(vector_utils, "_hashing_vectorizer", None)
+    monkeypatch.setattr(vector_utils, "_hashing_idf", None)
+    monkeypatch.setattr(vector_utils, "_hashing_idf_loaded", False)
+
+
+class TestHashingFeatures:
+    """Test feature extraction without a fitted vocabulary"""
+
+    def test_works_without_fitting(self, hashing):
+        """Rows are signed, L2-normalized and the same in batch and one by one"""
+        matrix = extract_features_batch(CORPUS + [""])
+
+        assert sp.isspmatrix_csr(matrix) and matrix.shape == (7, 2 ** 12)
+        assert vector_utils._vectorizer is None
+        np.testing.assert_allclose(sp.linalg.norm(matrix[:6], axis=1), 1.0, rtol=1e-5)
+        assert matrix[6].nnz == 0 and (matrix.data < 0).any()
+        np.testing.assert_allclose(extract_features(CORPUS[2]), matrix[2].toarray()[0], rtol=1e-6)
+        assert extract_features("!!!").shape == (2 ** 12,)
+
+    def test_similar_texts_score_higher(self, hashing):
+        base, close, other = extract_features_batch([CORPUS[0], "sản phẩm rất tốt giao hàng nhanh lắm", CORPUS[1]])
+
+        assert compute_similarity(base, close) > 0.5 > compute_similarity(base, other)
+
+    def test_identical_across_processes(self, hashing):
+        """A fresh interpreter (another worker) produces the same row"""
+        code = (
+            "from backend.utils.vector_utils import extract_features_batch;"
+            f"import sys; m = extract_features_batch([{CORPUS[3]!r}]);"
+            "sys.stdout.write(' '.join(f'{i}:{v:.6f}' for i, v in zip(m.indices, m.data)))"
+        )
+        env = {**os.environ, "FEATURE_MODE": "hashing", "HASHING_N_FEATURES": str(2 ** 12),
+               "HASHING_IDF_PATH": settings.HASHING_IDF_PATH, "PYTHONHASHSEED": "123"}
+        output = subprocess.run(
+            [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True, timeout=120
+        ).stdout
+
+        row = extract_features_batch([CORPUS[3]])
+        assert output == " ".join(f"{i}:{v:.6f}" for i, v in zip(row.indices, row.data))
+
+    def test_rows_fit_the_compact_vector_format(self, hashing):
+        row = extract_features_batch([CORPUS[0]])
+
+        np.testing.assert_allclose(decode_vector(encode_vector(row)), row.toarray()[0], rtol=1e-6)
+
+
+class TestHashingIdf:
+    """Test the IDF pass and its effect"""
+
+    def test_idf_pass_matches_in_memory_count(self, hashing, memory_db_session):
+        db = memory_db_session
+        corpus = CORPUS * 3 + ["giao hàng nhanh"] * 10
+        db.add_all(Comment(content=text, platform="facebook") for text in corpus)
+        db.commit()
+
+        report = train_hashing_idf(db, chunk_size=4)
+        db.close()
+
+        counts = vector_utils._get_hashing_vectorizer().transform(
+            [vector_utils.preprocess_text(t) for t in corpus]
+        ).tocsr()
+        counts.eliminate_zeros()
+        expected = vector_utils.compute_hashing_idf(np.bincount(counts.indices, minlength=2 ** 12), len(corpus))
+        idf = np.load(settings.HASHING_IDF_PATH)
+        np.testing.assert_allclose(idf, expected)
+        assert report["documents"] == len(corpus) and vector_utils._hashing_idf is not None
+
+        # "giao hàng" is everywhere now: its weight drops relative to the rare words
+        common = extract_features_batch(["giao hàng"]).indices
+        rare = extract_features_batch(["zalo"]).indices
+        assert idf[common].max() < idf[rare].min()
+
+    def test_wrong_size_idf_is_ignored(self, hashing):
+        np.save(settings.HASHING_IDF_PATH, np.ones(10, dtype=np.float32))
+
+        assert not vector_utils.load_hashing_idf()
+        assert extract_features_batch([CORPUS[0]]).nnz > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,75 @@
+"""
+Unit Tests for HuggingFace Tokenizer Service
+
+Tests loading from local files, caching and dynamic padding.
+"""
+
+import pytest
+from backend.services.hf_tokenizer import TokenizerService
+
+transformers = pytest.importorskip("transformers")
+
+
+@pytest.fixture
+def local_tokenizer(tmp_path, monkeypatch):
+    """Save a tiny BERT tokenizer under model/bert/tokenizer and chdir there"""
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "xin", "chào", "bạn", "rất", "tốt"]
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab), encoding="utf-8")
+
+    tokenizer = transformers.BertTokenizerFast(vocab_file=str(vocab_file), do_lower_case=False)
+    tokenizer.save_pretrained(str(tmp_path / "model" / "bert" / "tokenizer"))
+
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+class TestTokenizerService:
+    """Test tokenizer service functionality"""
+
+    def test_loads_once_from_local_files(self, local_tokenizer):
+        """Tokenizer is loaded once and shared"""
+        service = TokenizerService(local_files_only=True)
+
+        first = service.get("bert")
+        second = service.get("bert")
+
+        assert first is not None
+        assert first is second
+        assert service.loaded_types() == ["bert"]
+
+    def test_dynamic_padding_to_longest(self, local_tokenizer):
+        """Batch is padded to its longest item, not max_length"""
+        service = TokenizerService(local_files_only=True)
+
+        encoded = service.encode_batch(
+            ["xin chào", "xin chào bạn rất tốt"], "bert", max_length=100, return_tensors="np"
+        )
+
+        # [CLS] + 5 tokens + [SEP]
+        assert encoded["input_ids"].shape == (2, 7)
+        assert encoded["attention_mask"][0].sum() == 4
+
+    def test_max_length_padding_and_truncation(self, local_tokenizer):
+        """Fixed-length padding and truncation are still available"""
+        service = TokenizerService(local_files_only=True)
+
+        padded = service.encode_batch(["xin"], "bert", max_length=8, padding="max_length", return_tensors="np")
+        truncated = service.encode_batch(["xin chào bạn rất tốt"], "bert", max_length=4, return_tensors="np")
+
+        assert padded["input_ids"].shape == (1, 8)
+        assert truncated["input_ids"].shape == (1, 4)
+
+    def test_unavailable_tokenizer_returns_none(self, tmp_path, monkeypatch):
+        """Missing local files don't trigger downloads and return None"""
+        monkeypatch.chdir(tmp_path)
+        service = TokenizerService(local_files_only=True, cache_dir=str(tmp_path / "hf_cache"))
+
+        assert service.get("phobert") is None
+        assert service.encode_batch(["xin chào"], "phobert", max_length=10) is None
+        # Non-transformer models never use HuggingFace tokenizers
+        assert service.get("lstm") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,116 @@
+"""
+Unit Tests for the Lexicon Matcher
+
+Tests diacritic-insensitive, word-aligned matching over the offensive and
+hate-speech lexicons, mtime-based hot reload and batch matching.
+"""
+
+import os
+import pytest
+
+from backend.utils.lexicon import LexiconMatcher, fold, normalize_words
+
+
+def write_lexicon(path, words, mtime_ns=None):
+    path.write_text("\n".join(words) + "\n", encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def lexicon_files(tmp_path):
+    offensive = tmp_path / "offensive.txt"
+    hate = tmp_path / "hate.txt"
+    write_lexicon(offensive, ["# comment", "đồ", "ngu", "tiên sư", ""], mtime_ns=1_000_000_000)
+    write_lexicon(hate, ["bọn", "cút về", "quân"], mtime_ns=1_000_000_000)
+    return offensive, hate
+
+
+@pytest.fixture
+def matcher(lexicon_files):
+    offensive, hate = lexicon_files
+    return LexiconMatcher({"offensive": str(offensive), "hate": str(hate)}, check_interval=0)
+
+
+class TestNormalization:
+    """Test text folding"""
+
+    def test_fold_keeps_length(self):
+        """Folding maps characters one to one, including đ"""
+        text = "Đồ ngốc ĐẠI ĐỘI ữ"
+        assert fold(text) == "Do ngoc DAI DOI u"
+        assert len(fold(text)) == len(text)
+
+    def test_normalize_words(self):
+        """Punctuation and repeated whitespace collapse to single spaces"""
+        assert normalize_words("Tiên-sư,  NÓ!!") == "tiên sư nó"
+
+
+class TestLexiconMatcher:
+    """Test lexicon matching"""
+
+    def test_matches_both_lexicons_in_one_pass(self, matcher):
+        """Entries from each lexicon are reported under its name, in text order"""
+        result = matcher.match("Bọn ngu, đồ ngu!")
+        assert result == {"offensive": ["ngu", "đồ"], "hate": ["bọn"]}
+
+    def test_diacritic_insensitive(self, matcher):
+        """Missing diacritics match, conflicting diacritics do not"""
+        assert matcher.match("do ngu")["offensive"] == ["đồ", "ngu"]
+        assert matcher.match("cut ve di")["hate"] == ["cút về"]
+        assert matcher.match("dỗ dành")["offensive"] == []
+        assert matcher.match("đô la")["offensive"] == []
+
+    def test_word_aligned(self, matcher):
+        """Entries do not match inside longer words"""
+        assert matcher.match("quanh đây nguyên vẹn")["hate"] == []
+        assert matcher.match("quanh đây nguyên vẹn")["offensive"] == []
+        assert matcher.match("quân đội")["hate"] == ["quân"]
+
+    def test_phrases_across_punctuation(self, matcher):
+        """Multi-word entries match whatever separates the words"""
+        assert matcher.match("TIÊN...SƯ nó")["offensive"] == ["tiên sư"]
+
+    def test_batch(self, matcher):
+        """Batch matching keeps input order"""
+        results = matcher.match_batch(["đồ ngu", "", "bọn nó"])
+        assert [r["offensive"] for r in results] == [["đồ", "ngu"], [], []]
+        assert [r["hate"] for r in results] == [[], [], ["bọn"]]
+
+    def test_reloads_only_when_mtime_changes(self, matcher, lexicon_files):
+        """Unchanged files are not re-read; a new mtime swaps in the new lexicon"""
+        offensive, _ = lexicon_files
+        matcher.match("xin chào")
+        matcher.match("xin chào")
+        assert matcher.reloads == 1
+
+        write_lexicon(offensive, ["khốn"], mtime_ns=1_000_000_000)
+        assert matcher.match("đồ khốn")["offensive"] == ["đồ"]
+        assert matcher.reloads == 1
+
+        os.utime(offensive, ns=(2_000_000_000, 2_000_000_000))
+        assert matcher.match("đồ khốn")["offensive"] == ["khốn"]
+        assert matcher.reloads == 2
+
+    def test_missing_file_uses_defaults(self, tmp_path):
+        """Defaults are used until the file appears"""
+        path = tmp_path / "missing.txt"
+        matcher = LexiconMatcher({"hate": str(path)}, defaults={"hate": ["giết"]}, check_interval=0)
+        assert matcher.match("giết")["hate"] == ["giết"]
+
+        write_lexicon(path, ["tàn sát"])
+        assert matcher.match("giết tàn sát")["hate"] == ["tàn sát"]
+
+    def test_check_interval_throttles_stat(self, lexicon_files):
+        """Within the check interval the file is not looked at"""
+        offensive, hate = lexicon_files
+        matcher = LexiconMatcher({"offensive": str(offensive), "hate": str(hate)}, check_interval=3600)
+
+        write_lexicon(offensive, ["khốn"], mtime_ns=2_000_000_000)
+        matcher.match("khốn")
+        assert matcher.match("khốn")["offensive"] == []
+        assert matcher.reloads == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
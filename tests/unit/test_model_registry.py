@@ -0,0 +1,121 @@
+"""
+Unit Tests for Model Registry
+
+Tests lazy loading, LRU eviction and immutability of model handles.
+"""
+
+import threading
+import pytest
+from backend.services.model_registry import ModelRegistry, ModelHandle, normalize_model_type, model_version
+
+
+class FakeLoader:
+    """Loader stub counting how often each path is read from disk"""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, path, device):
+        with self.lock:
+            self.calls.append(path)
+        return object()
+
+
+@pytest.fixture
+def model_files(tmp_path):
+    """Create model files of 1 MB each"""
+    paths = {}
+    for model_type in ["lstm", "cnn", "gru"]:
+        path = tmp_path / f"{model_type}.h5"
+        path.write_bytes(b"\0" * (1024 * 1024))
+        paths[model_type] = [str(path)]
+    return paths
+
+
+def make_registry(model_files, budget_mb=10, loader=None):
+    return ModelRegistry(
+        memory_budget_mb=budget_mb,
+        loader=loader or FakeLoader(),
+        tokenizer_loader=lambda path: None,
+        model_paths=model_files
+    )
+
+
+class TestModelRegistry:
+    """Test model registry functionality"""
+
+    def test_loads_once(self, model_files):
+        """Repeated requests reuse the resident model"""
+        loader = FakeLoader()
+        registry = make_registry(model_files, loader=loader)
+
+        first = registry.get("cnn")
+        second = registry.get("cnn")
+
+        assert first is second
+        assert loader.calls == model_files["cnn"]
+        assert registry.stats()["hits"] == 1
+
+    def test_concurrent_first_use_loads_once(self, model_files):
+        """Concurrent first requests for one type share a single load"""
+        loader = FakeLoader()
+        registry = make_registry(model_files, loader=loader)
+
+        handles = []
+        threads = [threading.Thread(target=lambda: handles.append(registry.get("gru"))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(loader.calls) == 1
+        assert all(h is handles[0] for h in handles)
+
+    def test_lru_eviction_under_budget(self, model_files):
+        """Least recently used model is evicted when over budget"""
+        registry = make_registry(model_files, budget_mb=2.5)
+
+        registry.get("lstm")
+        registry.get("cnn")
+        registry.get("lstm")  # cnn is now least recently used
+        registry.get("gru")
+
+        assert registry.loaded_types() == ["lstm", "gru"]
+        assert registry.stats()["evictions"] == 1
+
+    def test_missing_model_returns_none(self, model_files):
+        """Unknown or missing model types are not loaded"""
+        registry = make_registry(model_files)
+
+        assert registry.get("phobert") is None
+        assert registry.get(None) is None
+
+    def test_alias_resolution(self, model_files):
+        """'grn' is served by the gru model"""
+        registry = make_registry(model_files)
+
+        assert normalize_model_type(" GRN ") == "gru"
+        assert registry.get("grn") is registry.get("gru")
+
+    def test_handle_is_immutable(self):
+        """Handles cannot be modified after creation"""
+        handle = ModelHandle("lstm", "x.h5", object(), None, 0)
+
+        with pytest.raises(AttributeError):
+            handle.model = object()
+
+
+    def test_version_changes_with_model_file(self, tmp_path):
+        """Replacing a model file changes its version fingerprint"""
+        path = tmp_path / "model.h5"
+        path.write_bytes(b"v1")
+        before = model_version(str(path))
+
+        path.write_bytes(b"version 2")
+
+        assert model_version(str(path)) != before
+        assert model_version(str(path)) == model_version(str(path))
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
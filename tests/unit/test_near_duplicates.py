@@ -0,0 +1,127 @@
+"""
+Unit Tests for Near-Duplicate Detection
+
+Tests shingling and MinHash similarity, clustering of edited copies, verdict
+reuse in batch classification, eviction and the per-platform listing.
+"""
+
+import os
+import time
+
+import numpy as np
+import pytest
+
+from backend.services.near_duplicates import NearDuplicateIndex, normalize_text, shingle_hashes
+
+RAID = "Mua ngay giảm giá sốc 90% liên hệ zalo 0901234567 để nhận quà miễn phí hôm nay"
+VARIANTS = [
+    RAID,
+    RAID.upper() + "!!!",
+    RAID.replace("hôm nay", "hôm nay nhé"),
+    "🔥🔥 " + RAID + " 🔥",
+]
+OTHER = "bài viết rất hay, cảm ơn bạn đã chia sẻ kinh nghiệm nuôi con nhỏ"
+
+
+def jaccard(a, b):
+    a, b = set(shingle_hashes(normalize_text(a)).tolist()), set(shingle_hashes(normalize_text(b)).tolist())
+    return len(a & b) / len(a | b)
+
+
+@pytest.fixture
+def index():
+    return NearDuplicateIndex(threshold=0.7, min_cluster_size=2, max_clusters=100)
+
+
+class FakeModel:
+    """Batch predictor counting the texts it is asked to classify"""
+
+    def __init__(self, prediction=3):
+        self.prediction = prediction
+        self.texts = []
+
+    def __call__(self, texts):
+        self.texts.extend(texts)
+        return [(self.prediction, 0.9, {"spam": 0.9}, "full") for _ in texts]
+
+
+class TestSignatures:
+    """Test normalization and MinHash estimates"""
+
+    def test_normalization_ignores_case_and_punctuation(self):
+        assert normalize_text("  Xin CHÀO!!! bạn_ơi ") == "xin chào bạn ơi"
+        assert len(shingle_hashes("")) == 0 and len(shingle_hashes("ab")) == 1
+
+    def test_minhash_estimates_jaccard(self, index):
+        """The fraction of equal signature values tracks the shingle Jaccard similarity"""
+        for text in VARIANTS[1:] + [OTHER]:
+            estimate = float(np.mean(index.signature(RAID) == index.signature(text)))
+            assert abs(estimate - jaccard(RAID, text)) < 0.2
+        assert index.signature("!!! ...") is None
+
+
+class TestClusters:
+    """Test clustering and lookup"""
+
+    def test_variants_join_one_cluster(self, index):
+        clusters = {index.add(text, "facebook").id for text in VARIANTS}
+        other = index.add(OTHER, "facebook")
+
+        assert len(clusters) == 1 and other.id not in clusters
+        assert index.find(RAID + " ok").size == len(VARIANTS)
+        assert index.find("hoàn toàn khác không liên quan gì cả") is None
+
+    def test_least_recently_hit_cluster_is_evicted(self):
+        index = NearDuplicateIndex(threshold=0.7, min_cluster_size=1, max_clusters=2)
+        index.add(RAID)
+        index.add(OTHER)
+        index.add(RAID)
+        index.add("một bình luận hoàn toàn mới về thời tiết hôm nay")
+
+        assert len(index) == 2 and index.find(RAID) is not None and index.find(OTHER) is None
+
+    def test_largest_clusters_per_platform(self, index):
+        for text in VARIANTS:
+            index.add(text, "facebook")
+        index.add(RAID, "youtube")
+        index.add(OTHER, "youtube")
+        index.add(OTHER, "youtube")
+
+        grouped = index.clusters_by_platform(limit=5, min_size=2)
+
+        assert [c["size"] for c in grouped["facebook"]] == [4]
+        assert [c["size"] for c in grouped["youtube"]] == [2]
+        assert grouped["youtube"][0]["sample"] == OTHER
+        assert index.largest_clusters(min_size=1)[0]["platforms"] == {"facebook": 4, "youtube": 1}
+        stats = index.stats()
+        assert stats["texts"] == 7 and stats["worker_pid"] == os.getpid() and stats["started_at"] <= time.time()
+
+
+class TestClassifyBatch:
+    """Test verdict reuse"""
+
+    def test_reuses_verdict_after_enough_classified_copies(self, index):
+        model = FakeModel()
+        results, reused = index.classify_batch(VARIANTS[:2], ["facebook"] * 2, model)
+        assert reused == [False, False] and len(model.texts) == 2
+
+        results, reused = index.classify_batch(VARIANTS[2:] + [OTHER], ["facebook"] * 3, model)
+
+        assert reused == [True, True, False] and model.texts[2:] == [OTHER]
+        assert results[0] == (3, 0.9, {"spam": 0.9}, "duplicate")
+        assert results[2][3] == "full"
+        assert index.find(RAID).reused == 2 and index.find(RAID).size == 4
+
+    def test_conflicting_verdicts_are_never_reused(self, index):
+        index.add(VARIANTS[0], verdict=(3, 0.9, {}))
+        index.add(VARIANTS[1], verdict=(0, 0.8, {}))
+        model = FakeModel()
+
+        _, reused = index.classify_batch(VARIANTS[2:], ["facebook"] * 2, model)
+
+        assert reused == [False, False] and len(model.texts) == 2
+        assert index.find(RAID).conflicting
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,97 @@
+"""
+Unit Tests for ONNX Export and ONNX Runtime Serving
+
+Exports a tiny Keras model and checks parity, dynamic batch size and
+backend selection.
+"""
+
+import os
+import pytest
+import numpy as np
+
+pytest.importorskip("tf2onnx")
+pytest.importorskip("onnxruntime")
+
+from backend.config.settings import settings
+from backend.services.model_adapter import ModelAdapter
+from backend.services.model_registry import ModelRegistry, onnx_path_for, serving_path
+from backend.services import onnx_export
+from backend.services.onnx_export import export_keras_model, export_model_file
+
+
+class TestOnnxExport:
+    """Test Keras to ONNX export"""
+
+    def test_export_matches_keras_for_any_batch_size(self, tmp_path, tiny_keras_model):
+        """Exported graph has a dynamic batch axis and matches Keras"""
+        model = tiny_keras_model(vocab_size=50, units=8)
+        onnx_path = export_keras_model(model, str(tmp_path / "tiny.onnx"))
+
+        onnx_model = ModelAdapter.load_model(onnx_path, "cpu")
+        assert onnx_model.input_shape == (None, 12)
+
+        for batch_size in (1, 5, 33):
+            inputs = np.random.default_rng(batch_size).integers(0, 50, size=(batch_size, 12))
+            expected = model.predict_on_batch(inputs.astype(np.float32))
+            # Integer token ids are cast to the graph's input dtype
+            actual = onnx_model.predict(inputs)
+            assert actual.shape == (batch_size, 4)
+            np.testing.assert_allclose(actual, expected, atol=1e-5)
+
+    def test_export_model_file_reports_parity(self, tmp_path, tiny_keras_model):
+        """Export from an .h5 file writes the .onnx sibling and a parity report"""
+        h5_path = str(tmp_path / "tiny.h5")
+        tiny_keras_model(vocab_size=50, units=8).save(h5_path)
+
+        report = export_model_file(h5_path)
+
+        assert report["output"] == str(tmp_path / "tiny.onnx")
+        assert os.path.exists(report["output"])
+        assert report["ok"] is True
+        assert report["max_abs_diff"] <= 1e-4
+        assert report["argmax_agreement"] == 1.0
+
+    def test_cli_logs_report_without_speedup(self, tmp_path, monkeypatch):
+        """A zero ONNX timing leaves speedup unset and the CLI still succeeds"""
+        report = {"output": str(tmp_path / "tiny.onnx"), "max_abs_diff": 0.0, "argmax_agreement": 1.0,
+                  "keras_ms_per_batch": 1.0, "onnx_ms_per_batch": 0.0, "speedup": None, "ok": True}
+        monkeypatch.setattr(onnx_export, "export_model_file", lambda *args, **kwargs: report)
+
+        assert onnx_export.main(["--path", str(tmp_path / "tiny.h5")]) == 0
+
+
+class TestOnnxBackendSelection:
+    """Test INFERENCE_BACKEND path resolution"""
+
+    def test_serving_path(self, tmp_path):
+        """The .onnx sibling is used only with the onnx backend and only if it exists"""
+        h5_path = str(tmp_path / "model.h5")
+        open(h5_path, "w").close()
+
+        assert serving_path(h5_path, backend="onnx") == h5_path
+
+        open(onnx_path_for(h5_path), "w").close()
+        assert serving_path(h5_path, backend="onnx") == str(tmp_path / "model.onnx")
+        assert serving_path(h5_path, backend="keras") == h5_path
+
+    def test_registry_loads_onnx_sibling(self, tmp_path, monkeypatch):
+        """Registry serves the exported file and fingerprints it for the cache"""
+        h5_path = str(tmp_path / "lstm.h5")
+        open(h5_path, "w").close()
+        open(onnx_path_for(h5_path), "w").close()
+        monkeypatch.setattr(settings, "INFERENCE_BACKEND", "onnx")
+
+        loaded = []
+        registry = ModelRegistry(
+            loader=lambda path, device: loaded.append(path) or object(),
+            tokenizer_loader=lambda path: None,
+            model_paths={"lstm": [h5_path]}
+        )
+        handle = registry.get("lstm")
+
+        assert loaded == [str(tmp_path / "lstm.onnx")]
+        assert handle.path.endswith(".onnx")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
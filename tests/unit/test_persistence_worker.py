@@ -0,0 +1,134 @@
+"""
+Unit Tests for the Batched Persistence Worker
+
+Tests grouping by size and time, one feature transform per flush, the
+bounded queue, draining on stop and the per-row retry after a failed insert.
+"""
+
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.config.settings import settings
+from backend.db.models import Comment
+from backend.db.models.base import Base
+from backend.services import persistence_worker
+from backend.services.persistence_worker import PersistenceWorker
+from backend.utils import vector_utils
+
+CORPUS = [
+    "sản phẩm này rất tốt giao hàng nhanh",
+    "đồ ngu như con bò cút đi",
+    "mua ngay giảm giá sốc liên hệ zalo",
+    "bài viết hay cảm ơn bạn đã chia sẻ",
+]
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    """File-backed sqlite (the worker writes from its own thread) and a fitted vectorizer"""
+    monkeypatch.setattr(settings, "VECTOR_INDEX_ENABLED", False)
+    monkeypatch.setattr(settings, "FEATURE_STORE_ENABLED", False)
+    monkeypatch.setattr(vector_utils, "_vectorizer", None)
+    vector_utils.train_vectorizer_on_corpus(CORPUS)
+    engine = create_engine(f"sqlite:///{tmp_path / 'comments.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def transforms(monkeypatch):
+    """Sizes of the extract_features_batch calls"""
+    calls = []
+    original = vector_utils.extract_features_batch
+
+    def counting(texts):
+        calls.append(len(texts))
+        return original(texts)
+
+    monkeypatch.setattr(vector_utils, "extract_features_batch", counting)
+    return calls
+
+
+def fields(i, **overrides):
+    return {"content": CORPUS[i % len(CORPUS)], "platform": "facebook", "prediction": i % 4, "confidence": 0.9, **overrides}
+
+
+def stored(session_factory):
+    db = session_factory()
+    try:
+        return db.query(Comment).order_by(Comment.id).all()
+    finally:
+        db.close()
+
+
+class TestPersistenceWorker:
+    """Test grouping, draining and back-pressure"""
+
+    def test_groups_by_size_and_drains_on_stop(self, sessions, transforms):
+        """Ten comments with batch size 4 take at most three transforms and inserts"""
+        worker = PersistenceWorker(sessions, max_queue=100, batch_size=4, flush_interval=5.0)
+        assert all(worker.submit(fields(i), CORPUS[i % 4]) for i in range(10))
+
+        worker.stop()
+
+        comments = stored(sessions)
+        assert len(comments) == 10 and sum(transforms) == 10 and max(transforms) <= 4
+        assert worker.stats()["written"] == 10 and worker.stats()["backlog"] == 0
+        assert all(c.vector_data is not None for c in comments)
+        assert comments[1].get_vector().nonzero()[0].size > 0
+        assert not worker.submit(fields(0), CORPUS[0])
+
+    def test_flushes_partial_group_after_interval(self, sessions, transforms):
+        worker = PersistenceWorker(sessions, max_queue=100, batch_size=100, flush_interval=0.05)
+        for i in range(3):
+            worker.submit(fields(i), CORPUS[i])
+
+        deadline = time.time() + 5
+        while worker.stats()["written"] < 3 and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert worker.stats()["written"] == 3 and transforms == [3]
+        worker.stop()
+
+    def test_full_queue_rejects_without_blocking(self, sessions):
+        """submit() fails fast while the worker is busy and the queue is full"""
+        entered, release = threading.Event(), threading.Event()
+
+        def slow_sessions():
+            entered.set()
+            release.wait(5)
+            return sessions()
+
+        worker = PersistenceWorker(slow_sessions, max_queue=2, batch_size=1, flush_interval=0)
+        worker.submit(fields(0), CORPUS[0])
+        assert entered.wait(5)
+
+        accepted = [worker.submit(fields(i), CORPUS[i]) for i in range(1, 4)]
+        release.set()
+        worker.stop()
+
+        assert accepted == [True, True, False] and worker.stats()["rejected"] == 1
+        assert len(stored(sessions)) == 3
+
+    def test_failed_group_is_retried_row_by_row(self, sessions):
+        """A row violating a constraint does not drop the rest of its group"""
+        worker = PersistenceWorker(sessions, batch_size=8)
+        batch = [(fields(0), CORPUS[0]), (fields(1, content=None), CORPUS[1]), (fields(2), CORPUS[2])]
+
+        assert worker.flush(batch) == 2
+
+        assert [c.content for c in stored(sessions)] == [CORPUS[0], CORPUS[2]]
+        assert worker.stats()["failed"] == 1
+
+    def test_enqueue_respects_setting(self, monkeypatch):
+        monkeypatch.setattr(settings, "PERSIST_WORKER_ENABLED", False)
+        assert not persistence_worker.enqueue_comment(fields(0), CORPUS[0])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
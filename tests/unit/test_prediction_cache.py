@@ -0,0 +1,139 @@
+"""
+Unit Tests for Prediction Cache
+
+Tests both cache tiers, TTL, versioned keys and metrics tracking.
+"""
+
+import json
+import time
+import pytest
+from backend.services.prediction_cache import PredictionCache
+from backend.services.redis_service import RedisService
+
+
+class FakeMetrics:
+    """Collects track_cache calls"""
+
+    def __init__(self):
+        self.calls = []
+
+    def track_cache(self, operation, hit):
+        self.calls.append((operation, hit))
+
+
+class FakeRedis(RedisService):
+    """RedisService that behaves like a connected Redis backed by a dict"""
+
+    def __init__(self):
+        super().__init__(redis_url=None, enabled=False)
+        self.enabled = True
+        self.redis_client = self
+        self.data = {}
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set_many(self, mapping, ex=None):
+        self.data.update(mapping)
+        return True
+
+
+def make_cache(**kwargs):
+    kwargs.setdefault("redis_service", RedisService(redis_url=None, enabled=False))
+    kwargs.setdefault("metrics", FakeMetrics())
+    kwargs.setdefault("enabled", True)
+    return PredictionCache(**kwargs)
+
+
+class TestPredictionCache:
+    """Test prediction cache functionality"""
+
+    def test_local_hit_and_miss(self):
+        """Stored vectors are returned; unknown keys are misses"""
+        metrics = FakeMetrics()
+        cache = make_cache(metrics=metrics)
+        key = cache.make_key("xin chào", "lstm", "v1")
+
+        assert cache.get_many([key]) == {}
+        cache.set_many({key: [0.7, 0.1, 0.1, 0.1]})
+
+        assert cache.get_many([key, key]) == {key: [0.7, 0.1, 0.1, 0.1]}
+        assert metrics.calls == [("prediction", False), ("prediction", True), ("prediction", True)]
+        assert cache.stats()["local_hits"] == 2
+
+    def test_version_and_model_type_in_key(self):
+        """Different model versions or types never share entries"""
+        cache = make_cache()
+
+        keys = {
+            cache.make_key("xin chào", "lstm", "v1"),
+            cache.make_key("xin chào", "lstm", "v2"),
+            cache.make_key("xin chào", "cnn", "v1"),
+        }
+
+        assert len(keys) == 3
+
+    def test_lru_bound(self):
+        """In-process tier keeps at most max_entries"""
+        cache = make_cache(max_entries=2)
+        a, b, c = (cache.make_key(t, "lstm", "v1") for t in "abc")
+
+        cache.set_many({a: [1.0]})
+        cache.set_many({b: [1.0]})
+        cache.get_many([a])  # b becomes least recently used
+        cache.set_many({c: [1.0]})
+
+        assert set(cache.get_many([a, b, c])) == {a, c}
+
+    def test_ttl_expiry(self):
+        """Expired entries are not served"""
+        cache = make_cache(ttl=0)
+        key = cache.make_key("x", "lstm", "v1")
+
+        cache.set_many({key: [1.0]})
+        time.sleep(0.01)
+
+        assert cache.get_many([key]) == {}
+
+    def test_shared_tier_promotion(self):
+        """Entries written by another process are read from Redis and promoted"""
+        redis = FakeRedis()
+        writer = make_cache(redis_service=redis)
+        reader = make_cache(redis_service=redis)
+        key = writer.make_key("xin chào", "lstm", "v1")
+
+        writer.set_many({key: [0.25, 0.25, 0.25, 0.25]})
+
+        assert json.loads(redis.data[key]) == [0.25, 0.25, 0.25, 0.25]
+        assert reader.get_many([key]) == {key: [0.25, 0.25, 0.25, 0.25]}
+        assert reader.stats()["shared_hits"] == 1
+        assert reader.stats()["local_entries"] == 1
+
+    def test_in_memory_redis_fallback_not_used_as_shared_tier(self):
+        """Without a real Redis only the bounded local tier is used"""
+        cache = make_cache()
+
+        assert cache.shared_tier_enabled is False
+
+    def test_empty_hits_tracked(self):
+        """Empty input counts as a cache hit"""
+        metrics = FakeMetrics()
+        cache = make_cache(metrics=metrics)
+
+        cache.record_empty_hit(2)
+
+        assert cache.stats()["empty_hits"] == 2
+        assert metrics.calls == [("prediction", True), ("prediction", True)]
+
+    def test_disabled_cache(self):
+        """Disabled cache stores and returns nothing"""
+        cache = make_cache(enabled=False)
+        key = cache.make_key("x", "lstm", "v1")
+
+        cache.set_many({key: [1.0]})
+
+        assert cache.get_many([key]) == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
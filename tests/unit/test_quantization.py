@@ -0,0 +1,112 @@
+"""
+Unit Tests for int8 Quantization
+
+Quantizes a tiny Keras model to ONNX and TFLite int8 variants and checks
+loading, accuracy report and serving path selection.
+"""
+
+import json
+import os
+import pytest
+import numpy as np
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tf2onnx")
+
+from backend.services.model_adapter import ModelAdapter
+from backend.services.model_registry import serving_path
+from backend.services.quantization import (
+    compare_predictions, convert_tflite_int8, main, quantize_keras_model_file
+)
+
+
+class TestQuantization:
+    """Test int8 variants and reports"""
+
+    def test_onnx_int8_variant_and_report(self, tmp_path, tiny_keras_model):
+        """ONNX dynamic quantization writes a smaller .int8.onnx close to fp32"""
+        h5_path = str(tmp_path / "tiny.h5")
+        tiny_keras_model().save(h5_path)
+
+        report = quantize_keras_model_file(h5_path, fmt="onnx", sample_size=64)
+
+        assert report["output"] == str(tmp_path / "tiny.int8.onnx")
+        assert os.path.exists(tmp_path / "tiny.onnx")
+        assert report["int8_bytes"] < report["fp32_bytes"]
+        assert report["top1_agreement"] >= 0.9
+        assert report["max_abs_diff"] < 0.1
+        assert {"fp32_ms_per_batch", "int8_ms_per_batch", "accuracy_delta"} <= set(report)
+
+    def test_tflite_int8_handles_any_batch_size(self, tmp_path, tiny_keras_model):
+        """Fixed-batch TFLite graph serves batches smaller and larger than its batch"""
+        model = tiny_keras_model()
+        path = convert_tflite_int8(model, str(tmp_path / "tiny.int8.tflite"), batch_size=8)
+
+        quantized = ModelAdapter.load_model(path, "cpu")
+        assert quantized.input_shape == (None, 12)
+
+        for batch_size in (1, 8, 21):
+            inputs = np.random.default_rng(batch_size).integers(0, 500, size=(batch_size, 12))
+            actual = quantized.predict(inputs)
+            expected = model.predict_on_batch(inputs.astype(np.float32))
+            assert actual.shape == (batch_size, 4)
+            np.testing.assert_allclose(actual, expected, atol=0.05)
+
+    def test_compare_predictions_with_labels(self):
+        """Labels produce a real accuracy delta"""
+        reference = lambda x: np.eye(4)[x[:, 0]]
+        quantized = lambda x: np.eye(4)[np.where(x[:, 0] == 3, 0, x[:, 0])]
+        inputs = np.array([[0], [1], [2], [3]])
+
+        report = compare_predictions(reference, quantized, inputs, labels=[0, 1, 2, 3], rounds=1)
+
+        assert report["accuracy_fp32"] == 1.0
+        assert report["accuracy_int8"] == 0.75
+        assert report["accuracy_delta"] == -0.25
+        assert report["top1_agreement"] == 0.75
+
+    def test_cli_writes_report(self, tmp_path, tiny_keras_model):
+        """CLI quantizes a file and writes the JSON report"""
+        h5_path = str(tmp_path / "tiny.h5")
+        tiny_keras_model().save(h5_path)
+        report_path = str(tmp_path / "report.json")
+
+        assert main(["--path", h5_path, "--report", report_path]) == 0
+
+        with open(report_path) as f:
+            data = json.load(f)
+        assert data["models"][0]["output"].endswith("tiny.int8.onnx")
+
+    def test_serving_path_prefers_int8(self, tmp_path):
+        """MODEL_QUANTIZATION=int8 serves the int8 variant before the fp32 export"""
+        h5_path = str(tmp_path / "model.h5")
+        for name in ("model.h5", "model.onnx", "model.int8.onnx"):
+            open(tmp_path / name, "w").close()
+
+        assert serving_path(h5_path, backend="onnx", quantization="int8") == str(tmp_path / "model.int8.onnx")
+        assert serving_path(h5_path, backend="onnx", quantization="none") == str(tmp_path / "model.onnx")
+        assert serving_path(h5_path, backend="keras", quantization="none") == h5_path
+
+
+class TestPytorchQuantization:
+    """Test dynamic quantization of PyTorch models"""
+
+    def test_quantize_pytorch_lstm_classifier(self):
+        """LSTM and Linear layers are replaced by dynamically quantized versions"""
+        torch = pytest.importorskip("torch")
+
+        model = ModelAdapter._create_pytorch_model({"vocab_size": 100, "embedding_dim": 16, "lstm_units": 16})
+        model.eval()
+        quantized = ModelAdapter.quantize_pytorch(model)
+
+        inputs = torch.randint(0, 100, (4, 10))
+        with torch.no_grad():
+            expected = model(inputs).numpy()
+            actual = quantized(inputs).numpy()
+
+        assert "quantized" in type(quantized.lstm).__module__
+        np.testing.assert_allclose(actual, expected, atol=0.05)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -52,6 +52,14 @@ class TestRedisService:
         redis.set("existing_key", "value")
         assert redis.exists("existing_key") == True
     
+    def test_mget_and_set_many(self):
+        """Test batch get and set operations"""
+        redis = RedisService(redis_url=None, enabled=False)
+        
+        redis.set_many({"m1": "a", "m2": "b"}, ex=60)
+        assert redis.mget(["m1", "missing", "m2"]) == ["a", None, "b"]
+        assert redis.mget([]) == []
+    
     def test_incr(self):
         """Test increment operation"""
         redis = RedisService(redis_url=None, enabled=False)
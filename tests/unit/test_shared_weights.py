@@ -0,0 +1,86 @@
+"""
+Unit Tests for Shared Model Weights
+
+Checks the page-aligned weight file, ONNX Runtime sessions that read their
+initializers from the shared mapping, and the per-process memory report.
+"""
+
+import os
+import json
+import pytest
+import numpy as np
+
+pytest.importorskip("tf2onnx")
+pytest.importorskip("onnxruntime")
+
+from backend.config.settings import settings
+from backend.services.model_adapter import ModelAdapter
+from backend.services.onnx_export import export_keras_model
+from backend.services.shared_weights import (
+    PAGE_SIZE, SharedWeights, get_shared_weights, process_memory, weights_path_for
+)
+
+
+@pytest.fixture
+def onnx_path(tmp_path, tiny_keras_model):
+    return export_keras_model(tiny_keras_model(), str(tmp_path / "tiny.onnx"))
+
+
+class TestSharedWeights:
+    """Test memory-mapped ONNX initializers"""
+
+    def test_weight_file_is_page_aligned(self, onnx_path):
+        """Large tensors start on page boundaries and are read-only views"""
+        shared = SharedWeights(onnx_path)
+
+        with open(weights_path_for(onnx_path) + ".json") as f:
+            index = json.load(f)
+        offsets = [info["offset"] for info in index["tensors"].values()]
+        assert offsets and all(offset % PAGE_SIZE == 0 for offset in offsets)
+
+        # Embedding table (500 x 32 floats) is served from the mapping
+        assert shared.nbytes >= 500 * 32 * 4
+        for array in shared.arrays.values():
+            assert not array.flags.writeable
+        # Stripped graph no longer carries the weights
+        assert len(shared.model_bytes) < os.path.getsize(onnx_path) - shared.nbytes / 2
+
+    def test_shared_session_matches_regular_session(self, onnx_path, monkeypatch):
+        """ModelAdapter serves identical predictions from shared weights"""
+        inputs = np.random.default_rng(0).integers(0, 500, size=(7, 12))
+
+        monkeypatch.setattr(settings, "MODEL_SHARED_WEIGHTS", False)
+        expected = ModelAdapter.load_model(onnx_path, "cpu").predict(inputs)
+
+        monkeypatch.setattr(settings, "MODEL_SHARED_WEIGHTS", True)
+        actual = ModelAdapter.load_model(onnx_path, "cpu").predict(inputs)
+
+        np.testing.assert_allclose(actual, expected, atol=1e-6)
+
+    def test_stale_weight_file_is_rebuilt(self, onnx_path, tmp_path, tiny_keras_model):
+        """A re-exported model gets a new weight file"""
+        first = get_shared_weights(onnx_path)
+        with open(weights_path_for(onnx_path) + ".json") as f:
+            old_version = json.load(f)["source_version"]
+
+        model = tiny_keras_model()
+        model.layers[1].set_weights([w + 1.0 for w in model.layers[1].get_weights()])
+        export_keras_model(model, onnx_path)
+        os.utime(onnx_path, (0, 0))
+
+        second = get_shared_weights(onnx_path)
+        with open(weights_path_for(onnx_path) + ".json") as f:
+            assert json.load(f)["source_version"] != old_version
+        assert second is not first
+        assert second.version != first.version
+
+    @pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="Linux only")
+    def test_process_memory(self):
+        """Memory report has shared and private breakdown"""
+        memory = process_memory()
+        assert {"Rss", "Pss", "Shared_Clean", "Private_Dirty"} <= set(memory)
+        assert memory["Rss"] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
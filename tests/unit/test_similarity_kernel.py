@@ -0,0 +1,84 @@
+"""
+Unit Tests for the Chunked Top-k Similarity Kernel
+
+Tests that chunked_top_k agrees with a full sort for several queries and
+block sizes, the threshold and padding, and SimilarityMatrix position
+mapping as used by the similar-comment routes.
+"""
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from backend.utils.vector_utils import SimilarityMatrix, chunked_top_k, normalize_rows, top_k_similar
+
+
+def brute_force(queries, matrix, k):
+    scores = normalize_rows(queries) @ normalize_rows(matrix).T
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return order, np.take_along_axis(scores, order, axis=1)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((2000, 32)).astype(np.float32), rng.standard_normal((9, 32))
+
+
+class TestChunkedTopK:
+    """Test agreement with a full sort"""
+
+    @pytest.mark.parametrize("block_rows", [7, 100, 5000])
+    def test_matches_full_sort(self, data, block_rows):
+        """Every block size gives the full-sort ranking for every query"""
+        matrix, queries = data
+        expected, expected_scores = brute_force(queries, matrix, 10)
+
+        indices, scores = chunked_top_k(normalize_rows(queries), normalize_rows(matrix), 10, block_rows=block_rows)
+
+        np.testing.assert_array_equal(indices, expected)
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+    def test_threshold_and_k_larger_than_matrix(self, data):
+        matrix, queries = data
+        indices, scores = chunked_top_k(normalize_rows(queries[:2]), normalize_rows(matrix[:5]), 8, threshold=0.1)
+
+        assert indices.shape == (2, 5)
+        assert ((indices == -1) == (scores < 0.1)).all() and np.isneginf(scores[indices == -1]).all()
+        assert (scores[:, :-1] >= scores[:, 1:]).all()
+
+    def test_many_queries_few_rows(self, data):
+        """Nearest centroid for many rows (the k-means assignment step)"""
+        matrix, _ = data
+        centroids = normalize_rows(matrix[:4])
+
+        nearest = chunked_top_k(normalize_rows(matrix), centroids, 1, block_rows=2)[0][:, 0]
+
+        np.testing.assert_array_equal(nearest, (normalize_rows(matrix) @ centroids.T).argmax(axis=1))
+
+
+class TestSimilarityMatrix:
+    """Test stacking, position mapping and the top_k_similar entry point"""
+
+    def test_skips_invalid_vectors_and_keeps_positions(self, data):
+        matrix, queries = data
+        vectors = [matrix[0], None, np.zeros(0), matrix[1], np.ones(5), sp.csr_matrix(matrix[2])]
+        stored = SimilarityMatrix(vectors)
+
+        results = stored.search([matrix[1], np.ones(3), queries[0]], k=2)
+
+        assert len(stored) == 3 and stored.matrix.dtype == np.float32 and stored.matrix.flags.c_contiguous
+        assert results[0][0] == (3, pytest.approx(1.0, abs=1e-6)) and results[1] == []
+        assert {i for i, _ in results[2]} <= {0, 3, 5}
+        assert len(stored.search(matrix[5], k=None, threshold=-1.0)[0]) == 3
+
+    def test_top_k_similar_dense_uses_kernel(self, data):
+        matrix, queries = data
+        expected, _ = brute_force(queries[:1], matrix, 5)
+
+        assert [i for i, _ in top_k_similar(queries[0], matrix, k=5)] == expected[0].tolist()
+        assert all(s >= 0.3 for _, s in top_k_similar(queries[0], matrix, k=None, threshold=0.3))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,94 @@
+"""
+Unit Tests for Spam Feature Extraction
+
+Golden test: the automaton-based extractor must produce exactly the features
+of the previous implementation. Also covers the batch variant and the
+Aho-Corasick automaton itself (native and pure-Python).
+"""
+
+import pytest
+
+from backend.utils.aho_corasick import AHOCORASICK_AVAILABLE, KeywordAutomaton
+from backend.utils.text_processing import (
+    preprocess_for_spam_detection, preprocess_for_spam_detection_batch
+)
+from tests.benchmarks.bench_spam_features import legacy_preprocess_for_spam_detection, synthetic_comments
+
+
+EDGE_CASES = [
+    "",
+    "xin chào",
+    "NHẬN CHIẾT KHẤU 10% liên hệ ngay!!!",          # overlapping keywords
+    "giảm-giá, mua.ngay; sale...off",                  # keywords split by punctuation
+    "xem bit.ly nhé nhưng không có link",              # domain outside of a URL
+    "https://example.com/khuyenmai/hot-deal",           # keyword only inside a URL
+    "https://BIT.LY/ABC www.Tiny.CC/x t.co/zz",        # upper-case domains, several URLs
+    "gọi 0912.345.678 hoặc +84 98 765 4321",
+    "giá 1.500.000 VNĐ, còn 2tr, chỉ 99k",
+    "😀😀 🔥 ✂ Ⓜ️ text",
+    "SIÊU SALE SIÊU SALE SĂN SALE",
+    "Liên Hệ: shop@example.vn, Hết Hàng, CÒN ÍT",
+    "ΣΟΦΙΑ İstanbul ǅ Ⓐ",                               # unusual case mappings
+    "???!!!...",
+]
+
+
+class TestSpamFeatures:
+    """Test the precompiled spam feature extractor"""
+
+    @pytest.mark.parametrize("text", EDGE_CASES)
+    def test_edge_cases_match_legacy(self, text):
+        """Hand-picked inputs produce identical features"""
+        assert preprocess_for_spam_detection(text) == legacy_preprocess_for_spam_detection(text)
+
+    def test_corpus_matches_legacy(self):
+        """Generated mix of clean comments and spam produces identical features"""
+        for text in synthetic_comments(3000, seed=1):
+            assert preprocess_for_spam_detection(text) == legacy_preprocess_for_spam_detection(text), text
+
+    def test_batch_matches_single(self):
+        """Batch variant keeps order and returns independent dicts for duplicates"""
+        texts = ["mua ngay giá sốc", "", "xin chào", "mua ngay giá sốc"]
+
+        results = preprocess_for_spam_detection_batch(texts)
+
+        assert results == [preprocess_for_spam_detection(text) for text in texts]
+        results[0][1]["spam_keyword_count"] = -1
+        assert results[3][1]["spam_keyword_count"] == 3  # mua ngay, giá sốc, sốc
+
+
+@pytest.fixture(params=["python", "native"])
+def use_native(request):
+    if request.param == "native" and not AHOCORASICK_AVAILABLE:
+        pytest.skip("pyahocorasick not installed")
+    return request.param == "native"
+
+
+class TestKeywordAutomaton:
+    """Test the Aho-Corasick automaton"""
+
+    def test_overlapping_matches(self, use_native):
+        """Every occurrence is reported, including overlapping and nested keywords"""
+        automaton = KeywordAutomaton(["he", "she", "his", "hers"], use_native=use_native)
+
+        assert sorted(automaton.iter("ushers")) == [(3, 0), (3, 1), (5, 3)]
+        assert automaton.find("ushers") == ["he", "she", "hers"]
+
+    def test_duplicates_and_empty_keywords(self, use_native):
+        """Duplicate keywords report every id, empty keywords never match"""
+        automaton = KeywordAutomaton(["giá", "", "giá rẻ", "giá"], use_native=use_native)
+
+        assert automaton.find_ids("giá rẻ quá") == {0, 2, 3}
+        assert KeywordAutomaton([], use_native=use_native).find_ids("giá") == set()
+
+    def test_matches_substring_search(self, use_native):
+        """Same keyword set as a naive `keyword in text` scan"""
+        keywords = ["ab", "bab", "bca", "c", "caa", "a"]
+        automaton = KeywordAutomaton(keywords, use_native=use_native)
+        for text in ["abccab", "bababca", "caab", "", "xyz"]:
+            expected = {i for i, keyword in enumerate(keywords) if keyword in text}
+            assert automaton.find_ids(text) == expected
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,112 @@
+"""
+Unit Tests for the Sparse TF-IDF Feature Path
+
+Tests batch extraction into CSR rows, agreement with the dense path, sparse
+cosine similarity and top-k selection.
+"""
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from backend.utils import vector_utils
+from backend.utils.vector_codec import decode_vector, encode_vector
+from backend.utils.vector_utils import (
+    batch_compute_similarity, compute_similarity, extract_features, extract_features_batch,
+    extract_features_sparse, find_similar_vectors, top_k_similar
+)
+
+CORPUS = [
+    "sản phẩm này rất tốt giao hàng nhanh",
+    "đồ ngu như con bò cút đi",
+    "mua ngay giảm giá sốc liên hệ zalo",
+    "bài viết hay cảm ơn bạn đã chia sẻ",
+    "giao hàng chậm sản phẩm không như mô tả",
+    "click link nhận quà miễn phí ngay hôm nay",
+]
+
+
+@pytest.fixture
+def fitted(monkeypatch):
+    monkeypatch.setattr(vector_utils, "_vectorizer", None)
+    vector_utils.train_vectorizer_on_corpus(CORPUS)
+
+
+def brute_force(query, matrix):
+    dense = matrix.toarray() if sp.issparse(matrix) else np.asarray(matrix)
+    q = query.toarray().ravel() if sp.issparse(query) else np.asarray(query).ravel()
+    norms = np.linalg.norm(dense, axis=1) * np.linalg.norm(q)
+    return np.divide(dense @ q, norms, out=np.zeros(len(dense)), where=norms > 0)
+
+
+class TestSparseExtraction:
+    """Test CSR feature extraction"""
+
+    def test_batch_matches_single_and_dense(self, fitted):
+        """One batch transform gives the same rows as per-text extraction"""
+        texts = CORPUS + ["", "giao hàng nhanh"]
+        matrix = extract_features_batch(texts)
+
+        assert sp.isspmatrix_csr(matrix) and matrix.shape[0] == len(texts)
+        assert matrix[6].nnz == 0
+        for i, text in enumerate(texts[:-2] + texts[-1:]):
+            row = matrix[i if i < 6 else 7]
+            assert (extract_features_sparse(text) != row).nnz == 0
+            np.testing.assert_allclose(extract_features(text), row.toarray()[0])
+
+    def test_unfitted_vectorizer_returns_zero_rows(self, monkeypatch):
+        """Without a trained vectorizer every row is empty"""
+        monkeypatch.setattr(vector_utils, "_vectorizer", None)
+
+        matrix = extract_features_batch(["a b c", "d e"])
+
+        assert matrix.shape == (2, vector_utils.DEFAULT_FEATURE_DIM) and matrix.nnz == 0
+
+    def test_sparse_rows_encode_without_densifying(self, fitted):
+        """A CSR row goes straight into the binary vector format"""
+        row = extract_features_sparse(CORPUS[0])
+
+        np.testing.assert_allclose(decode_vector(encode_vector(row)), row.toarray()[0], rtol=1e-6)
+
+
+class TestSparseSimilarity:
+    """Test cosine similarity and top-k on sparse and dense inputs"""
+
+    def test_compute_similarity_mixed_inputs(self, fitted):
+        """Sparse, dense and mismatched vectors"""
+        a, b = extract_features_sparse(CORPUS[0]), extract_features_sparse(CORPUS[4])
+        expected = brute_force(a, b)[0]
+
+        assert compute_similarity(a, b) == pytest.approx(expected)
+        assert compute_similarity(a.toarray()[0], b) == pytest.approx(expected)
+        assert compute_similarity(a, a) == pytest.approx(1.0)
+        assert compute_similarity(a, np.ones(3)) == 0.0
+        assert compute_similarity(None, b) == 0.0
+
+    def test_top_k_matches_brute_force(self):
+        """argpartition top-k returns the same ranking as a full sort"""
+        matrix = sp.random(500, 2000, density=0.01, format="csr", random_state=1)
+        query = sp.random(1, 2000, density=0.05, format="csr", random_state=2)
+        scores = brute_force(query, matrix)
+
+        result = top_k_similar(query, matrix, k=10)
+
+        assert [i for i, _ in result] == list(np.lexsort((np.arange(500), -scores))[:10])
+        assert [s for _, s in result] == pytest.approx(np.sort(scores)[::-1][:10])
+        assert all(s >= 0.2 for _, s in top_k_similar(query, matrix, k=None, threshold=0.2))
+
+    def test_list_apis_skip_invalid_vectors(self, fitted):
+        """find_similar_vectors and batch_compute_similarity keep original positions"""
+        rows = extract_features_batch(CORPUS)
+        vectors = [rows[0], None, np.zeros(0), rows[4].toarray()[0], np.ones(5), rows[0]]
+
+        found = find_similar_vectors(rows[0], vectors, threshold=0.5, top_n=5)
+        everything = batch_compute_similarity(rows[0], vectors)
+
+        assert [i for i, _ in found] == [0, 5]
+        assert [i for i, _ in everything] == [0, 5, 3]
+        assert batch_compute_similarity(rows[0], rows)[0] == (0, pytest.approx(1.0))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
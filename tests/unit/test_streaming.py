@@ -0,0 +1,210 @@
+"""
+Unit Tests for Streaming Batch Detection
+
+Tests the incremental NDJSON / JSON-array body parser, micro-batching of
+streamed items, error lines, client disconnects and the NDJSON response
+through a real ASGI app.
+"""
+
+import json
+import asyncio
+import pytest
+
+from starlette.requests import ClientDisconnect
+
+from backend.api.streaming import (
+    JSONItemParser, StreamParseError, ndjson_prediction_response, stream_predictions
+)
+
+
+def parse_chunks(chunks, max_item_bytes=1024):
+    parser = JSONItemParser(max_item_bytes)
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    items.extend(parser.close())
+    return items
+
+
+def byte_chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+async def body(chunks, delay=0.0, fail_after=None):
+    for i, chunk in enumerate(chunks):
+        if fail_after is not None and i >= fail_after:
+            raise ClientDisconnect()
+        if delay:
+            await asyncio.sleep(delay)
+        yield chunk
+
+
+class StubPredictor:
+    """Records batch sizes; predicts class len(text) % 4"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return [(len(text) % 4, 0.9) for text in texts]
+
+
+def format_result(item, text, prediction):
+    return {"text": text, "prediction": prediction[0]}
+
+
+def run_stream(chunks, predictor, **kwargs):
+    async def collect():
+        output = b""
+        async for part in stream_predictions(chunks, predictor, format_result, **kwargs):
+            output += part
+        return [json.loads(line) for line in output.decode("utf-8").splitlines()]
+    return asyncio.run(collect())
+
+
+class TestJSONItemParser:
+    """Test the incremental body parser"""
+
+    ITEMS = [{"text": "xin chào", "id": 1}, "đồ ngu", {"text": "mua ngay [giá] sốc, \"hot\"", "id": 3}, 42]
+
+    @pytest.mark.parametrize("size", [1, 2, 7, 1000])
+    def test_ndjson_any_chunking(self, size):
+        """Chunk boundaries, including inside multi-byte characters, do not matter"""
+        data = "\n".join(json.dumps(item, ensure_ascii=False) for item in self.ITEMS).encode("utf-8")
+        assert [item for item, _ in parse_chunks(byte_chunks(data, size))] == self.ITEMS
+
+    @pytest.mark.parametrize("size", [1, 3, 1000])
+    def test_json_array_any_chunking(self, size):
+        """A chunked JSON array yields the same items"""
+        data = (" \n" + json.dumps(self.ITEMS, ensure_ascii=False)).encode("utf-8")
+        assert [item for item, _ in parse_chunks(byte_chunks(data, size))] == self.ITEMS
+
+    def test_empty_bodies(self):
+        """Empty body and empty array yield nothing"""
+        assert parse_chunks([b""]) == []
+        assert parse_chunks([b"[", b" ]"]) == []
+
+    def test_ndjson_bad_line_is_item_error(self):
+        """A malformed line fails only that item"""
+        items = parse_chunks([b'{"text": "a"}\n{oops\n\n"b"\n'])
+        assert items[0] == ({"text": "a"}, None)
+        assert items[1][0] is None and "Invalid JSON" in items[1][1]
+        assert items[2] == ("b", None)
+
+    def test_array_errors_end_stream(self):
+        """Malformed or unterminated arrays raise"""
+        with pytest.raises(StreamParseError):
+            parse_chunks([b'["a" "b"]'])
+        with pytest.raises(StreamParseError):
+            parse_chunks([b'["a", "b"'])
+        with pytest.raises(StreamParseError):
+            parse_chunks([b'["a",]'])
+
+    def test_oversized_item(self):
+        """An incomplete item larger than the limit is not buffered"""
+        with pytest.raises(StreamParseError):
+            parse_chunks([b'{"text": "' + b"x" * 100], max_item_bytes=50)
+        with pytest.raises(StreamParseError):
+            parse_chunks([b'["' + b"x" * 100], max_item_bytes=50)
+
+
+class TestStreamPredictions:
+    """Test micro-batched classification of a streamed body"""
+
+    def test_micro_batches_in_order(self):
+        """Items are classified in batches of batch_size and keep their index and id"""
+        data = "".join(json.dumps({"text": "t" * i, "id": f"c{i}"}) + "\n" for i in range(10)).encode()
+        predictor = StubPredictor()
+
+        lines = run_stream(body(byte_chunks(data, 13)), predictor, batch_size=4, max_wait_ms=1000)
+
+        assert [len(batch) for batch in predictor.batches] == [4, 4, 2]
+        assert [line["index"] for line in lines] == list(range(10))
+        assert [line["id"] for line in lines] == [f"c{i}" for i in range(10)]
+        assert [line["prediction"] for line in lines] == [i % 4 for i in range(10)]
+
+    def test_slow_producer_flushes_on_wait(self):
+        """A partial batch is flushed once its oldest item has waited max_wait_ms"""
+        chunks = [b'"a"\n', b'"b"\n', b'"c"\n']
+        predictor = StubPredictor()
+
+        run_stream(body(chunks, delay=0.05), predictor, batch_size=100, max_wait_ms=10)
+
+        assert len(predictor.batches) == 3
+
+    def test_error_lines(self):
+        """Items without text and malformed lines get error lines, the rest is classified"""
+        lines = run_stream(body([b'"a"\n{"id": 1}\nnot json\n"b"\n']), StubPredictor(), batch_size=10)
+
+        assert sorted(line["index"] for line in lines) == [0, 1, 2, 3]
+        errors = {line["index"]: line["error"] for line in lines if "error" in line}
+        assert set(errors) == {1, 2}
+
+    def test_fatal_parse_error_flushes_and_stops(self):
+        """Items before a fatal error are still answered"""
+        lines = run_stream(body([b'["a", "b" "c"]']), StubPredictor(), batch_size=10)
+
+        assert [line.get("text") for line in lines[:2]] == ["a", "b"]
+        assert "error" in lines[2] and len(lines) == 3
+
+    def test_disconnect_while_reading_stops(self):
+        """A disconnect during upload stops without classifying the partial batch"""
+        predictor = StubPredictor()
+        chunks = [f'"{i}"\n'.encode() for i in range(10)]
+
+        lines = run_stream(body(chunks, fail_after=6), predictor, batch_size=4, max_wait_ms=1000)
+
+        assert [len(batch) for batch in predictor.batches] == [4]
+        assert len(lines) == 4
+
+    def test_disconnect_after_upload_stops(self):
+        """Once the body is read, a disconnected client stops further batches"""
+        predictor = StubPredictor()
+        checks = []
+
+        async def is_disconnected():
+            checks.append(1)
+            return True
+
+        lines = run_stream(body([b'"a"\n"b"\n"c"\n']), predictor, batch_size=2,
+                           max_wait_ms=1000, is_disconnected=is_disconnected)
+
+        assert [len(batch) for batch in predictor.batches] == [2]
+        assert len(lines) == 2 and checks == [1]
+
+
+class TestNDJSONEndpoint:
+    """Test the response class against a real ASGI app"""
+
+    def test_streamed_request_and_response(self):
+        """The response does not consume the request body it is reading"""
+        httpx = pytest.importorskip("httpx")
+        from fastapi import FastAPI, Request
+
+        app = FastAPI()
+        predictor = StubPredictor()
+
+        @app.post("/stream")
+        async def stream(request: Request):
+            return ndjson_prediction_response(request, predictor, format_result, batch_size=3)
+
+        async def request_body():
+            for i in range(8):
+                yield (json.dumps({"text": f"văn bản {i}", "id": i}, ensure_ascii=False) + "\n").encode("utf-8")
+
+        async def call():
+            async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                return await client.post("/stream", content=request_body())
+
+        response = asyncio.run(call())
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["id"] for line in lines] == list(range(8))
+        assert [len(batch) for batch in predictor.batches] == [3, 3, 2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,146 @@
+"""
+Unit Tests for the Compact Vector Codec
+
+Tests sparse and float16 round trips, header validation, Comment vector
+storage with the legacy JSON fallback and the batched conversion migration.
+"""
+
+import json
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend.db.migrations.compact_vector_storage import add_vector_column, convert_vectors, restore_json_vectors
+from backend.db.models import Comment
+from backend.utils.vector_codec import (
+    HEADER_SIZE, KIND_DENSE_F16, KIND_SPARSE, VectorCodecError, decode_header, decode_sparse, decode_vector,
+    encode_vector
+)
+
+
+def tfidf_like(dim=10000, nnz=40, seed=0):
+    rng = np.random.default_rng(seed)
+    vector = np.zeros(dim)
+    vector[rng.choice(dim, size=nnz, replace=False)] = rng.random(nnz)
+    return vector
+
+
+class TestVectorCodec:
+    """Test encoding, decoding and format detection"""
+
+    def test_sparse_round_trip_is_exact(self):
+        """A TF-IDF vector is stored sparse and decodes to the same float32 values"""
+        vector = tfidf_like()
+        blob = encode_vector(vector)
+
+        assert decode_header(blob)[1:] == (KIND_SPARSE, 10000, 40)
+        assert len(blob) == HEADER_SIZE + 40 * (2 + 4)
+        assert len(blob) * 100 < len(json.dumps(vector.tolist()))
+        np.testing.assert_array_equal(decode_vector(blob), vector.astype(np.float32))
+
+        dim, indices, values = decode_sparse(blob)
+        assert dim == 10000 and list(indices) == list(np.flatnonzero(vector))
+
+    def test_dense_vectors_use_float16(self):
+        """Mostly non-zero vectors are stored as float16"""
+        vector = np.random.default_rng(1).standard_normal(256)
+        blob = encode_vector(vector)
+
+        assert decode_header(blob)[1] == KIND_DENSE_F16
+        assert len(blob) == HEADER_SIZE + 256 * 2
+        np.testing.assert_allclose(decode_vector(blob), vector, rtol=1e-3, atol=1e-3)
+
+    def test_edge_cases(self):
+        """Zero vectors, lists, forced kinds and wide dimensions"""
+        assert decode_vector(encode_vector(np.zeros(10))).tolist() == [0.0] * 10
+        assert decode_vector(encode_vector([0.5, 0, 2.0], kind=KIND_DENSE_F16)).tolist() == [0.5, 0, 2.0]
+
+        wide = np.zeros(100_000)
+        wide[[3, 99_999]] = 1.5
+        assert decode_vector(encode_vector(wide))[99_999] == 1.5
+
+    def test_rejects_foreign_and_corrupt_blobs(self):
+        """Unknown versions, other magic bytes and truncated payloads raise"""
+        blob = encode_vector(tfidf_like())
+
+        with pytest.raises(VectorCodecError):
+            decode_vector(b"[0.1, 0.2]")
+        with pytest.raises(VectorCodecError):
+            decode_vector(blob[:2] + b"\x09" + blob[3:])
+        with pytest.raises(VectorCodecError):
+            decode_vector(blob[:-1])
+
+
+class TestCommentVector:
+    """Test Comment.set_vector / get_vector"""
+
+    def test_binary_storage_and_legacy_fallback(self):
+        """New vectors go to vector_data; unmigrated JSON rows still decode"""
+        comment = Comment(content="x", platform="facebook")
+        comment.vector_representation = "[1.0, 2.0]"
+        assert comment.get_vector().tolist() == [1.0, 2.0]
+
+        comment.set_vector(tfidf_like())
+        assert comment.vector_representation is None and isinstance(comment.vector_data, bytes)
+        np.testing.assert_array_equal(comment.get_vector(), tfidf_like().astype(np.float32))
+
+        comment.set_vector(None)
+        assert comment.get_vector() is None
+
+
+class TestMigration:
+    """Test the batched JSON to binary conversion"""
+
+    def test_convert_and_rollback(self, tmp_path):
+        """Every parseable row is converted across batches; rollback restores JSON"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        vectors = [tfidf_like(nnz=5 + i, seed=i) for i in range(7)]
+        with engine.connect() as conn:
+            conn.execute(text("CREATE TABLE comments (id INTEGER PRIMARY KEY, vector_representation TEXT)"))
+            for i, vector in enumerate(vectors, start=1):
+                conn.execute(text("INSERT INTO comments VALUES (:id, :v)"),
+                             {"id": i, "v": json.dumps(vector.tolist())})
+            conn.execute(text("INSERT INTO comments VALUES (8, 'not json'), (9, NULL)"))
+            conn.commit()
+
+        add_vector_column(engine)
+        add_vector_column(engine)
+        summary = convert_vectors(engine, batch_size=3)
+
+        assert summary["converted"] == 7 and summary["failed"] == 1
+        assert summary["json_bytes"] > 100 * summary["binary_bytes"]
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT id, vector_representation, vector_data FROM comments")).fetchall()
+        for row_id, legacy, data in rows[:7]:
+            assert legacy is None
+            np.testing.assert_array_equal(decode_vector(data), vectors[row_id - 1].astype(np.float32))
+        assert rows[7][1] == "not json" and rows[7][2] is None
+
+        assert restore_json_vectors(engine, batch_size=2) == 7
+        with engine.connect() as conn:
+            legacy, data = conn.execute(text("SELECT vector_representation, vector_data FROM comments WHERE id = 4")).one()
+        assert data is None and np.allclose(json.loads(legacy), vectors[3])
+
+    def test_startup_adds_missing_column(self, tmp_path, monkeypatch):
+        """An un-migrated database gets an empty vector_data column so ORM queries work"""
+        from sqlalchemy.orm import Session
+        import backend.db.models as models
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        with engine.connect() as conn:
+            conn.execute(text("CREATE TABLE comments (id INTEGER PRIMARY KEY, content TEXT NOT NULL, "
+                              "platform VARCHAR(50), vector_representation TEXT, prediction INTEGER)"))
+            conn.execute(text("INSERT INTO comments (id, content, platform, vector_representation) "
+                              "VALUES (1, 'c', 'facebook', '[0.5, 0.0]')"))
+            conn.commit()
+        monkeypatch.setattr(models, "engine", engine)
+
+        assert models.ensure_comment_columns() and not models.ensure_comment_columns()
+        with Session(engine) as db:
+            comment = db.query(Comment.id, Comment.vector_data, Comment.vector_representation).one()
+        assert comment.vector_data is None and comment.vector_representation == "[0.5, 0.0]"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
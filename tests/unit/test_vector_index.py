@@ -0,0 +1,201 @@
+"""
+Unit Tests for the Comment Vector Index
+
+Tests exact and IVF search, metadata filters, removal, persistence, random
+projection of wide vectors and catching up with the comments table.
+"""
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from backend.config.settings import settings
+from backend.db.models import Comment
+from backend.services import vector_index as vector_index_module
+from backend.services.vector_index import VectorIndex, search_similar_comments
+
+
+def clustered_vectors(count, dim, clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    labels = rng.integers(0, clusters, size=count)
+    return (centers[labels] + 0.3 * rng.standard_normal((count, dim))).astype(np.float32)
+
+
+def brute_force(vectors, query, k):
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normed @ (query / np.linalg.norm(query))
+    return [int(i) for i in np.argsort(-scores)[:k]]
+
+
+def build(vectors, **kwargs):
+    index = VectorIndex(**kwargs)
+    index.add_many((i, vector, "facebook" if i % 2 else "youtube", i % 4, i % 3) for i, vector in enumerate(vectors))
+    return index
+
+
+class TestVectorIndex:
+    """Test search, filters and updates"""
+
+    def test_exact_before_training(self):
+        """Below the training size every vector is scanned"""
+        vectors = clustered_vectors(300, 16, 5)
+        index = build(vectors, index_dim=32, train_size=10_000)
+
+        result = index.search(vectors[7], k=10)
+
+        assert index.centroids is None
+        assert [comment_id for comment_id, _ in result] == brute_force(vectors, vectors[7], 10)
+        assert result[0][1] == pytest.approx(1.0, abs=1e-5)
+
+    def test_ivf_recall(self):
+        """Trained lists keep recall@10 high while scanning a fraction of the rows"""
+        vectors = clustered_vectors(4000, 32, 40, seed=1)
+        index = build(vectors, index_dim=64, nlist=64, nprobe=8, train_size=1000)
+        queries = clustered_vectors(50, 32, 40, seed=1)[:50] + 0.05
+
+        recall = np.mean([
+            len(set(c for c, _ in index.search(q, k=10)) & set(brute_force(vectors, q, 10))) / 10
+            for q in queries
+        ])
+
+        assert index.stats()["lists"] == 64
+        assert recall >= 0.9
+
+    def test_filters(self):
+        """Platform, prediction and user_id restrict the results"""
+        vectors = clustered_vectors(200, 16, 4)
+        index = build(vectors, index_dim=16, train_size=50, nlist=8, nprobe=1)
+
+        result = index.search(vectors[0], k=20, platform="facebook", prediction=1, user_id=0)
+
+        assert len(result) == 16  # i % 12 == 9 among 200 (every list is scanned to find them)
+        assert all(i % 4 == 1 and i % 3 == 0 for i, _ in result)
+        assert index.search(vectors[0], k=5, platform="tiktok") == []
+
+    def test_remove_replace_and_exclude(self):
+        """Removed comments disappear, re-adding replaces the vector"""
+        vectors = clustered_vectors(100, 8, 3)
+        index = build(vectors, index_dim=8)
+
+        assert index.remove(5) and not index.remove(5)
+        assert 5 not in [c for c, _ in index.search(vectors[5], k=100)]
+
+        index.add(6, vectors[9], "youtube", 0, 0)
+        assert index.search(vectors[9], k=2, exclude_ids={9})[0][0] == 6
+        assert len(index) == 99
+
+        index.compact()
+        assert index.stats()["rows"] == 99
+        assert index.search(vectors[9], k=1)[0][0] in (6, 9)
+
+    def test_wide_vectors_are_projected(self):
+        """Sparse high-dimensional vectors go through the random projection"""
+        rng = np.random.default_rng(0)
+        vectors = np.zeros((50, 5000), dtype=np.float32)
+        for row in vectors:
+            row[rng.choice(5000, size=30, replace=False)] = rng.random(30)
+        index = build(vectors, index_dim=128)
+
+        assert index.stats()["dim"] == 128
+        assert all(index.search(vectors[i], k=1)[0][0] == i for i in range(50))
+        assert index.search(sp.csr_matrix(vectors[7]), k=1) == index.search(vectors[7], k=1)
+        assert not index.add(999, np.zeros(5000)) and not index.add(998, np.ones(10))
+
+    def test_save_and_load(self, tmp_path):
+        """A saved index answers queries identically after loading"""
+        vectors = clustered_vectors(600, 16, 6)
+        index = build(vectors, index_dim=16, train_size=200, nlist=12)
+        index.remove(3)
+        path = str(tmp_path / "index.npz")
+
+        index.save(path)
+        loaded = VectorIndex.load(path)
+
+        assert len(loaded) == len(index) and loaded.watermark == index.watermark
+        for q in vectors[:10]:
+            assert loaded.search(q, k=5, platform="facebook") == index.search(q, k=5, platform="facebook")
+        assert VectorIndex.load(str(tmp_path / "missing.npz")) is None
+
+
+class TestSimilarComments:
+    """Test database catch-up and exact re-ranking"""
+
+    def test_sync_and_rerank(self, memory_db_session, monkeypatch):
+        """New rows are indexed on query; deleted rows and filters are re-checked"""
+        db = memory_db_session
+        monkeypatch.setattr(settings, "VECTOR_INDEX_PATH", "/nonexistent/index.npz")
+        monkeypatch.setattr(vector_index_module, "_vector_index", VectorIndex(index_dim=8))
+        vectors = clustered_vectors(30, 8, 3)
+        for i, vector in enumerate(vectors):
+            comment = Comment(content=f"c{i}", platform="facebook", prediction=i % 2, confidence=0.9)
+            comment.set_vector(vector)
+            db.add(comment)
+        db.add(Comment(content="no vector", platform="facebook", prediction=0, confidence=0.9))
+        db.commit()
+
+        results = search_similar_comments(db, vectors[4], limit=3, threshold=0.0)
+        assert results[0][0].content == "c4" and results[0][1] == pytest.approx(1.0)
+        assert vector_index_module._vector_index.watermark == 31
+
+        db.delete(results[0][0])
+        db.commit()
+        results = search_similar_comments(db, vectors[4], limit=3, prediction=1)
+        assert "c4" not in [comment.content for comment, _ in results]
+        assert all(comment.prediction == 1 for comment, _ in results)
+
+    def test_local_inserts_do_not_hide_other_workers_comments(self, memory_db_session, tmp_path):
+        """Two workers: each one's own insert doesn't skip rows the other committed"""
+        db = memory_db_session
+        vectors = clustered_vectors(6, 8, 3)
+
+        def store(i, comment_id=None):
+            comment = Comment(id=comment_id, content=f"c{i}", platform="facebook", prediction=0)
+            comment.set_vector(vectors[i])
+            db.add(comment)
+            db.commit()
+            return comment
+
+        worker_a, worker_b = VectorIndex(index_dim=8), VectorIndex(index_dim=8)
+        worker_b.add(store(0).id, vectors[0], "facebook", 0)
+        worker_a.add(store(1).id, vectors[1], "facebook", 0)
+        assert worker_a.watermark == 0
+
+        assert worker_a.sync(db) == 1 and worker_a.watermark == 2
+        assert worker_a.search(vectors[0], k=1)[0][0] == 1
+
+        # Id 3 was taken first but its transaction commits after 4 and 5 are synced
+        store(3, comment_id=4)
+        store(4, comment_id=5)
+        worker_a.sync(db)
+        store(2, comment_id=3)
+        assert worker_a.sync(db) == 1 and worker_a.search(vectors[2], k=1)[0][0] == 3
+        assert worker_a.sync(db) == 0
+
+        worker_a.save(str(tmp_path / "index.npz"))
+        loaded = VectorIndex.load(str(tmp_path / "index.npz"))
+        assert loaded.watermark == 5 and len(loaded) == 5
+
+    def test_disabled_index_scans_exactly(self, memory_db_session, monkeypatch):
+        """VECTOR_INDEX_ENABLED=False scores every stored vector without touching the index"""
+        db = memory_db_session
+        monkeypatch.setattr(settings, "VECTOR_INDEX_ENABLED", False)
+        monkeypatch.setattr(vector_index_module, "_vector_index", None)
+        monkeypatch.setattr(vector_index_module, "get_vector_index", lambda: pytest.fail("index used"))
+        vectors = clustered_vectors(25, 8, 3)
+        for i, vector in enumerate(vectors):
+            comment = Comment(content=f"c{i}", platform="facebook", prediction=i % 2, confidence=0.9)
+            comment.set_vector(vector)
+            db.add(comment)
+        db.commit()
+
+        results = vector_index_module.exact_search(db, vectors[3], limit=4, prediction=1, exclude_ids={4}, batch_size=7)
+        expected = [i for i in brute_force(vectors, vectors[3], 25) if i % 2 == 1 and i != 3][:4]
+
+        assert [comment.content for comment, _ in results] == [f"c{i}" for i in expected]
+        assert search_similar_comments(db, vectors[3], limit=1)[0][0].content == "c3"
+        assert vector_index_module.warm_vector_index() is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
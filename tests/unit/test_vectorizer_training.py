@@ -0,0 +1,127 @@
+"""
+Unit Tests for Out-of-Core Vectorizer Training
+
+Tests that the chunked vocabulary pass reproduces TfidfVectorizer.fit(),
+the max_features selection, resuming from a checkpoint and the chunked
+reduction pass.
+"""
+
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from backend.db.models import Comment
+from backend.services import vectorizer_training
+from backend.services.vectorizer_training import train_streaming
+from backend.utils import vector_utils
+
+WORDS = (
+    "sản phẩm tốt giao hàng nhanh đồ ngu cút đi mua ngay giảm giá sốc liên hệ zalo "
+    "bài viết hay cảm ơn chia sẻ chậm không như mô tả click link nhận quà miễn phí"
+).split()
+
+
+def make_corpus(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(WORDS, size=rng.integers(3, 12))) for _ in range(count)]
+
+
+@pytest.fixture
+def db(monkeypatch, memory_db_session):
+    monkeypatch.setattr(vector_utils, "_vectorizer", None)
+    monkeypatch.setattr(vector_utils, "_svd", None)
+    session = memory_db_session
+    corpus = make_corpus(120) + [""]
+    session.add_all(Comment(content=text, platform="facebook") for text in corpus)
+    session.commit()
+    session.corpus = corpus
+    return session
+
+
+def in_memory_fit(corpus, max_features=10000):
+    vectorizer = vector_utils.train_vectorizer_on_corpus(corpus, max_features=max_features)
+    vector_utils._vectorizer = None
+    return vectorizer
+
+
+class TestVocabularyPass:
+    """Test agreement with the in-memory fit"""
+
+    def test_matches_in_memory_fit(self, db, tmp_path):
+        expected = in_memory_fit(db.corpus)
+        output = str(tmp_path / "vectorizer.joblib")
+
+        report = train_streaming(db, output=output, chunk_size=7)
+
+        loaded = joblib.load(output)
+        assert report["documents"] == len(db.corpus) and report["features"] == len(expected.vocabulary_)
+        assert loaded.vocabulary_ == expected.vocabulary_
+        np.testing.assert_allclose(loaded.idf_, expected.idf_)
+        texts = [vector_utils.preprocess_text(t) for t in db.corpus[:10]]
+        np.testing.assert_allclose(loaded.transform(texts).toarray(), expected.transform(texts).toarray())
+        assert vector_utils._vectorizer is not None and not os.path.exists(output + ".checkpoint")
+
+    def test_max_features_keeps_most_frequent_terms(self, db, tmp_path):
+        expected = in_memory_fit(db.corpus, max_features=15)
+        output = str(tmp_path / "vectorizer.joblib")
+
+        train_streaming(db, output=output, chunk_size=16, max_features=15)
+
+        loaded = joblib.load(output)
+        assert len(loaded.vocabulary_) == 15
+        assert loaded.vocabulary_ == dict(sorted(loaded.vocabulary_.items()))
+        assert len(set(loaded.vocabulary_) & set(expected.vocabulary_)) >= 13
+
+    def test_resumes_from_checkpoint(self, db, tmp_path, monkeypatch):
+        """An interrupted run continues after the last checkpointed id"""
+        output = str(tmp_path / "vectorizer.joblib")
+        seen = []
+        update = vectorizer_training.VocabularyCounts.update
+
+        def failing_update(self, texts):
+            if len(seen) == 5:
+                raise KeyboardInterrupt
+            seen.append(len(texts))
+            update(self, texts)
+
+        monkeypatch.setattr(vectorizer_training.VocabularyCounts, "update", failing_update)
+        with pytest.raises(KeyboardInterrupt):
+            train_streaming(db, output=output, chunk_size=10, checkpoint_every=2)
+        assert joblib.load(output + ".checkpoint")["last_id"] == 40
+
+        seen.clear()
+        monkeypatch.setattr(vectorizer_training.VocabularyCounts, "update", update)
+        report = train_streaming(db, output=output, chunk_size=10, checkpoint_every=2)
+
+        assert report["documents"] == len(db.corpus)
+        assert joblib.load(output).vocabulary_ == in_memory_fit(db.corpus).vocabulary_
+
+
+class TestReductionPass:
+    """Test the chunked IncrementalPCA reducer"""
+
+    def test_fits_reducer_on_chunks(self, db, tmp_path):
+        output, svd_output = str(tmp_path / "v.joblib"), str(tmp_path / "svd.joblib")
+
+        report = train_streaming(db, output=output, svd_output=svd_output, svd_components=4, chunk_size=25)
+
+        svd = joblib.load(svd_output)
+        assert report["svd_rows"] == 121 and svd.n_components_ == 4
+        assert vector_utils.extract_features(db.corpus[0], reduce_dim=True).shape == (4,)
+
+    def test_reducer_reloads_after_restart(self, db, tmp_path):
+        """A fresh process loads the vectorizer and its reducer from disk"""
+        output, svd_output = str(tmp_path / "v.joblib"), str(tmp_path / "svd.joblib")
+        train_streaming(db, output=output, svd_output=svd_output, svd_components=4, chunk_size=25)
+        expected = vector_utils.extract_features(db.corpus[0], reduce_dim=True)
+        vector_utils._vectorizer, vector_utils._svd = None, None
+
+        assert vector_utils.load_vectorizer(output) and vector_utils.load_svd_reducer(svd_output)
+        np.testing.assert_allclose(vector_utils.extract_features(db.corpus[0], reduce_dim=True), expected, rtol=1e-5)
+        assert not vector_utils.load_svd_reducer(str(tmp_path / "missing.joblib"))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])